@@ -0,0 +1,15 @@
+-- Precomputed project analytics (EVA, risk, cash flow forecast) served by /analytics
+-- Rows are marked stale when the project's decisions, cash flows, invoices or payments
+-- change and are recomputed in the background (app/analytics_snapshots.py)
+CREATE TABLE IF NOT EXISTS analytics_snapshots (
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    kind VARCHAR(30) NOT NULL,
+    payload JSON NOT NULL,
+    is_stale BOOLEAN NOT NULL DEFAULT FALSE,
+    version INTEGER NOT NULL DEFAULT 0,
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT uq_analytics_snapshots_project_kind UNIQUE (project_id, kind)
+);
+
+CREATE INDEX IF NOT EXISTS ix_analytics_snapshots_project_id ON analytics_snapshots(project_id);
@@ -0,0 +1,15 @@
+-- Forward-filled daily exchange rates (one row per currency pair and day).
+-- Maintained by the application (app/exchange_rate_daily.py): rebuilt from the changed
+-- date onwards on every exchange rate write, and filled/extended at startup.
+CREATE TABLE IF NOT EXISTS exchange_rates_daily (
+    from_currency VARCHAR(3) NOT NULL,
+    to_currency VARCHAR(3) NOT NULL,
+    day DATE NOT NULL,
+    rate NUMERIC(15, 6) NOT NULL,
+    source_date DATE NOT NULL,
+    PRIMARY KEY (from_currency, to_currency, day)
+);
+
+-- Supports the "latest rate on or before day" lookup used to fill the table
+CREATE INDEX IF NOT EXISTS idx_exchange_rates_pair_date
+    ON exchange_rates(from_currency, to_currency, date);
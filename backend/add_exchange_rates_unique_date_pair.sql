@@ -0,0 +1,18 @@
+-- One exchange rate per currency pair and day.
+-- Required by the bulk import (POST /currencies/rates/import), which upserts with
+-- INSERT ... ON CONFLICT (date, from_currency, to_currency).
+
+BEGIN;
+
+-- Keep the most recently inserted row of any duplicates (the one lookups already use)
+DELETE FROM exchange_rates er
+USING exchange_rates newer
+WHERE er.date = newer.date
+  AND er.from_currency = newer.from_currency
+  AND er.to_currency = newer.to_currency
+  AND er.id < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_exchange_rates_date_pair
+    ON exchange_rates(date, from_currency, to_currency);
+
+COMMIT;
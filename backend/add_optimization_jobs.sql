@@ -0,0 +1,25 @@
+-- Queue of optimization runs executed by optimization workers (python -m app.workers.optimizer)
+CREATE TABLE IF NOT EXISTS optimization_jobs (
+    id UUID PRIMARY KEY,
+    engine VARCHAR(20) NOT NULL DEFAULT 'ENHANCED',
+    request_parameters JSON NOT NULL,
+    solver_type VARCHAR(20) NULL,
+    generate_multiple_proposals BOOLEAN NOT NULL DEFAULT FALSE,
+    strategies JSON NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'QUEUED',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id VARCHAR(100) NULL,
+    run_id UUID NULL,
+    result JSON NULL,
+    error TEXT NULL,
+    created_by_id INTEGER NULL REFERENCES users(id),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at TIMESTAMPTZ NULL,
+    heartbeat_at TIMESTAMPTZ NULL,
+    finished_at TIMESTAMPTZ NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_optimization_jobs_status ON optimization_jobs(status);
+CREATE INDEX IF NOT EXISTS ix_optimization_jobs_created_at ON optimization_jobs(created_at);
+-- Workers claim the oldest queued job: keep that scan small
+CREATE INDEX IF NOT EXISTS idx_optimization_jobs_queued ON optimization_jobs(created_at) WHERE status = 'QUEUED';
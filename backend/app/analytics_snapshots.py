@@ -0,0 +1,314 @@
+"""
+Project Analytics Snapshots
+
+The project EVA, risk and cash flow forecast endpoints are computed from all of a
+project's decisions and cash flow events. Their responses are kept in
+analytics_snapshots (one row per project and kind) and served from there:
+
+- Writes are tracked with session events. When a flush or a bulk insert/update/delete
+  statement touches a FinalizedDecision, CashflowEvent, Invoice, Payment or
+  SupplierPayment, the project's snapshots are marked stale in the same transaction,
+  and after commit the project is queued for recomputation by the background
+  SnapshotRefresher (debounced, so a burst of writes costs one recomputation). The
+  projects of a bulk statement are resolved from its WHERE clause before it runs;
+  when they cannot be (inserts, statements without WHERE, updates moving rows to
+  another project or decision), every project's snapshots are marked stale. The
+  project's data version counters are bumped at the same time (app/data_versions.py),
+  which invalidates its cached responses.
+- serve_snapshot() returns a snapshot that is not stale, was computed today and is
+  younger than analytics_snapshot_max_age_seconds; otherwise it computes the response
+  live and stores it.
+- Every invalidation increments the row's version; a computation only stores its
+  result if the version is unchanged, so a result computed from data that changed in
+  the meantime is never stored as fresh. A project without a snapshot row first gets
+  a stale placeholder row, so writes during its first computation have a version to
+  increment.
+
+Builders (kind -> async (db, project_id) -> response dict) are registered by the
+analytics router with register_snapshot_builder.
+"""
+
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+import asyncio
+import logging
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func, event, inspect
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.data_versions import bump_version, project_version_name
+from app.models import AnalyticsSnapshot, Project, FinalizedDecision, CashflowEvent, SupplierPayment
+from app.models_invoice_payment import Invoice, Payment
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_EVA = 'EVA'
+SNAPSHOT_RISK = 'RISK'
+SNAPSHOT_CASHFLOW_FORECAST = 'CASHFLOW_FORECAST'
+
+SnapshotBuilder = Callable[[AsyncSession, int], Awaitable[dict]]
+
+_builders: Dict[str, SnapshotBuilder] = {}
+
+# session.info key of the projects changed by the session's current transaction
+_CHANGED_PROJECTS_KEY = 'analytics_changed_projects'
+
+
+def register_snapshot_builder(kind: str, builder: SnapshotBuilder):
+    _builders[kind] = builder
+
+
+async def _load_snapshot(db: AsyncSession, project_id: int, kind: str) -> Optional[AnalyticsSnapshot]:
+    result = await db.execute(
+        select(AnalyticsSnapshot).where(
+            AnalyticsSnapshot.project_id == project_id,
+            AnalyticsSnapshot.kind == kind
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+def _is_fresh(snapshot: AnalyticsSnapshot) -> bool:
+    if snapshot.is_stale or snapshot.computed_at is None:
+        return False
+    computed_at = snapshot.computed_at
+    if computed_at.tzinfo is None:
+        computed_at = computed_at.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    # Schedule metrics depend on today's date
+    if computed_at.astimezone().date() != now.astimezone().date():
+        return False
+    return now - computed_at <= timedelta(seconds=settings.analytics_snapshot_max_age_seconds)
+
+
+async def _claim_snapshot(db: AsyncSession, project_id: int, kind: str) -> int:
+    """Create a stale placeholder snapshot row (if still missing) and return its version"""
+    await db.execute(
+        pg_insert(AnalyticsSnapshot)
+        .values(project_id=project_id, kind=kind, payload={}, is_stale=True, version=0)
+        .on_conflict_do_nothing(constraint='uq_analytics_snapshots_project_kind')
+    )
+    await db.commit()
+    result = await db.execute(
+        select(AnalyticsSnapshot.version).where(
+            AnalyticsSnapshot.project_id == project_id,
+            AnalyticsSnapshot.kind == kind
+        )
+    )
+    return result.scalar_one()
+
+
+async def store_snapshot(db: AsyncSession, project_id: int, kind: str, payload: dict, version: int):
+    """Store a computed response and commit. Skipped when the snapshot was invalidated after version was read."""
+    await db.execute(
+        update(AnalyticsSnapshot)
+        .where(
+            AnalyticsSnapshot.project_id == project_id,
+            AnalyticsSnapshot.kind == kind,
+            AnalyticsSnapshot.version == version
+        )
+        .values(payload=payload, is_stale=False, computed_at=func.now())
+    )
+    await db.commit()
+
+
+async def compute_snapshot(db: AsyncSession, project_id: int, kind: str) -> dict:
+    """Compute a response live and store it as the project's snapshot"""
+    existing = await _load_snapshot(db, project_id, kind)
+    if existing is not None:
+        version = existing.version
+    elif await db.scalar(select(Project.id).where(Project.id == project_id)) is None:
+        # Unknown project: nothing to store, the builder answers (404 or empty data)
+        return jsonable_encoder(await _builders[kind](db, project_id))
+    else:
+        version = await _claim_snapshot(db, project_id, kind)
+    payload = jsonable_encoder(await _builders[kind](db, project_id))
+    try:
+        await store_snapshot(db, project_id, kind, payload, version)
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Failed to store {kind} snapshot of project {project_id}: {str(e)}")
+    return payload
+
+
+async def serve_snapshot(db: AsyncSession, project_id: int, kind: str) -> dict:
+    """The project's snapshot if fresh, else the live response (which is then stored)"""
+    snapshot = await _load_snapshot(db, project_id, kind)
+    if snapshot is not None and _is_fresh(snapshot):
+        return snapshot.payload
+    return await compute_snapshot(db, project_id, kind)
+
+
+async def refresh_project_snapshots(project_id: int):
+    """Recompute every kind of snapshot of a project in its own session"""
+    async with AsyncSessionLocal() as db:
+        for kind in list(_builders):
+            try:
+                await compute_snapshot(db, project_id, kind)
+            except Exception as e:
+                await db.rollback()
+                logger.warning(f"Failed to refresh {kind} snapshot of project {project_id}: {str(e)}")
+
+
+class SnapshotRefresher:
+    """Recomputes the snapshots of changed projects in the background"""
+
+    def __init__(self, debounce_seconds: float = 2.0):
+        self.debounce_seconds = debounce_seconds
+        self._pending: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, project_ids: Iterable[int]):
+        """Queue projects for recomputation (ignored when the refresher is not running)"""
+        if self._task is None:
+            return
+        self._pending.update(project_ids)
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Let a burst of writes settle before recomputing
+            await asyncio.sleep(self.debounce_seconds)
+            self._wakeup.clear()
+            project_ids, self._pending = self._pending, set()
+            for project_id in sorted(project_ids):
+                await refresh_project_snapshots(project_id)
+            logger.debug(f"Refreshed analytics snapshots of {len(project_ids)} project(s)")
+
+
+snapshot_refresher = SnapshotRefresher(debounce_seconds=settings.analytics_snapshot_debounce_seconds)
+
+
+def _loaded(obj, attribute: str):
+    """Attribute value without triggering a load"""
+    return inspect(obj).dict.get(attribute)
+
+
+def _mark_stale(session: Session, project_ids: Set[int]):
+    project_ids.discard(None)
+    if not project_ids:
+        return
+    session.connection().execute(
+        update(AnalyticsSnapshot)
+        .where(AnalyticsSnapshot.project_id.in_(project_ids))
+        .values(is_stale=True, version=AnalyticsSnapshot.version + 1)
+    )
+    session.info.setdefault(_CHANGED_PROJECTS_KEY, set()).update(project_ids)
+
+
+def _mark_all_stale(session: Session):
+    result = session.connection().execute(
+        update(AnalyticsSnapshot)
+        .values(is_stale=True, version=AnalyticsSnapshot.version + 1)
+        .returning(AnalyticsSnapshot.project_id)
+    )
+    session.info.setdefault(_CHANGED_PROJECTS_KEY, set()).update(row.project_id for row in result)
+
+
+def _decision_projects(decision_ids):
+    return select(FinalizedDecision.project_id).where(FinalizedDecision.id.in_(decision_ids))
+
+
+def _mark_changed_projects(session: Session, flush_context):
+    project_ids: Set[int] = set()
+    decision_ids: Set[int] = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (FinalizedDecision, SupplierPayment)):
+            project_ids.add(_loaded(obj, 'project_id'))
+        elif isinstance(obj, CashflowEvent):
+            decision_ids.add(_loaded(obj, 'related_decision_id'))
+        elif isinstance(obj, (Invoice, Payment)):
+            decision_ids.add(_loaded(obj, 'decision_id'))
+    decision_ids.discard(None)
+
+    if decision_ids:
+        result = session.connection().execute(_decision_projects(decision_ids))
+        project_ids.update(row.project_id for row in result)
+    _mark_stale(session, project_ids)
+
+
+# table -> (column linking a row to its project, query of the projects of the rows matching a WHERE clause)
+_BULK_PROJECT_QUERIES = {
+    FinalizedDecision.__table__: (
+        'project_id', lambda where: select(FinalizedDecision.project_id).where(where)
+    ),
+    SupplierPayment.__table__: (
+        'project_id', lambda where: select(SupplierPayment.project_id).where(where)
+    ),
+    CashflowEvent.__table__: (
+        'related_decision_id', lambda where: _decision_projects(select(CashflowEvent.related_decision_id).where(where))
+    ),
+    Invoice.__table__: (
+        'decision_id', lambda where: _decision_projects(select(Invoice.decision_id).where(where))
+    ),
+    Payment.__table__: (
+        'decision_id', lambda where: _decision_projects(select(Payment.decision_id).where(where))
+    ),
+}
+
+
+def _mark_bulk_write_projects(orm_execute_state):
+    """Mark the projects of a bulk insert/update/delete stale (runs before the statement)"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    statement = orm_execute_state.statement
+    entry = _BULK_PROJECT_QUERIES.get(getattr(statement, 'table', None))
+    if entry is None:
+        return
+    link_column, project_query = entry
+    session = orm_execute_state.session
+
+    where = None if orm_execute_state.is_insert else statement.whereclause
+    if orm_execute_state.is_update:
+        assigned = getattr(statement, '_values', None)
+        if assigned is None or link_column in {getattr(key, 'key', key) for key in assigned}:
+            # Rows may move to projects the WHERE clause does not tell
+            where = None
+    if where is None:
+        _mark_all_stale(session)
+        return
+
+    result = session.connection().execute(project_query(where))
+    _mark_stale(session, {row.project_id for row in result})
+
+
+def _schedule_changed_projects(session: Session):
+    project_ids = session.info.pop(_CHANGED_PROJECTS_KEY, None)
+    if project_ids:
+        bump_version(*(project_version_name(project_id) for project_id in project_ids))
+        snapshot_refresher.schedule(project_ids)
+
+
+def _forget_changed_projects(session: Session, previous_transaction):
+    session.info.pop(_CHANGED_PROJECTS_KEY, None)
+
+
+def install_change_tracking():
+    """Mark snapshots stale on writes made through any ORM session of this process"""
+    if not event.contains(Session, 'after_flush', _mark_changed_projects):
+        event.listen(Session, 'after_flush', _mark_changed_projects)
+        event.listen(Session, 'do_orm_execute', _mark_bulk_write_projects)
+        event.listen(Session, 'after_commit', _schedule_changed_projects)
+        event.listen(Session, 'after_soft_rollback', _forget_changed_projects)
@@ -19,10 +19,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import logging
 
+import numpy as np
+
 from app.models import (
     Project, ProjectItem, ProcurementOption, BudgetData,
     FinalizedDecision, Currency
 )
+from app.money import DEFAULT_DECIMAL_PLACES, to_minor, from_minor, load_currency_scales
 
 logger = logging.getLogger(__name__)
 
@@ -768,110 +771,110 @@ class BudgetAnalysisService:
         
         # Get all periods
         all_periods = sorted(set(list(cash_flow_by_period.keys()) + list(available_by_period.keys())))
-        
-        # Track cumulative cash flow by currency
-        cumulative_outflow = defaultdict(Decimal)
-        cumulative_inflow = defaultdict(Decimal)
-        cumulative_net_flow = defaultdict(Decimal)
-        cumulative_budget_by_currency = defaultdict(Decimal)  # Track cumulative budget per currency
+        currencies = sorted(
+            {currency for flows in cash_flow_by_period.values() for currency in flows}
+            | {currency for budgets in available_by_period.values() for currency in budgets}
+        )
+        column = {currency: j for j, currency in enumerate(currencies)}
+        scales = await load_currency_scales(self.db)
+        places = [scales.get(currency, DEFAULT_DECIMAL_PLACES) for currency in currencies]
+        divisors = np.power(10.0, places)
+        
+        # Period x currency matrices of exact minor units; present marks the currencies
+        # that appear in a period (only those are reported for it)
+        shape = (len(all_periods), len(currencies))
+        outflow = np.zeros(shape, dtype=np.int64)
+        inflow = np.zeros(shape, dtype=np.int64)
+        budget = np.zeros(shape, dtype=np.int64)
+        present = np.zeros(shape, dtype=bool)
+        for i, period in enumerate(all_periods):
+            for currency, flows in cash_flow_by_period.get(period, {}).items():
+                j = column[currency]
+                outflow[i, j] = to_minor(flows.get('outflow', 0), places[j])
+                inflow[i, j] = to_minor(flows.get('inflow', 0), places[j])
+                present[i, j] = True
+            for currency, amount in available_by_period.get(period, {}).items():
+                j = column[currency]
+                budget[i, j] = to_minor(amount, places[j])
+                present[i, j] = True
+        
+        # Budget accumulates over time, as do cash flows
+        cumulative_outflow = np.cumsum(outflow, axis=0)
+        cumulative_inflow = np.cumsum(inflow, axis=0)
+        cumulative_budget = np.cumsum(budget, axis=0)
+        # Cumulative position (budget + net cash flow), for informational purposes
+        cumulative_position = cumulative_budget + cumulative_inflow - cumulative_outflow
+        # Gap calculation for finance managers:
+        # gap = available_budget - needed_budget (negative = shortage)
+        # This shows directly how much budget is available vs needed, regardless of inflows
+        gap = cumulative_budget - cumulative_outflow
         
         # Analyze each period
-        for period in all_periods:
-            period_cash_flow = cash_flow_by_period.get(period, {})
-            period_available = available_by_period.get(period, {})
-            
-            # Get all currencies in this period (from both cash flows and available budget)
-            all_currencies = set(list(period_cash_flow.keys()) + list(period_available.keys()))
-            
+        for i, period in enumerate(all_periods):
             period_data = {
                 'period': period,
                 'currencies': {}
             }
             
-            for currency in all_currencies:
-                # Get cash flows for this period
-                cash_flow = period_cash_flow.get(currency, {'outflow': Decimal(0), 'inflow': Decimal(0)})
-                outflow = cash_flow.get('outflow', Decimal(0))
-                inflow = cash_flow.get('inflow', Decimal(0))
-                
-                # Update cumulative flows
-                cumulative_outflow[currency] += outflow
-                cumulative_inflow[currency] += inflow
-                cumulative_net_flow[currency] = cumulative_inflow[currency] - cumulative_outflow[currency]
-                
-                # Get available budget for this period and add to cumulative
-                period_budget = period_available.get(currency, Decimal(0))
-                cumulative_budget_by_currency[currency] += period_budget
-                cumulative_budget = cumulative_budget_by_currency[currency]
-                
-                # Calculate cumulative position (budget + net cash flow)
-                cumulative_position = cumulative_budget + cumulative_net_flow[currency]
-                
-                # Gap calculation for finance managers:
-                # gap = available_budget - needed_budget (negative = shortage)
-                # This shows directly how much budget is available vs needed, regardless of inflows
-                gap = cumulative_budget - cumulative_outflow[currency]
-                
-                # Also calculate position (for informational purposes, considering inflows)
-                cumulative_position = cumulative_budget + cumulative_net_flow[currency]
-                gap_percentage = (gap / cumulative_outflow[currency] * 100) if cumulative_outflow[currency] > 0 else Decimal(0)
+            for j in np.flatnonzero(present[i]):
+                currency = currencies[j]
+                gap_percentage = (
+                    gap[i, j] / cumulative_outflow[i, j] * 100 if cumulative_outflow[i, j] > 0 else 0
+                )
                 
                 period_data['currencies'][currency] = {
-                    'outflow': float(outflow),
-                    'inflow': float(inflow),
-                    'cumulative_outflow': float(cumulative_outflow[currency]),
-                    'cumulative_inflow': float(cumulative_inflow[currency]),
-                    'cumulative_budget': float(cumulative_budget),
-                    'cumulative_position': float(cumulative_position),
-                    'gap': float(gap),
+                    'outflow': float(outflow[i, j] / divisors[j]),
+                    'inflow': float(inflow[i, j] / divisors[j]),
+                    'cumulative_outflow': float(cumulative_outflow[i, j] / divisors[j]),
+                    'cumulative_inflow': float(cumulative_inflow[i, j] / divisors[j]),
+                    'cumulative_budget': float(cumulative_budget[i, j] / divisors[j]),
+                    'cumulative_position': float(cumulative_position[i, j] / divisors[j]),
+                    'gap': float(gap[i, j] / divisors[j]),
                     'gap_percentage': float(gap_percentage),
-                    'status': 'OK' if gap >= 0 else 'DEFICIT'
+                    'status': 'OK' if gap[i, j] >= 0 else 'DEFICIT'
                 }
-                
-                # Check for gaps in this period
-                if gap < 0:
-                    if period not in result.critical_months:
-                        result.critical_months.append(period)
+            
+            # Check for gaps in this period
+            if (gap[i] < 0)[present[i]].any():
+                result.critical_months.append(period)
             
             result.periods.append(period_data)
         
         # Track final totals by currency (after processing all periods)
         # This ensures we capture all currencies, even if they only appear in cash flows or only in budget
-        all_currencies_final = set(list(cumulative_outflow.keys()) + list(cumulative_budget_by_currency.keys()))
-        
         logger.info(
             f"Final currency tracking: "
-            f"Currencies with outflows: {list(cumulative_outflow.keys())}, "
-            f"Currencies with budget: {list(cumulative_budget_by_currency.keys())}, "
-            f"All currencies: {sorted(all_currencies_final)}"
+            f"Currencies with outflows: {[c for j, c in enumerate(currencies) if outflow[:, j].any()]}, "
+            f"Currencies with budget: {[c for j, c in enumerate(currencies) if budget[:, j].any()]}, "
+            f"All currencies: {currencies}"
         )
         
-        for currency in all_currencies_final:
-            total_needed = cumulative_outflow.get(currency, Decimal(0))
-            total_available = cumulative_budget_by_currency.get(currency, Decimal(0))
+        for j, currency in enumerate(currencies):
+            total_needed = from_minor(cumulative_outflow[-1, j], places[j]) if all_periods else Decimal(0)
+            total_available = from_minor(cumulative_budget[-1, j], places[j]) if all_periods else Decimal(0)
             # Gap = available - needed (negative means shortage)
-            gap = total_available - total_needed
+            gap_total = total_available - total_needed
             
             result.total_needed_by_currency[currency] = total_needed
             result.total_available_by_currency[currency] = total_available
-            result.gap_by_currency[currency] = gap
+            result.gap_by_currency[currency] = gap_total
             
             # Critical: Ensure currencies with outflows are always tracked, even with 0 budget
             if total_needed > 0:
                 logger.info(
                     f"Currency {currency}: Needed={total_needed:,.2f}, "
-                    f"Available={total_available:,.2f}, Gap={gap:,.2f}"
+                    f"Available={total_available:,.2f}, Gap={gap_total:,.2f}"
                 )
             
             # Log for debugging all currencies (dynamic - supports any currency)
             if total_needed > 0 or total_available > 0:
                 logger.info(
                     f"{currency} Currency Summary: "
-                    f"Needed={total_needed:,.2f}, Available={total_available:,.2f}, Gap={gap:,.2f}"
+                    f"Needed={total_needed:,.2f}, Available={total_available:,.2f}, Gap={gap_total:,.2f}"
                 )
-                if gap < 0:
+                if gap_total < 0:
                     logger.warning(
-                        f"⚠️  {currency} Budget Shortage: {abs(gap):,.2f} {currency} required"
+                        f"⚠️  {currency} Budget Shortage: {abs(gap_total):,.2f} {currency} required"
                     )
                 elif total_needed > 0 and total_available == 0:
                     logger.warning(
@@ -0,0 +1,126 @@
+"""
+Monthly Cash Flow Forecast
+
+Cash flow events are summed per calendar month in Postgres: one date_trunc('month')
+GROUP BY with inflow/outflow x actual/forecast totals, left-joined to a generated series
+of months so months without events still appear. Only the running balance and the gap
+detection are done in Python (build_cashflow_forecast).
+
+For each month the actual amount is used when there is one, else the forecast.
+"""
+
+from typing import Any, Dict, List, Optional
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+_MONTHLY_CASHFLOW_SQL = text("""
+    WITH months AS (
+        SELECT CAST(month AS date) AS month
+        FROM generate_series(CAST(:first_month AS date), CAST(:last_month AS date), interval '1 month') AS month
+    ),
+    totals AS (
+        SELECT
+            CAST(date_trunc('month', ce.event_date) AS date) AS month,
+            SUM(ce.amount) FILTER (WHERE UPPER(ce.event_type) = 'INFLOW' AND ce.forecast_type = 'ACTUAL') AS inflow_actual,
+            SUM(ce.amount) FILTER (WHERE UPPER(ce.event_type) = 'INFLOW' AND ce.forecast_type <> 'ACTUAL') AS inflow_forecast,
+            SUM(ce.amount) FILTER (WHERE UPPER(ce.event_type) <> 'INFLOW' AND ce.forecast_type = 'ACTUAL') AS outflow_actual,
+            SUM(ce.amount) FILTER (WHERE UPPER(ce.event_type) <> 'INFLOW' AND ce.forecast_type <> 'ACTUAL') AS outflow_forecast
+        FROM cashflow_events ce
+        JOIN finalized_decisions fd ON fd.id = ce.related_decision_id
+        JOIN projects p ON p.id = fd.project_id
+        WHERE ce.is_cancelled = FALSE
+          AND ce.event_date >= CAST(:first_month AS date)
+          AND ce.event_date < CAST(:last_month AS date) + interval '1 month'
+          AND (
+              (CAST(:project_id AS integer) IS NULL AND p.is_active = TRUE)
+              OR fd.project_id = CAST(:project_id AS integer)
+          )
+        GROUP BY 1
+    )
+    SELECT
+        m.month,
+        COALESCE(t.inflow_actual, 0) AS inflow_actual,
+        COALESCE(t.inflow_forecast, 0) AS inflow_forecast,
+        COALESCE(t.outflow_actual, 0) AS outflow_actual,
+        COALESCE(t.outflow_forecast, 0) AS outflow_forecast
+    FROM months m
+    LEFT JOIN totals t ON t.month = m.month
+    ORDER BY m.month
+""")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` calendar months after (or before) month"""
+    index = month.year * 12 + (month.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def monthly_cashflow_totals(
+    db: AsyncSession,
+    first_month: date,
+    last_month: date,
+    project_id: Optional[int] = None
+) -> List[Any]:
+    """
+    Inflow/outflow actual/forecast totals of every month from first_month to last_month
+    (inclusive), for one project or for all active projects.
+    """
+    result = await db.execute(_MONTHLY_CASHFLOW_SQL, {
+        'first_month': month_start(first_month),
+        'last_month': month_start(last_month),
+        'project_id': project_id,
+    })
+    return result.all()
+
+
+def build_cashflow_forecast(rows: List[Any], today: Optional[date] = None) -> Dict[str, Any]:
+    """forecast_data, gap_intervals and summary of the forecast endpoints from monthly totals"""
+    current_month = month_start(today or date.today())
+    forecast_data = []
+    cumulative_balance = Decimal('0')
+
+    for row in rows:
+        inflow = row.inflow_actual or row.inflow_forecast
+        outflow = row.outflow_actual or row.outflow_forecast
+        net = inflow - outflow
+        cumulative_balance += net
+
+        forecast_data.append({
+            'date': row.month.strftime('%Y-%m'),  # Month key for consistent monthly display
+            'inflow_forecast': float(row.inflow_forecast),
+            'outflow_forecast': float(row.outflow_forecast),
+            'inflow_actual': float(row.inflow_actual),
+            'outflow_actual': float(row.outflow_actual),
+            'net_cashflow': round(float(net), 2),
+            'cumulative_balance': round(float(cumulative_balance), 2),
+            'is_forecast': row.month > current_month,
+        })
+
+    # Identify periods with negative balance
+    gap_intervals = [
+        {'date': item['date'], 'deficit': abs(item['cumulative_balance'])}
+        for item in forecast_data
+        if item['cumulative_balance'] < 0
+    ]
+    lowest_balance = min((f['cumulative_balance'] for f in forecast_data), default=0)
+
+    return {
+        'forecast_data': forecast_data,
+        'gap_intervals': gap_intervals,
+        'summary': {
+            'total_inflow_forecast': sum(f['inflow_forecast'] for f in forecast_data),
+            'total_outflow_forecast': sum(f['outflow_forecast'] for f in forecast_data),
+            'total_inflow_actual': sum(f['inflow_actual'] for f in forecast_data),
+            'total_outflow_actual': sum(f['outflow_actual'] for f in forecast_data),
+            'final_balance': forecast_data[-1]['cumulative_balance'] if forecast_data else 0,
+            'max_deficit': lowest_balance,
+            'financing_needed': abs(lowest_balance) if lowest_balance < 0 else 0,
+        }
+    }
@@ -21,6 +21,63 @@ class Settings(BaseSettings):
     # Set to "*" to allow all origins (for development only)
     allowed_origins: Optional[str] = None
     
+    # Optimization model dumps for offline replay (replay_optimization_model.py)
+    # Models are dumped when a run sets dump_model, or automatically when a solve takes
+    # at least OPTIMIZATION_MODEL_DUMP_SLOW_SECONDS
+    optimization_model_dump_dir: str = "optimization_dumps"
+    optimization_model_dump_slow_seconds: Optional[float] = None
+    
+    # Process-wide exchange rate cache; bounds staleness after writes made by other processes
+    exchange_rate_cache_ttl_seconds: float = 300.0
+    # Per-date cross-rate matrices kept by app/cross_rate_matrix.py (LRU by date)
+    cross_rate_matrix_cache_dates: int = 64
+    # exchange_rates_daily is forward-filled up to this many days after today
+    exchange_rate_daily_horizon_days: int = 3650
+    
+    # Optimization workers (python -m app.workers.optimizer)
+    optimization_worker_poll_seconds: float = 2.0
+    optimization_worker_heartbeat_seconds: float = 10.0
+    # RUNNING jobs without a heartbeat for this long are requeued (or failed after max attempts)
+    optimization_worker_stale_seconds: float = 120.0
+    optimization_job_max_attempts: int = 2
+    
+    # BrsApi market rates (app/services/brs_api_client.py)
+    # BRS_API_TRANSPORT=fake serves built-in sample rates without network access (tests,
+    # offline deployments); BRS_API_BASE_URL can also point the http transport at a local server
+    brs_api_transport: str = "http"
+    brs_api_base_url: str = "https://BrsApi.ir/Api/Market/Gold_Currency.php"
+    brs_api_key: str = "BY2La54gKuQsmIZEZCN9TFDUPpxhAicx"
+    brs_api_timeout_seconds: float = 10.0
+    brs_api_max_connections: int = 10
+    # Rates older than this are served while a background refresh runs
+    brs_api_refresh_seconds: float = 300.0
+    
+    # Analytics
+    # Project analytics snapshots (app/analytics_snapshots.py): served while younger than
+    # this; recomputed this long after the last change to a project's data
+    analytics_snapshot_max_age_seconds: float = 3600.0
+    analytics_snapshot_debounce_seconds: float = 2.0
+    # Monte Carlo schedule/cost risk (app/risk_simulation.py)
+    risk_simulation_samples: int = 100000
+    risk_simulation_seed: int = 20240601
+    risk_simulation_budget_seconds: float = 2.0
+    # Process pool for portfolio simulations; below 2 simulations run in a thread
+    risk_simulation_workers: int = 4
+    # Observations a supplier/project group needs before items draw from it
+    risk_simulation_min_samples: int = 5
+    # Portfolio risk (app/portfolio_risk.py): projects not finished by then are left out
+    portfolio_risk_deadline_seconds: float = 5.0
+    # Items per batch when building the portfolio item follow-up (app/item_follow_up.py)
+    item_follow_up_batch_size: int = 500
+    # In-memory decision cube (app/decision_cube.py): refreshed at least this often, and
+    # each refresh re-reads decisions changed up to overlap seconds before the last one seen
+    decision_cube_max_age_seconds: float = 60.0
+    decision_cube_overlap_seconds: float = 300.0
+    # Cached analytics/report/dashboard responses (app/response_cache.py)
+    response_cache_max_entries: int = 512
+    # Cached responses roll over this often, to pick up writes made by other processes
+    response_cache_max_age_seconds: float = 300.0
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,138 @@
+"""
+Cross-Rate Matrices
+
+Exchange rates are stored against the base currency (X -> IRR). Converting between two
+other currencies needs both legs, so a per-call conversion does two lookups. For a date,
+CrossRateEngine builds a dense currency x currency matrix from the base rates in effect
+on that date:
+
+    matrix[i, j] = rate(i -> IRR) / rate(j -> IRR)   # units of j per unit of i
+
+so any pair is one index lookup, and a whole column of amounts in mixed currencies is
+converted with one fancy-indexing operation (CrossRateMatrix.convert).
+
+- Base rates come from the process-wide exchange rate cache; matrices are rebuilt when
+  that cache reloads or is invalidated.
+- Matrices of the most recently used dates are kept (cross_rate_matrix_cache_dates).
+- Currencies without a rate on or before the date have NaN rows and columns.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+from collections import OrderedDict
+from decimal import Decimal
+from datetime import date
+
+import numpy as np
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.exchange_rate_cache import exchange_rate_cache
+from app.currency_conversion_service import BASE_CURRENCY
+
+
+class CrossRateMatrix:
+    """Cross rates between all known currencies on one date"""
+
+    def __init__(self, on_date: date, currencies: Sequence[str], base_rates: Sequence[Optional[Decimal]]):
+        self.on_date = on_date
+        self.currencies: Tuple[str, ...] = tuple(currencies)
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(self.currencies)}
+        # Decimal rates into the base currency (None where missing) for exact single conversions
+        self.base_rates: Tuple[Optional[Decimal], ...] = tuple(base_rates)
+
+        to_base = np.array(
+            [float(rate) if rate else np.nan for rate in self.base_rates], dtype=np.float64
+        )
+        self.matrix = np.outer(to_base, 1.0 / to_base)
+
+    def has_rate(self, currency: str) -> bool:
+        position = self.index.get(currency)
+        return position is not None and self.base_rates[position] is not None
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[Decimal]:
+        """Units of to_currency per unit of from_currency, or None if either rate is missing"""
+        if from_currency == to_currency:
+            return Decimal('1')
+        if not (self.has_rate(from_currency) and self.has_rate(to_currency)):
+            return None
+        return self.base_rates[self.index[from_currency]] / self.base_rates[self.index[to_currency]]
+
+    def codes_to_indices(self, currencies: Sequence[str]) -> np.ndarray:
+        """Row/column index per currency code; -1 for unknown codes"""
+        return np.array([self.index.get(code, -1) for code in currencies], dtype=np.int64)
+
+    def convert(self, amounts: Sequence, from_currencies: Sequence[str], to_currency: str) -> np.ndarray:
+        """
+        Convert a column of amounts in mixed currencies to one currency.
+
+        Returns:
+            float64 array aligned with amounts; NaN where a rate is missing
+        """
+        values = np.asarray(amounts, dtype=np.float64)
+        rows = self.codes_to_indices(from_currencies)
+        column = self.index.get(to_currency)
+        if column is None:
+            return np.full(values.shape, np.nan)
+
+        factors = np.where(rows >= 0, self.matrix[np.maximum(rows, 0), column], np.nan)
+        # Same-currency amounts pass through even when the currency has no rate
+        factors[np.asarray(from_currencies, dtype=object) == to_currency] = 1.0
+        return values * factors
+
+
+class CrossRateEngine:
+    """Builds cross-rate matrices per date and keeps the recently used ones"""
+
+    def __init__(self, base_currency: str, max_dates: int = 64):
+        self.base_currency = base_currency
+        self.max_dates = max_dates
+        self._matrices: "OrderedDict[date, CrossRateMatrix]" = OrderedDict()
+        self._generation: Optional[int] = None
+
+    def clear(self):
+        self._matrices.clear()
+
+    async def matrix_for(self, db: AsyncSession, on_date: date) -> CrossRateMatrix:
+        """Cross-rate matrix for on_date (rates on or before that date)"""
+        series_by_currency = await exchange_rate_cache.get_series_to(db, self.base_currency)
+
+        if self._generation != exchange_rate_cache.generation:
+            self._matrices.clear()
+            self._generation = exchange_rate_cache.generation
+
+        matrix = self._matrices.get(on_date)
+        if matrix is not None:
+            self._matrices.move_to_end(on_date)
+            return matrix
+
+        currencies = [self.base_currency] + sorted(c for c in series_by_currency if c != self.base_currency)
+        base_rates = [Decimal('1')] + [
+            series_by_currency[code].rate_on_or_before(on_date) for code in currencies[1:]
+        ]
+        matrix = CrossRateMatrix(on_date, currencies, base_rates)
+
+        self._matrices[on_date] = matrix
+        while len(self._matrices) > self.max_dates:
+            self._matrices.popitem(last=False)
+        return matrix
+
+    async def rate(self, db: AsyncSession, from_currency: str, to_currency: str, on_date: date) -> Optional[Decimal]:
+        matrix = await self.matrix_for(db, on_date)
+        return matrix.rate(from_currency, to_currency)
+
+    async def convert_column(
+        self,
+        db: AsyncSession,
+        amounts: Sequence,
+        from_currencies: Sequence[str],
+        to_currency: str,
+        on_date: date
+    ) -> np.ndarray:
+        """Convert amounts in mixed currencies to to_currency at the rates of one date"""
+        matrix = await self.matrix_for(db, on_date)
+        return matrix.convert(amounts, from_currencies, to_currency)
+
+
+# Shared by every CurrencyConversionService in this process
+cross_rate_engine = CrossRateEngine(BASE_CURRENCY, max_dates=settings.cross_rate_matrix_cache_dates)
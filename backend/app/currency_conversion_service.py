@@ -8,12 +8,15 @@ It implements rigorous financial accounting principles:
 - No mixing of currencies without explicit conversion
 """
 
-from typing import Optional
+from typing import Optional, Sequence
 from decimal import Decimal
 from datetime import date
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, and_
 from app.models import ExchangeRate
+from app.exchange_rate_cache import exchange_rate_cache
+from app.rate_history import downsample_rate_history
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,6 +24,13 @@ logger = logging.getLogger(__name__)
 # Base currency for the system
 BASE_CURRENCY = 'IRR'
 
+# What convert_many does with amounts that have no rate on or before their date
+MISSING_RATE_RAISE = 'raise'  # ValueError listing the missing currency pairs
+MISSING_RATE_NAN = 'nan'      # NaN in the result
+MISSING_RATE_ZERO = 'zero'    # 0 in the result
+MISSING_RATE_KEEP = 'keep'    # unconverted amount (treated as already in the target currency)
+MISSING_RATE_POLICIES = (MISSING_RATE_RAISE, MISSING_RATE_NAN, MISSING_RATE_ZERO, MISSING_RATE_KEEP)
+
 
 class CurrencyConversionService:
     """Service for handling currency conversions with time-variant exchange rates"""
@@ -68,7 +78,7 @@ class CurrencyConversionService:
         
         # Convert to base currency
         converted_amount = amount * rate
-        logger.info(
+        logger.debug(
             f"Converted {amount} {currency} to {converted_amount} {BASE_CURRENCY} "
             f"using rate {rate} for date {transaction_date}"
         )
@@ -102,32 +112,102 @@ class CurrencyConversionService:
         if from_currency == to_currency:
             return amount
         
-        # Convert via base currency for consistency
-        base_amount = await self.convert_to_base(amount, from_currency, transaction_date)
-        
-        # If target is base currency, we're done
-        if to_currency == BASE_CURRENCY:
-            return base_amount
-        
-        # Convert from base to target currency
-        rate = await self._get_exchange_rate(BASE_CURRENCY, to_currency, transaction_date)
-        
-        if not rate:
-            raise ValueError(
-                f"No exchange rate found for {BASE_CURRENCY} to {to_currency} "
-                f"on or before {transaction_date}"
-            )
+        # Both legs (from -> IRR, to -> IRR) come from the cached cross-rate matrix of the date
+        from app.cross_rate_matrix import cross_rate_engine
+        matrix = await cross_rate_engine.matrix_for(self.db, transaction_date)
+        for currency in (from_currency, to_currency):
+            if currency != BASE_CURRENCY and not matrix.has_rate(currency):
+                raise ValueError(
+                    f"No exchange rate found for {currency} to {BASE_CURRENCY} "
+                    f"on or before {transaction_date}"
+                )
         
-        # Convert from base to target (inverse rate)
-        converted_amount = base_amount / rate
+        converted_amount = amount * matrix.rate(from_currency, to_currency)
         
-        logger.info(
+        logger.debug(
             f"Converted {amount} {from_currency} to {converted_amount} {to_currency} "
             f"via {BASE_CURRENCY} for date {transaction_date}"
         )
         
         return converted_amount
     
+    async def convert_many(
+        self,
+        amounts: Sequence,
+        currencies: Sequence[Optional[str]],
+        dates: Sequence[date],
+        target_currency: str = BASE_CURRENCY,
+        on_missing: str = MISSING_RATE_RAISE
+    ) -> np.ndarray:
+        """
+        Convert many amounts at once using the rate valid on each amount's date.
+        
+        Amounts are grouped by currency; for each currency pair the rates for all dates
+        are resolved with one searchsorted over the pair's cached history. Conversions
+        follow convert_currency: amount * rate(from->IRR) / rate(target->IRR). Unlike convert_currency, negative amounts keep their sign.
+        
+        Args:
+            amounts: Amounts (Decimal, float or None; None counts as 0)
+            currencies: Currency code per amount (None means base currency)
+            dates: Transaction date per amount
+            target_currency: Currency of the result
+            on_missing: 'raise', 'nan', 'zero' or 'keep' (see MISSING_RATE_*)
+            
+        Returns:
+            float64 array of converted amounts, aligned with the input
+            
+        Raises:
+            ValueError: If the inputs differ in length, or on_missing='raise' and a rate is missing
+        """
+        if on_missing not in MISSING_RATE_POLICIES:
+            raise ValueError(f"on_missing must be one of {MISSING_RATE_POLICIES}")
+        if not (len(amounts) == len(currencies) == len(dates)):
+            raise ValueError("amounts, currencies and dates must have the same length")
+        
+        values = np.array([float(a) if a is not None else 0.0 for a in amounts], dtype=np.float64)
+        codes = np.array([(c or BASE_CURRENCY).strip().upper() for c in currencies], dtype=object)
+        days = np.array(dates, dtype='datetime64[D]')
+        factors = np.ones(len(values), dtype=np.float64)
+        
+        to_target = None
+        if target_currency != BASE_CURRENCY:
+            to_target = await exchange_rate_cache.get_series(self.db, target_currency, BASE_CURRENCY)
+        
+        for currency in np.unique(codes):
+            if currency == target_currency:
+                continue
+            
+            mask = codes == currency
+            pair_factors = np.ones(int(mask.sum()), dtype=np.float64)
+            
+            if currency != BASE_CURRENCY:
+                to_base = await exchange_rate_cache.get_series(self.db, currency, BASE_CURRENCY)
+                pair_factors = to_base.rates_on_or_before(days[mask]) if to_base else np.full(pair_factors.shape, np.nan)
+            
+            if target_currency != BASE_CURRENCY:
+                # Same cross-rate convention as convert_currency
+                inverse = to_target.rates_on_or_before(days[mask]) if to_target else np.full(pair_factors.shape, np.nan)
+                pair_factors = pair_factors / inverse
+            
+            factors[mask] = pair_factors
+        
+        missing = np.isnan(factors)
+        if missing.any():
+            if on_missing == MISSING_RATE_RAISE:
+                missing_pairs = sorted(set(codes[missing]))
+                raise ValueError(
+                    f"No exchange rate found for {int(missing.sum())} amount(s) "
+                    f"({', '.join(missing_pairs)} to {target_currency}) on or before "
+                    f"{days[missing].min()}"
+                )
+            if on_missing == MISSING_RATE_ZERO:
+                factors[missing] = 0.0
+            elif on_missing == MISSING_RATE_KEEP:
+                factors[missing] = 1.0
+            logger.debug(f"{int(missing.sum())} amount(s) without exchange rate handled with policy '{on_missing}'")
+        
+        return values * factors
+    
     async def _get_exchange_rate(
         self, 
         from_currency: str, 
@@ -138,6 +218,9 @@ class CurrencyConversionService:
         Get exchange rate between two currencies for a specific date.
         Returns the closest available rate on or before the transaction date.
         
+        Served from the process-wide exchange rate cache (binary search over the
+        pair's rate history) instead of a query per lookup.
+        
         Args:
             from_currency: Source currency code
             to_currency: Target currency code
@@ -146,23 +229,7 @@ class CurrencyConversionService:
         Returns:
             Exchange rate as Decimal, or None if not found
         """
-        # Query for the most recent rate on or before the transaction date
-        stmt = (
-            select(ExchangeRate.rate)
-            .where(
-                and_(
-                    ExchangeRate.from_currency == from_currency,
-                    ExchangeRate.to_currency == to_currency,
-                    ExchangeRate.date <= transaction_date,
-                    ExchangeRate.is_active == True
-                )
-            )
-            .order_by(desc(ExchangeRate.date))
-            .limit(1)
-        )
-        
-        result = await self.db.execute(stmt)
-        rate = result.scalar_one_or_none()
+        rate = await exchange_rate_cache.get_rate(self.db, from_currency, to_currency, transaction_date)
         
         if rate:
             logger.debug(
@@ -202,7 +269,8 @@ class CurrencyConversionService:
         from_currency: str, 
         to_currency: str, 
         start_date: Optional[date] = None,
-        end_date: Optional[date] = None
+        end_date: Optional[date] = None,
+        max_points: Optional[int] = None
     ) -> list[dict]:
         """
         Get historical exchange rates between two currencies.
@@ -212,6 +280,7 @@ class CurrencyConversionService:
             to_currency: Target currency code
             start_date: Optional start date filter
             end_date: Optional end date filter
+            max_points: If set, downsample to at most this many points (LTTB, keeps the shape)
             
         Returns:
             List of rate records with date and rate
@@ -237,10 +306,13 @@ class CurrencyConversionService:
         
         result = await self.db.execute(stmt)
         
-        return [
+        history = [
             {"date": row.date, "rate": row.rate}
             for row in result
         ]
+        if max_points:
+            history = downsample_rate_history(history, max_points)
+        return history
 
 
 # Convenience functions for direct usage
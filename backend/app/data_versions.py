@@ -0,0 +1,129 @@
+"""
+Data Version Counters
+
+Process-wide counters bumped whenever a kind of data is written (e.g. 'currencies',
+'exchange_rates'). Endpoints derive ETags from the counters of the data they read,
+so an unchanged view can be answered with 304 Not Modified without querying.
+
+Table counters are named after the table ('finalized_decisions', 'cashflow_events',
+...) and bumped automatically once install_write_tracking() is called: every commit of
+an ORM session bumps the tables it flushed or wrote with bulk insert/update/delete
+statements. Per-project counters (project_version_name) are bumped by the analytics
+snapshot tracking for the projects whose decisions, cash flow events or payments
+changed; a bulk statement on project data (project unknown) bumps ALL_PROJECTS, which
+every project's names include. Raw SQL writes (text()) are not tracked.
+
+Counters live in one process. ETags carry a per-process epoch, so an ETag issued by
+another API process never matches here; writes made by other processes are picked up
+because ETags also roll over every max_age_seconds.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+from collections import defaultdict
+from itertools import chain
+import hashlib
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Distinguishes ETags issued by this process from those of other processes
+_EPOCH = uuid.uuid4().hex[:8]
+
+_versions: Dict[str, int] = defaultdict(int)
+
+ALL_PROJECTS = 'project:*'
+
+# Tables whose bulk writes may change any project's analytics
+PROJECT_DATA_TABLES = frozenset({
+    'finalized_decisions', 'cashflow_events', 'supplier_payments', 'invoices', 'payments',
+})
+
+# session.info key of the names to bump when the session's current transaction commits
+_CHANGED_NAMES_KEY = 'data_versions_changed'
+
+
+def bump_version(*names: str):
+    """Mark data as changed; call after committing the write"""
+    for name in names:
+        _versions[name] += 1
+
+
+def get_version(name: str) -> int:
+    return _versions[name]
+
+
+def project_version_name(project_id: int) -> str:
+    """Counter bumped when one project's analytics data changes"""
+    return f"project:{project_id}"
+
+
+def project_version_names(project_id: int) -> List[str]:
+    """Counter names an ETag of one project's analytics data is derived from"""
+    return [project_version_name(project_id), ALL_PROJECTS]
+
+
+def make_etag(names: Iterable[str], *extra, max_age_seconds: Optional[float] = None) -> str:
+    """
+    Weak ETag for a response built from the named data and extra key parts
+    (query parameters, date, role, ...).
+    """
+    parts = [_EPOCH] + [f"{name}:{_versions[name]}" for name in names] + [str(part) for part in extra]
+    if max_age_seconds:
+        parts.append(f"t{int(time.time() // max_age_seconds)}")
+    digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header lists the ETag (or '*')"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison: W/"x" and "x" are equivalent
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return '*' in candidates or etag in candidates or bare in candidates
+
+
+def _changed_names(session: Session) -> Set[str]:
+    return session.info.setdefault(_CHANGED_NAMES_KEY, set())
+
+
+def _record_flushed_tables(session: Session, flush_context):
+    names = _changed_names(session)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            names.add(table.name)
+
+
+def _record_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None:
+        return
+    names = _changed_names(orm_execute_state.session)
+    names.add(table.name)
+    if table.name in PROJECT_DATA_TABLES:
+        names.add(ALL_PROJECTS)
+
+
+def _bump_committed(session: Session):
+    names = session.info.pop(_CHANGED_NAMES_KEY, None)
+    if names:
+        bump_version(*names)
+
+
+def _forget_changes(session: Session, previous_transaction):
+    session.info.pop(_CHANGED_NAMES_KEY, None)
+
+
+def install_write_tracking():
+    """Bump the table counters on every commit of an ORM session of this process"""
+    if not event.contains(Session, 'after_flush', _record_flushed_tables):
+        event.listen(Session, 'after_flush', _record_flushed_tables)
+        event.listen(Session, 'do_orm_execute', _record_bulk_write)
+        event.listen(Session, 'after_commit', _bump_committed)
+        event.listen(Session, 'after_soft_rollback', _forget_changes)
@@ -0,0 +1,264 @@
+"""
+In-Memory Decision Cube
+
+Reports and portfolio analytics slice the same finalized decisions by status, project,
+supplier and date range. Instead of each loading ORM objects with its own query, the
+decisions of all projects are kept in memory as NumPy columns (one array per field,
+rows in id order) and filtered with boolean masks:
+
+    frame = await get_decision_frame(db)
+    locked = frame.where((frame['status'] == 'LOCKED') & frame.is_in('project_id', project_ids))
+    locked.money('final_cost').group_sum(locked['project_id'].tolist())
+
+- The cube is built from one projection query (decisions joined with their project
+  and procurement option).
+- Refreshes are incremental: only decisions whose updated_at (or created_at) is newer
+  than the last seen one, minus decision_cube_overlap_seconds for transactions that
+  committed late, are loaded and merged by id. Deleted decisions are noticed by the row
+  count and sum of ids (a delete and an insert between refreshes keep the count, but
+  new ids are larger than any deleted one) and trigger a full reload, as do writes to
+  projects, procurement options (names) or currencies (decimal places).
+- The cube refreshes when this process wrote decisions (app/data_versions.py) or when
+  it is older than decision_cube_max_age_seconds (writes of other processes).
+- Listeners (add_listener) are told about every change so structures derived from the
+  decisions can be maintained incrementally: listener(None, frame) after a full load,
+  listener(previous rows, changed rows) after an incremental refresh.
+
+Dates are datetime64[D] and timestamps naive UTC datetime64[us] (NaT when empty);
+amounts are int64 minor units of the base currency, 0 when empty.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+
+from app.config import settings
+from app.models import FinalizedDecision, Project, ProcurementOption
+from app.money import DEFAULT_DECIMAL_PLACES, MoneyArray, to_minor, load_currency_scales
+from app.data_versions import get_version
+from app.currency_conversion_service import BASE_CURRENCY
+
+logger = logging.getLogger(__name__)
+
+INT, TEXT, FLAG, DAY, TIMESTAMP, AMOUNT = 'int', 'text', 'flag', 'day', 'timestamp', 'amount'
+
+# (column name, kind, selected expression)
+_COLUMNS: Tuple[Tuple[str, str, Any], ...] = (
+    ('id', INT, FinalizedDecision.id),
+    ('project_id', INT, FinalizedDecision.project_id),
+    ('project_name', TEXT, Project.name),
+    ('project_is_active', FLAG, Project.is_active),
+    ('supplier_name', TEXT, ProcurementOption.supplier_name),
+    ('item_code', TEXT, FinalizedDecision.item_code),
+    ('status', TEXT, FinalizedDecision.status),
+    ('delivery_status', TEXT, FinalizedDecision.delivery_status),
+    ('purchase_date', DAY, FinalizedDecision.purchase_date),
+    ('delivery_date', DAY, FinalizedDecision.delivery_date),
+    ('actual_delivery_date', DAY, FinalizedDecision.actual_delivery_date),
+    ('actual_invoice_issue_date', DAY, FinalizedDecision.actual_invoice_issue_date),
+    ('actual_payment_date', DAY, FinalizedDecision.actual_payment_date),
+    ('forecast_invoice_timing_type', TEXT, FinalizedDecision.forecast_invoice_timing_type),
+    ('forecast_invoice_issue_date', DAY, FinalizedDecision.forecast_invoice_issue_date),
+    ('forecast_invoice_days_after_delivery', INT, FinalizedDecision.forecast_invoice_days_after_delivery),
+    ('finalized_at', TIMESTAMP, FinalizedDecision.finalized_at),
+    ('pm_accepted_at', TIMESTAMP, FinalizedDecision.pm_accepted_at),
+    ('final_cost', AMOUNT, FinalizedDecision.final_cost),
+    ('actual_payment_amount', AMOUNT, FinalizedDecision.actual_payment_amount),
+)
+
+_CHANGED_AT = func.coalesce(FinalizedDecision.updated_at, FinalizedDecision.created_at)
+
+# Data versions whose change requires a full reload (joined names, currency scales)
+_RELOAD_VERSIONS = ('projects', 'procurement_options', 'currencies')
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _column(kind: str, values: List[Any], decimal_places: int) -> np.ndarray:
+    if kind == INT:
+        # Missing integers are -1 (ids and day counts are never negative)
+        return np.fromiter((-1 if v is None else v for v in values), dtype=np.int64, count=len(values))
+    if kind == FLAG:
+        return np.fromiter((bool(v) for v in values), dtype=bool, count=len(values))
+    if kind == DAY:
+        return np.array(values, dtype='datetime64[D]')
+    if kind == TIMESTAMP:
+        return np.array([_utc_naive(v) for v in values], dtype='datetime64[us]')
+    if kind == AMOUNT:
+        return np.fromiter((to_minor(v, decimal_places) for v in values), dtype=np.int64, count=len(values))
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+class DecisionFrame:
+    """An immutable set of decisions as columns; filtering returns a new frame"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], scales: Dict[str, int]):
+        self.columns = columns
+        self.scales = scales
+        self.decimal_places = scales.get(BASE_CURRENCY, DEFAULT_DECIMAL_PLACES)
+
+    def __len__(self) -> int:
+        return len(self.columns['id'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def where(self, mask: np.ndarray) -> "DecisionFrame":
+        return DecisionFrame({name: column[mask] for name, column in self.columns.items()}, self.scales)
+
+    def is_in(self, name: str, values: Iterable) -> np.ndarray:
+        column = self.columns[name]
+        values = list(values)
+        if column.dtype != object:
+            return np.isin(column, values)
+        wanted = set(values)
+        return np.fromiter((value in wanted for value in column), dtype=bool, count=len(column))
+
+    def on_or_after(self, name: str, day: date) -> np.ndarray:
+        """Mask of rows whose date/timestamp column is on or after day (empty: False)"""
+        return self.columns[name] >= np.datetime64(day, 'D')
+
+    def on_or_before(self, name: str, day: date) -> np.ndarray:
+        """Mask of rows whose date/timestamp column is on or before day, i.e. before the next day"""
+        return self.columns[name] < np.datetime64(day + timedelta(days=1), 'D')
+
+    def days(self, name: str) -> np.ndarray:
+        """A date or timestamp column as datetime64[D] (timestamps: UTC date)"""
+        return self.columns[name].astype('datetime64[D]')
+
+    def money(self, name: str) -> MoneyArray:
+        """An amount column as base currency MoneyArray"""
+        minor = self.columns[name]
+        return MoneyArray(minor, np.full(len(minor), BASE_CURRENCY, dtype=object), self.scales)
+
+    def amounts(self, name: str) -> np.ndarray:
+        """An amount column as major-unit float64 (for ratios and scores, not totals)"""
+        return self.columns[name] / (10.0 ** self.decimal_places)
+
+
+def _merge(current: Dict[str, np.ndarray], changed: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Columns of current with the rows of changed replacing or added by id (id order)"""
+    ids = current['id']
+    changed_ids = changed['id']
+    positions = np.searchsorted(ids, changed_ids)
+    exists = positions < len(ids)
+    exists[exists] = ids[positions[exists]] == changed_ids[exists]
+
+    merged = {}
+    for name, column in current.items():
+        column = column.copy()
+        column[positions[exists]] = changed[name][exists]
+        merged[name] = np.concatenate([column, changed[name][~exists]])
+    order = np.argsort(merged['id'], kind='stable')
+    return {name: column[order] for name, column in merged.items()}
+
+
+CubeListener = Callable[[Optional[DecisionFrame], DecisionFrame], None]
+
+
+class DecisionCube:
+    """Keeps the DecisionFrame of all decisions up to date"""
+
+    def __init__(self):
+        self._frame: Optional[DecisionFrame] = None
+        self._watermark: Optional[datetime] = None
+        self._versions: Optional[Tuple[int, ...]] = None
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._listeners: List[CubeListener] = []
+
+    def add_listener(self, listener: CubeListener):
+        self._listeners.append(listener)
+        if self._frame is not None:
+            listener(None, self._frame)
+
+    def _notify(self, previous: Optional[DecisionFrame], changed: DecisionFrame):
+        for listener in self._listeners:
+            listener(previous, changed)
+
+    async def frame(self, db: AsyncSession) -> DecisionFrame:
+        """The current frame, refreshed first when decisions may have changed"""
+        async with self._lock:
+            decisions_version = get_version('finalized_decisions')
+            reload_versions = tuple(get_version(name) for name in _RELOAD_VERSIONS)
+            expired = time.monotonic() - self._refreshed_at > settings.decision_cube_max_age_seconds
+
+            if self._frame is None or self._versions is None or self._versions[1:] != reload_versions:
+                await self._load(db)
+            elif expired or self._versions[0] != decisions_version:
+                await self._refresh(db)
+
+            self._versions = (decisions_version,) + reload_versions
+            self._refreshed_at = time.monotonic()
+            return self._frame
+
+    def _query(self):
+        return (
+            select(*(expression.label(name) for name, _, expression in _COLUMNS), _CHANGED_AT.label('changed_at'))
+            .outerjoin(Project, Project.id == FinalizedDecision.project_id)
+            .outerjoin(ProcurementOption, ProcurementOption.id == FinalizedDecision.procurement_option_id)
+            .order_by(FinalizedDecision.id)
+        )
+
+    async def _fetch(self, db: AsyncSession, query, decimal_places: int) -> Tuple[Dict[str, np.ndarray], Optional[datetime]]:
+        rows = (await db.execute(query)).all()
+        columns = {
+            name: _column(kind, [row[index] for row in rows], decimal_places)
+            for index, (name, kind, _) in enumerate(_COLUMNS)
+        }
+        watermark = max((row.changed_at for row in rows if row.changed_at is not None), default=None)
+        return columns, watermark
+
+    async def _load(self, db: AsyncSession):
+        started = time.monotonic()
+        scales = await load_currency_scales(db)
+        columns, self._watermark = await self._fetch(
+            db, self._query(), scales.get(BASE_CURRENCY, DEFAULT_DECIMAL_PLACES)
+        )
+        self._frame = DecisionFrame(columns, scales)
+        self._notify(None, self._frame)
+        logger.debug(f"Loaded decision cube: {len(self._frame)} decisions in {time.monotonic() - started:.3f}s")
+
+    async def _refresh(self, db: AsyncSession):
+        frame = self._frame
+        query = self._query()
+        if self._watermark is not None:
+            since = self._watermark - timedelta(seconds=settings.decision_cube_overlap_seconds)
+            query = query.where(_CHANGED_AT >= since)
+        changed, watermark = await self._fetch(db, query, frame.decimal_places)
+        columns = _merge(frame.columns, changed) if len(changed['id']) else frame.columns
+
+        # Deleted decisions are not in the delta; fall back to a full load
+        count, id_sum = (await db.execute(
+            select(func.count(FinalizedDecision.id), func.coalesce(func.sum(FinalizedDecision.id), 0))
+        )).one()
+        if count != len(columns['id']) or int(id_sum) != int(columns['id'].sum()):
+            await self._load(db)
+            return
+
+        self._frame = DecisionFrame(columns, frame.scales)
+        if len(changed['id']):
+            self._notify(frame.where(frame.is_in('id', changed['id'])), DecisionFrame(changed, frame.scales))
+        if watermark is not None and (self._watermark is None or watermark > self._watermark):
+            self._watermark = watermark
+
+
+decision_cube = DecisionCube()
+
+
+async def get_decision_frame(db: AsyncSession) -> DecisionFrame:
+    """All decisions (every status and project) as a DecisionFrame"""
+    return await decision_cube.frame(db)
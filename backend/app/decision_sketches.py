@@ -0,0 +1,220 @@
+"""
+Delay and Cycle-Time Sketches
+
+The risk and operational report sections need percentiles and histograms of per-decision
+day counts:
+
+- payment delay: actual_payment_date - purchase_date of LOCKED decisions (days, only
+  delays within a year either way), filtered by purchase date
+- procurement cycle time: pm_accepted_at - finalized_at of LOCKED decisions (days; 7
+  when finalized but not yet accepted), filtered by finalization date
+
+Both are whole days, so a histogram with one bin per day (DayHistogram) is a quantile
+sketch without approximation: it merges by adding counts, updates by adding or removing
+one value, and answers percentiles with the same interpolation as sorting the values.
+
+DecisionSketches keeps one DayHistogram per metric and (project, supplier, month of the
+filter date) cell. It listens to the decision cube, so recording a payment or a delivery
+moves one decision's contribution to its new cell at the next cube refresh. A query
+merges the cells of the requested projects/suppliers whose month lies entirely in the
+date range; the rows of a month only partly in range are read from the cube.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.decision_cube import DecisionFrame, decision_cube
+
+PAYMENT_DELAY = 'payment_delay'
+CYCLE_TIME = 'cycle_time'
+
+# Column each metric's cells are keyed and filtered by
+METRIC_DATE_COLUMNS = {PAYMENT_DELAY: 'purchase_date', CYCLE_TIME: 'finalized_at'}
+
+# Cycle time assumed for decisions finalized but not accepted by the PM yet
+DEFAULT_CYCLE_TIME_DAYS = 7
+
+# Payment delays outside (-MAX_DELAY_DAYS, MAX_DELAY_DAYS) are treated as data errors
+MAX_DELAY_DAYS = 365
+
+
+class DayHistogram:
+    """Counts of whole-day values; exact percentiles, mergeable"""
+
+    __slots__ = ('counts',)
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        self.counts: Dict[int, int] = dict(counts) if counts else {}
+
+    @classmethod
+    def of(cls, values: np.ndarray) -> "DayHistogram":
+        histogram = cls()
+        histogram.add(values)
+        return histogram
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, values: np.ndarray, sign: int = 1):
+        days, counts = np.unique(np.asarray(values, dtype=np.int64), return_counts=True)
+        for day, count in zip(days.tolist(), counts.tolist()):
+            total = self.counts.get(day, 0) + sign * count
+            if total:
+                self.counts[day] = total
+            else:
+                self.counts.pop(day, None)
+
+    def remove(self, values: np.ndarray):
+        self.add(values, sign=-1)
+
+    def merge(self, other: "DayHistogram"):
+        for day, count in other.counts.items():
+            self.counts[day] = self.counts.get(day, 0) + count
+
+    def percentile(self, percentile: float) -> float:
+        """Linearly interpolated percentile, as of the sorted values (0.0 when empty)"""
+        n = self.count
+        if n == 0:
+            return 0.0
+        days = sorted(self.counts)
+        cumulative = np.cumsum([self.counts[day] for day in days])
+
+        def value_at(rank: int) -> int:
+            return days[int(np.searchsorted(cumulative, rank, side='right'))]
+
+        index = (percentile / 100) * (n - 1)
+        lower = int(index)
+        upper = lower + 1
+        if upper >= n:
+            return float(days[-1])
+        weight = index - lower
+        return value_at(lower) * (1 - weight) + value_at(upper) * weight
+
+    def buckets(self, width: int) -> List[Tuple[int, int]]:
+        """[(bucket start, count)] in width-day intervals, ascending"""
+        buckets: Dict[int, int] = defaultdict(int)
+        for day, count in self.counts.items():
+            buckets[(day // width) * width] += count
+        return sorted(buckets.items())
+
+
+def metric_values(frame: DecisionFrame, metric: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(row mask, values of those rows) of a metric"""
+    is_locked = frame['status'] == 'LOCKED'
+    if metric == PAYMENT_DELAY:
+        paid = frame['actual_payment_date']
+        purchased = frame['purchase_date']
+        mask = is_locked & ~np.isnat(paid) & ~np.isnat(purchased)
+        delays = (paid - purchased)[mask].astype(np.int64)
+        in_range = (delays > -MAX_DELAY_DAYS) & (delays < MAX_DELAY_DAYS)
+        mask[mask] = in_range
+        return mask, delays[in_range]
+
+    finalized = frame['finalized_at']
+    accepted = frame['pm_accepted_at']
+    mask = is_locked & ~np.isnat(finalized)
+    values = np.where(
+        np.isnat(accepted),
+        np.timedelta64(DEFAULT_CYCLE_TIME_DAYS, 'D'),
+        accepted - finalized
+    )
+    return mask, values[mask] // np.timedelta64(1, 'D')
+
+
+def _months(frame: DecisionFrame, metric: str) -> np.ndarray:
+    return frame[METRIC_DATE_COLUMNS[metric]].astype('datetime64[M]')
+
+
+def _month_end(month: date) -> date:
+    next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+class DecisionSketches:
+    """Per (project, supplier, month) day histograms of each metric"""
+
+    def __init__(self):
+        self._cells: Dict[str, Dict[Tuple[int, Optional[str], date], DayHistogram]] = {
+            metric: {} for metric in METRIC_DATE_COLUMNS
+        }
+
+    def apply(self, previous: Optional[DecisionFrame], changed: DecisionFrame):
+        """Cube listener: rebuild (previous None) or move the changed decisions' values"""
+        if previous is None:
+            for cells in self._cells.values():
+                cells.clear()
+        else:
+            self._update(previous, sign=-1)
+        self._update(changed, sign=1)
+
+    def _update(self, frame: DecisionFrame, sign: int):
+        for metric, cells in self._cells.items():
+            mask, values = metric_values(frame, metric)
+            keys = zip(
+                frame['project_id'][mask].tolist(),
+                frame['supplier_name'][mask].tolist(),
+                _months(frame, metric)[mask].astype('datetime64[D]').astype(object),
+            )
+            grouped: Dict[Hashable, List[int]] = defaultdict(list)
+            for key, value in zip(keys, values.tolist()):
+                grouped[key].append(value)
+            for key, key_values in grouped.items():
+                histogram = cells.setdefault(key, DayHistogram())
+                histogram.add(np.array(key_values), sign)
+                if not histogram.counts:
+                    del cells[key]
+
+    def query(
+        self,
+        frame: DecisionFrame,
+        metric: str,
+        project_ids: Optional[Iterable[int]] = None,
+        supplier_names: Optional[Iterable[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> DayHistogram:
+        """
+        Merged histogram of a metric over the filters.
+
+        Args:
+            frame: The cube's current frame (rows of months only partly in range)
+        """
+        projects = set(project_ids) if project_ids else None
+        suppliers = set(supplier_names) if supplier_names else None
+        result = DayHistogram()
+        partial_months = set()
+
+        for (project_id, supplier_name, month), histogram in self._cells[metric].items():
+            if projects is not None and project_id not in projects:
+                continue
+            if suppliers is not None and supplier_name not in suppliers:
+                continue
+            month_end = _month_end(month)
+            if (start_date and month_end < start_date) or (end_date and month > end_date):
+                continue
+            if (start_date and month < start_date) or (end_date and month_end > end_date):
+                partial_months.add(month)
+                continue
+            result.merge(histogram)
+
+        if partial_months:
+            mask, values = metric_values(frame, metric)
+            rows = np.isin(_months(frame, metric), np.array(sorted(partial_months), dtype='datetime64[M]'))
+            if projects is not None:
+                rows &= frame.is_in('project_id', projects)
+            if suppliers is not None:
+                rows &= frame.is_in('supplier_name', suppliers)
+            if start_date:
+                rows &= frame.on_or_after(METRIC_DATE_COLUMNS[metric], start_date)
+            if end_date:
+                rows &= frame.on_or_before(METRIC_DATE_COLUMNS[metric], end_date)
+            result.add(values[rows[mask]])
+        return result
+
+
+decision_sketches = DecisionSketches()
+decision_cube.add_listener(decision_sketches.apply)
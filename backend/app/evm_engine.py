@@ -0,0 +1,145 @@
+"""
+Earned Value Time Series
+
+PV, EV and AC are running totals of cost events: a decision's planned cost counts from
+its scheduled date, its earned value from the date the work was accepted or paid, and
+its actual cost from the payment date. Each measure is kept as an EvmEvents array
+(dates sorted, amounts in int64 minor units) with a cumulative sum, so the totals at
+any number of sample dates come from one np.searchsorted:
+
+    planned = EvmEvents.from_pairs((d.delivery_date, d.final_cost) for d in decisions)
+    ...
+    series = evm_time_series(planned, earned, actual, sample_dates)
+    series.to_rows()
+
+Which date counts for which measure is decided by the caller (project EVA, portfolio
+EVA and the reports EVM page apply different rules); this module only accumulates.
+"""
+
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.money import DEFAULT_DECIMAL_PLACES, to_minor
+
+# Days between samples of the monthly EVA charts
+SAMPLE_INTERVAL_DAYS = 30
+
+
+class EvmEvents:
+    """Cost events of one measure, sorted by date, with running totals"""
+
+    __slots__ = ('dates', 'minor', 'cumulative')
+
+    def __init__(self, dates: np.ndarray, minor: np.ndarray):
+        order = np.argsort(dates, kind='stable')
+        self.dates = dates[order]
+        self.minor = minor[order]
+        # cumulative[k] = total of the first k events
+        self.cumulative = np.concatenate(([0], np.cumsum(self.minor))).astype(np.int64)
+
+    @classmethod
+    def from_pairs(
+        cls,
+        pairs: Iterable[Tuple[Optional[date], Any]],
+        decimal_places: int = DEFAULT_DECIMAL_PLACES
+    ) -> "EvmEvents":
+        """Build from (date, amount) pairs; pairs without a date are not events"""
+        dated = [(day, amount) for day, amount in pairs if day is not None]
+        return cls(
+            np.array([day for day, _ in dated], dtype='datetime64[D]'),
+            np.fromiter((to_minor(amount, decimal_places) for _, amount in dated), dtype=np.int64, count=len(dated))
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def cumulative_at(self, sample_dates: np.ndarray) -> np.ndarray:
+        """Minor-unit total of the events on or before each sample date"""
+        return self.cumulative[np.searchsorted(self.dates, sample_dates, side='right')]
+
+
+class EvmSeries:
+    """Cumulative PV, EV and AC (major units) at a set of sample dates"""
+
+    def __init__(self, dates: np.ndarray, pv: np.ndarray, ev: np.ndarray, ac: np.ndarray):
+        self.dates = dates
+        self.pv = pv
+        self.ev = ev
+        self.ac = ac
+
+    def cpi(self) -> np.ndarray:
+        """EV / AC, 1.0 where nothing has been spent"""
+        return np.divide(self.ev, self.ac, out=np.ones_like(self.ev), where=self.ac > 0)
+
+    def spi(self) -> np.ndarray:
+        """EV / PV, 1.0 where nothing was scheduled"""
+        return np.divide(self.ev, self.pv, out=np.ones_like(self.ev), where=self.pv > 0)
+
+    def to_rows(self) -> List[dict]:
+        """[{'date', 'pv', 'ev', 'ac', 'cpi', 'spi'}, ...] for chart payloads"""
+        cpi = self.cpi()
+        spi = self.spi()
+        return [
+            {
+                'date': day.isoformat(),
+                'pv': round(float(self.pv[k]), 2),
+                'ev': round(float(self.ev[k]), 2),
+                'ac': round(float(self.ac[k]), 2),
+                'cpi': round(float(cpi[k]), 3),
+                'spi': round(float(spi[k]), 3),
+            }
+            for k, day in enumerate(self.dates.astype(object))
+        ]
+
+
+def evm_time_series(
+    planned: EvmEvents,
+    earned: EvmEvents,
+    actual: EvmEvents,
+    sample_dates: Sequence[date],
+    decimal_places: int = DEFAULT_DECIMAL_PLACES
+) -> EvmSeries:
+    """Cumulative PV/EV/AC at every sample date"""
+    samples = np.array(sample_dates, dtype='datetime64[D]')
+    divisor = 10.0 ** decimal_places
+    return EvmSeries(
+        samples,
+        planned.cumulative_at(samples) / divisor,
+        earned.cumulative_at(samples) / divisor,
+        actual.cumulative_at(samples) / divisor,
+    )
+
+
+def event_dates(*measures: EvmEvents) -> List[date]:
+    """Sorted distinct dates on which any of the measures changes"""
+    if not measures:
+        return []
+    days = np.unique(np.concatenate([measure.dates for measure in measures]))
+    return list(days.astype(object))
+
+
+def monthly_sample_dates(decisions: Sequence, start_date: date, today: Optional[date] = None) -> List[date]:
+    """
+    Sample dates every SAMPLE_INTERVAL_DAYS from start_date, covering at least 12
+    samples and reaching past the latest forecast invoice date of the decisions.
+    """
+    latest_invoice_date = today or date.today()
+    for d in decisions:
+        if d.forecast_invoice_timing_type == 'ABSOLUTE' and d.forecast_invoice_issue_date:
+            invoice_date = d.forecast_invoice_issue_date
+        elif d.forecast_invoice_timing_type == 'RELATIVE' and d.delivery_date:
+            invoice_date = d.delivery_date + timedelta(days=d.forecast_invoice_days_after_delivery or 30)
+        else:
+            continue
+        latest_invoice_date = max(latest_invoice_date, invoice_date)
+
+    return sample_dates_until(start_date, latest_invoice_date)
+
+
+def sample_dates_until(start_date: date, end_date: date) -> List[date]:
+    """Sample dates every SAMPLE_INTERVAL_DAYS from start_date, at least 12, reaching past end_date"""
+    days_span = (end_date - start_date).days
+    samples = max(12, (days_span // SAMPLE_INTERVAL_DAYS) + 2)
+    return [start_date + timedelta(days=SAMPLE_INTERVAL_DAYS * k) for k in range(samples)]
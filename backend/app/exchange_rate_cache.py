@@ -0,0 +1,178 @@
+"""
+Exchange Rate Cache
+
+Process-wide, in-memory copy of the active exchange rates. Each (from, to) currency
+pair is held as sorted date and rate arrays, so "the rate on or before a date" is a
+binary search instead of an ORDER BY date DESC LIMIT 1 query per conversion.
+
+- All active rates are loaded with a single query on first use.
+- Routers that write exchange rates call invalidate_exchange_rate_cache() after
+  committing; the next lookup reloads.
+- Other processes (more API containers, optimization workers) cannot see that
+  invalidation, so entries also expire after exchange_rate_cache_ttl_seconds.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from bisect import bisect_right
+from decimal import Decimal
+from datetime import date
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.config import settings
+from app.models import ExchangeRate
+from app.data_versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+
+class RateSeries:
+    """Rate history of one currency pair, sorted by date (one rate per date)"""
+
+    __slots__ = ('dates', 'rates', '_arrays')
+
+    def __init__(self, dates: List[date], rates: List[Decimal]):
+        self.dates = dates
+        self.rates = rates
+        self._arrays = None
+
+    def as_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(datetime64[D] dates, float64 rates), built once per loaded series"""
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self.dates, dtype='datetime64[D]'),
+                np.array([float(rate) for rate in self.rates], dtype=np.float64)
+            )
+        return self._arrays
+
+    def rates_on_or_before(self, on_dates: np.ndarray) -> np.ndarray:
+        """Vectorized rate_on_or_before over a datetime64[D] array; NaN where no rate exists"""
+        dates, rates = self.as_arrays()
+        index = np.searchsorted(dates, on_dates, side='right') - 1
+        return np.where(index >= 0, rates[np.maximum(index, 0)], np.nan)
+
+    def rate_on_or_before(self, on_date: date) -> Optional[Decimal]:
+        """Most recent rate on or before a date, or None if the history starts later"""
+        index = bisect_right(self.dates, on_date) - 1
+        if index < 0:
+            return None
+        return self.rates[index]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+class ExchangeRateCache:
+    """Active exchange rates of the whole table, grouped by currency pair"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds
+        self._series: Dict[Tuple[str, str], RateSeries] = {}
+        self._loaded_at: Optional[float] = None
+        self._version = 0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        """Incremented on every invalidation"""
+        return self._version
+
+    @property
+    def generation(self) -> int:
+        """Changes whenever the cached rates are replaced (reload or invalidation)"""
+        return self._generation
+
+    def _is_fresh(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        if self.ttl_seconds and time.monotonic() - self._loaded_at > self.ttl_seconds:
+            return False
+        return True
+
+    def invalidate(self):
+        """Drop all cached rates; the next lookup reloads them"""
+        self._version += 1
+        self._series = {}
+        self._loaded_at = None
+        self._generation += 1
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._is_fresh():
+            return
+
+        async with self._lock:
+            if self._is_fresh():
+                return
+
+            version = self._version
+            result = await db.execute(
+                select(ExchangeRate.from_currency, ExchangeRate.to_currency, ExchangeRate.date, ExchangeRate.rate)
+                .where(ExchangeRate.is_active == True)
+                .order_by(ExchangeRate.from_currency, ExchangeRate.to_currency, ExchangeRate.date, ExchangeRate.id)
+            )
+
+            series: Dict[Tuple[str, str], RateSeries] = {}
+            row_count = 0
+            for row in result:
+                row_count += 1
+                pair_series = series.get((row.from_currency, row.to_currency))
+                if pair_series is None:
+                    pair_series = RateSeries([], [])
+                    series[(row.from_currency, row.to_currency)] = pair_series
+
+                if pair_series.dates and pair_series.dates[-1] == row.date:
+                    # Duplicate date: keep the most recently inserted rate
+                    pair_series.rates[-1] = row.rate
+                else:
+                    pair_series.dates.append(row.date)
+                    pair_series.rates.append(row.rate)
+
+            self._series = series
+            self._generation += 1
+            # A write committed while loading invalidated the cache again: serve this load
+            # but leave it stale so the next lookup reloads
+            if version != self._version:
+                logger.debug("Exchange rate cache invalidated while loading; will reload")
+                return
+
+            self._loaded_at = time.monotonic()
+            logger.info(f"Exchange rate cache loaded: {row_count} rates, {len(series)} currency pairs")
+
+    async def get_series(self, db: AsyncSession, from_currency: str, to_currency: str) -> Optional[RateSeries]:
+        await self.ensure_loaded(db)
+        return self._series.get((from_currency, to_currency))
+
+    async def get_series_to(self, db: AsyncSession, to_currency: str) -> Dict[str, RateSeries]:
+        """Rate histories of every currency that has rates into to_currency"""
+        await self.ensure_loaded(db)
+        return {pair[0]: series for pair, series in self._series.items() if pair[1] == to_currency}
+
+    async def get_rate(
+        self,
+        db: AsyncSession,
+        from_currency: str,
+        to_currency: str,
+        on_date: date
+    ) -> Optional[Decimal]:
+        """Most recent active rate on or before on_date, or None"""
+        series = await self.get_series(db, from_currency, to_currency)
+        if series is None:
+            return None
+        return series.rate_on_or_before(on_date)
+
+
+# Shared by every CurrencyConversionService in this process
+exchange_rate_cache = ExchangeRateCache(ttl_seconds=settings.exchange_rate_cache_ttl_seconds)
+
+
+def invalidate_exchange_rate_cache():
+    """Call after committing any change to exchange_rates"""
+    exchange_rate_cache.invalidate()
+    bump_version('exchange_rates')
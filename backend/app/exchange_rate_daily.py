@@ -0,0 +1,226 @@
+"""
+Forward-Filled Daily Exchange Rates
+
+exchange_rates only has rows for the days a rate was entered; conversions use the
+latest rate on or before the transaction date. exchange_rates_daily materializes that
+rule as one row per currency pair and day, so unified-currency aggregations can join on
+(currency, event_date) and run entirely in Postgres:
+
+    SELECT to_char(e.event_date, 'YYYY-MM'), SUM(e.amount_value * COALESCE(d.rate, 1))
+    FROM cashflow_events e
+    LEFT JOIN exchange_rates_daily d
+      ON d.from_currency = e.amount_currency AND d.to_currency = 'IRR' AND d.day = e.event_date
+    GROUP BY 1
+
+- Rows run from the pair's first active rate to today + exchange_rate_daily_horizon_days.
+- A change to a rate dated D only affects the days from D up to the day before the
+  pair's next rate date (or the horizon when there is none), so only those days are
+  rebuilt (refresh_daily_rates / exchange_rates_changed).
+- sync_daily_rates fills pairs that are missing or whose horizon has drifted; it runs
+  at startup.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from datetime import date, timedelta
+from bisect import bisect_right
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, case, and_, text
+from sqlalchemy.orm import aliased
+
+from app.config import settings
+from app.models import ExchangeRate, ExchangeRateDaily
+from app.exchange_rate_cache import invalidate_exchange_rate_cache
+from app.currency_conversion_service import BASE_CURRENCY
+
+logger = logging.getLogger(__name__)
+
+_FILL_SQL = text("""
+    INSERT INTO exchange_rates_daily (from_currency, to_currency, day, rate, source_date)
+    SELECT :from_currency, :to_currency, d.day, r.rate, r.date
+    FROM (
+        SELECT CAST(generate_series(CAST(:start_day AS date), CAST(:end_day AS date), interval '1 day') AS date) AS day
+    ) d
+    CROSS JOIN LATERAL (
+        SELECT er.rate, er.date
+        FROM exchange_rates er
+        WHERE er.from_currency = :from_currency
+          AND er.to_currency = :to_currency
+          AND er.is_active = TRUE
+          AND er.date <= d.day
+        ORDER BY er.date DESC, er.id DESC
+        LIMIT 1
+    ) r
+""")
+
+
+def horizon_end() -> date:
+    return date.today() + timedelta(days=settings.exchange_rate_daily_horizon_days)
+
+
+async def refresh_daily_rates(
+    db: AsyncSession,
+    from_currency: str,
+    to_currency: str,
+    from_day: Optional[date] = None,
+    to_day: Optional[date] = None
+) -> int:
+    """
+    Rebuild the forward-filled rows of one pair from from_day (whole pair if None) through
+    to_day (the horizon if None).
+
+    Does not commit; the caller commits together with its own changes.
+
+    Returns:
+        Number of days rebuilt
+    """
+    if from_day is None:
+        result = await db.execute(
+            select(func.min(ExchangeRate.date)).where(
+                ExchangeRate.from_currency == from_currency,
+                ExchangeRate.to_currency == to_currency,
+                ExchangeRate.is_active == True
+            )
+        )
+        from_day = result.scalar_one_or_none()
+
+    delete_stmt = delete(ExchangeRateDaily).where(
+        ExchangeRateDaily.from_currency == from_currency,
+        ExchangeRateDaily.to_currency == to_currency
+    )
+    if from_day is not None:
+        delete_stmt = delete_stmt.where(ExchangeRateDaily.day >= from_day)
+    if to_day is not None:
+        delete_stmt = delete_stmt.where(ExchangeRateDaily.day <= to_day)
+    await db.execute(delete_stmt)
+
+    end_day = horizon_end() if to_day is None else min(to_day, horizon_end())
+    if from_day is None or from_day > end_day:
+        return 0
+
+    await db.execute(_FILL_SQL, {
+        'from_currency': from_currency,
+        'to_currency': to_currency,
+        'start_day': from_day,
+        'end_day': end_day,
+    })
+    return (end_day - from_day).days + 1
+
+
+async def _affected_ranges(
+    db: AsyncSession,
+    from_currency: str,
+    to_currency: str,
+    changed_days: Set[date]
+) -> List[Tuple[date, Optional[date]]]:
+    """
+    Day ranges (first, last; last None: up to the horizon) whose forward-filled rate may
+    change when the pair's rates dated changed_days were written: each changed day up to
+    the day before the next rate date after it. Adjacent ranges are merged.
+    """
+    result = await db.execute(
+        select(ExchangeRate.date)
+        .where(
+            ExchangeRate.from_currency == from_currency,
+            ExchangeRate.to_currency == to_currency,
+            ExchangeRate.is_active == True,
+            ExchangeRate.date > min(changed_days)
+        )
+        .distinct()
+        .order_by(ExchangeRate.date)
+    )
+    rate_days = [row[0] for row in result]
+
+    ranges: List[Tuple[date, Optional[date]]] = []
+    for changed_day in sorted(changed_days):
+        position = bisect_right(rate_days, changed_day)
+        last_day = rate_days[position] - timedelta(days=1) if position < len(rate_days) else None
+        if ranges and (ranges[-1][1] is None or ranges[-1][1] >= changed_day - timedelta(days=1)):
+            # Overlaps or touches the previous range
+            first_day, previous_last = ranges[-1]
+            ranges[-1] = (first_day, None if previous_last is None or last_day is None else max(previous_last, last_day))
+        else:
+            ranges.append((changed_day, last_day))
+    return ranges
+
+
+async def exchange_rates_changed(db: AsyncSession, changes: Iterable[Tuple[str, str, date]]):
+    """
+    Bring derived rate data up to date after exchange_rates rows were written and committed.
+
+    Args:
+        changes: (from_currency, to_currency, rate date) of every inserted, updated or
+            deleted row; for an update that moved a row, pass both dates
+    """
+    changed_days: Dict[Tuple[str, str], Set[date]] = {}
+    for from_currency, to_currency, changed_day in changes:
+        changed_days.setdefault((from_currency, to_currency), set()).add(changed_day)
+
+    try:
+        for (from_currency, to_currency), days in changed_days.items():
+            for first_day, last_day in await _affected_ranges(db, from_currency, to_currency, days):
+                await refresh_daily_rates(db, from_currency, to_currency, first_day, last_day)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to refresh exchange_rates_daily: {str(e)}")
+    finally:
+        invalidate_exchange_rate_cache()
+
+
+async def sync_daily_rates(db: AsyncSession) -> int:
+    """
+    Fill pairs that have no daily rows yet and extend pairs whose rows end before the
+    horizon (the horizon moves forward every day). Returns the number of pairs touched.
+    """
+    pairs_result = await db.execute(
+        select(ExchangeRate.from_currency, ExchangeRate.to_currency)
+        .where(ExchangeRate.is_active == True)
+        .distinct()
+    )
+    coverage_result = await db.execute(
+        select(ExchangeRateDaily.from_currency, ExchangeRateDaily.to_currency, func.max(ExchangeRateDaily.day))
+        .group_by(ExchangeRateDaily.from_currency, ExchangeRateDaily.to_currency)
+    )
+    covered_until = {(row[0], row[1]): row[2] for row in coverage_result}
+
+    end_day = horizon_end()
+    touched = 0
+    for from_currency, to_currency in pairs_result.all():
+        last_day = covered_until.get((from_currency, to_currency))
+        if last_day is None:
+            await refresh_daily_rates(db, from_currency, to_currency)
+        elif last_day < end_day:
+            await refresh_daily_rates(db, from_currency, to_currency, last_day + timedelta(days=1))
+        else:
+            continue
+        touched += 1
+
+    await db.commit()
+    if touched:
+        logger.info(f"exchange_rates_daily: filled {touched} currency pair(s) up to {end_day}")
+    return touched
+
+
+def base_rate_join(currency_expr, date_expr, to_currency: str = BASE_CURRENCY):
+    """
+    Join target and rate expression for converting (currency_expr, date_expr) amounts in SQL.
+
+    Returns:
+        (daily_alias, onclause, rate_expr). Use select_from(...).outerjoin(daily_alias, onclause)
+        and multiply amounts by rate_expr. Amounts already in to_currency use 1; amounts
+        without a rate also use 1 (treated as already in to_currency), matching the
+        unified cashflow view's fallback.
+    """
+    daily = aliased(ExchangeRateDaily)
+    onclause = and_(
+        daily.from_currency == currency_expr,
+        daily.to_currency == to_currency,
+        daily.day == date_expr
+    )
+    rate_expr = case(
+        (currency_expr == to_currency, 1),
+        else_=func.coalesce(daily.rate, 1)
+    )
+    return daily, onclause, rate_expr
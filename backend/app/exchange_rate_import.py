@@ -0,0 +1,266 @@
+"""
+Bulk Exchange Rate Import
+
+Loads many exchange rates from a CSV or Excel file in one transaction (POST
+/currencies/rates/import), e.g. to backfill a year of daily rates.
+
+Two layouts are accepted:
+
+    long:  date, from_currency, to_currency, rate       (one row per rate)
+    wide:  date, USD, EUR, AED, ...                     (one column per currency,
+                                                         rates into the base currency)
+
+- Rows are validated with pandas; a file with invalid rows is rejected unless
+  skip_invalid is set. When the file has the same (date, pair) twice the last row wins
+  (reported as duplicates, separately from the skipped invalid rows).
+- A file that cannot be parsed (corrupt workbook, bad encoding, ...) raises ValueError.
+- Valid rows are COPYed into a temporary table and merged with a single
+  INSERT ... ON CONFLICT (date, from_currency, to_currency) DO UPDATE.
+- Derived rate data (exchange_rates_daily, the rate caches) is refreshed once for the
+  whole import, for the days the imported dates affect.
+"""
+
+from typing import Dict, List, Tuple
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+import os
+import logging
+
+import pandas as pd
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.currency_conversion_service import BASE_CURRENCY
+from app.exchange_rate_daily import exchange_rates_changed
+
+logger = logging.getLogger(__name__)
+
+CSV_EXTENSIONS = ('.csv',)
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+
+LONG_COLUMNS = ['date', 'from_currency', 'to_currency', 'rate']
+
+# NUMERIC(15, 6): at most 9 digits before the decimal point
+MAX_RATE = 10 ** 9
+
+_STAGE_TABLE = "exchange_rates_import"
+
+_MERGE_SQL = text(f"""
+    INSERT INTO exchange_rates (date, from_currency, to_currency, rate, is_active, created_by_id, created_at)
+    SELECT date, from_currency, to_currency, rate, TRUE, :created_by_id, now()
+    FROM {_STAGE_TABLE}
+    ON CONFLICT (date, from_currency, to_currency) DO UPDATE
+    SET rate = EXCLUDED.rate, is_active = TRUE, updated_at = now()
+    RETURNING (xmax = 0) AS inserted
+""")
+
+
+@dataclass
+class RateImportResult:
+    rows_read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    errors: List[str] = field(default_factory=list)
+    # Earliest imported date per (from_currency, to_currency)
+    pairs: Dict[Tuple[str, str], date] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "rows_read": self.rows_read,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "pairs": [
+                {"from_currency": pair[0], "to_currency": pair[1], "from_date": from_day.isoformat()}
+                for pair, from_day in sorted(self.pairs.items())
+            ],
+        }
+
+
+def read_rate_file(content: bytes, filename: str) -> pd.DataFrame:
+    """
+    Read a CSV or Excel file into a DataFrame of strings.
+
+    Raises:
+        ValueError: If the file type is not supported or the file cannot be parsed
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension not in CSV_EXTENSIONS + EXCEL_EXTENSIONS:
+        raise ValueError(
+            f"Unsupported file type '{extension}'. Use {', '.join(CSV_EXTENSIONS + EXCEL_EXTENSIONS)}"
+        )
+    try:
+        if extension in CSV_EXTENSIONS:
+            df = pd.read_csv(BytesIO(content), dtype=str, skipinitialspace=True)
+        else:
+            df = pd.read_excel(BytesIO(content), dtype=str)
+    except ImportError:
+        # Missing Excel engine: a server problem, not a bad file
+        raise
+    except Exception as e:
+        # Bad zip archives, openpyxl/xlrd errors, encodings, empty files
+        raise ValueError(f"Could not read {filename}: {str(e)}") from e
+    df.columns = [str(column).strip() for column in df.columns]
+    return df
+
+
+def normalize_rate_frame(df: pd.DataFrame, base_currency: str = BASE_CURRENCY) -> pd.DataFrame:
+    """
+    Bring a long or wide layout to the long columns (plus source_row, the 1-based
+    spreadsheet row including the header, for error messages).
+    """
+    columns = {column.lower(): column for column in df.columns}
+    if 'date' not in columns:
+        raise ValueError("Missing required column: date")
+
+    df = df.copy()
+    df['source_row'] = df.index + 2
+
+    if all(column in columns for column in LONG_COLUMNS):
+        long_df = df.rename(columns={columns[c]: c for c in LONG_COLUMNS})[LONG_COLUMNS + ['source_row']]
+    else:
+        currency_columns = [c for c in df.columns if c not in (columns['date'], 'source_row')]
+        if not currency_columns:
+            raise ValueError(
+                f"Expected columns {', '.join(LONG_COLUMNS)}, or date plus one column per currency"
+            )
+        long_df = df.melt(
+            id_vars=[columns['date'], 'source_row'],
+            value_vars=currency_columns,
+            var_name='from_currency',
+            value_name='rate'
+        ).rename(columns={columns['date']: 'date'})
+        # Empty cells in the wide layout mean "no rate that day"
+        long_df = long_df[long_df['rate'].notna() & (long_df['rate'].astype(str).str.strip() != '')].copy()
+        long_df['to_currency'] = base_currency
+        long_df = long_df[LONG_COLUMNS + ['source_row']]
+
+    return long_df.reset_index(drop=True)
+
+
+def validate_rate_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str], int]:
+    """
+    Parse and check every row at once.
+
+    Returns:
+        (valid rows with typed date/currency/rate columns, error messages of invalid rows,
+         number of valid rows dropped as duplicates of a later row)
+    """
+    parsed = pd.DataFrame({
+        'date': pd.to_datetime(df['date'], errors='coerce').dt.date,
+        'from_currency': df['from_currency'].fillna('').astype(str).str.strip().str.upper(),
+        'to_currency': df['to_currency'].fillna('').astype(str).str.strip().str.upper(),
+        'rate': pd.to_numeric(df['rate'].fillna('').astype(str).str.replace(',', '', regex=False).str.strip(), errors='coerce'),
+        'source_row': df['source_row'],
+    })
+
+    code_pattern = r'^[A-Z]{3}$'
+    problems = {
+        'invalid date': parsed['date'].isna(),
+        'invalid from_currency': ~parsed['from_currency'].str.match(code_pattern),
+        'invalid to_currency': ~parsed['to_currency'].str.match(code_pattern),
+        'from_currency equals to_currency': parsed['from_currency'] == parsed['to_currency'],
+        'rate must be a positive number': ~(parsed['rate'] > 0),
+        f'rate must be below {MAX_RATE}': parsed['rate'] >= MAX_RATE,
+    }
+
+    invalid = pd.Series(False, index=parsed.index)
+    row_messages: Dict[int, List[str]] = {}
+    for message, mask in problems.items():
+        mask = mask.fillna(True)
+        invalid |= mask
+        for source_row in parsed.loc[mask, 'source_row']:
+            row_messages.setdefault(int(source_row), []).append(message)
+
+    errors = [f"Row {row}: {', '.join(messages)}" for row, messages in sorted(row_messages.items())]
+    valid = parsed[~invalid]
+    # Later rows override earlier ones for the same date and pair
+    deduplicated = valid.drop_duplicates(subset=['date', 'from_currency', 'to_currency'], keep='last')
+    return deduplicated.reset_index(drop=True), errors, len(valid) - len(deduplicated)
+
+
+async def upsert_rates(db: AsyncSession, rates: pd.DataFrame, created_by_id: int = None) -> Tuple[int, int]:
+    """
+    COPY rates into a temporary table and merge them into exchange_rates.
+
+    Does not commit. Returns (inserted, updated).
+    """
+    # The first statement through SQLAlchemy opens the transaction that COPY then joins
+    await db.execute(text(f"""
+        CREATE TEMPORARY TABLE {_STAGE_TABLE} (
+            date DATE NOT NULL,
+            from_currency VARCHAR(3) NOT NULL,
+            to_currency VARCHAR(3) NOT NULL,
+            rate NUMERIC(15, 6) NOT NULL
+        ) ON COMMIT DROP
+    """))
+
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    records = list(zip(
+        rates['date'],
+        rates['from_currency'],
+        rates['to_currency'],
+        (Decimal(str(round(float(rate), 6))) for rate in rates['rate'])
+    ))
+    await raw_connection.driver_connection.copy_records_to_table(
+        _STAGE_TABLE,
+        records=records,
+        columns=['date', 'from_currency', 'to_currency', 'rate']
+    )
+
+    result = await db.execute(_MERGE_SQL, {'created_by_id': created_by_id})
+    flags = [row.inserted for row in result]
+    inserted = sum(1 for flag in flags if flag)
+    return inserted, len(flags) - inserted
+
+
+async def import_exchange_rates(
+    db: AsyncSession,
+    content: bytes,
+    filename: str,
+    created_by_id: int = None,
+    skip_invalid: bool = False,
+    dry_run: bool = False
+) -> RateImportResult:
+    """
+    Validate and import a rate file.
+
+    Raises:
+        ValueError: If the file cannot be read or has the wrong columns
+    """
+    df = normalize_rate_frame(read_rate_file(content, filename))
+    valid, errors, duplicates = validate_rate_frame(df)
+
+    result = RateImportResult(rows_read=len(df), errors=errors, duplicates=duplicates)
+    result.skipped = len(df) - len(valid) - duplicates
+    for (from_currency, to_currency), first_day in valid.groupby(['from_currency', 'to_currency'])['date'].min().items():
+        result.pairs[(from_currency, to_currency)] = first_day
+
+    if dry_run or valid.empty or (errors and not skip_invalid):
+        return result
+
+    try:
+        result.inserted, result.updated = await upsert_rates(db, valid, created_by_id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    # One refresh of the derived rate data for the whole import
+    await exchange_rates_changed(
+        db, list(zip(valid['from_currency'], valid['to_currency'], valid['date']))
+    )
+    logger.info(
+        f"Imported exchange rates from {filename}: {result.inserted} inserted, "
+        f"{result.updated} updated, {result.skipped} skipped, {result.duplicates} duplicate(s), "
+        f"{len(result.pairs)} pair(s)"
+    )
+    return result
@@ -0,0 +1,241 @@
+"""
+Item Follow-Up Status
+
+Status of each project item in the platform process (CREATED -> DELIVERY_ADDED ->
+PROCUREMENT_OPTIONS -> ... -> DELIVERY_COMPLETE) for the analytics follow-up tables.
+
+The facts behind a status are loaded for a whole batch of items with three queries
+instead of two per item:
+
+- latest decision per item (DISTINCT ON project_item_id, newest created_at first)
+- active procurement option count, finalized count and earliest supplier delivery date
+- delivery option count and earliest delivery date to the customer
+
+classify_item() then decides the status in memory. The portfolio view walks all items
+of active projects in id order, one batch at a time (iter_follow_up_batches).
+"""
+
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_
+
+from app.config import settings
+from app.models import Project, ProjectItem, FinalizedDecision, ProcurementOption, DeliveryOption
+
+# Decision statuses whose delivery_status refines the item status
+_DELIVERY_TRACKED_STATUSES = ("LOCKED", "PROCUREMENT_PLAN")
+_PASS_THROUGH_STATUSES = ("PROPOSED", "ORDERED", "DELIVERED")
+
+_ITEM_COLUMNS = (
+    ProjectItem.id,
+    ProjectItem.project_id,
+    ProjectItem.item_code,
+    ProjectItem.item_name,
+    ProjectItem.quantity,
+    ProjectItem.is_finalized,
+    ProjectItem.created_at,
+)
+
+
+def classify_item(
+    is_finalized: bool,
+    has_delivery_options: bool,
+    decision,
+    options_count: int,
+    finalized_options_count: int
+) -> Tuple[str, str]:
+    """
+    (status, notes) of an item.
+
+    Args:
+        decision: Latest decision of the item (with status and delivery_status), or None
+    """
+    status = "CREATED"
+    notes = ""
+
+    if has_delivery_options:
+        status = "DELIVERY_ADDED"
+
+    # Finalized decisions have the highest priority
+    if decision:
+        if decision.status in _PASS_THROUGH_STATUSES:
+            status = decision.status
+        elif decision.status in _DELIVERY_TRACKED_STATUSES:
+            # delivery_status tracks procurement and project delivery
+            if decision.delivery_status in ("DELIVERY_COMPLETE", "CONFIRMED_BY_PROCUREMENT"):
+                status = decision.delivery_status
+            else:
+                status = decision.status
+
+    if options_count > 0:
+        notes = f"{options_count} options ({finalized_options_count} finalized)"
+        # Only set the options statuses if there is no decision
+        if not decision:
+            # Finalized with options but no decision - ready for optimization
+            status = "READY_FOR_OPTIMIZATION" if is_finalized else "PROCUREMENT_OPTIONS"
+    elif not decision and is_finalized:
+        status = "FINALIZED"
+
+    return status, notes
+
+
+async def _latest_decisions(db: AsyncSession, item_ids: Sequence[int]) -> Dict[int, object]:
+    result = await db.execute(
+        select(FinalizedDecision.project_item_id, FinalizedDecision.status, FinalizedDecision.delivery_status)
+        .where(FinalizedDecision.project_item_id.in_(item_ids))
+        .distinct(FinalizedDecision.project_item_id)
+        .order_by(
+            FinalizedDecision.project_item_id,
+            FinalizedDecision.created_at.desc(),
+            FinalizedDecision.id.desc()
+        )
+    )
+    return {row.project_item_id: row for row in result}
+
+
+async def _option_stats(db: AsyncSession, item_ids: Sequence[int]) -> Dict[int, object]:
+    result = await db.execute(
+        select(
+            ProcurementOption.project_item_id,
+            func.count().label('options'),
+            func.count().filter(ProcurementOption.is_finalized == True).label('finalized'),
+            func.min(ProcurementOption.expected_delivery_date).label('earliest_delivery'),
+        )
+        .where(
+            and_(
+                ProcurementOption.project_item_id.in_(item_ids),
+                ProcurementOption.is_active == True
+            )
+        )
+        .group_by(ProcurementOption.project_item_id)
+    )
+    return {row.project_item_id: row for row in result}
+
+
+async def _delivery_stats(db: AsyncSession, item_ids: Sequence[int]) -> Dict[int, object]:
+    result = await db.execute(
+        select(
+            DeliveryOption.project_item_id,
+            func.count().label('options'),
+            func.min(DeliveryOption.delivery_date).label('earliest_delivery'),
+        )
+        .where(DeliveryOption.project_item_id.in_(item_ids))
+        .group_by(DeliveryOption.project_item_id)
+    )
+    return {row.project_item_id: row for row in result}
+
+
+async def follow_up_rows(db: AsyncSession, items: Sequence, projects: Optional[Dict[int, object]] = None) -> List[dict]:
+    """
+    Follow-up rows of a batch of items (rows with the _ITEM_COLUMNS fields).
+
+    Args:
+        projects: {project_id: project row with project_code and name}; adds the
+            project columns of the portfolio view when given
+    """
+    if not items:
+        return []
+
+    item_ids = [item.id for item in items]
+    decisions = await _latest_decisions(db, item_ids)
+    options = await _option_stats(db, item_ids)
+    deliveries = await _delivery_stats(db, item_ids)
+
+    rows = []
+    for item in items:
+        decision = decisions.get(item.id)
+        option_stats = options.get(item.id)
+        delivery_stats = deliveries.get(item.id)
+        options_count = option_stats.options if option_stats else 0
+        finalized_count = option_stats.finalized if option_stats else 0
+
+        status, notes = classify_item(
+            item.is_finalized,
+            bool(delivery_stats and delivery_stats.options),
+            decision,
+            options_count,
+            finalized_count
+        )
+        # Delivery date to project (earliest supplier delivery) and to customer (earliest delivery option)
+        lead_time_date = option_stats.earliest_delivery if option_stats else None
+        delivery_time_date = delivery_stats.earliest_delivery if delivery_stats else None
+
+        row = {}
+        if projects is not None:
+            project = projects[item.project_id]
+            row.update({
+                'project_id': item.project_id,
+                'project_code': project.project_code,
+                'project_name': project.name,
+            })
+        row.update({
+            'project_item_id': item.id,
+            'item_code': item.item_code,
+            'item_name': item.item_name or item.item_code,
+            'quantity': item.quantity,
+            'status': status,
+            'lead_time_date': lead_time_date.isoformat() if lead_time_date else None,
+            'delivery_time_date': delivery_time_date.isoformat() if delivery_time_date else None,
+            'procurement_options_count': options_count,
+            'procurement_options_finalized': finalized_count == options_count and options_count > 0,
+            'notes': notes,
+            'is_finalized': item.is_finalized,
+            'created_at': item.created_at,
+        })
+        rows.append(row)
+    return rows
+
+
+async def project_follow_up(db: AsyncSession, project_id: int) -> List[dict]:
+    """Follow-up rows of all items of one project, in item id order"""
+    result = await db.execute(
+        select(*_ITEM_COLUMNS).where(ProjectItem.project_id == project_id).order_by(ProjectItem.id)
+    )
+    return await follow_up_rows(db, result.all())
+
+
+async def iter_follow_up_batches(
+    db: AsyncSession,
+    after_item_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    batch_size: Optional[int] = None
+) -> AsyncIterator[List[dict]]:
+    """
+    Follow-up rows of the items of all active projects, in item id order, one batch at
+    a time (keyset pagination on the item id).
+
+    Args:
+        after_item_id: Start after this item id
+        limit: Stop after this many items (None = all)
+    """
+    batch_size = batch_size or settings.item_follow_up_batch_size
+    projects_result = await db.execute(
+        select(Project.id, Project.project_code, Project.name).where(Project.is_active == True)
+    )
+    projects = {row.id: row for row in projects_result}
+    if not projects:
+        return
+
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        query = (
+            select(*_ITEM_COLUMNS)
+            .where(ProjectItem.project_id.in_(list(projects)))
+            .order_by(ProjectItem.id)
+            .limit(size)
+        )
+        if after_item_id is not None:
+            query = query.where(ProjectItem.id > after_item_id)
+        items = (await db.execute(query)).all()
+        if not items:
+            return
+
+        yield await follow_up_rows(db, items, projects)
+
+        after_item_id = items[-1].id
+        if remaining is not None:
+            remaining -= len(items)
+        if len(items) < size:
+            return
@@ -25,6 +25,15 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized successfully")
     
+    # Fill or extend the forward-filled daily exchange rates
+    try:
+        from app.database import AsyncSessionLocal
+        from app.exchange_rate_daily import sync_daily_rates
+        async with AsyncSessionLocal() as session:
+            await sync_daily_rates(session)
+    except Exception as e:
+        logger.warning(f"Failed to sync daily exchange rates: {str(e)}")
+    
     # Seed sample data
     try:
         from app.seed_data import seed_sample_data
@@ -33,10 +42,27 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Failed to seed sample data: {str(e)}")
     
+    # Keep BrsApi market rates warm in the background
+    from app.services.brs_api_client import brs_api_client
+    await brs_api_client.start()
+    
+    # Bump data version counters on writes (invalidates cached analytics responses)
+    from app.data_versions import install_write_tracking
+    install_write_tracking()
+    
+    # Recompute project analytics snapshots after their data changes
+    from app.analytics_snapshots import install_change_tracking, snapshot_refresher
+    install_change_tracking()
+    snapshot_refresher.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Procurement DSS API...")
+    await snapshot_refresher.close()
+    await brs_api_client.close()
+    from app.risk_simulation import shutdown_simulation_pool
+    shutdown_simulation_pool()
 
 
 # Create FastAPI application
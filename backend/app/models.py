@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, Numeric, DateTime, Date, ForeignKey, JSON, CheckConstraint, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, Boolean, Numeric, DateTime, Date, ForeignKey, JSON, CheckConstraint, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -337,6 +337,29 @@ class OptimizationRun(Base):
     finalized_decisions = relationship("FinalizedDecision", back_populates="optimization_run")
 
 
+class OptimizationJob(Base):
+    """Queued optimization run, claimed and executed by an optimization worker (app.workers.optimizer)"""
+    __tablename__ = "optimization_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    engine = Column(String(20), nullable=False, default='ENHANCED')  # 'LEGACY' or 'ENHANCED'
+    request_parameters = Column(JSON, nullable=False)  # OptimizationRunRequest payload
+    solver_type = Column(String(20), nullable=True)  # enhanced engine only
+    generate_multiple_proposals = Column(Boolean, nullable=False, default=False)
+    strategies = Column(JSON, nullable=True)  # list of strategy names, enhanced engine only
+    status = Column(String(20), nullable=False, default='QUEUED', index=True)  # 'QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED'
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(100), nullable=True)
+    run_id = Column(UUID(as_uuid=True), nullable=True)  # optimization run produced by the job
+    result = Column(JSON, nullable=True)  # OptimizationRunResponse payload
+    error = Column(Text, nullable=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class FinalizedDecision(Base):
     __tablename__ = "finalized_decisions"
     
@@ -501,9 +524,22 @@ class ExchangeRate(Base):
     __table_args__ = (
         CheckConstraint('from_currency != to_currency', name='check_different_currencies'),
         CheckConstraint('rate > 0', name='check_positive_rate'),
+        # One rate per pair and day; target of the bulk import's ON CONFLICT upsert
+        UniqueConstraint('date', 'from_currency', 'to_currency', name='uq_exchange_rates_date_pair'),
     )
 
 
+class ExchangeRateDaily(Base):
+    """Forward-filled daily exchange rates (one row per currency pair and day), derived from exchange_rates"""
+    __tablename__ = "exchange_rates_daily"
+    
+    from_currency = Column(String(3), primary_key=True)
+    to_currency = Column(String(3), primary_key=True)
+    day = Column(Date, primary_key=True)
+    rate = Column(Numeric(15, 6), nullable=False)  # Latest active rate on or before day
+    source_date = Column(Date, nullable=False)  # Date of the exchange_rates row the rate comes from
+
+
 class OptimizationResult(Base):
     __tablename__ = "optimization_results"
     
@@ -772,3 +808,19 @@ class AuditLog(Base):
 
     # Relationships
     user = relationship("User")
+
+
+class AnalyticsSnapshot(Base):
+    """Precomputed project analytics response (app.analytics_snapshots), refreshed after the project's data changes"""
+    __tablename__ = "analytics_snapshots"
+    __table_args__ = (
+        UniqueConstraint('project_id', 'kind', name='uq_analytics_snapshots_project_kind'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(30), nullable=False)  # 'EVA', 'RISK', 'CASHFLOW_FORECAST'
+    payload = Column(JSON, nullable=False)  # response body of the analytics endpoint
+    is_stale = Column(Boolean, nullable=False, default=False)
+    version = Column(Integer, nullable=False, default=0)  # incremented whenever the snapshot is marked stale
+    computed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,233 @@
+"""
+Money in Integer Minor Units
+
+Aggregations used to add Decimals in Python loops or mix in float() conversions, which
+is slow and lets float rounding creep into totals. Here amounts are held as int64
+counts of the currency's minor unit, so sums and group-bys are exact integer
+arithmetic and run vectorized:
+
+    costs = MoneyArray.from_amounts([d.final_cost for d in decisions], 'IRR', scales)
+    costs.total()                        # Money('IRR', ...)
+    costs[delivered_mask].total()
+    costs.group_sum(project_ids)         # {(project_id, 'IRR'): Money}
+
+- The minor unit follows the storage precision of amounts (Numeric(15, 2): cents),
+  not Currency.decimal_places, which only says how many places to display (IRR: 0).
+  A currency displayed with more places uses those (load_currency_scales), so no
+  stored amount is rounded when loaded; converted amounts are rounded half-up.
+- Adding different currencies raises ValueError; use convert() with explicit rates.
+- int64 holds up to ~9.2e18 minor units (9.2e16 at 2 decimal places).
+"""
+
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.models import Currency
+from app.data_versions import get_version
+
+DEFAULT_DECIMAL_PLACES = 2
+
+# Decimal places of stored amounts (Numeric(15, 2) columns)
+STORAGE_DECIMAL_PLACES = 2
+
+
+def to_minor(amount: Any, decimal_places: int = DEFAULT_DECIMAL_PLACES) -> int:
+    """Exact minor units of an amount (Decimal, int, float or numeric string), rounded half-up"""
+    if amount is None:
+        return 0
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int(amount.scaleb(decimal_places).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_minor(minor: int, decimal_places: int = DEFAULT_DECIMAL_PLACES) -> Decimal:
+    return Decimal(int(minor)).scaleb(-decimal_places)
+
+
+@dataclass(frozen=True)
+class Money:
+    """An exact amount of one currency"""
+    currency: str
+    minor: int
+    decimal_places: int = DEFAULT_DECIMAL_PLACES
+
+    @classmethod
+    def of(cls, amount: Any, currency: str, decimal_places: int = DEFAULT_DECIMAL_PLACES) -> "Money":
+        return cls(currency, to_minor(amount, decimal_places), decimal_places)
+
+    @classmethod
+    def zero(cls, currency: str, decimal_places: int = DEFAULT_DECIMAL_PLACES) -> "Money":
+        return cls(currency, 0, decimal_places)
+
+    @property
+    def amount(self) -> Decimal:
+        return from_minor(self.minor, self.decimal_places)
+
+    def _check(self, other: "Money"):
+        if other.currency != self.currency:
+            raise ValueError(f"Cannot combine {self.currency} and {other.currency} amounts without conversion")
+
+    def __add__(self, other: "Money") -> "Money":
+        self._check(other)
+        return Money(self.currency, self.minor + other.minor, self.decimal_places)
+
+    def __sub__(self, other: "Money") -> "Money":
+        self._check(other)
+        return Money(self.currency, self.minor - other.minor, self.decimal_places)
+
+    def __neg__(self) -> "Money":
+        return Money(self.currency, -self.minor, self.decimal_places)
+
+    def __float__(self) -> float:
+        return float(self.amount)
+
+    def __bool__(self) -> bool:
+        return self.minor != 0
+
+    def __str__(self) -> str:
+        return f"{self.amount} {self.currency}"
+
+
+class MoneyArray:
+    """A column of amounts, each in its own currency, stored as int64 minor units"""
+
+    __slots__ = ('minor', 'currencies', 'scales')
+
+    def __init__(self, minor: np.ndarray, currencies: np.ndarray, scales: Mapping[str, int]):
+        self.minor = minor
+        self.currencies = currencies
+        self.scales = scales
+
+    @classmethod
+    def from_amounts(
+        cls,
+        amounts: Iterable[Any],
+        currencies: Union[str, Sequence[Optional[str]]],
+        scales: Optional[Mapping[str, int]] = None,
+        default_currency: str = 'IRR'
+    ) -> "MoneyArray":
+        """
+        Args:
+            amounts: Amounts in major units; None counts as 0
+            currencies: One currency for all amounts, or one per amount (None -> default_currency)
+            scales: Minor-unit decimal places per currency (see load_currency_scales); missing -> 2
+        """
+        scales = scales or {}
+        amounts = list(amounts)
+        if isinstance(currencies, str):
+            codes = np.full(len(amounts), currencies, dtype=object)
+        else:
+            codes = np.array([(c or default_currency).strip().upper() for c in currencies], dtype=object)
+            if len(codes) != len(amounts):
+                raise ValueError("amounts and currencies must have the same length")
+
+        minor = np.fromiter(
+            (to_minor(amount, scales.get(code, DEFAULT_DECIMAL_PLACES)) for amount, code in zip(amounts, codes)),
+            dtype=np.int64,
+            count=len(amounts)
+        )
+        return cls(minor, codes, scales)
+
+    def __len__(self) -> int:
+        return len(self.minor)
+
+    def __getitem__(self, selector) -> "MoneyArray":
+        return MoneyArray(self.minor[selector], self.currencies[selector], self.scales)
+
+    def places_of(self, currency: str) -> int:
+        return self.scales.get(currency, DEFAULT_DECIMAL_PLACES)
+
+    def decimal_places(self) -> np.ndarray:
+        """Decimal places per amount"""
+        return np.array([self.places_of(code) for code in self.currencies], dtype=np.int64)
+
+    def totals(self) -> Dict[str, Money]:
+        """Exact total per currency"""
+        codes, inverse = np.unique(self.currencies, return_inverse=True)
+        sums = np.zeros(len(codes), dtype=np.int64)
+        np.add.at(sums, inverse, self.minor)
+        return {code: Money(code, int(total), self.places_of(code)) for code, total in zip(codes, sums)}
+
+    def total(self, currency: Optional[str] = None) -> Money:
+        """
+        Exact total of single-currency amounts (or of one currency's amounts).
+
+        Raises:
+            ValueError: If the array mixes currencies and no currency is given
+        """
+        totals = self.totals()
+        if currency is not None:
+            return totals.get(currency, Money.zero(currency, self.places_of(currency)))
+        if len(totals) > 1:
+            raise ValueError(f"Amounts mix currencies ({', '.join(sorted(totals))}); total per currency instead")
+        if not totals:
+            return Money.zero('IRR', self.places_of('IRR'))
+        return next(iter(totals.values()))
+
+    def group_sum(self, keys: Sequence[Hashable]) -> Dict[Tuple[Hashable, str], Money]:
+        """Exact totals per (key, currency)"""
+        if len(keys) != len(self.minor):
+            raise ValueError("keys must align with the amounts")
+        if not len(keys):
+            return {}
+
+        pairs = list(zip(keys, self.currencies))
+        uniques: Dict[Tuple[Hashable, str], int] = {}
+        group_index = np.fromiter(
+            (uniques.setdefault(pair, len(uniques)) for pair in pairs), dtype=np.int64, count=len(pairs)
+        )
+        sums = np.zeros(len(uniques), dtype=np.int64)
+        np.add.at(sums, group_index, self.minor)
+        return {
+            pair: Money(pair[1], int(sums[index]), self.places_of(pair[1]))
+            for pair, index in uniques.items()
+        }
+
+    def to_float(self) -> np.ndarray:
+        """Major-unit float64 values (for ratios and charts, not for totals)"""
+        return self.minor / np.power(10.0, self.decimal_places())
+
+    def convert(self, factors: np.ndarray, target_currency: str) -> "MoneyArray":
+        """
+        Convert every amount with its own rate (units of target per unit of source),
+        rounding half-up to the target currency's minor unit.
+        """
+        target_places = self.places_of(target_currency)
+        values = self.to_float() * np.asarray(factors, dtype=np.float64)
+        scaled = values * (10.0 ** target_places)
+        minor = (np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)).astype(np.int64)
+        codes = np.full(len(minor), target_currency, dtype=object)
+        return MoneyArray(minor, codes, self.scales)
+
+
+def money_to_float(value: Optional[Money]) -> float:
+    return float(value) if value is not None else 0.0
+
+
+# (currencies version, {code: minor-unit decimal places})
+_scales_cache: Tuple[int, Optional[Dict[str, int]]] = (-1, None)
+
+
+async def load_currency_scales(db: AsyncSession) -> Dict[str, int]:
+    """
+    Minor-unit decimal places per currency code: the storage precision, or the display
+    places (Currency.decimal_places) when larger. Reloaded after currencies are written.
+    """
+    global _scales_cache
+    version = get_version('currencies')
+    if _scales_cache[0] == version and _scales_cache[1] is not None:
+        return _scales_cache[1]
+
+    result = await db.execute(select(Currency.code, Currency.decimal_places))
+    scales = {
+        code: max(STORAGE_DECIMAL_PLACES, places if places is not None else DEFAULT_DECIMAL_PLACES)
+        for code, places in result.all()
+    }
+    _scales_cache = (version, scales)
+    return scales
@@ -4,8 +4,10 @@ This module contains the core optimization logic for procurement planning.
 """
 
 from typing import Dict, List, Tuple, Optional
+from dataclasses import dataclass
 from decimal import Decimal
 from ortools.sat.python import cp_model
+import math
 import uuid
 from datetime import datetime, date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,11 +17,30 @@ from app.models import (
     OptimizationResult, FinalizedDecision, DecisionFactorWeight
 )
 from app.schemas import OptimizationRunRequest, OptimizationRunResponse
-from app.currency_conversion_service import CurrencyConversionService
+from app.currency_conversion_service import CurrencyConversionService, MISSING_RATE_KEEP
+from app.optimization_time_axis import TimeAxis
+from app.config import settings
+from app.optimization_model_dump import should_dump, dump_cpsat_model
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Lower bound on the solver time granted to each rolling-horizon window
+ROLLING_MIN_WINDOW_SECONDS = 5.0
+
+
+@dataclass
+class HorizonWindow:
+    """
+    A rolling-horizon window in days from today.
+    
+    Purchases in [start_day, end_day) get full-resolution (daily) variables; later
+    purchases are aggregated into buckets of coarse_bucket_days with one variable each.
+    """
+    start_day: int
+    end_day: int
+    coarse_bucket_days: int
+
 
 class ProcurementOptimizer:
     """Main optimization engine for procurement planning"""
@@ -31,28 +52,44 @@ class ProcurementOptimizer:
         self.run_id = str(uuid.uuid4())
         self.start_time = None
         self.currency_service = CurrencyConversionService(db)
+        # Converted unit costs {(option_id, project_item_id, purchase_date): cost in IRR}
+        self.converted_costs = {}
+        # Rolling-horizon state: decisions fixed by earlier windows
+        self.committed_vars = []
+        self.committed_item_ids = set()
+        # Calendar buckets for budget constraints (replaced per request in run_optimization)
+        self.time_axis = TimeAxis()
         
     async def run_optimization(self, request: OptimizationRunRequest) -> OptimizationRunResponse:
         """Run the complete optimization process"""
         self.start_time = datetime.now()
+        self.time_axis = TimeAxis(request.time_bucket)
         
         try:
             # Step 1: Load and validate data
             await self._load_data()
             
-            # Step 2: Build the optimization model
-            await self._build_model(request.max_time_slots)
-            
-            # Step 3: Solve the model
-            solver = cp_model.CpSolver()
-            solver.parameters.max_time_in_seconds = request.time_limit_seconds
-            
-            status = solver.Solve(self.model)
+            if request.rolling_horizon_weeks:
+                # Steps 2-3: Solve a sequence of rolling windows
+                status, selected_vars = await self._solve_rolling_horizon(request)
+            else:
+                # Step 2: Build the optimization model
+                await self._build_model(request.max_time_slots)
+                
+                # Step 3: Solve the model
+                solver = cp_model.CpSolver()
+                solver.parameters.max_time_in_seconds = request.time_limit_seconds
+                
+                status = solver.Solve(self.model)
+                self._maybe_dump_model(request, 'cpsat', solver, status)
+                selected_vars = []
+                if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+                    selected_vars = [name for name, var in self.variables.items() if solver.Value(var) == 1]
             
             # Step 4: Process results
             if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-                await self._save_results(solver)
-                total_cost = await self._calculate_total_cost(solver)
+                await self._save_results(selected_vars)
+                total_cost = await self._calculate_total_cost(selected_vars)
                 execution_time = (datetime.now() - self.start_time).total_seconds()
                 
                 return OptimizationRunResponse(
@@ -61,7 +98,7 @@ class ProcurementOptimizer:
                     status="OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE",
                     execution_time_seconds=execution_time,
                     total_cost=total_cost,
-                    items_optimized=len([v for v in self.variables.values() if solver.Value(v) == 1]),
+                    items_optimized=len(selected_vars),
                     proposals=[],  # TODO: Generate multiple proposals
                     message="Optimization completed successfully"
                 )
@@ -286,6 +323,9 @@ class ProcurementOptimizer:
             # Map budget to time slot (1, 2, 3, etc.)
             self.budget_data[idx] = bd
         
+        # Budgets per calendar bucket {bucket_start: available_budget}
+        self.budget_by_bucket = self.time_axis.base_budgets_by_bucket(budget_list)
+        
         if not self.budget_data:
             raise ValueError(
                 "❌ No budget data found.\n\n"
@@ -368,8 +408,145 @@ class ProcurementOptimizer:
         logger.info(f"Configured weights: {len(configured_weights)}")
         logger.info(f"Default weights (1): {len(available_factors) - len(configured_weights)}")
     
-    async def _build_model(self, max_time_slots: int):
-        """Build the CP-SAT optimization model"""
+    async def _solve_rolling_horizon(self, request: OptimizationRunRequest) -> Tuple[int, List[str]]:
+        """
+        Solve long planning horizons as a sequence of bounded windows.
+        
+        Each window has daily variables for the next rolling_horizon_weeks and coarse
+        buckets of rolling_horizon_coarse_days after that. Decisions purchased before the
+        window rolls forward are committed: their items leave the model and their spending
+        stays in the budget constraints of later windows. The time limit is split across
+        windows so total solve time stays bounded as the horizon grows.
+        
+        Returns:
+            (status, selected variable names)
+        """
+        window_days = request.rolling_horizon_weeks * 7
+        step_days = min((request.rolling_horizon_step_weeks or request.rolling_horizon_weeks) * 7, window_days)
+        horizon_days = self._horizon_length_days()
+        window_count = max(1, math.ceil(horizon_days / step_days))
+        window_time_limit = max(ROLLING_MIN_WINDOW_SECONDS, request.time_limit_seconds / window_count)
+        
+        logger.info(
+            f"Rolling horizon: {horizon_days} days, window {window_days} days, step {step_days} days, "
+            f"~{window_count} windows of {window_time_limit:.1f}s"
+        )
+        
+        self.committed_vars = []
+        self.committed_item_ids = set()
+        overall_status = cp_model.OPTIMAL
+        window_start = 0
+        
+        while True:
+            window_end = window_start + window_days
+            is_last_window = window_end >= horizon_days
+            window = HorizonWindow(window_start, window_end, request.rolling_horizon_coarse_days)
+            
+            await self._build_model(request.max_time_slots, window)
+            
+            if self.variables:
+                solver = cp_model.CpSolver()
+                solver.parameters.max_time_in_seconds = window_time_limit
+                status = solver.Solve(self.model)
+                self._maybe_dump_model(request, f"window_{window_start}_{window_end}", solver, status)
+                
+                logger.info(
+                    f"Window days {window_start}-{window_end}: {solver.StatusName(status)}, "
+                    f"{len(self.variables)} variables, {solver.WallTime():.2f}s"
+                )
+                
+                if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+                    if not self.committed_vars:
+                        return status, []
+                    # Keep the decisions committed by earlier windows
+                    overall_status = cp_model.FEASIBLE
+                    break
+                
+                if status != cp_model.OPTIMAL:
+                    overall_status = cp_model.FEASIBLE
+                
+                # Commit purchases that happen before the window rolls forward
+                commit_end = horizon_days + 1 if is_last_window else window_start + step_days
+                for var_name, var in self.variables.items():
+                    if solver.Value(var) == 1 and self._purchase_time_of(var_name) < commit_end:
+                        self.committed_vars.append(var_name)
+                        self.committed_item_ids.add(int(var_name.split('_')[2]))
+            
+            if is_last_window:
+                break
+            window_start += step_days
+        
+        logger.info(f"Rolling horizon committed {len(self.committed_vars)} decisions")
+        return overall_status, list(self.committed_vars)
+    
+    def _maybe_dump_model(self, request: OptimizationRunRequest, label: str, solver: cp_model.CpSolver, status: int):
+        """Write the current model for offline replay when requested or when the solve was slow"""
+        if not should_dump(request.dump_model, solver.WallTime(), settings.optimization_model_dump_slow_seconds):
+            return
+        try:
+            dump_cpsat_model(
+                settings.optimization_model_dump_dir, self.run_id, label,
+                self.model, self.variables, solver, status,
+                {
+                    'engine': 'legacy',
+                    'request': request.model_dump(mode='json'),
+                    'items': len(self.project_items),
+                    'options': len(self.procurement_options),
+                }
+            )
+        except Exception as e:
+            logger.warning(f"Could not dump optimization model: {str(e)}")
+    
+    def _horizon_length_days(self) -> int:
+        """Latest delivery date of any item to optimize, in days from today"""
+        today = date.today()
+        delivery_days = [
+            (delivery_option.delivery_date - today).days
+            for item in self.project_items
+            for delivery_option in (item.delivery_options_rel or [])
+            if getattr(delivery_option, 'delivery_date', None)
+        ]
+        return max(delivery_days + [1])
+    
+    def _purchase_time_of(self, var_name: str) -> int:
+        """Purchase time slot (days from today) encoded by a variable name"""
+        parts = var_name.split('_')
+        option = self.procurement_options[int(parts[3])]
+        return int(parts[4]) - option.lomc_lead_time
+    
+    def _candidate_delivery_times(
+        self,
+        option: ProcurementOption,
+        valid_times: List[int],
+        window: Optional[HorizonWindow] = None
+    ) -> List[int]:
+        """
+        Delivery times to create variables for with this option.
+        
+        Without a window every delivery time with a feasible purchase time is used. In a
+        rolling-horizon window, purchases before the window are dropped (already decided),
+        purchases inside it keep daily resolution, and later purchases are aggregated into
+        coarse buckets represented by their earliest delivery time.
+        """
+        if window is None:
+            return [t for t in valid_times if t - option.lomc_lead_time >= 1]
+        
+        fine_times = []
+        coarse_times = {}
+        for delivery_time in sorted(valid_times):
+            purchase_time = delivery_time - option.lomc_lead_time
+            if purchase_time < max(1, window.start_day):
+                continue
+            if purchase_time < window.end_day:
+                fine_times.append(delivery_time)
+            else:
+                bucket = (purchase_time - window.end_day) // window.coarse_bucket_days
+                coarse_times.setdefault(bucket, delivery_time)
+        
+        return fine_times + [coarse_times[bucket] for bucket in sorted(coarse_times)]
+    
+    async def _build_model(self, max_time_slots: int, window: Optional[HorizonWindow] = None):
+        """Build the CP-SAT optimization model (optionally for a single rolling-horizon window)"""
         self.model = cp_model.CpModel()
         self.max_time_slots = max_time_slots
         
@@ -381,6 +558,10 @@ class ProcurementOptimizer:
             project_id = item.project_id
             item_code = item.item_code
             
+            # Items committed by an earlier rolling-horizon window are fixed
+            if window and item.id in self.committed_item_ids:
+                continue
+            
             # Get delivery options from the relationship
             delivery_options = item.delivery_options_rel if item.delivery_options_rel else []
             
@@ -437,17 +618,15 @@ class ProcurementOptimizer:
             # Create variables for each valid (project, item, option, time) combination
             # Each variable represents buying this specific project item with this option at this time
             for option in item_options:
-                for delivery_time in valid_times:
-                    purchase_time = delivery_time - option.lomc_lead_time
-                    
-                    # Purchase time must be >= 1 (time slot 0 doesn't exist)
-                    if purchase_time < 1:
-                        continue
-                    
+                # Purchase time must be >= 1 (time slot 0 doesn't exist)
+                for delivery_time in self._candidate_delivery_times(option, valid_times, window):
                     # Use project_item_id instead of item_code for unique identification
                     var_name = f"buy_{project_id}_{item.id}_{option.id}_{delivery_time}"
                     self.variables[var_name] = self.model.NewBoolVar(var_name)
         
+        # Convert all candidate costs to IRR in one batch before building constraints
+        await self._prefetch_effective_costs()
+        
         # Add constraints
         self._add_demand_fulfillment_constraints()
         await self._add_budget_constraints()
@@ -501,47 +680,54 @@ class ProcurementOptimizer:
         we use slack variables that allow going over budget but add
         a penalty to the objective function.
         """
-        # Group variables by purchase time
+        # Group variables by calendar bucket of their purchase date
         time_groups = {}
         
+        def add_to_bucket(var, var_name: str, option: ProcurementOption, item: ProjectItem):
+            purchase_time = self._purchase_time_of(var_name)
+            # Only purchases inside the planning horizon are budgeted (time slot 1 = today)
+            if purchase_time < 1 or purchase_time > self.max_time_slots:
+                return
+            purchase_date = date.today() + timedelta(days=purchase_time - 1)
+            bucket = self.time_axis.bucket_of(purchase_date)
+            time_groups.setdefault(bucket, []).append((var, option, item, purchase_date))
+        
         for var_name, var in self.variables.items():
             parts = var_name.split('_')
-            delivery_time = int(parts[4])
             option_id = int(parts[3])
             project_id = int(parts[1])
             project_item_id = int(parts[2])
             
-            # Calculate purchase time
             option = self.procurement_options[option_id]
-            purchase_time = delivery_time - option.lomc_lead_time
-            
-            if purchase_time not in time_groups:
-                time_groups[purchase_time] = []
             
             # Find the project item to get quantity
             item = next((i for i in self.project_items 
                         if i.project_id == project_id and i.id == project_item_id), None)
             
             if item:
-                time_groups[purchase_time].append((var, option, item))
+                add_to_bucket(var, var_name, option, item)
+        
+        # Decisions committed by earlier rolling-horizon windows still spend budget
+        for var_name in self.committed_vars:
+            parts = var_name.split('_')
+            option = self.procurement_options[int(parts[3])]
+            item = next((i for i in self.project_items if i.id == int(parts[2])), None)
+            if item:
+                add_to_bucket(1, var_name, option, item)
         
         # Store slack variables for penalty in objective
         self.budget_slack_vars = []
         
-        # Add soft budget constraint for each time period
-        for time_slot in range(1, self.max_time_slots + 1):
-            if time_slot not in time_groups:
-                continue
-                
-            # Calculate total cash outflow for this time period
+        logger.info(f"Budget constraints over {self.time_axis.describe(list(time_groups.keys()))}")
+        
+        # Add soft budget constraint for each calendar bucket with spending
+        for bucket in sorted(time_groups.keys()):
+            # Calculate total cash outflow for this bucket
             # Scale by 1000 for numerical stability (thousands of dollars)
             cash_flow_vars = []
             cash_flow_coeffs = []
             
-            for var, option, item in time_groups[time_slot]:
-                # Calculate purchase date from time slot
-                # Time slot represents days from today
-                purchase_date = date.today() + timedelta(days=time_slot - 1)
+            for var, option, item, purchase_date in time_groups[bucket]:
                 cost_per_unit = await self._calculate_effective_cost(option, item, purchase_date)
                 total_cost = cost_per_unit * item.quantity
                 
@@ -549,20 +735,16 @@ class ProcurementOptimizer:
                 cash_flow_vars.append(var)
                 cash_flow_coeffs.append(int(total_cost / 1000))
             
-            # Get available budget for this time period
-            if time_slot in self.budget_data:
-                available_budget = self.budget_data[time_slot]
-            else:
-                # Assign a large default budget for time slots without explicit data
-                available_budget = type('obj', (object,), {'available_budget': Decimal('1000000')})()
+            # Get available budget for this bucket, with a large default for buckets without explicit data
+            available_budget = self.budget_by_bucket.get(bucket, Decimal('1000000'))
             
-            budget_limit = int(available_budget.available_budget / 1000)  # Scale to thousands
+            budget_limit = int(available_budget / 1000)  # Scale to thousands
             
             if cash_flow_vars:
                 # Create slack variable to allow exceeding budget
                 # Maximum slack is 50% of budget (adjust as needed)
                 max_slack = max(budget_limit // 2, 1000)  # At least 1000 (= $1M)
-                slack_var = self.model.NewIntVar(0, max_slack, f'budget_slack_{time_slot}')
+                slack_var = self.model.NewIntVar(0, max_slack, f'budget_slack_{bucket.isoformat()}')
                 
                 # Soft constraint: spending = budget + slack
                 total_spending = sum(var * coeff for var, coeff in zip(cash_flow_vars, cash_flow_coeffs))
@@ -571,11 +753,52 @@ class ProcurementOptimizer:
                 # Store slack variable for penalty
                 self.budget_slack_vars.append(slack_var)
                 
-                logger.debug(f"Time slot {time_slot}: {len(cash_flow_vars)} variables, "
+                logger.debug(f"Bucket {bucket.isoformat()}: {len(cash_flow_vars)} variables, "
                            f"budget limit: ${budget_limit}K, max slack: ${max_slack}K")
     
-    async def _calculate_effective_cost(self, option: ProcurementOption, item: ProjectItem, purchase_date: date) -> Decimal:
-        """Calculate the effective cost per unit in base currency (IRR) considering discounts, shipping, and currency conversion"""
+    async def _prefetch_effective_costs(self):
+        """
+        Convert the unit cost of every model variable to IRR with one bulk conversion.
+        
+        _calculate_effective_cost is called for each variable by the budget constraints,
+        the objective and result saving; with the costs prefetched it no longer awaits a
+        rate lookup per call.
+        """
+        keys = []
+        amounts = []
+        currencies = []
+        dates = []
+        
+        for var_name in self.variables:
+            parts = var_name.split('_')
+            option = self.procurement_options[int(parts[3])]
+            item = next((i for i in self.project_items if i.id == int(parts[2])), None)
+            if not item:
+                continue
+            
+            purchase_date = date.today() + timedelta(days=self._purchase_time_of(var_name) - 1)
+            key = (option.id, item.id, purchase_date)
+            if key in self.converted_costs:
+                continue
+            
+            cost, currency = self._cost_in_original_currency(option, item)
+            keys.append(key)
+            amounts.append(cost)
+            currencies.append(currency)
+            dates.append(purchase_date)
+        
+        if not keys:
+            return
+        
+        # Amounts without a rate are assumed to be in IRR already (same fallback as below)
+        converted = await self.currency_service.convert_many(amounts, currencies, dates, on_missing=MISSING_RATE_KEEP)
+        for key, value in zip(keys, converted):
+            self.converted_costs[key] = Decimal(str(value))
+        
+        logger.info(f"Prefetched {len(keys)} converted costs")
+    
+    def _cost_in_original_currency(self, option: ProcurementOption, item: ProjectItem) -> Tuple[Decimal, str]:
+        """Effective cost per unit in the option's currency, considering shipping and discounts"""
         
         # Get the original cost in its original currency
         if hasattr(option, 'cost_amount') and option.cost_amount:
@@ -604,6 +827,17 @@ class ProcurementOptimizer:
             logger.debug(f"Applied bundling discount: {option.discount_bundle_percent}% on {company_quantity} units (threshold: {option.discount_bundle_threshold})")
             base_cost = base_cost - discount_amount
         
+        return base_cost, cost_currency
+    
+    async def _calculate_effective_cost(self, option: ProcurementOption, item: ProjectItem, purchase_date: date) -> Decimal:
+        """Calculate the effective cost per unit in base currency (IRR) considering discounts, shipping, and currency conversion"""
+        
+        cached = self.converted_costs.get((option.id, item.id, purchase_date))
+        if cached is not None:
+            return cached
+        
+        base_cost, cost_currency = self._cost_in_original_currency(option, item)
+        
         # Convert to base currency (IRR) using the purchase date
         try:
             converted_cost = await self.currency_service.convert_to_base(
@@ -831,38 +1065,37 @@ class ProcurementOptimizer:
         
         logger.info(f"Set objective: Minimize(Cost - Value + Budget_Penalty) with {len(cost_terms)} decision variables")
     
-    async def _save_results(self, solver):
-        """Save optimization results to database"""
+    async def _save_results(self, selected_vars: List[str]):
+        """Save optimization results for the selected variables to database"""
         results = []
         
-        for var_name, var in self.variables.items():
-            if solver.Value(var) == 1:  # Variable is selected
-                parts = var_name.split('_')
-                project_id = int(parts[1])
-                project_item_id = int(parts[2])
-                option_id = int(parts[3])
-                delivery_time = int(parts[4])
-                
-                option = self.procurement_options[option_id]
-                item = next((i for i in self.project_items 
-                            if i.project_id == project_id and i.id == project_item_id), None)
+        for var_name in selected_vars:
+            parts = var_name.split('_')
+            project_id = int(parts[1])
+            project_item_id = int(parts[2])
+            option_id = int(parts[3])
+            delivery_time = int(parts[4])
+            
+            option = self.procurement_options[option_id]
+            item = next((i for i in self.project_items 
+                        if i.project_id == project_id and i.id == project_item_id), None)
+            
+            if item:
+                purchase_time = delivery_time - option.lomc_lead_time
+                purchase_date = date.today() + timedelta(days=purchase_time - 1)
+                final_cost = await self._calculate_effective_cost(option, item, purchase_date) * item.quantity
                 
-                if item:
-                    purchase_time = delivery_time - option.lomc_lead_time
-                    purchase_date = date.today() + timedelta(days=purchase_time - 1)
-                    final_cost = await self._calculate_effective_cost(option, item, purchase_date) * item.quantity
-                    
-                    result = OptimizationResult(
-                        run_id=uuid.UUID(self.run_id),
-                        project_id=project_id,
-                        item_code=item.item_code,
-                        procurement_option_id=option_id,
-                        purchase_time=purchase_time,
-                        delivery_time=delivery_time,
-                        quantity=item.quantity,
-                        final_cost=final_cost
-                    )
-                    results.append(result)
+                result = OptimizationResult(
+                    run_id=uuid.UUID(self.run_id),
+                    project_id=project_id,
+                    item_code=item.item_code,
+                    procurement_option_id=option_id,
+                    purchase_time=purchase_time,
+                    delivery_time=delivery_time,
+                    quantity=item.quantity,
+                    final_cost=final_cost
+                )
+                results.append(result)
         
         # Save all results
         self.db.add_all(results)
@@ -870,27 +1103,26 @@ class ProcurementOptimizer:
         
         logger.info(f"Saved {len(results)} optimization results")
     
-    async def _calculate_total_cost(self, solver) -> Decimal:
+    async def _calculate_total_cost(self, selected_vars: List[str]) -> Decimal:
         """Calculate total cost of the optimized solution"""
         total_cost = Decimal('0')
         
-        for var_name, var in self.variables.items():
-            if solver.Value(var) == 1:
-                parts = var_name.split('_')
-                option_id = int(parts[3])
-                project_id = int(parts[1])
-                project_item_id = int(parts[2])
-                delivery_time = int(parts[4])  # Extract delivery time from variable name
-                
-                option = self.procurement_options[option_id]
-                item = next((i for i in self.project_items 
-                            if i.project_id == project_id and i.id == project_item_id), None)
-                
-                if item:
-                    # Calculate purchase date from delivery time and lead time
-                    purchase_time = delivery_time - option.lomc_lead_time
-                    purchase_date = date.today() + timedelta(days=purchase_time - 1)
-                    cost_per_unit = await self._calculate_effective_cost(option, item, purchase_date)
-                    total_cost += cost_per_unit * item.quantity
+        for var_name in selected_vars:
+            parts = var_name.split('_')
+            option_id = int(parts[3])
+            project_id = int(parts[1])
+            project_item_id = int(parts[2])
+            delivery_time = int(parts[4])  # Extract delivery time from variable name
+            
+            option = self.procurement_options[option_id]
+            item = next((i for i in self.project_items 
+                        if i.project_id == project_id and i.id == project_item_id), None)
+            
+            if item:
+                # Calculate purchase date from delivery time and lead time
+                purchase_time = delivery_time - option.lomc_lead_time
+                purchase_date = date.today() + timedelta(days=purchase_time - 1)
+                cost_per_unit = await self._calculate_effective_cost(option, item, purchase_date)
+                total_cost += cost_per_unit * item.quantity
         
         return total_cost
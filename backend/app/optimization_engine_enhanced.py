@@ -16,6 +16,11 @@ from app.models import (
     OptimizationResult, FinalizedDecision, OptimizationRun
 )
 from app.schemas import OptimizationRunRequest, OptimizationRunResponse, OptimizationProposal, OptimizationDecision
+from app.config import settings
+from app.optimization_model_dump import should_dump, dump_cpsat_model, dump_mp_model
+from app.optimization_symmetry import build_item_groups
+from app.optimization_time_axis import TimeAxis
+from app.optimization_solution_pool import enumerate_alternatives, hamming_distance
 import logging
 from enum import Enum
 import networkx as nx
@@ -40,6 +45,10 @@ class OptimizationStrategy(str, Enum):
     FAST_DELIVERY = "FAST_DELIVERY"          # Minimize total delivery time
 
 
+# Share of the time limit granted to the solution pool's re-solves after the first solve
+SOLUTION_POOL_EXTRA_TIME_FRACTION = 0.5
+
+
 class EnhancedProcurementOptimizer:
     """
     Advanced optimization engine with multiple solvers and strategies.
@@ -60,6 +69,8 @@ class EnhancedProcurementOptimizer:
         self.run_id = str(uuid.uuid4())
         self.start_time = None
         self.dependency_graph = None
+        # Calendar buckets for budget constraints (replaced per request in run_optimization)
+        self.time_axis = TimeAxis()
         
     async def run_optimization(
         self, 
@@ -76,6 +87,7 @@ class EnhancedProcurementOptimizer:
             strategies: List of strategies to use (default: all strategies)
         """
         self.start_time = datetime.now()
+        self.time_axis = TimeAxis(request.time_bucket)
         
         try:
             # Load and validate data
@@ -85,7 +97,11 @@ class EnhancedProcurementOptimizer:
             self._build_dependency_graph()
             
             # Generate proposals based on strategies
-            if generate_multiple_proposals:
+            if request.solution_pool_size and request.solution_pool_size > 1 and self.solver_type == SolverType.CP_SAT:
+                # K best alternatives of one strategy instead of one solve per strategy
+                pool_strategy = strategies[0] if strategies else OptimizationStrategy.PRIORITY_WEIGHTED
+                proposals = await self._generate_solution_pool(request, pool_strategy)
+            elif generate_multiple_proposals:
                 proposals = await self._generate_multiple_proposals(request, strategies)
             else:
                 # Single optimization run with current strategy
@@ -203,6 +219,87 @@ class EnhancedProcurementOptimizer:
         
         return proposals
     
+    async def _generate_solution_pool(
+        self,
+        request: OptimizationRunRequest,
+        strategy: OptimizationStrategy
+    ) -> List[OptimizationProposal]:
+        """
+        Enumerate the K best distinct solutions of one strategy's CP-SAT model.
+        
+        After each solve the solution is excluded with a no-good cut that also excludes
+        every solution closer than request.solution_pool_min_distance item choices, and the
+        model is re-solved (app/optimization_solution_pool.py).
+        """
+        pool_size = request.solution_pool_size
+        min_distance = request.solution_pool_min_distance
+        
+        def configure_solver(solver: cp_model.CpSolver):
+            if strategy == OptimizationStrategy.FAST_DELIVERY:
+                solver.parameters.linearization_level = 2
+                solver.parameters.cp_model_presolve = True
+        
+        def dump_first_solve(solver: cp_model.CpSolver, status: int):
+            self._maybe_dump_cpsat_model(request, strategy, 'cpsat_pool', model, variables, solver, status)
+        
+        try:
+            model, variables = self._build_cpsat_model(request, strategy)
+            alternatives = enumerate_alternatives(
+                model, variables, getattr(self, 'cpsat_objective', None), pool_size, min_distance,
+                request.time_limit_seconds,
+                max(1.0, request.time_limit_seconds * SOLUTION_POOL_EXTRA_TIME_FRACTION),
+                configure_solver=configure_solver,
+                on_first_solve=dump_first_solve
+            )
+            pool = [(solution, self._cpsat_item_choices(solution.selected)) for solution in alternatives]
+        
+        except Exception as e:
+            logger.error(f"Solution pool for strategy {strategy} failed: {str(e)}")
+            return []
+        
+        best_choices = pool[0][1] if pool else {}
+        proposals = []
+        
+        for rank, (solution, choices) in enumerate(pool, start=1):
+            decisions = self._decisions_from_var_names(sorted(solution.selected))
+            total_cost = sum(d.final_cost for d in decisions)
+            
+            if rank == 1:
+                proposal_name = self._get_strategy_name(strategy)
+                notes = f"CP-SAT solution pool: best of {len(pool)} alternatives"
+            else:
+                proposal_name = f"{self._get_strategy_name(strategy)} - Alternative {rank}"
+                notes = (
+                    f"CP-SAT solution pool: alternative {rank} of {len(pool)}"
+                    f"{' (best of the remaining solutions)' if solution.is_optimal else ''}, "
+                    f"{hamming_distance(choices, best_choices)} item choice(s) differ from the best"
+                )
+            
+            proposals.append(OptimizationProposal(
+                proposal_name=proposal_name,
+                strategy_type=strategy.value,
+                total_cost=total_cost,
+                weighted_cost=self._calculate_weighted_cost(decisions),
+                status="OPTIMAL" if rank == 1 and solution.is_optimal else "FEASIBLE",
+                items_count=len(decisions),
+                decisions=decisions,
+                summary_notes=notes
+            ))
+        
+        return proposals
+    
+    def _cpsat_item_choices(self, selected: frozenset) -> Dict[int, Tuple[int, int]]:
+        """Map selected per-item variables to {project_item_id: (option_id, delivery_time)}"""
+        choices = {}
+        for var_name in selected:
+            parts = var_name.split('_')
+            option_id = int(parts[3])
+            delivery_time = int(parts[4])
+            option = self.procurement_options.get(option_id)
+            if option:
+                choices[option.project_item_id] = (option_id, delivery_time)
+        return choices
+    
     async def _run_single_optimization(
         self, 
         request: OptimizationRunRequest,
@@ -235,6 +332,105 @@ class EnhancedProcurementOptimizer:
         Best for: Complex constraints, non-linear relationships, logical conditions
         """
         
+        if request.aggregate_identical_items:
+            return await self._solve_with_cpsat_aggregated(request, strategy)
+        
+        model, variables = self._build_cpsat_model(request, strategy)
+        
+        # Solve
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = request.time_limit_seconds
+        
+        # Apply strategy-specific search heuristics
+        if strategy == OptimizationStrategy.FAST_DELIVERY:
+            solver.parameters.linearization_level = 2
+            solver.parameters.cp_model_presolve = True
+        
+        status = solver.Solve(model)
+        self._maybe_dump_cpsat_model(request, strategy, 'cpsat', model, variables, solver, status)
+        
+        logger.info("=== SOLVER RESULTS ===")
+        logger.info(f"Solver status: {status}")
+        logger.info(f"Status meaning: {'OPTIMAL' if status == cp_model.OPTIMAL else 'FEASIBLE' if status == cp_model.FEASIBLE else 'INFEASIBLE' if status == cp_model.INFEASIBLE else 'UNKNOWN'}")
+        
+        if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            decisions = self._extract_cpsat_decisions(solver, variables)
+            total_cost = sum(d.final_cost for d in decisions)
+            weighted_cost = self._calculate_weighted_cost(decisions)
+            
+            logger.info("✅ Optimization successful!")
+            logger.info(f"Items optimized: {len(decisions)}")
+            logger.info(f"Total cost: ${total_cost}")
+            
+            # Debug: Check which variables were actually selected
+            selected_vars = []
+            for var_name, var in variables.items():
+                if solver.Value(var) == 1:
+                    selected_vars.append(var_name)
+            
+            logger.info(f"Selected variables: {len(selected_vars)}")
+            for var in selected_vars[:10]:  # Show first 10
+                logger.info(f"  {var}")
+            if len(selected_vars) > 10:
+                logger.info(f"  ... and {len(selected_vars) - 10} more")
+            
+            return OptimizationProposal(
+                proposal_name=self._get_strategy_name(strategy),
+                strategy_type=strategy.value,
+                total_cost=total_cost,
+                weighted_cost=weighted_cost,
+                status="OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE",
+                items_count=len(decisions),
+                decisions=decisions,
+                summary_notes=f"CP-SAT solver: {len(decisions)} items optimized"
+            )
+        else:
+            logger.warning(f"❌ Optimization failed with status: {status}")
+            logger.warning("Possible reasons: No feasible solution, budget constraints too tight, or no valid items")
+        
+        return None
+    
+    def _dump_metadata(self, request: OptimizationRunRequest, strategy: OptimizationStrategy) -> Dict[str, Any]:
+        return {
+            'engine': 'enhanced',
+            'strategy': strategy.value,
+            'request': request.model_dump(mode='json'),
+            'items': len(self.project_items),
+            'options': len(self.procurement_options),
+        }
+    
+    def _maybe_dump_cpsat_model(self, request, strategy, label, model, variables, solver, status):
+        """Write the CP-SAT model for offline replay when requested or when the solve was slow"""
+        if not should_dump(request.dump_model, solver.WallTime(), settings.optimization_model_dump_slow_seconds):
+            return
+        try:
+            dump_cpsat_model(
+                settings.optimization_model_dump_dir, self.run_id, f"{strategy.value}_{label}",
+                model, variables, solver, status, self._dump_metadata(request, strategy)
+            )
+        except Exception as e:
+            logger.warning(f"Could not dump CP-SAT model: {str(e)}")
+    
+    def _maybe_dump_mp_model(self, request, strategy, solver, solver_name, variables, status):
+        """Write the linear solver model for offline replay when requested or when the solve was slow"""
+        if not should_dump(request.dump_model, solver.wall_time() / 1000.0, settings.optimization_model_dump_slow_seconds):
+            return
+        try:
+            dump_mp_model(
+                settings.optimization_model_dump_dir, self.run_id, f"{strategy.value}_{solver_name}",
+                solver, solver_name, variables, status, request.time_limit_seconds,
+                self._dump_metadata(request, strategy)
+            )
+        except Exception as e:
+            logger.warning(f"Could not dump {solver_name} model: {str(e)}")
+    
+    def _build_cpsat_model(
+        self,
+        request: OptimizationRunRequest,
+        strategy: OptimizationStrategy
+    ) -> Tuple[cp_model.CpModel, Dict[str, Any]]:
+        """Build the per-item CP-SAT model: one boolean per (project item, option, time slot)"""
+        
         model = cp_model.CpModel()
         variables = {}
         
@@ -322,57 +518,172 @@ class EnhancedProcurementOptimizer:
         # Set objective based on strategy
         self._set_cpsat_objective(model, variables, strategy)
         
-        # Solve
+        return model, variables
+    
+    async def _solve_with_cpsat_aggregated(
+        self,
+        request: OptimizationRunRequest,
+        strategy: OptimizationStrategy
+    ) -> Optional[OptimizationProposal]:
+        """
+        Solve with CP-SAT after grouping interchangeable project items.
+        
+        Items with the same item code, quantity, business value, identical finalized
+        options and identical objective coefficients share one integer variable per
+        (option, time slot) whose value is the number of items of the group bought that
+        way. The reduced model is solved and
+        the quantities are split back out to project items by project priority: the
+        highest-priority projects receive the earliest-delivering options.
+        """
+        
+        # Priority-weighted objectives give items of different priority different
+        # coefficients, so those items are only interchangeable within one priority level
+        include_priority = strategy in (OptimizationStrategy.PRIORITY_WEIGHTED, OptimizationStrategy.BALANCED)
+        
+        options_by_item = {}
+        for item in self.project_items:
+            if not self._item_has_delivery_options(item):
+                continue
+            item_options = [
+                opt for opt in self.procurement_options.values()
+                if opt.item_code == item.item_code and opt.project_item_id == item.id
+                and opt.purchase_date and opt.expected_delivery_date
+            ]
+            if item_options:
+                options_by_item[item.id] = item_options
+        
+        # Time slots are option ids, which differ between projects, so delivery-time
+        # dependent strategies (FAST_DELIVERY, SMOOTH_CASHFLOW, BALANCED) can give the
+        # same option different coefficients per item: compare each item's own
+        def coefficient_key(item: ProjectItem, option_ids: List[int]) -> Tuple:
+            return tuple(
+                (
+                    self._cpsat_objective_coefficients(self.procurement_options[option_id], item, delivery_time, strategy),
+                    self._purchase_bucket(self.procurement_options[option_id], delivery_time),
+                )
+                for option_id in option_ids
+                for delivery_time in option_ids
+            )
+        
+        groups = build_item_groups(
+            [item for item in self.project_items if item.id in options_by_item],
+            options_by_item,
+            self.projects,
+            include_priority=include_priority,
+            coefficient_key=coefficient_key
+        )
+        
+        model = cp_model.CpModel()
+        # {(group_index, option_index, slot_index): IntVar}
+        variables = {}
+        demand_terms = {}
+        time_groups = {}
+        cost_terms = []
+        value_terms = []
+        
+        for group_index, group in enumerate(groups):
+            representative = group.representative
+            representative_option_ids = group.representative_option_ids()
+            demand_terms[group_index] = []
+            
+            for option_index, option_id in enumerate(representative_option_ids):
+                option = self.procurement_options[option_id]
+                
+                # Each option of the representative item doubles as a time slot (same as the per-item model)
+                for slot_index, delivery_time in enumerate(representative_option_ids):
+                    var_name = f"agg_{group_index}_{option_index}_{slot_index}"
+                    var = model.NewIntVar(0, group.size, var_name)
+                    variables[(group_index, option_index, slot_index)] = var
+                    demand_terms[group_index].append(var)
+                    
+                    bucket = self._purchase_bucket(option, delivery_time)
+                    time_groups.setdefault(bucket, []).append((var, option, representative))
+                    
+                    cost_scaled, value_scaled = self._cpsat_objective_coefficients(
+                        option, representative, delivery_time, strategy
+                    )
+                    cost_terms.append(var * cost_scaled)
+                    value_terms.append(var * value_scaled)
+        
+        per_item_variables = sum(len(group.representative_option_ids()) ** 2 * group.size for group in groups)
+        logger.info("=== AGGREGATED CP-SAT MODEL ===")
+        logger.info(
+            f"Groups: {len(groups)} for {sum(g.size for g in groups)} items, "
+            f"variables: {len(variables)} (per-item model: {per_item_variables})"
+        )
+        
+        # DEMAND FULFILLMENT: every item of every group is purchased exactly once
+        for group_index, group in enumerate(groups):
+            if demand_terms[group_index]:
+                model.Add(sum(demand_terms[group_index]) == group.size)
+        
+        self._add_cpsat_budget_time_groups(model, time_groups)
+        self._minimize_cpsat_objective(model, cost_terms, value_terms)
+        
         solver = cp_model.CpSolver()
         solver.parameters.max_time_in_seconds = request.time_limit_seconds
         
-        # Apply strategy-specific search heuristics
         if strategy == OptimizationStrategy.FAST_DELIVERY:
             solver.parameters.linearization_level = 2
             solver.parameters.cp_model_presolve = True
         
         status = solver.Solve(model)
+        self._maybe_dump_cpsat_model(request, strategy, 'cpsat_aggregated', model, variables, solver, status)
         
-        logger.info(f"=== SOLVER RESULTS ===")
-        logger.info(f"Solver status: {status}")
-        logger.info(f"Status meaning: {'OPTIMAL' if status == cp_model.OPTIMAL else 'FEASIBLE' if status == cp_model.FEASIBLE else 'INFEASIBLE' if status == cp_model.INFEASIBLE else 'UNKNOWN'}")
+        logger.info(f"Aggregated solver status: {solver.StatusName(status)}")
         
-        if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-            decisions = self._extract_cpsat_decisions(solver, variables)
-            total_cost = sum(d.final_cost for d in decisions)
-            weighted_cost = self._calculate_weighted_cost(decisions)
-            
-            logger.info(f"✅ Optimization successful!")
-            logger.info(f"Items optimized: {len(decisions)}")
-            logger.info(f"Total cost: ${total_cost}")
-            
-            # Debug: Check which variables were actually selected
-            selected_vars = []
-            for var_name, var in variables.items():
-                if solver.Value(var) == 1:
-                    selected_vars.append(var_name)
-            
-            logger.info(f"Selected variables: {len(selected_vars)}")
-            for var in selected_vars[:10]:  # Show first 10
-                logger.info(f"  {var}")
-            if len(selected_vars) > 10:
-                logger.info(f"  ... and {len(selected_vars) - 10} more")
-            
-            return OptimizationProposal(
-                proposal_name=self._get_strategy_name(strategy),
-                strategy_type=strategy.value,
-                total_cost=total_cost,
-                weighted_cost=weighted_cost,
-                status="OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE",
-                items_count=len(decisions),
-                decisions=decisions,
-                summary_notes=f"CP-SAT solver: {len(decisions)} items optimized"
-            )
-        else:
-            logger.warning(f"❌ Optimization failed with status: {status}")
-            logger.warning(f"Possible reasons: No feasible solution, budget constraints too tight, or no valid items")
+        if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            logger.warning(f"❌ Aggregated optimization failed with status: {status}")
+            return None
         
-        return None
+        decisions = []
+        for group_index, group in enumerate(groups):
+            counts = {}
+            for (g_index, option_index, slot_index), var in variables.items():
+                if g_index == group_index:
+                    value = solver.Value(var)
+                    if value > 0:
+                        counts[(option_index, slot_index)] = value
+            
+            # Option signatures are sorted by delivery date, so lower indexes deliver earlier
+            for item, (option_index, slot_index) in group.allocate(counts):
+                option_id = group.option_id_for(item, option_index)
+                delivery_time = group.option_id_for(item, slot_index)
+                decision = self._create_decision(item.project_id, item.item_code, option_id, delivery_time)
+                if decision:
+                    decisions.append(decision)
+        
+        total_cost = sum(d.final_cost for d in decisions)
+        weighted_cost = self._calculate_weighted_cost(decisions)
+        
+        logger.info(f"✅ Aggregated optimization successful: {len(decisions)} items, total cost {total_cost}")
+        
+        return OptimizationProposal(
+            proposal_name=self._get_strategy_name(strategy),
+            strategy_type=strategy.value,
+            total_cost=total_cost,
+            weighted_cost=weighted_cost,
+            status="OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE",
+            items_count=len(decisions),
+            decisions=decisions,
+            summary_notes=(
+                f"CP-SAT solver: {len(decisions)} items optimized "
+                f"({len(groups)} aggregated item groups, {len(variables)} variables)"
+            )
+        )
+    
+    def _item_has_delivery_options(self, item: ProjectItem) -> bool:
+        """Check delivery options from the DeliveryOption table, falling back to the legacy JSON field"""
+        if item.delivery_options_rel and len(item.delivery_options_rel) > 0:
+            return True
+        if item.delivery_options:
+            try:
+                import json
+                delivery_options = json.loads(item.delivery_options) if isinstance(item.delivery_options, str) else item.delivery_options
+                return bool(delivery_options)
+            except (ValueError, TypeError):
+                return False
+        return False
     
     async def _solve_with_glop(
         self, 
@@ -447,8 +758,8 @@ class EnhancedProcurementOptimizer:
                 constraint.SetCoefficient(var, 1)
         
         # Add budget constraints (MULTI-CURRENCY SUPPORT)
-        # Group by time slot AND currency
-        time_currency_groups = {}  # {(time_slot, currency): [(var, cost), ...]}
+        # Group by calendar bucket AND currency
+        time_currency_groups = {}  # {(bucket_start, currency): [(var, cost), ...]}
         
         time_groups = self._group_by_purchase_time(variables, request.max_time_slots)
         for time_slot, var_data in time_groups.items():
@@ -460,12 +771,12 @@ class EnhancedProcurementOptimizer:
         
         # Apply budget constraints per currency
         for (time_slot, currency), var_cost_pairs in time_currency_groups.items():
-            if time_slot in self.budget_data_by_currency:
-                currency_budgets = self.budget_data_by_currency[time_slot]
+            if time_slot in self.budget_by_bucket:
+                currency_budgets = self.budget_by_bucket[time_slot]
                 budget_amount = currency_budgets.get(currency, Decimal(0))
                 budget_limit = float(budget_amount)
             else:
-                # No budget data for this time slot - use large default
+                # No budget data for this calendar bucket - use large default
                 budget_limit = 100000000000000.0  # $100T default
             
             constraint = solver.Constraint(0, budget_limit)
@@ -481,6 +792,7 @@ class EnhancedProcurementOptimizer:
         # Solve
         solver.SetTimeLimit(request.time_limit_seconds * 1000)  # milliseconds
         status = solver.Solve()
+        self._maybe_dump_mp_model(request, strategy, solver, 'GLOP', variables, status)
         
         if status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
             # Round LP solution to integer solution
@@ -571,8 +883,8 @@ class EnhancedProcurementOptimizer:
                 constraint.SetCoefficient(var, 1)
         
         # Add budget constraints (MULTI-CURRENCY SUPPORT)
-        # Group by time slot AND currency
-        time_currency_groups = {}  # {(time_slot, currency): [(var, cost), ...]}
+        # Group by calendar bucket AND currency
+        time_currency_groups = {}  # {(bucket_start, currency): [(var, cost), ...]}
         
         time_groups = self._group_by_purchase_time(variables, request.max_time_slots)
         for time_slot, var_data in time_groups.items():
@@ -584,12 +896,12 @@ class EnhancedProcurementOptimizer:
         
         # Apply budget constraints per currency
         for (time_slot, currency), var_cost_pairs in time_currency_groups.items():
-            if time_slot in self.budget_data_by_currency:
-                currency_budgets = self.budget_data_by_currency[time_slot]
+            if time_slot in self.budget_by_bucket:
+                currency_budgets = self.budget_by_bucket[time_slot]
                 budget_amount = currency_budgets.get(currency, Decimal(0))
                 budget_limit = float(budget_amount)
             else:
-                # No budget data for this time slot - use large default
+                # No budget data for this calendar bucket - use large default
                 budget_limit = 100000000000000.0  # $100T default
             
             constraint = solver.Constraint(0, budget_limit)
@@ -605,6 +917,7 @@ class EnhancedProcurementOptimizer:
         # Solve
         solver.SetTimeLimit(request.time_limit_seconds * 1000)
         status = solver.Solve()
+        self._maybe_dump_mp_model(request, strategy, solver, solver_name, variables, status)
         
         if status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]:
             decisions = self._extract_mip_decisions(solver, variables)
@@ -911,36 +1224,10 @@ class EnhancedProcurementOptimizer:
             select(BudgetData).order_by(BudgetData.budget_date)
         )
         budget_list = budget_result.scalars().all()
-        self.budget_data = {}
-        self.budget_data_by_currency = {}  # NEW: Track budgets by currency {time_slot: {currency: amount}}
+        self.budget_data = {idx: bd for idx, bd in enumerate(budget_list, start=1)}
         
-        for idx, bd in enumerate(budget_list, start=1):
-            self.budget_data[idx] = bd
-            
-            # Load multi_currency_budget if available
-            if bd.multi_currency_budget:
-                import json
-                if isinstance(bd.multi_currency_budget, str):
-                    currency_dict = json.loads(bd.multi_currency_budget)
-                else:
-                    currency_dict = bd.multi_currency_budget
-                
-                if idx not in self.budget_data_by_currency:
-                    self.budget_data_by_currency[idx] = {}
-                
-                # Store each currency separately
-                for currency, amount in currency_dict.items():
-                    currency_code = currency.strip().upper() if currency else 'IRR'
-                    if currency_code not in self.budget_data_by_currency[idx]:
-                        self.budget_data_by_currency[idx][currency_code] = Decimal(0)
-                    self.budget_data_by_currency[idx][currency_code] += Decimal(str(amount))
-            else:
-                # Fallback to legacy available_budget (assumed IRR)
-                if idx not in self.budget_data_by_currency:
-                    self.budget_data_by_currency[idx] = {}
-                if 'IRR' not in self.budget_data_by_currency[idx]:
-                    self.budget_data_by_currency[idx]['IRR'] = Decimal(0)
-                self.budget_data_by_currency[idx]['IRR'] += Decimal(str(bd.available_budget or 0))
+        # Budgets per calendar bucket and currency {bucket_start: {currency: amount}}
+        self.budget_by_bucket = self.time_axis.budgets_by_bucket(budget_list)
         
         if not self.budget_data:
             raise ValueError(
@@ -1015,33 +1302,40 @@ class EnhancedProcurementOptimizer:
             item_code = parts[2]
             
             option = self.procurement_options[option_id]
-            purchase_time = delivery_time - option.lomc_lead_time
-            
-            # Skip options with impossible lead times (purchase time in the past or too far in the past)
-            if purchase_time < 0:
-                logger.debug(f"Skipping option {option_id} for {item_code}: purchase_time={purchase_time} (negative)")
-                continue
-            
-            if purchase_time not in time_groups:
-                time_groups[purchase_time] = []
+            # Spending is charged to the calendar bucket of the option's purchase date
+            bucket = self._purchase_bucket(option, delivery_time)
             
             item = next((i for i in self.project_items 
                         if i.project_id == project_id and i.item_code == item_code), None)
             
             if item:
-                time_groups[purchase_time].append((var, option, item))
+                time_groups.setdefault(bucket, []).append((var, option, item))
+        
+        self._add_cpsat_budget_time_groups(model, time_groups)
+    
+    def _purchase_bucket(self, option: ProcurementOption, delivery_time: int) -> date:
+        """Calendar bucket of an option's purchase date (derived from the lead time when not set)"""
+        if option.purchase_date:
+            return self.time_axis.bucket_of(option.purchase_date)
+        return self.time_axis.bucket_of_offset(max(0, delivery_time - (option.lomc_lead_time or 0)))
+    
+    def _add_cpsat_budget_time_groups(self, model: cp_model.CpModel, time_groups: Dict[date, List[Tuple[Any, ProcurementOption, ProjectItem]]]):
+        """
+        Add soft per-currency budget constraints for grouped variables.
         
+        Args:
+            time_groups: {bucket_start: [(var, option, item), ...]}. Each var is multiplied
+                by the full item cost, so integer (aggregated) variables are supported too.
+        """
         # Store slack variables for penalty in objective
         self.cpsat_budget_slack_vars = []
         
-        # FIXED: Iterate over actual time slots that have variables, not a fixed range
+        # One constraint per calendar bucket (and currency) that has spending
         logger.info(f"=== BUDGET CONSTRAINTS ===")
-        logger.info(f"Time groups keys: {sorted(time_groups.keys())}")
-        logger.info(f"Budget data keys: {list(self.budget_data.keys())}")
+        logger.info(f"Spending in {self.time_axis.describe(list(time_groups.keys()))}")
+        logger.info(f"Budgets in {self.time_axis.describe(list(self.budget_by_bucket.keys()))}")
         
         for time_slot in sorted(time_groups.keys()):
-            if time_slot not in time_groups:
-                continue
             
             cash_flow_vars = []
             cash_flow_coeffs = []
@@ -1067,9 +1361,9 @@ class EnhancedProcurementOptimizer:
                 # Scale to thousands for numerical stability
                 cash_flow_coeffs = [int(c / 1000) for _, c in var_cost_pairs]
                 
-                # Get budget for this currency and time slot
-                if time_slot in self.budget_data_by_currency:
-                    currency_budgets = self.budget_data_by_currency[time_slot]
+                # Get budget for this currency and calendar bucket
+                if time_slot in self.budget_by_bucket:
+                    currency_budgets = self.budget_by_bucket[time_slot]
                     budget_amount = currency_budgets.get(currency, Decimal(0))
                     budget_limit = int(budget_amount / 1000)
                     logger.info(
@@ -1096,7 +1390,7 @@ class EnhancedProcurementOptimizer:
                     max_slack = max(budget_limit // 2, 500)  # At least $500K
                     slack_var = model.NewIntVar(
                         0, max_slack, 
-                        f'cpsat_budget_slack_{time_slot}_{currency}'
+                        f'cpsat_budget_slack_{time_slot.isoformat()}_{currency}'
                     )
                     
                     # Soft constraint: spending <= budget + slack (per currency)
@@ -1132,84 +1426,101 @@ class EnhancedProcurementOptimizer:
             if not item:
                 continue
             
-            # Calculate procurement cost
-            cost, _ = self._calculate_effective_cost(option, item)
-            cost = float(cost * item.quantity)
-            
-            # Calculate business value (revenue from item)
-            business_value = 0
-            # Try to get invoice amount from delivery options relationship (NEW SYSTEM)
-            if item.delivery_options_rel and len(item.delivery_options_rel) > 0:
-                # Use the first delivery option's invoice amount
-                first_delivery_option = item.delivery_options_rel[0]
-                if first_delivery_option.invoice_amount_per_unit:
-                    business_value = float(first_delivery_option.invoice_amount_per_unit) * item.quantity
-            # Fallback to JSON field for legacy items (OLD SYSTEM)
-            elif hasattr(item, 'delivery_options') and item.delivery_options:
-                try:
-                    import json
-                    delivery_options = json.loads(item.delivery_options) if isinstance(item.delivery_options, str) else item.delivery_options
-                    if isinstance(delivery_options, list) and delivery_options:
-                        first_delivery = delivery_options[0]
-                        if isinstance(first_delivery, dict) and 'invoice_amount_per_unit' in first_delivery:
-                            business_value = float(first_delivery['invoice_amount_per_unit']) * item.quantity
-                except:
-                    pass
-            
-            # If no delivery option, use 200% markup as default to ensure profitability
-            if business_value == 0:
-                business_value = cost * 3.0  # 200% profit margin
-            
-            # Debug logging for objective function
-            logger.debug(f"Objective for {item.item_code}: cost={cost:,.2f}, value={business_value:,.2f}, profit={business_value-cost:,.2f}")
-            
-            project = self.projects.get(project_id)
-            
-            # Apply strategy-specific weighting to BOTH cost and value
-            # This ensures strategies still differentiate while maintaining profitability
-            if strategy == OptimizationStrategy.LOWEST_COST:
-                cost_weight = 1.0
-                value_weight = 1.0
-            elif strategy == OptimizationStrategy.PRIORITY_WEIGHTED:
-                priority = project.priority_weight if project else 5
-                # Higher priority = lower cost weight, higher value weight
-                cost_weight = float(11 - priority) * 0.1
-                value_weight = float(priority) * 0.1
-            elif strategy == OptimizationStrategy.FAST_DELIVERY:
-                # Earlier delivery = higher value
-                # Normalize delivery_time (days) to a reasonable scale
-                # Shorter delivery time = higher value weight
-                max_delivery_days = 90  # Assume max 90 days
-                normalized_delivery = min(delivery_time, max_delivery_days) / max_delivery_days
-                cost_weight = 1.0
-                value_weight = 1.0 + (1.0 - normalized_delivery) * 2.0  # Range: 1.0 to 3.0
-            elif strategy == OptimizationStrategy.SMOOTH_CASHFLOW:
-                # Prefer middle time slots to balance cash flow
-                # Normalize delivery_time to 0-1 range
-                max_delivery_days = 90
-                normalized_delivery = min(delivery_time, max_delivery_days) / max_delivery_days
-                # Prefer middle range (around 0.5)
-                distance_from_middle = abs(normalized_delivery - 0.5)
-                cost_weight = 1.0 + distance_from_middle
-                value_weight = 1.0 + (0.5 - distance_from_middle) * 0.5  # Bonus for middle range
-            else:  # BALANCED
-                # Balance between priority and delivery time
-                priority = project.priority_weight if project else 5
-                priority_factor = float(11 - priority) * 0.05  # Range: 0.3 to 0.55
-                # Normalize delivery time
-                max_delivery_days = 90
-                normalized_delivery = min(delivery_time, max_delivery_days) / max_delivery_days
-                delivery_factor = (1.0 - normalized_delivery) * 0.3  # Range: 0 to 0.3
-                cost_weight = priority_factor + delivery_factor + 0.5
-                value_weight = 1.0 + (priority * 0.1) + (1.0 - normalized_delivery) * 0.2
-            
-            # Scale to thousands for numerical stability
-            cost_scaled = int(cost / 1000 * cost_weight)
-            value_scaled = int(business_value / 1000 * value_weight)
+            cost_scaled, value_scaled = self._cpsat_objective_coefficients(option, item, delivery_time, strategy)
             
             cost_terms.append(var * cost_scaled)
             value_terms.append(var * value_scaled)
         
+        self._minimize_cpsat_objective(model, cost_terms, value_terms)
+    
+    def _cpsat_objective_coefficients(
+        self,
+        option: ProcurementOption,
+        item: ProjectItem,
+        delivery_time: int,
+        strategy: OptimizationStrategy
+    ) -> Tuple[int, int]:
+        """Scaled (cost, business value) objective coefficients of buying one item with an option"""
+        project_id = item.project_id
+        # Calculate procurement cost
+        cost, _ = self._calculate_effective_cost(option, item)
+        cost = float(cost * item.quantity)
+        
+        # Calculate business value (revenue from item)
+        business_value = 0
+        # Try to get invoice amount from delivery options relationship (NEW SYSTEM)
+        if item.delivery_options_rel and len(item.delivery_options_rel) > 0:
+            # Use the first delivery option's invoice amount
+            first_delivery_option = item.delivery_options_rel[0]
+            if first_delivery_option.invoice_amount_per_unit:
+                business_value = float(first_delivery_option.invoice_amount_per_unit) * item.quantity
+        # Fallback to JSON field for legacy items (OLD SYSTEM)
+        elif hasattr(item, 'delivery_options') and item.delivery_options:
+            try:
+                import json
+                delivery_options = json.loads(item.delivery_options) if isinstance(item.delivery_options, str) else item.delivery_options
+                if isinstance(delivery_options, list) and delivery_options:
+                    first_delivery = delivery_options[0]
+                    if isinstance(first_delivery, dict) and 'invoice_amount_per_unit' in first_delivery:
+                        business_value = float(first_delivery['invoice_amount_per_unit']) * item.quantity
+            except:
+                pass
+        
+        # If no delivery option, use 200% markup as default to ensure profitability
+        if business_value == 0:
+            business_value = cost * 3.0  # 200% profit margin
+        
+        # Debug logging for objective function
+        logger.debug(f"Objective for {item.item_code}: cost={cost:,.2f}, value={business_value:,.2f}, profit={business_value-cost:,.2f}")
+        
+        project = self.projects.get(project_id)
+        
+        # Apply strategy-specific weighting to BOTH cost and value
+        # This ensures strategies still differentiate while maintaining profitability
+        if strategy == OptimizationStrategy.LOWEST_COST:
+            cost_weight = 1.0
+            value_weight = 1.0
+        elif strategy == OptimizationStrategy.PRIORITY_WEIGHTED:
+            priority = project.priority_weight if project else 5
+            # Higher priority = lower cost weight, higher value weight
+            cost_weight = float(11 - priority) * 0.1
+            value_weight = float(priority) * 0.1
+        elif strategy == OptimizationStrategy.FAST_DELIVERY:
+            # Earlier delivery = higher value
+            # Normalize delivery_time (days) to a reasonable scale
+            # Shorter delivery time = higher value weight
+            max_delivery_days = 90  # Assume max 90 days
+            normalized_delivery = min(delivery_time, max_delivery_days) / max_delivery_days
+            cost_weight = 1.0
+            value_weight = 1.0 + (1.0 - normalized_delivery) * 2.0  # Range: 1.0 to 3.0
+        elif strategy == OptimizationStrategy.SMOOTH_CASHFLOW:
+            # Prefer middle time slots to balance cash flow
+            # Normalize delivery_time to 0-1 range
+            max_delivery_days = 90
+            normalized_delivery = min(delivery_time, max_delivery_days) / max_delivery_days
+            # Prefer middle range (around 0.5)
+            distance_from_middle = abs(normalized_delivery - 0.5)
+            cost_weight = 1.0 + distance_from_middle
+            value_weight = 1.0 + (0.5 - distance_from_middle) * 0.5  # Bonus for middle range
+        else:  # BALANCED
+            # Balance between priority and delivery time
+            priority = project.priority_weight if project else 5
+            priority_factor = float(11 - priority) * 0.05  # Range: 0.3 to 0.55
+            # Normalize delivery time
+            max_delivery_days = 90
+            normalized_delivery = min(delivery_time, max_delivery_days) / max_delivery_days
+            delivery_factor = (1.0 - normalized_delivery) * 0.3  # Range: 0 to 0.3
+            cost_weight = priority_factor + delivery_factor + 0.5
+            value_weight = 1.0 + (priority * 0.1) + (1.0 - normalized_delivery) * 0.2
+        
+        # Scale to thousands for numerical stability
+        cost_scaled = int(cost / 1000 * cost_weight)
+        value_scaled = int(business_value / 1000 * value_weight)
+        
+        return cost_scaled, value_scaled
+    
+    def _minimize_cpsat_objective(self, model: cp_model.CpModel, cost_terms: List, value_terms: List):
+        """Minimize(Cost - Value + Budget_Penalty) over the collected objective terms"""
         # Add budget penalty if slack variables exist
         budget_penalty = 0
         if hasattr(self, 'cpsat_budget_slack_vars') and self.cpsat_budget_slack_vars:
@@ -1228,6 +1539,8 @@ class EnhancedProcurementOptimizer:
         logger.info(f"Final objective: [CP-SAT Expression]")
         
         model.Minimize(objective_value)
+        # Kept for the solution pool's objective bound
+        self.cpsat_objective = objective_value
     
     def _set_glop_objective(self, objective, variables: Dict, strategy: OptimizationStrategy):
         """Set objective for Glop LP solver
@@ -1278,8 +1591,8 @@ class EnhancedProcurementOptimizer:
         """Set objective for MIP solver (same as Glop)"""
         self._set_glop_objective(objective, variables, strategy)
     
-    def _group_by_purchase_time(self, variables: Dict, max_time_slots: int) -> Dict[int, List[Tuple[Any, float]]]:
-        """Group variables by purchase time with their costs"""
+    def _group_by_purchase_time(self, variables: Dict, max_time_slots: int) -> Dict[date, List[Tuple[Any, float, str]]]:
+        """Group variables by calendar bucket of their purchase date with their costs and currency"""
         time_groups = {}
         
         for var_name, var in variables.items():
@@ -1299,11 +1612,12 @@ class EnhancedProcurementOptimizer:
                         if i.project_id == project_id and i.item_code == item_code), None)
             
             if item:
-                cost, _ = self._calculate_effective_cost(option, item)
+                cost, currency = self._calculate_effective_cost(option, item)
                 cost = float(cost * item.quantity)
-                if purchase_time not in time_groups:
-                    time_groups[purchase_time] = []
-                time_groups[purchase_time].append((var, cost))
+                bucket = self._purchase_bucket(option, delivery_time)
+                if bucket not in time_groups:
+                    time_groups[bucket] = []
+                time_groups[bucket].append((var, cost, currency))
         
         return time_groups
     
@@ -1348,19 +1662,24 @@ class EnhancedProcurementOptimizer:
     
     def _extract_cpsat_decisions(self, solver: cp_model.CpSolver, variables: Dict) -> List[OptimizationDecision]:
         """Extract decisions from CP-SAT solution"""
+        return self._decisions_from_var_names(
+            [var_name for var_name, var in variables.items() if solver.Value(var) == 1]
+        )
+    
+    def _decisions_from_var_names(self, var_names: List[str]) -> List[OptimizationDecision]:
+        """Create decisions for selected per-item variables (buy_{project}_{item}_{option}_{time})"""
         decisions = []
         
-        for var_name, var in variables.items():
-            if solver.Value(var) == 1:
-                parts = var_name.split('_')
-                project_id = int(parts[1])
-                item_code = parts[2]
-                option_id = int(parts[3])
-                delivery_time = int(parts[4])
-                
-                decision = self._create_decision(project_id, item_code, option_id, delivery_time)
-                if decision:
-                    decisions.append(decision)
+        for var_name in var_names:
+            parts = var_name.split('_')
+            project_id = int(parts[1])
+            item_code = parts[2]
+            option_id = int(parts[3])
+            delivery_time = int(parts[4])
+            
+            decision = self._create_decision(project_id, item_code, option_id, delivery_time)
+            if decision:
+                decisions.append(decision)
         
         return decisions
     
@@ -1533,6 +1852,9 @@ class EnhancedProcurementOptimizer:
                     'max_time_slots': request.max_time_slots,
                     'time_limit_seconds': request.time_limit_seconds,
                     'solver_type': self.solver_type.value,
+                    'aggregate_identical_items': request.aggregate_identical_items,
+                    'solution_pool_size': request.solution_pool_size,
+                    'time_bucket': self.time_axis.granularity.value,
                     'proposals_count': len(proposals),
                     'strategies': [p.strategy_type for p in proposals]
                 },
@@ -0,0 +1,366 @@
+"""
+Optimization Model Dumps and Offline Replay
+
+Slow production runs are hard to reproduce because the solver model only exists in
+memory of the API process. The engines can write the compiled model to disk:
+
+- CP-SAT: the CpModelProto (model.pb) plus the CpSolver parameters in text format
+- GLOP / SCIP / CBC: the MPModelProto (model.pb) plus an MPS export (model.mps)
+
+Each dump directory also contains manifest.json with the variable mapping
+(variable name -> model index), the request parameters and the result of the
+original solve. Dumps are replayed by replay_optimization_model.py without any
+database access, using different solver parameters or backends.
+"""
+
+from typing import Dict, List, Optional, Any
+from datetime import datetime
+import json
+import logging
+import os
+import re
+
+from google.protobuf import text_format
+from ortools.sat.python import cp_model
+from ortools.sat import cp_model_pb2
+from ortools.linear_solver import pywraplp
+from ortools.linear_solver import linear_solver_pb2
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+MODEL_FILE = 'model.pb'
+MPS_FILE = 'model.mps'
+
+FORMAT_CPSAT = 'cpsat'
+FORMAT_MP = 'mp'
+
+# CP-SAT domains use int64 bounds; anything this large is treated as unbounded
+_CPSAT_INFINITY = 2 ** 53
+
+
+def should_dump(requested: bool, wall_time: float, slow_seconds: Optional[float]) -> bool:
+    """Dump when the request asked for it or the solve took at least slow_seconds"""
+    if requested:
+        return True
+    return bool(slow_seconds) and wall_time >= slow_seconds
+
+
+def _new_dump_directory(base_dir: str, run_id: str, label: str) -> str:
+    safe_label = re.sub(r'[^A-Za-z0-9_.-]+', '_', label)
+    path = os.path.join(base_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{run_id[:8]}_{safe_label}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _write_manifest(path: str, manifest: Dict[str, Any]):
+    with open(os.path.join(path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+
+def dump_cpsat_model(
+    base_dir: str,
+    run_id: str,
+    label: str,
+    model: cp_model.CpModel,
+    variables: Dict[Any, Any],
+    solver: cp_model.CpSolver,
+    status: int,
+    metadata: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Write a CP-SAT model, its solver parameters and the original result.
+
+    Args:
+        variables: {variable key: CP-SAT variable}; keys are stored as strings
+        metadata: Request parameters, engine and strategy for the manifest
+
+    Returns:
+        Path of the dump directory
+    """
+    path = _new_dump_directory(base_dir, run_id, label)
+
+    with open(os.path.join(path, MODEL_FILE), 'wb') as f:
+        f.write(model.Proto().SerializeToString())
+
+    has_solution = status in [cp_model.OPTIMAL, cp_model.FEASIBLE]
+    _write_manifest(path, {
+        'format': FORMAT_CPSAT,
+        'run_id': run_id,
+        'label': label,
+        'created_at': datetime.now().isoformat(),
+        'metadata': metadata or {},
+        'solver': 'CP_SAT',
+        'solver_parameters': text_format.MessageToString(solver.parameters),
+        'variables': {str(key): var.Index() for key, var in variables.items()},
+        'result': {
+            'status': solver.StatusName(status),
+            'objective': solver.ObjectiveValue() if has_solution else None,
+            'best_bound': solver.BestObjectiveBound() if has_solution else None,
+            'wall_time': solver.WallTime(),
+        },
+    })
+
+    logger.info(f"Dumped CP-SAT model ({len(variables)} variables) to {path}")
+    return path
+
+
+def dump_mp_model(
+    base_dir: str,
+    run_id: str,
+    label: str,
+    solver: pywraplp.Solver,
+    solver_name: str,
+    variables: Dict[str, Any],
+    status: int,
+    time_limit_seconds: float,
+    metadata: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Write a linear solver model (MPModelProto and MPS) and the original result.
+
+    Returns:
+        Path of the dump directory
+    """
+    path = _new_dump_directory(base_dir, run_id, label)
+
+    proto = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(proto)
+    with open(os.path.join(path, MODEL_FILE), 'wb') as f:
+        f.write(proto.SerializeToString())
+    with open(os.path.join(path, MPS_FILE), 'w', encoding='utf-8') as f:
+        f.write(solver.ExportModelAsMpsFormat(False, False))
+
+    has_solution = status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]
+    _write_manifest(path, {
+        'format': FORMAT_MP,
+        'run_id': run_id,
+        'label': label,
+        'created_at': datetime.now().isoformat(),
+        'metadata': metadata or {},
+        'solver': solver_name,
+        'time_limit_seconds': time_limit_seconds,
+        'variables': {name: var.index() for name, var in variables.items()},
+        'result': {
+            'status': _mp_status_name(status),
+            'objective': solver.Objective().Value() if has_solution else None,
+            'best_bound': solver.Objective().BestBound() if has_solution else None,
+            'wall_time': solver.wall_time() / 1000.0,
+        },
+    })
+
+    logger.info(f"Dumped {solver_name} model ({len(variables)} variables) to {path}")
+    return path
+
+
+class ModelDump:
+    """A dump directory loaded for replay"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(path, MODEL_FILE), 'rb') as f:
+            self.model_bytes = f.read()
+
+    @property
+    def format(self) -> str:
+        return self.manifest['format']
+
+    @property
+    def recorded_result(self) -> Dict[str, Any]:
+        return self.manifest.get('result', {})
+
+    def cpsat_proto(self) -> cp_model_pb2.CpModelProto:
+        proto = cp_model_pb2.CpModelProto()
+        proto.ParseFromString(self.model_bytes)
+        return proto
+
+    def mp_proto(self) -> linear_solver_pb2.MPModelProto:
+        """Linear model of the dump (CP-SAT dumps are converted when they are purely linear)"""
+        if self.format == FORMAT_MP:
+            proto = linear_solver_pb2.MPModelProto()
+            proto.ParseFromString(self.model_bytes)
+            return proto
+        return cpsat_to_mp_model(self.cpsat_proto())
+
+
+class ReplayResult:
+    """Outcome of one replay"""
+
+    def __init__(self, label: str, status: str, objective: Optional[float],
+                 best_bound: Optional[float], wall_time: float):
+        self.label = label
+        self.status = status
+        self.objective = objective
+        self.best_bound = best_bound
+        self.wall_time = wall_time
+
+
+def replay_cpsat(
+    dump: ModelDump,
+    overrides: Optional[Dict[str, str]] = None,
+    time_limit_seconds: Optional[float] = None,
+    label: str = 'CP_SAT'
+) -> ReplayResult:
+    """
+    Solve a CP-SAT dump with the recorded parameters plus overrides.
+
+    Args:
+        overrides: {parameter name: value in protobuf text format}, e.g. {'num_workers': '8'}
+    """
+    model = cp_model.CpModel()
+    model.Proto().CopyFrom(dump.cpsat_proto())
+
+    solver = cp_model.CpSolver()
+    text_format.Merge(dump.manifest.get('solver_parameters', ''), solver.parameters)
+    for key, value in (overrides or {}).items():
+        text_format.Merge(f"{key}: {value}", solver.parameters)
+    if time_limit_seconds:
+        solver.parameters.max_time_in_seconds = time_limit_seconds
+
+    status = solver.Solve(model)
+    has_solution = status in [cp_model.OPTIMAL, cp_model.FEASIBLE]
+    return ReplayResult(
+        label,
+        solver.StatusName(status),
+        solver.ObjectiveValue() if has_solution else None,
+        solver.BestObjectiveBound() if has_solution else None,
+        solver.WallTime()
+    )
+
+
+def replay_mp(
+    dump: ModelDump,
+    solver_name: str,
+    time_limit_seconds: Optional[float] = None
+) -> ReplayResult:
+    """Solve a dump with a pywraplp backend (GLOP, SCIP, CBC, ...)"""
+    solver = pywraplp.Solver.CreateSolver(solver_name)
+    if not solver:
+        raise ValueError(f"Solver backend {solver_name} is not available")
+
+    error = solver.LoadModelFromProto(dump.mp_proto())
+    if error:
+        raise ValueError(f"Could not load model into {solver_name}: {error}")
+
+    time_limit = time_limit_seconds or dump.manifest.get('time_limit_seconds')
+    if time_limit:
+        solver.SetTimeLimit(int(time_limit * 1000))
+
+    status = solver.Solve()
+    has_solution = status in [pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE]
+    return ReplayResult(
+        solver_name,
+        _mp_status_name(status),
+        solver.Objective().Value() if has_solution else None,
+        solver.Objective().BestBound() if has_solution else None,
+        solver.wall_time() / 1000.0
+    )
+
+
+def cpsat_to_mp_model(proto: cp_model_pb2.CpModelProto) -> linear_solver_pb2.MPModelProto:
+    """
+    Convert a purely linear CP-SAT model into an integer MPModelProto.
+
+    The engines' models only use integer variables, linear constraints and a linear
+    objective, so they can be replayed on MIP backends as well.
+
+    Raises:
+        ValueError: if the model uses constraints other than plain linear ones
+    """
+    mp_model = linear_solver_pb2.MPModelProto()
+
+    for index, variable in enumerate(proto.variables):
+        mp_var = mp_model.variable.add()
+        mp_var.name = variable.name or f"x{index}"
+        mp_var.lower_bound = _bound(variable.domain[0])
+        mp_var.upper_bound = _bound(variable.domain[-1])
+        mp_var.is_integer = True
+
+    for index, constraint in enumerate(proto.constraints):
+        kind = constraint.WhichOneof('constraint')
+        if kind != 'linear' or constraint.enforcement_literal:
+            raise ValueError(f"Constraint {index} ({kind}) cannot be converted to a linear model")
+
+        domain = constraint.linear.domain
+        if len(domain) != 2:
+            raise ValueError(f"Constraint {index} has a non-contiguous domain")
+
+        mp_constraint = mp_model.constraint.add()
+        mp_constraint.name = constraint.name or f"c{index}"
+        mp_constraint.lower_bound = _bound(domain[0])
+        mp_constraint.upper_bound = _bound(domain[1])
+        for var_ref, coeff in zip(constraint.linear.vars, constraint.linear.coeffs):
+            if var_ref < 0:
+                # Negated reference: coeff * not(x) = coeff - coeff * x
+                var_index = -var_ref - 1
+                mp_constraint.lower_bound -= coeff
+                mp_constraint.upper_bound -= coeff
+                coeff = -coeff
+            else:
+                var_index = var_ref
+            mp_constraint.var_index.append(var_index)
+            mp_constraint.coefficient.append(coeff)
+
+    if proto.HasField('objective'):
+        objective = proto.objective
+        scaling = objective.scaling_factor or 1.0
+        mp_model.objective_offset = objective.offset * scaling
+        for var_ref, coeff in zip(objective.vars, objective.coeffs):
+            if var_ref < 0:
+                var_index = -var_ref - 1
+                mp_model.objective_offset += coeff * scaling
+                coeff = -coeff
+            else:
+                var_index = var_ref
+            mp_model.variable[var_index].objective_coefficient += coeff * scaling
+        # CP-SAT stores maximization as minimization with a negative scaling factor
+        mp_model.maximize = scaling < 0
+
+    return mp_model
+
+
+def format_comparison(recorded: Dict[str, Any], results: List[ReplayResult]) -> str:
+    """Text table of replay results against the recorded production result"""
+    rows = [('recorded', recorded.get('status'), recorded.get('objective'),
+             recorded.get('best_bound'), recorded.get('wall_time'))]
+    rows += [(r.label, r.status, r.objective, r.best_bound, r.wall_time) for r in results]
+
+    reference = recorded.get('objective')
+    lines = [f"{'run':<40} {'status':<12} {'objective':>18} {'best bound':>18} {'time (s)':>10} {'vs recorded':>12}"]
+    for label, status, objective, best_bound, wall_time in rows:
+        delta = ''
+        if reference not in (None, 0) and objective is not None:
+            delta = f"{(objective - reference) / abs(reference) * 100:+.2f}%"
+        lines.append(
+            f"{label:<40} {status or '-':<12} {_fmt(objective):>18} {_fmt(best_bound):>18} "
+            f"{_fmt(wall_time, 2):>10} {delta:>12}"
+        )
+    return '\n'.join(lines)
+
+
+def _bound(value: int) -> float:
+    if value <= -_CPSAT_INFINITY:
+        return float('-inf')
+    if value >= _CPSAT_INFINITY:
+        return float('inf')
+    return float(value)
+
+
+def _mp_status_name(status: int) -> str:
+    names = {
+        pywraplp.Solver.OPTIMAL: 'OPTIMAL',
+        pywraplp.Solver.FEASIBLE: 'FEASIBLE',
+        pywraplp.Solver.INFEASIBLE: 'INFEASIBLE',
+        pywraplp.Solver.UNBOUNDED: 'UNBOUNDED',
+        pywraplp.Solver.ABNORMAL: 'ABNORMAL',
+        pywraplp.Solver.NOT_SOLVED: 'NOT_SOLVED',
+    }
+    return names.get(status, str(status))
+
+
+def _fmt(value, digits: int = 1) -> str:
+    if value is None:
+        return '-'
+    return f"{value:,.{digits}f}"
@@ -0,0 +1,124 @@
+"""
+CP-SAT Solution Pool
+
+Multi-proposal mode normally runs one full solve per strategy, which yields one plan per
+objective. The solution pool instead returns the K best distinct alternatives of one
+strategy, enumerated by re-solving the same model:
+
+1. Solve the model; its solution is alternative 1.
+2. Add a no-good cut excluding the last alternative and every solution closer than
+   min_distance item choices to it, and bound the objective from below by the last
+   alternative's value when that was proven optimal (no excluded solution can be
+   beaten, so the bound only prunes).
+3. Re-solve for the next alternative; repeat until K alternatives are found, the model
+   becomes infeasible or the time limit is used up.
+
+An alternative solved to OPTIMAL is the best solution at least min_distance item choices
+away from every earlier alternative. One that was only FEASIBLE when its time ran out may
+not be, and is flagged as such.
+
+- Diversity is measured as the Hamming distance between item choices: the number of
+  project items whose (option, time slot) choice differs between two solutions.
+"""
+
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from ortools.sat.python import cp_model
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSolution:
+    """An enumerated alternative: objective value, selected boolean variables and solve status"""
+
+    def __init__(self, objective: float, selected: frozenset, wall_time: float = 0.0, is_optimal: bool = False):
+        self.objective = objective
+        self.selected = selected
+        self.wall_time = wall_time
+        self.is_optimal = is_optimal
+
+
+def hamming_distance(
+    first: Dict[Hashable, Hashable],
+    second: Dict[Hashable, Hashable]
+) -> int:
+    """Number of items whose choice differs (an item missing from one side counts as different)"""
+    keys = set(first.keys()) | set(second.keys())
+    return sum(1 for key in keys if first.get(key) != second.get(key))
+
+
+def add_nogood_cut(
+    model: cp_model.CpModel,
+    variables: Dict[str, Any],
+    selected: frozenset,
+    min_distance: int
+):
+    """
+    Exclude a solution and its close neighbours from further search.
+
+    Each item selects exactly one variable, so keeping at most len(selected) - min_distance
+    of the previously selected variables forces at least min_distance items to change.
+    """
+    selected_vars = [variables[name] for name in selected if name in variables]
+    if not selected_vars:
+        return
+    model.Add(sum(selected_vars) <= max(0, len(selected_vars) - min_distance))
+
+
+def enumerate_alternatives(
+    model: cp_model.CpModel,
+    variables: Dict[str, Any],
+    objective: Any,
+    pool_size: int,
+    min_distance: int,
+    time_limit_seconds: float,
+    extra_time_seconds: float,
+    configure_solver: Optional[Callable[[cp_model.CpSolver], None]] = None,
+    on_first_solve: Optional[Callable[[cp_model.CpSolver, int], None]] = None
+) -> List[PoolSolution]:
+    """
+    Enumerate up to pool_size alternatives, best first, by re-solving with no-good cuts.
+
+    Args:
+        model: The strategy's CP-SAT model (cuts and bounds are added to it)
+        variables: Boolean decision variables by name
+        objective: The minimized linear expression (for the objective bound; skipped if constant)
+        pool_size: K, the maximum number of alternatives
+        min_distance: Minimum Hamming distance between alternatives
+        time_limit_seconds: Time limit of the first solve
+        extra_time_seconds: Additional time the following solves may share
+        configure_solver: Optional callable applied to each CpSolver (strategy parameters)
+        on_first_solve: Optional callable given the first solver and status (before any cut)
+
+    Returns:
+        Alternatives in enumeration order (non-decreasing objective when all are optimal)
+    """
+    alternatives: List[PoolSolution] = []
+    budget_left = time_limit_seconds + extra_time_seconds
+
+    while len(alternatives) < pool_size and budget_left > 0:
+        solver = cp_model.CpSolver()
+        # The first solve gets the regular time limit; later ones share what is left
+        solver.parameters.max_time_in_seconds = min(time_limit_seconds, budget_left) if not alternatives else budget_left
+        if configure_solver is not None:
+            configure_solver(solver)
+        status = solver.Solve(model)
+        budget_left -= solver.WallTime()
+        if on_first_solve is not None and not alternatives:
+            on_first_solve(solver, status)
+
+        if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            logger.info(f"Solution pool stopped after {len(alternatives)} alternative(s): {solver.StatusName(status)}")
+            break
+
+        selected = frozenset(name for name, var in variables.items() if solver.Value(var) == 1)
+        is_optimal = status == cp_model.OPTIMAL
+        alternatives.append(PoolSolution(solver.ObjectiveValue(), selected, solver.WallTime(), is_optimal))
+
+        add_nogood_cut(model, variables, selected, min_distance)
+        if is_optimal and isinstance(objective, cp_model.LinearExpr):
+            model.Add(objective >= math.ceil(solver.ObjectiveValue() - 1e-6))
+
+    logger.info(f"Solution pool enumerated {len(alternatives)} alternative(s)")
+    return alternatives
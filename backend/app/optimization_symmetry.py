@@ -0,0 +1,230 @@
+"""
+Symmetry Aggregation for the Optimization Engines
+
+The same item_code is usually requested by many projects with identical finalized
+procurement options (this is why the legacy engine keeps company_wide_quantities).
+Creating one set of boolean variables per project item makes the solver explore
+every permutation of those interchangeable items.
+
+This module groups interchangeable project items so an engine can create a single
+integer-quantity variable per (group, option) instead, solve the reduced model and
+split the allocation back out to the individual project items by project priority.
+
+Two project items are interchangeable when every coefficient the engine derives from
+them is identical: same item code, quantity, business value and the same multiset of
+finalized procurement options (supplier, cost, currency, dates, terms, discounts).
+Coefficients that depend on more than the option's content (the CP-SAT time slot is
+an option id, which differs between projects) are compared through coefficient_key:
+the engine computes them for each item with the item's own option ids, and items are
+only grouped when they agree.
+"""
+
+from typing import Callable, Dict, Hashable, List, Tuple, Optional, Any, Iterable
+from decimal import Decimal
+from datetime import date
+import json
+import logging
+
+from app.models import Project, ProjectItem, ProcurementOption
+
+logger = logging.getLogger(__name__)
+
+
+def option_signature(option: ProcurementOption) -> Tuple:
+    """
+    Return a hashable signature of everything the engines read from an option.
+
+    Two options with the same signature produce identical costs, dates and
+    objective coefficients, so they can be treated as the same choice.
+    """
+    payment_terms = option.payment_terms
+    if isinstance(payment_terms, dict):
+        payment_terms = json.dumps(payment_terms, sort_keys=True, default=str)
+
+    return (
+        option.item_code,
+        option.supplier_name,
+        _normalize_decimal(option.cost_amount),
+        (option.cost_currency or 'IRR').strip().upper(),
+        _normalize_decimal(option.shipping_cost),
+        _normalize_decimal(option.base_cost),
+        option.lomc_lead_time or 0,
+        option.purchase_date,
+        option.expected_delivery_date,
+        payment_terms,
+        option.discount_bundle_threshold,
+        _normalize_decimal(option.discount_bundle_percent),
+    )
+
+
+def item_business_value_per_unit(item: ProjectItem) -> Optional[Decimal]:
+    """Invoice amount per unit used by the engines as business value (first delivery option)"""
+    if item.delivery_options_rel and len(item.delivery_options_rel) > 0:
+        first_delivery_option = item.delivery_options_rel[0]
+        return _normalize_decimal(first_delivery_option.invoice_amount_per_unit)
+
+    if item.delivery_options:
+        try:
+            delivery_options = json.loads(item.delivery_options) if isinstance(item.delivery_options, str) else item.delivery_options
+            if isinstance(delivery_options, list) and delivery_options:
+                first_delivery = delivery_options[0]
+                if isinstance(first_delivery, dict) and 'invoice_amount_per_unit' in first_delivery:
+                    return _normalize_decimal(first_delivery['invoice_amount_per_unit'])
+        except (ValueError, TypeError):
+            pass
+
+    return None
+
+
+class ItemGroup:
+    """
+    A set of interchangeable project items.
+
+    Attributes:
+        items: Project items ordered by allocation preference (highest priority first)
+        option_signatures: Distinct option signatures shared by every item, sorted
+        option_ids: {project_item_id: [option_id aligned with option_signatures]}
+    """
+
+    def __init__(self, key: Tuple, option_signatures: List[Tuple]):
+        self.key = key
+        self.option_signatures = option_signatures
+        self.items: List[ProjectItem] = []
+        self.option_ids: Dict[int, List[int]] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.items)
+
+    @property
+    def representative(self) -> ProjectItem:
+        """Item whose options and coefficients stand in for the whole group"""
+        return self.items[0]
+
+    def representative_option_ids(self) -> List[int]:
+        return self.option_ids[self.representative.id]
+
+    def option_id_for(self, item: ProjectItem, option_index: int) -> int:
+        """Map an option index of the group back to the item's own procurement option"""
+        return self.option_ids[item.id][option_index]
+
+    def allocate(
+        self,
+        counts: Dict[Any, int],
+        preference_key=None
+    ) -> List[Tuple[ProjectItem, Any]]:
+        """
+        Split aggregated quantities back out to the project items.
+
+        Args:
+            counts: {choice: quantity} chosen by the solver for this group. A choice is
+                whatever the engine used to index the group's variables (usually a tuple
+                starting with the option index).
+            preference_key: Sort key for choices; the most preferred choices go to the
+                highest-priority items. Defaults to the natural order of the choices.
+
+        Returns:
+            List of (project_item, choice). Items beyond the total quantity are left out.
+        """
+        units = []
+        for choice in sorted(counts.keys(), key=preference_key):
+            units.extend([choice] * max(0, int(counts[choice])))
+
+        if len(units) > self.size:
+            logger.warning(
+                f"Aggregated quantity {len(units)} exceeds group size {self.size} "
+                f"for {self.representative.item_code} - truncating"
+            )
+
+        return list(zip(self.items, units))
+
+
+def build_item_groups(
+    items: Iterable[ProjectItem],
+    options_by_item: Dict[int, List[ProcurementOption]],
+    projects: Dict[int, Project],
+    include_priority: bool = False,
+    coefficient_key: Optional[Callable[[ProjectItem, List[int]], Hashable]] = None
+) -> List[ItemGroup]:
+    """
+    Group interchangeable project items.
+
+    Args:
+        items: Project items eligible for optimization
+        options_by_item: {project_item_id: [finalized options usable in the model]}
+        projects: {project_id: Project} used for priority ordering
+        include_priority: Also require equal project priority. Set this when the
+            objective weights items by project priority, otherwise items of
+            different priority would not share the same coefficients.
+        coefficient_key: Optional function of (item, the item's option ids aligned with
+            the sorted option signatures) returning the item's model coefficients;
+            only items with equal keys are grouped.
+
+    Returns:
+        List of ItemGroup (singleton groups included), in first-seen order
+    """
+    groups: Dict[Tuple, ItemGroup] = {}
+
+    for item in items:
+        item_options = options_by_item.get(item.id, [])
+        if not item_options:
+            continue
+
+        # Deduplicate identical options of the same item - they are the same choice
+        options_by_signature: Dict[Tuple, ProcurementOption] = {}
+        for option in sorted(item_options, key=lambda o: o.id):
+            options_by_signature.setdefault(option_signature(option), option)
+
+        signatures = sorted(options_by_signature.keys(), key=_signature_sort_key)
+        option_ids = [options_by_signature[sig].id for sig in signatures]
+        priority = _priority_of(item, projects)
+
+        key = (
+            item.item_code,
+            item.quantity,
+            item_business_value_per_unit(item),
+            priority if include_priority else None,
+            tuple(signatures),
+            coefficient_key(item, option_ids) if coefficient_key is not None else None,
+        )
+
+        group = groups.get(key)
+        if group is None:
+            group = ItemGroup(key, signatures)
+            groups[key] = group
+
+        group.items.append(item)
+        group.option_ids[item.id] = option_ids
+
+    for group in groups.values():
+        # Highest project priority first, then earliest requested item for stability
+        group.items.sort(key=lambda i: (-_priority_of(i, projects), i.project_id, i.id))
+
+    result = list(groups.values())
+
+    total_items = sum(g.size for g in result)
+    logger.info(
+        f"Symmetry aggregation: {total_items} items -> {len(result)} groups "
+        f"({sum(1 for g in result if g.size > 1)} groups with repeated items)"
+    )
+
+    return result
+
+
+def _priority_of(item: ProjectItem, projects: Dict[int, Project]) -> int:
+    project = projects.get(item.project_id)
+    return project.priority_weight if project else 5
+
+
+def _normalize_decimal(value) -> Optional[Decimal]:
+    """Normalize numeric values so 100, 100.0 and Decimal('100.00') compare equal"""
+    if value is None:
+        return None
+    return Decimal(str(value)).normalize()
+
+
+def _signature_sort_key(signature: Tuple) -> Tuple:
+    """Order option signatures by delivery date, purchase date and cost"""
+    purchase_date = signature[7] or date.max
+    delivery_date = signature[8] or date.max
+    return (delivery_date, purchase_date, signature[2] or Decimal(0), str(signature))
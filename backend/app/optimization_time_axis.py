@@ -0,0 +1,104 @@
+"""
+Calendar Time Axis for the Optimization Engines
+
+Maps purchase dates into calendar buckets (day, week or month) and aggregates
+BudgetData rows into the same buckets, so budget constraints are generated per
+calendar period instead of per ordinal budget row or per option id.
+
+A budget row belongs to the bucket containing its budget_date. With MONTH
+granularity this matches how finance enters budgets (one row per month).
+"""
+
+from typing import Dict, List, Optional, Iterable
+from decimal import Decimal
+from datetime import date, timedelta
+from enum import Enum
+import json
+import logging
+
+from app.models import BudgetData
+
+logger = logging.getLogger(__name__)
+
+
+class TimeGranularity(str, Enum):
+    """Calendar bucket size for budget constraints"""
+    DAY = "DAY"
+    WEEK = "WEEK"      # ISO weeks, starting on Monday
+    MONTH = "MONTH"
+
+
+def bucket_start(value: date, granularity: TimeGranularity) -> date:
+    """First day of the calendar bucket containing a date"""
+    if granularity == TimeGranularity.MONTH:
+        return value.replace(day=1)
+    if granularity == TimeGranularity.WEEK:
+        return value - timedelta(days=value.weekday())
+    return value
+
+
+class TimeAxis:
+    """
+    Calendar buckets anchored at an origin date (default: today).
+
+    Buckets are identified by their first day, so keys from different engines and
+    from BudgetData.budget_date line up without any ordinal bookkeeping.
+    """
+
+    def __init__(self, granularity: TimeGranularity = TimeGranularity.MONTH, origin: Optional[date] = None):
+        self.granularity = TimeGranularity(granularity)
+        self.origin = origin or date.today()
+
+    def bucket_of(self, value: date) -> date:
+        """Bucket (first day) containing a date"""
+        return bucket_start(value, self.granularity)
+
+    def bucket_of_offset(self, days_from_origin: int) -> date:
+        """Bucket for a time slot expressed in days from the origin"""
+        return self.bucket_of(self.origin + timedelta(days=days_from_origin))
+
+    def budgets_by_bucket(self, budget_rows: Iterable[BudgetData]) -> Dict[date, Dict[str, Decimal]]:
+        """
+        Aggregate budget rows per bucket and currency.
+
+        Uses multi_currency_budget when present, otherwise the legacy available_budget
+        (base currency IRR).
+
+        Returns:
+            {bucket_start: {currency_code: amount}}
+        """
+        budgets: Dict[date, Dict[str, Decimal]] = {}
+
+        for bd in budget_rows:
+            bucket_budgets = budgets.setdefault(self.bucket_of(bd.budget_date), {})
+
+            if bd.multi_currency_budget:
+                if isinstance(bd.multi_currency_budget, str):
+                    currency_dict = json.loads(bd.multi_currency_budget)
+                else:
+                    currency_dict = bd.multi_currency_budget
+
+                for currency, amount in currency_dict.items():
+                    currency_code = currency.strip().upper() if currency else 'IRR'
+                    bucket_budgets[currency_code] = bucket_budgets.get(currency_code, Decimal(0)) + Decimal(str(amount))
+            else:
+                bucket_budgets['IRR'] = bucket_budgets.get('IRR', Decimal(0)) + Decimal(str(bd.available_budget or 0))
+
+        return budgets
+
+    def base_budgets_by_bucket(self, budget_rows: Iterable[BudgetData]) -> Dict[date, Decimal]:
+        """Aggregate available_budget (base currency) per bucket"""
+        budgets: Dict[date, Decimal] = {}
+        for bd in budget_rows:
+            bucket = self.bucket_of(bd.budget_date)
+            budgets[bucket] = budgets.get(bucket, Decimal(0)) + Decimal(str(bd.available_budget or 0))
+        return budgets
+
+    def describe(self, buckets: List[date]) -> str:
+        """Short log description of a set of buckets"""
+        if not buckets:
+            return f"0 {self.granularity.value.lower()} buckets"
+        return (
+            f"{len(buckets)} {self.granularity.value.lower()} buckets "
+            f"({min(buckets).isoformat()} .. {max(buckets).isoformat()})"
+        )
@@ -0,0 +1,171 @@
+"""
+Portfolio Risk
+
+The portfolio risk endpoint loads the LOCKED and PROPOSED decisions of all active
+projects with one query (risk_simulation.load_risk_rows) and then works project by
+project in the simulation process pool (the default thread pool when
+risk_simulation_workers < 2). Each project task computes:
+
+- the payment delays and cost overruns of the project's paid LOCKED decisions
+- a Monte Carlo simulation of the project's remaining items, drawing from distributions
+  fitted on the whole portfolio
+
+Projects are combined into portfolio distributions: run k of the portfolio completes
+when the last project's run k completes (elementwise max) and costs the sum of the
+projects' run k estimates. Every project simulates with its own seed, derived from the
+request seed and the project id, so the combination does not depend on which worker
+ran what or in which order.
+
+Projects not finished by the request deadline (portfolio_risk_deadline_seconds) are
+left out and the result is flagged partial; at least one project is always included.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from concurrent.futures import Executor
+from collections import defaultdict
+from datetime import date
+import asyncio
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.risk_simulation import (
+    SimulationModel, build_simulation_model, collect_observations, simulate_runs,
+    summarize_simulation, day_number
+)
+
+# (status, purchase_date, final_cost, actual_payment_date, actual_payment_amount)
+DecisionFacts = Tuple
+
+
+class ProjectRisk(NamedTuple):
+    """Result of one project task"""
+    project_id: int
+    time_delays: List[int]
+    cost_overruns: List[float]      # percent over planned cost
+    completion: np.ndarray
+    eac: np.ndarray
+
+
+def risk_samples(decisions: Sequence[DecisionFacts]) -> Tuple[List[int], List[float]]:
+    """Payment delays (days) and cost overruns (%) of the paid LOCKED decisions"""
+    time_delays = []
+    cost_overruns = []
+    for status, purchase_date, final_cost, actual_payment_date, actual_payment_amount in decisions:
+        if status != 'LOCKED':
+            continue
+        if purchase_date and actual_payment_date:
+            time_delays.append((actual_payment_date - purchase_date).days)
+        if actual_payment_amount and actual_payment_amount > 0 and final_cost:
+            cost_overruns.append((float(actual_payment_amount) / float(final_cost) - 1.0) * 100)
+    return time_delays, cost_overruns
+
+
+def project_risk(
+    project_id: int,
+    decisions: Sequence[DecisionFacts],
+    model: SimulationModel,
+    seed: int,
+    runs: int
+) -> ProjectRisk:
+    """Samples and simulated runs of one project (runs in a pool worker)"""
+    time_delays, cost_overruns = risk_samples(decisions)
+    completion, eac = simulate_runs(model, runs, [seed, project_id])
+    return ProjectRisk(project_id, time_delays, cost_overruns, completion, eac)
+
+
+def _decision_facts(row) -> DecisionFacts:
+    # Plain tuples pickle cheaply to pool workers
+    return (row.status, row.purchase_date, row.final_cost, row.actual_payment_date, row.actual_payment_amount)
+
+
+async def portfolio_risk(
+    rows: Sequence,
+    runs: Optional[int] = None,
+    seed: Optional[int] = None,
+    deadline_seconds: Optional[float] = None,
+    executor: Optional[Executor] = None,
+    today: Optional[date] = None
+) -> dict:
+    """
+    Portfolio delay/cost samples and simulation from load_risk_rows() rows.
+
+    Returns:
+        {'time_delays', 'cost_overruns', 'simulation', 'partial', 'projects_total',
+         'projects_completed', 'missing_project_ids'}
+    """
+    runs = runs or settings.risk_simulation_samples
+    seed = settings.risk_simulation_seed if seed is None else seed
+    deadline_seconds = deadline_seconds or settings.portfolio_risk_deadline_seconds
+    today = today or date.today()
+    started = time.monotonic()
+
+    rows_by_project: Dict[int, list] = defaultdict(list)
+    for row in rows:
+        rows_by_project[row.project_id].append(row)
+    observations = collect_observations(rows)
+    models = {
+        project_id: build_simulation_model(project_rows, today, observations=observations)
+        for project_id, project_rows in rows_by_project.items()
+    }
+
+    loop = asyncio.get_running_loop()
+    futures = {
+        loop.run_in_executor(
+            executor, project_risk,
+            project_id, [_decision_facts(row) for row in project_rows], models[project_id], seed, runs
+        ): project_id
+        for project_id, project_rows in sorted(rows_by_project.items())
+    }
+    done, pending = set(), set(futures)
+    if futures:
+        done, pending = await asyncio.wait(futures, timeout=deadline_seconds)
+        if not done:
+            # Always include at least one project
+            done, pending = await asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
+    for future in pending:
+        future.cancel()
+
+    # Combine in project order so the distributions do not depend on completion order
+    results = sorted((future.result() for future in done), key=lambda result: result.project_id)
+    completion = np.full(runs, day_number(today), dtype=np.int64)
+    eac = np.zeros(runs, dtype=np.float64)
+    baseline_day = None
+    remaining_items = 0
+    budget_at_completion = 0.0
+    for result in results:
+        model = models[result.project_id]
+        eac += result.eac
+        budget_at_completion += model.budget_at_completion
+        if model.remaining_items:
+            # Projects with nothing left do not hold up completion
+            completion = result.completion if baseline_day is None else np.maximum(completion, result.completion)
+            baseline_day = model.baseline_day if baseline_day is None else max(baseline_day, model.baseline_day)
+            remaining_items += model.remaining_items
+
+    simulation = summarize_simulation(
+        completion,
+        eac,
+        baseline_day if baseline_day is not None else day_number(today),
+        budget_at_completion,
+        remaining_items
+    )
+    partial = len(results) < len(futures)
+    simulation.update({
+        'runs': runs,
+        'requested_runs': runs,
+        'seed': seed,
+        'truncated': partial,
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+    })
+
+    return {
+        'time_delays': [delay for result in results for delay in result.time_delays],
+        'cost_overruns': [overrun for result in results for overrun in result.cost_overruns],
+        'simulation': simulation,
+        'partial': partial,
+        'projects_total': len(futures),
+        'projects_completed': len(results),
+        'missing_project_ids': sorted(futures[future] for future in pending),
+    }
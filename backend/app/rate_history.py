@@ -0,0 +1,130 @@
+"""
+Exchange Rate History for Charts
+
+Years of daily rates for several pairs make chart payloads large. Two reductions:
+
+- downsample_lttb: Largest-Triangle-Three-Buckets keeps the points that carry the
+  visual shape of the line (peaks, dips, turns) instead of every n-th point. The first
+  and last points are always kept.
+- ohlc_rate_history: open/high/low/close per week or month, aggregated in Postgres.
+"""
+
+from typing import List, Optional
+from datetime import date
+
+import numpy as np
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+OHLC_INTERVALS = {'WEEK': 'week', 'MONTH': 'month'}
+
+_OHLC_SQL = text("""
+    SELECT
+        CAST(date_trunc(:interval, date) AS date) AS period_start,
+        (array_agg(rate ORDER BY date, id))[1] AS open,
+        MAX(rate) AS high,
+        MIN(rate) AS low,
+        (array_agg(rate ORDER BY date DESC, id DESC))[1] AS close,
+        COUNT(*) AS samples
+    FROM exchange_rates
+    WHERE from_currency = :from_currency
+      AND to_currency = :to_currency
+      AND is_active = TRUE
+      AND (CAST(:start_date AS date) IS NULL OR date >= CAST(:start_date AS date))
+      AND (CAST(:end_date AS date) IS NULL OR date <= CAST(:end_date AS date))
+    GROUP BY 1
+    ORDER BY 1
+""")
+
+
+def downsample_lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Increasing x values (e.g. days since epoch)
+        y: y values
+        threshold: Number of points to keep (>= 3); series at or below it are kept whole
+
+    Returns:
+        Sorted integer index array into x/y
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+
+    # Interior points split into threshold - 2 buckets; edges[i]..edges[i+1] is bucket i
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+
+        # Point forming the largest triangle with the previously kept point and that average
+        areas = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        kept[bucket + 1] = selected
+
+    return kept
+
+
+def downsample_rate_history(history: List[dict], max_points: Optional[int]) -> List[dict]:
+    """Shape-preserving downsample of [{'date', 'rate'}, ...] rows sorted by date"""
+    if not max_points or len(history) <= max_points:
+        return history
+
+    x = np.array([row['date'] for row in history], dtype='datetime64[D]').astype(np.int64)
+    y = np.array([float(row['rate']) for row in history], dtype=np.float64)
+    return [history[i] for i in downsample_lttb(x, y, max_points)]
+
+
+async def ohlc_rate_history(
+    db: AsyncSession,
+    from_currency: str,
+    to_currency: str,
+    interval: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> List[dict]:
+    """
+    Open/high/low/close rates per WEEK or MONTH (period_start is the Monday or the
+    first of the month).
+    """
+    if interval not in OHLC_INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(OHLC_INTERVALS)}")
+
+    result = await db.execute(_OHLC_SQL, {
+        'interval': OHLC_INTERVALS[interval],
+        'from_currency': from_currency,
+        'to_currency': to_currency,
+        'start_date': start_date,
+        'end_date': end_date,
+    })
+    return [
+        {
+            "period_start": row.period_start,
+            "open": row.open,
+            "high": row.high,
+            "low": row.low,
+            "close": row.close,
+            "samples": row.samples,
+        }
+        for row in result
+    ]
@@ -0,0 +1,148 @@
+"""
+Version-Stamped Response Cache
+
+Analytics, report and dashboard endpoints decorated with @cached_view answer repeated
+requests for unchanged data from memory:
+
+    @router.get("/portfolio/eva")
+    @cached_view(tables=PORTFOLIO_TABLES)
+    async def get_portfolio_eva(..., current_user: User = Depends(...), ...):
+
+The response's ETag is derived (app/data_versions.make_etag) from the counters of the
+tables the view reads (plus the project's counters for project_param views), the path,
+the query parameters, the caller's role (PM users see only their projects, so their
+responses are keyed per user) and today's date. The rendered JSON body is kept in a
+bounded in-process LRU under that ETag:
+
+- If-None-Match matching the ETag: 304 Not Modified, nothing is computed.
+- ETag in the LRU: the stored body is returned.
+- Otherwise the endpoint runs and its body is stored.
+
+A write bumps the counters, so later requests get a new ETag and recompute; old entries
+age out of the LRU. Endpoints returning a Response themselves (streams, files) are
+passed through uncached.
+"""
+
+from typing import Optional, Sequence
+from collections import OrderedDict
+from datetime import date
+import functools
+import inspect
+
+from fastapi import Header, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.data_versions import make_etag, etag_matches, project_version_names
+
+
+class ResponseLRU:
+    """Rendered response bodies by ETag, least recently used evicted first"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, etag: str) -> Optional[bytes]:
+        body = self._entries.get(etag)
+        if body is not None:
+            self._entries.move_to_end(etag)
+        return body
+
+    def put(self, etag: str, body: bytes):
+        self._entries[etag] = body
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseLRU(settings.response_cache_max_entries)
+
+# Parameters added to decorated endpoints (private names, so they never clash)
+_REQUEST_PARAM = '_cache_request'
+_IF_NONE_MATCH_PARAM = '_cache_if_none_match'
+
+
+def _caller_scope(user) -> str:
+    role = getattr(user, 'role', None)
+    if role == 'pm':
+        return f"pm:{user.id}"
+    return str(role)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def _cached_body(body: bytes, etag: str) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        # Clients may keep the body but must revalidate with If-None-Match
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+    )
+
+
+def cached_view(tables: Sequence[str], project_param: Optional[str] = None):
+    """
+    Cache an endpoint's JSON responses by data version.
+
+    Args:
+        tables: Tables the response is built from
+        project_param: Path parameter holding a project id; the project's counters are
+            used instead of per-table counters for project-scoped data
+    """
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs.pop(_REQUEST_PARAM)
+            if_none_match: Optional[str] = kwargs.pop(_IF_NONE_MATCH_PARAM)
+            current_user = kwargs.get('current_user')
+
+            names = list(tables)
+            if project_param is not None:
+                names.extend(project_version_names(kwargs[project_param]))
+            if getattr(current_user, 'role', None) == 'pm':
+                names.append('project_assignments')
+
+            etag = make_etag(
+                names,
+                request.url.path,
+                sorted(request.query_params.multi_items()),
+                _caller_scope(current_user),
+                date.today(),
+                max_age_seconds=settings.response_cache_max_age_seconds
+            )
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+
+            body = response_cache.get(etag)
+            if body is None:
+                result = await endpoint(*args, **kwargs)
+                if isinstance(result, Response):
+                    return result
+                body = JSONResponse(jsonable_encoder(result)).body
+                response_cache.put(etag, body)
+            return _cached_body(body, etag)
+
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter(
+                _IF_NONE_MATCH_PARAM,
+                inspect.Parameter.KEYWORD_ONLY,
+                annotation=Optional[str],
+                default=Header(None, alias="If-None-Match", include_in_schema=False)
+            ),
+        ])
+        return wrapper
+    return decorator
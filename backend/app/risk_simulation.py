@@ -0,0 +1,334 @@
+"""
+Monte Carlo Schedule and Cost Risk
+
+Simulates when the remaining (unpaid) decisions of a project or portfolio complete and
+what the whole scope ends up costing, from the delays and cost overruns observed on
+decisions that were already paid:
+
+- delay = actual_payment_date - purchase_date (days)
+- cost ratio = actual_payment_amount / final_cost
+
+Observations are grouped by (project, supplier), supplier, project and overall. Each
+remaining item draws from the narrowest group that has at least
+risk_simulation_min_samples observations (empirical bootstrap: resampling observed
+values). A simulated run gives a completion date (the latest planned date plus delay of
+any remaining item) and an estimate at completion (cost paid so far plus planned cost
+times cost ratio of every remaining item).
+
+Runs are drawn in vectorized chunks. Chunk i always uses the i-th child of the seed's
+SeedSequence, so a seed reproduces the same samples whether chunks run in one thread or
+in a process pool. Chunks not finished within the latency budget are dropped (the
+result is then flagged truncated and is no longer reproducible).
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from collections import defaultdict
+from datetime import date, timedelta
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.config import settings
+from app.models import FinalizedDecision, ProcurementOption, Project
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of items x runs drawn per chunk (memory of the per-chunk sample matrix)
+CHUNK_ELEMENTS = 2_000_000
+
+PERCENTILES = (50, 80, 90)
+
+_EPOCH = date(1970, 1, 1)
+
+
+def day_number(day: date) -> int:
+    return (day - _EPOCH).days
+
+
+def from_day_number(day: int) -> date:
+    return _EPOCH + timedelta(days=int(day))
+
+
+@dataclass
+class SimulationModel:
+    """Remaining items and the empirical distributions they draw from (picklable)"""
+    planned_days: np.ndarray        # planned completion per remaining item (days since 1970-01-01)
+    planned_costs: np.ndarray       # planned cost per remaining item
+    delay_group: np.ndarray         # index into delay_samples per item, -1 = no delay data
+    cost_group: np.ndarray          # index into cost_ratio_samples per item, -1 = no cost data
+    delay_samples: List[np.ndarray]
+    cost_ratio_samples: List[np.ndarray]
+    cost_to_date: float             # paid so far
+    budget_at_completion: float     # planned cost of all decisions
+    baseline_day: int               # planned completion (latest planned date of remaining items, or today)
+
+    @property
+    def remaining_items(self) -> int:
+        return len(self.planned_days)
+
+
+async def load_risk_rows(db: AsyncSession, project_id: Optional[int] = None) -> List:
+    """LOCKED and PROPOSED decisions (of one project, or of all active projects) with their supplier"""
+    query = (
+        select(
+            FinalizedDecision.id,
+            FinalizedDecision.project_id,
+            FinalizedDecision.status,
+            FinalizedDecision.purchase_date,
+            FinalizedDecision.final_cost,
+            FinalizedDecision.actual_payment_date,
+            FinalizedDecision.actual_payment_amount,
+            ProcurementOption.supplier_name,
+        )
+        .outerjoin(ProcurementOption, ProcurementOption.id == FinalizedDecision.procurement_option_id)
+        .where(FinalizedDecision.status.in_(['LOCKED', 'PROPOSED']))
+    )
+    if project_id is not None:
+        query = query.where(FinalizedDecision.project_id == project_id)
+    else:
+        query = query.join(Project, FinalizedDecision.project_id == Project.id).where(Project.is_active == True)
+    result = await db.execute(query)
+    return result.all()
+
+
+def _group_keys(project_id, supplier) -> List[Tuple]:
+    """Distribution groups of an item, narrowest first"""
+    return [('project_supplier', project_id, supplier), ('supplier', supplier), ('project', project_id), ('all',)]
+
+
+Observations = Tuple[Dict[Tuple, List[float]], Dict[Tuple, List[float]]]
+
+
+def collect_observations(rows: Sequence) -> Observations:
+    """(delays, cost ratios) of the paid LOCKED decisions, by distribution group"""
+    delays: Dict[Tuple, List[float]] = defaultdict(list)
+    ratios: Dict[Tuple, List[float]] = defaultdict(list)
+    for row in rows:
+        if not row.actual_payment_date or row.status != 'LOCKED':
+            continue
+        keys = _group_keys(row.project_id, row.supplier_name)
+        planned_cost = float(row.final_cost or 0)
+        if row.purchase_date:
+            delay = (row.actual_payment_date - row.purchase_date).days
+            for key in keys:
+                delays[key].append(delay)
+        if row.actual_payment_amount and row.actual_payment_amount > 0 and planned_cost > 0:
+            ratio = float(row.actual_payment_amount) / planned_cost
+            for key in keys:
+                ratios[key].append(ratio)
+    return delays, ratios
+
+
+def build_simulation_model(
+    rows: Sequence,
+    today: Optional[date] = None,
+    min_samples: Optional[int] = None,
+    observations: Optional[Observations] = None
+) -> SimulationModel:
+    """
+    Fit the model from decision rows with project_id, supplier_name, status, purchase_date,
+    final_cost, actual_payment_date and actual_payment_amount.
+
+    Paid LOCKED decisions supply the observations and the cost to date; unpaid LOCKED or
+    PROPOSED decisions are the remaining items.
+
+    Args:
+        observations: Distributions fitted on a wider set of rows (collect_observations),
+            e.g. the whole portfolio when simulating one of its projects; default: rows
+    """
+    today = today or date.today()
+    min_samples = min_samples or settings.risk_simulation_min_samples
+    delays, ratios = observations if observations is not None else collect_observations(rows)
+
+    remaining = []
+    cost_to_date = 0.0
+    budget_at_completion = 0.0
+
+    for row in rows:
+        planned_cost = float(row.final_cost or 0)
+        budget_at_completion += planned_cost
+        if row.actual_payment_date:
+            cost_to_date += float(row.actual_payment_amount or row.final_cost or 0)
+        elif row.purchase_date:
+            remaining.append((row, planned_cost, _group_keys(row.project_id, row.supplier_name)))
+
+    def assign(observations: Dict[Tuple, List[float]]) -> Tuple[np.ndarray, List[np.ndarray]]:
+        samples: List[np.ndarray] = []
+        index_of: Dict[Tuple, int] = {}
+        groups = np.full(len(remaining), -1, dtype=np.int64)
+        for i, (_, _, keys) in enumerate(remaining):
+            key = next((key for key in keys if len(observations.get(key, ())) >= min_samples), None)
+            if key is None:
+                # Too little history anywhere: use whatever the broadest group has
+                key = keys[-1] if observations.get(keys[-1]) else None
+            if key is None:
+                continue
+            if key not in index_of:
+                index_of[key] = len(samples)
+                samples.append(np.asarray(observations[key], dtype=np.float64))
+            groups[i] = index_of[key]
+        return groups, samples
+
+    delay_group, delay_samples = assign(delays)
+    cost_group, cost_ratio_samples = assign(ratios)
+    planned_days = np.array([day_number(row.purchase_date) for row, _, _ in remaining], dtype=np.int64)
+
+    return SimulationModel(
+        planned_days=planned_days,
+        planned_costs=np.array([cost for _, cost, _ in remaining], dtype=np.float64),
+        delay_group=delay_group,
+        cost_group=cost_group,
+        delay_samples=delay_samples,
+        cost_ratio_samples=cost_ratio_samples,
+        cost_to_date=cost_to_date,
+        budget_at_completion=budget_at_completion,
+        baseline_day=int(planned_days.max()) if len(planned_days) else day_number(today),
+    )
+
+
+def _draw(rng: np.random.Generator, groups: np.ndarray, samples: List[np.ndarray], runs: int, default: float) -> np.ndarray:
+    """runs x items matrix of values resampled from each item's group"""
+    values = np.full((runs, len(groups)), default, dtype=np.float64)
+    for group, observations in enumerate(samples):
+        columns = np.flatnonzero(groups == group)
+        if len(columns):
+            values[:, columns] = observations[rng.integers(0, len(observations), size=(runs, len(columns)))]
+    return values
+
+
+def simulate_chunk(model: SimulationModel, seed: np.random.SeedSequence, runs: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(completion day, estimate at completion) of each of runs simulated runs"""
+    if model.remaining_items == 0:
+        return np.full(runs, model.baseline_day, dtype=np.int64), np.full(runs, model.cost_to_date)
+
+    rng = np.random.default_rng(seed)
+    delays = _draw(rng, model.delay_group, model.delay_samples, runs, 0.0)
+    ratios = _draw(rng, model.cost_group, model.cost_ratio_samples, runs, 1.0)
+    completion = (model.planned_days + np.rint(delays).astype(np.int64)).max(axis=1)
+    eac = model.cost_to_date + ratios @ model.planned_costs
+    return completion, eac
+
+
+def _chunks(model: SimulationModel, runs: int, seed: Union[int, Sequence[int]]) -> List[Tuple[np.random.SeedSequence, int]]:
+    size = max(1, min(runs, CHUNK_ELEMENTS // max(model.remaining_items, 1)))
+    count = -(-runs // size)
+    seeds = np.random.SeedSequence(seed).spawn(count)
+    return [(seeds[i], min(size, runs - i * size)) for i in range(count)]
+
+
+def simulate_runs(model: SimulationModel, runs: int, seed: Union[int, Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """All runs of a model, chunk by chunk (no time budget)"""
+    results = [simulate_chunk(model, chunk_seed, size) for chunk_seed, size in _chunks(model, runs, seed)]
+    return (
+        np.concatenate([completion for completion, _ in results]),
+        np.concatenate([eac for _, eac in results]),
+    )
+
+
+def _run_chunks_until(model: SimulationModel, chunks, deadline: float) -> List[Tuple[np.ndarray, np.ndarray]]:
+    results = []
+    for chunk_seed, runs in chunks:
+        # Always finish at least one chunk
+        if results and time.monotonic() > deadline:
+            break
+        results.append(simulate_chunk(model, chunk_seed, runs))
+    return results
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_simulation_pool() -> Optional[Executor]:
+    """Process pool for portfolio simulations (None when risk_simulation_workers < 2)"""
+    global _pool
+    if settings.risk_simulation_workers < 2:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.risk_simulation_workers)
+    return _pool
+
+
+def shutdown_simulation_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_simulation(
+    model: SimulationModel,
+    runs: Optional[int] = None,
+    seed: Optional[int] = None,
+    budget_seconds: Optional[float] = None,
+    executor: Optional[Executor] = None
+) -> dict:
+    """
+    Simulate and summarize.
+
+    Without an executor the chunks run one after another in a worker thread; with one
+    they are spread over its workers.
+    """
+    runs = runs or settings.risk_simulation_samples
+    seed = settings.risk_simulation_seed if seed is None else seed
+    budget_seconds = budget_seconds or settings.risk_simulation_budget_seconds
+    chunks = _chunks(model, runs, seed)
+    started = time.monotonic()
+
+    if executor is None:
+        results = await asyncio.to_thread(_run_chunks_until, model, chunks, started + budget_seconds)
+    else:
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(executor, simulate_chunk, model, chunk_seed, size) for chunk_seed, size in chunks]
+        done, pending = await asyncio.wait(futures, timeout=budget_seconds)
+        if not done:
+            # Always finish at least one chunk
+            done, pending = await asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
+        for future in pending:
+            future.cancel()
+        # Combine in chunk order so a complete run is independent of scheduling
+        results = [future.result() for future in futures if future in done]
+
+    completion = np.concatenate([completion for completion, _ in results])
+    eac = np.concatenate([eac for _, eac in results])
+    summary = summarize_simulation(completion, eac, model.baseline_day, model.budget_at_completion, model.remaining_items)
+    summary.update({
+        'runs': int(len(eac)),
+        'requested_runs': runs,
+        'seed': seed,
+        'truncated': len(results) < len(chunks),
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+    })
+    return summary
+
+
+def summarize_simulation(
+    completion: np.ndarray,
+    eac: np.ndarray,
+    baseline_day: int,
+    bac: float,
+    remaining_items: int
+) -> dict:
+    """Percentiles of simulated completion days and estimates at completion"""
+    completion_percentiles = np.percentile(completion, PERCENTILES, method='higher')
+    eac_percentiles = np.percentile(eac, PERCENTILES)
+    return {
+        'remaining_items': remaining_items,
+        'planned_completion': from_day_number(baseline_day).isoformat(),
+        'completion': {
+            f'p{p}': from_day_number(day).isoformat() for p, day in zip(PERCENTILES, completion_percentiles)
+        },
+        'completion_shift_days': {
+            f'p{p}': int(day - baseline_day) for p, day in zip(PERCENTILES, completion_percentiles)
+        },
+        'eac': {f'p{p}': round(float(value), 2) for p, value in zip(PERCENTILES, eac_percentiles)},
+        'eac_mean': round(float(eac.mean()), 2),
+        'bac': round(bac, 2),
+        'probability_over_budget': round(float((eac > bac).mean()), 4) if bac > 0 else None,
+    }
@@ -3,27 +3,61 @@ Analytics Router - Project Analytics & Forecasting
 Provides Earned Value Management (EVM), Cash Flow Forecasting, and Risk Analytics
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
-from sqlalchemy.orm import selectinload
 from datetime import datetime, date, timedelta
 from typing import Optional, List, Dict, Any
-from decimal import Decimal
+import json
 import statistics
 import numpy as np
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.auth import require_finance, require_admin, get_current_user, require_analytics_access
 from app.models import (
-    User, Project, ProjectItem, FinalizedDecision, 
-    CashflowEvent, OptimizationResult, ProcurementOption
+    User, Project, ProjectItem, FinalizedDecision, OptimizationResult
+)
+from app.money import DEFAULT_DECIMAL_PLACES, MoneyArray, load_currency_scales
+from app.evm_engine import EvmEvents, evm_time_series, monthly_sample_dates, sample_dates_until
+from app.decision_cube import get_decision_frame
+from app.currency_conversion_service import BASE_CURRENCY
+from app.item_follow_up import project_follow_up, iter_follow_up_batches
+from app.cashflow_forecast import month_start, add_months, monthly_cashflow_totals, build_cashflow_forecast
+from app.risk_simulation import build_simulation_model, load_risk_rows, run_simulation, get_simulation_pool
+from app.portfolio_risk import portfolio_risk
+from app.response_cache import cached_view
+from app.analytics_snapshots import (
+    SNAPSHOT_EVA, SNAPSHOT_RISK, SNAPSHOT_CASHFLOW_FORECAST, register_snapshot_builder, serve_snapshot
 )
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+# Horizon of the project cash flow forecast kept in analytics snapshots
+DEFAULT_FORECAST_MONTHS = 12
+
+# Data the cached responses are built from (app/response_cache.py); project views also
+# depend on the project's own data version
+_PROJECT_VIEW_TABLES = ('projects', 'currencies', 'exchange_rates')
+_PORTFOLIO_TABLES = (
+    'projects', 'finalized_decisions', 'cashflow_events', 'procurement_options',
+    'supplier_payments', 'invoices', 'payments', 'currencies', 'exchange_rates',
+)
+_ITEM_FOLLOW_UP_TABLES = ('project_items', 'procurement_options', 'delivery_options', 'finalized_decisions')
+
+
+def _sample_stdev(n: int, total, total_sq) -> float:
+    """Sample standard deviation from a count, sum and sum of squares (0 for fewer than 2 values)"""
+    if not n or n < 2:
+        return 0.0
+    total = float(total or 0)
+    variance = (float(total_sq or 0) - total * total / n) / (n - 1)
+    return max(variance, 0.0) ** 0.5
+
 
 @router.get("/eva/{project_id}")
+@cached_view(tables=_PROJECT_VIEW_TABLES, project_param='project_id')
 async def get_earned_value_analytics(
     project_id: int,
     currency_view: Optional[str] = Query('unified', description="Currency view: 'unified' (IRR) or 'original' (multi-currency)"),
@@ -33,7 +67,13 @@ async def get_earned_value_analytics(
     """
     Calculate Earned Value Analytics (EVA) for a project
     Returns: EV, PV, AC, CPI, SPI, CV, SV, EAC metrics
+    Served from the project's analytics snapshot when it is fresh
     """
+    return await serve_snapshot(db, project_id, SNAPSHOT_EVA)
+
+
+async def compute_project_eva(db: AsyncSession, project_id: int) -> Dict[str, Any]:
+    """Live EVA of a project (response of GET /analytics/eva/{project_id})"""
     
     # Get project
     project_result = await db.execute(
@@ -61,63 +101,57 @@ async def get_earned_value_analytics(
     )
     decisions = decisions_result.scalars().all()
     
+    # Planned costs and payments as exact minor-unit arrays (amounts are in the base currency)
+    scales = await load_currency_scales(db)
+    costs = MoneyArray.from_amounts([d.final_cost for d in decisions], BASE_CURRENCY, scales)
+    payments = MoneyArray.from_amounts([d.actual_payment_amount for d in decisions], BASE_CURRENCY, scales)
+    is_locked = np.array([d.status == 'LOCKED' for d in decisions], dtype=bool)
+    
     # Calculate Budget at Completion (BAC)
     # BAC = Total PLANNED COST (not revenue) for all work
-    BAC = sum(float(d.final_cost) for d in decisions) if decisions else 0
+    BAC = float(costs.total(BASE_CURRENCY))
     
     # Calculate total planned work (number of items)
     total_items = len(items)
     
     # Calculate Actual Cost (AC) - sum of actual payments for locked decisions
     # Only count decisions where payment has actually been made
-    AC = sum(
-        float(d.actual_payment_amount)
-        for d in decisions
-        if d.status == 'LOCKED' and d.actual_payment_date and d.actual_payment_amount
-    ) if decisions else 0
+    is_paid = is_locked & np.array([bool(d.actual_payment_date and d.actual_payment_amount) for d in decisions], dtype=bool)
+    AC = float(payments[is_paid].total(BASE_CURRENCY))
     
     # Calculate Planned Value (PV) - budgeted cost of work scheduled to be complete by now
     # PV = Sum of planned costs for work that SHOULD be done by today (based on delivery dates)
     # FALLBACK: If all delivery dates are in future, use finalized_at dates instead
     today = date.today()
     
-    PV = 0
-    items_should_be_done = 0
-    
     # Check if all delivery dates are in the future (data quality issue)
     all_delivery_dates_future = all(
         d.delivery_date and d.delivery_date > today 
         for d in decisions if d.delivery_date
     )
     
-    for d in decisions:
-        # Use finalized_at date as fallback if delivery dates are unrealistic
-        if all_delivery_dates_future and d.finalized_at:
-            # Work is "scheduled" if finalized more than 30 days ago
-            if d.finalized_at.date() <= today - timedelta(days=30):
-                items_should_be_done += 1
-                PV += float(d.final_cost)
-        elif d.delivery_date and d.delivery_date <= today:
-            # Normal case: use delivery date
-            items_should_be_done += 1
-            PV += float(d.final_cost)
+    is_planned = np.array([
+        # Use finalized_at date as fallback if delivery dates are unrealistic:
+        # work is "scheduled" if finalized more than 30 days ago
+        d.finalized_at.date() <= today - timedelta(days=30)
+        if all_delivery_dates_future and d.finalized_at
+        # Normal case: use delivery date
+        else bool(d.delivery_date and d.delivery_date <= today)
+        for d in decisions
+    ], dtype=bool)
+    items_should_be_done = int(is_planned.sum())
+    PV = float(costs[is_planned].total(BASE_CURRENCY))
     
     # Calculate Earned Value (EV) - budgeted cost of work actually completed
     # Items are considered completed ONLY when PM accepts delivery
     # Priority: Actual Payment > PM Acceptance (required for completion)
-    EV = 0
-    items_actually_done = 0
-    
-    for d in decisions:
-        # Priority 1: Actual payment indicates truly completed work (payment made after PM acceptance)
-        if d.status == 'LOCKED' and d.actual_payment_amount and d.actual_payment_amount > 0:
-            items_actually_done += 1
-            EV += float(d.final_cost)
-        # Priority 2: PM acceptance - required indicator that delivery was accepted
-        elif d.status == 'LOCKED' and d.pm_accepted_at:
-            items_actually_done += 1
-            EV += float(d.final_cost)
-        # Note: LOCKED status alone is NOT sufficient - PM must accept delivery first
+    # Note: LOCKED status alone is NOT sufficient - PM must accept delivery first
+    is_done = is_locked & np.array([
+        bool((d.actual_payment_amount and d.actual_payment_amount > 0) or d.pm_accepted_at)
+        for d in decisions
+    ], dtype=bool)
+    items_actually_done = int(is_done.sum())
+    EV = float(costs[is_done].total(BASE_CURRENCY))
     
     # Calculate performance indices
     CPI = EV / AC if AC > 0 else 1.0
@@ -139,70 +173,36 @@ async def get_earned_value_analytics(
     VAC = BAC - EAC
     
     # Time-series data for charts (monthly breakdown)
-    monthly_data = []
-    current_date = date.today()
-    
-    # Determine date range: 6 months history + enough future to cover all planned invoices
-    start_date = current_date - timedelta(days=180)  # Last 6 months
-    
-    # Find latest invoice date to determine end date
-    latest_invoice_date = current_date
-    for d in decisions:
-        if d.forecast_invoice_timing_type == 'ABSOLUTE' and d.forecast_invoice_issue_date:
-            if d.forecast_invoice_issue_date > latest_invoice_date:
-                latest_invoice_date = d.forecast_invoice_issue_date
-        elif d.forecast_invoice_timing_type == 'RELATIVE' and d.delivery_date:
-            days_after = d.forecast_invoice_days_after_delivery or 30
-            invoice_date = d.delivery_date + timedelta(days=days_after)
-            if invoice_date > latest_invoice_date:
-                latest_invoice_date = invoice_date
-    
-    # Calculate number of months to cover
-    days_span = (latest_invoice_date - start_date).days
-    months_to_show = max(12, (days_span // 30) + 2)  # At least 12 months, or enough to cover all invoices
-    
-    for month_offset in range(months_to_show):
-        target_date = start_date + timedelta(days=30 * month_offset)
-        
-        # PV at this date - budgeted cost of work scheduled by target_date
-        pv_at_date = 0
-        for d in decisions:
-            # Use finalized_at date as fallback if delivery dates are unrealistic
-            if all_delivery_dates_future and d.finalized_at:
-                # Work is "scheduled" if finalized by target_date
-                if d.finalized_at.date() <= target_date:
-                    pv_at_date += float(d.final_cost)
-            elif d.delivery_date and d.delivery_date <= target_date:
-                # Normal case: use delivery date
-                pv_at_date += float(d.final_cost)
-        
-        # EV at this date - budgeted cost of work actually completed by target_date
-        # Items are considered completed ONLY when PM accepts delivery
-        ev_at_date = 0
-        for d in decisions:
-            # Priority 1: Actual payment indicates truly completed work
-            if d.status == 'LOCKED' and d.actual_payment_amount and d.actual_payment_amount > 0 and d.actual_payment_date and d.actual_payment_date <= target_date:
-                ev_at_date += float(d.final_cost)
-            # Priority 2: PM acceptance - required indicator that delivery was accepted
-            elif d.status == 'LOCKED' and d.pm_accepted_at and d.pm_accepted_at.date() <= target_date:
-                ev_at_date += float(d.final_cost)
-            # Note: LOCKED status alone is NOT sufficient - PM must accept delivery first
-        
-        # AC at this date - sum of actual costs for payments made by this date
-        ac_at_date = sum(
-            float(d.actual_payment_amount if d.actual_payment_amount else d.final_cost)
-            for d in decisions
-            if d.status == 'LOCKED' and d.actual_payment_date and d.actual_payment_date <= target_date
+    # 6 months history + enough future to cover all planned invoices
+    sample_dates = monthly_sample_dates(decisions, today - timedelta(days=180), today)
+    places = scales.get(BASE_CURRENCY, DEFAULT_DECIMAL_PLACES)
+    
+    # PV - work is scheduled at its delivery date, or at finalization if delivery dates are unrealistic
+    planned = EvmEvents.from_pairs(
+        (
+            d.finalized_at.date() if all_delivery_dates_future and d.finalized_at else d.delivery_date,
+            d.final_cost
         )
-        
-        monthly_data.append({
-            'date': target_date.isoformat(),
-            'pv': round(pv_at_date, 2),
-            'ev': round(ev_at_date, 2),
-            'ac': round(ac_at_date, 2),
-            'cpi': round(ev_at_date / ac_at_date, 3) if ac_at_date > 0 else 1.0,
-            'spi': round(ev_at_date / pv_at_date, 3) if pv_at_date > 0 else 1.0,
-        })
+        for d in decisions
+    )
+    # EV - work is earned when paid or when the PM accepts delivery, whichever comes first
+    # Note: LOCKED status alone is NOT sufficient - PM must accept delivery first
+    earned = EvmEvents.from_pairs(
+        (
+            min(filter(None, [
+                d.actual_payment_date if d.actual_payment_amount and d.actual_payment_amount > 0 else None,
+                d.pm_accepted_at.date() if d.pm_accepted_at else None,
+            ]), default=None),
+            d.final_cost
+        )
+        for d in decisions if d.status == 'LOCKED'
+    )
+    # AC - actual cost of payments made
+    actual = EvmEvents.from_pairs(
+        (d.actual_payment_date, d.actual_payment_amount if d.actual_payment_amount else d.final_cost)
+        for d in decisions if d.status == 'LOCKED'
+    )
+    monthly_data = evm_time_series(planned, earned, actual, sample_dates, places).to_rows()
     
     return {
         'project_id': project_id,
@@ -238,9 +238,10 @@ async def get_earned_value_analytics(
 
 
 @router.get("/cashflow-forecast/{project_id}")
+@cached_view(tables=_PROJECT_VIEW_TABLES, project_param='project_id')
 async def get_cashflow_forecast(
     project_id: int,
-    months_ahead: int = Query(default=12, ge=1, le=24),
+    months_ahead: int = Query(default=DEFAULT_FORECAST_MONTHS, ge=1, le=24),
     currency_view: Optional[str] = Query('unified', description="Currency view: 'unified' (IRR) or 'original' (multi-currency)"),
     current_user: User = Depends(require_finance),
     db: AsyncSession = Depends(get_db)
@@ -248,110 +249,57 @@ async def get_cashflow_forecast(
     """
     Generate cash flow forecast for a project
     Returns inflow/outflow projections and net balance
+    The default horizon is served from the project's analytics snapshot when it is fresh
     """
-    
-    # Get all cashflow events for this project
-    events_result = await db.execute(
-        select(CashflowEvent)
-        .join(FinalizedDecision, CashflowEvent.related_decision_id == FinalizedDecision.id)
-        .where(FinalizedDecision.project_id == project_id)
-        .where(CashflowEvent.is_cancelled == False)
+    if months_ahead == DEFAULT_FORECAST_MONTHS:
+        return await serve_snapshot(db, project_id, SNAPSHOT_CASHFLOW_FORECAST)
+    return await compute_cashflow_forecast(db, project_id, months_ahead)
+
+
+async def compute_cashflow_forecast(
+    db: AsyncSession,
+    project_id: int,
+    months_ahead: int = DEFAULT_FORECAST_MONTHS
+) -> Dict[str, Any]:
+    """Live cash flow forecast of a project (response of GET /analytics/cashflow-forecast/{project_id})"""
+    # Monthly totals from 6 months back to months_ahead months ahead, aggregated in SQL
+    current_month = month_start(date.today())
+    rows = await monthly_cashflow_totals(
+        db, add_months(current_month, -6), add_months(current_month, months_ahead), project_id=project_id
     )
-    events = events_result.scalars().all()
-    
-    # Group by MONTH (not exact date) for proper aggregation
-    monthly_cashflow: Dict[str, Dict[str, Decimal]] = {}
-    
-    for event in events:
-        month_key = event.event_date.strftime('%Y-%m')  # Group by month
-        if month_key not in monthly_cashflow:
-            monthly_cashflow[month_key] = {
-                'inflow_forecast': Decimal('0'),
-                'outflow_forecast': Decimal('0'),
-                'inflow_actual': Decimal('0'),
-                'outflow_actual': Decimal('0'),
-            }
-        
-        amount = event.amount
-        if event.event_type == 'INFLOW':
-            if event.forecast_type == 'ACTUAL':
-                monthly_cashflow[month_key]['inflow_actual'] += amount
-            else:
-                monthly_cashflow[month_key]['inflow_forecast'] += amount
-        else:  # OUTFLOW
-            if event.forecast_type == 'ACTUAL':
-                monthly_cashflow[month_key]['outflow_actual'] += amount
-            else:
-                monthly_cashflow[month_key]['outflow_forecast'] += amount
-    
-    # Generate forecast for future months
-    today = date.today()
-    forecast_data = []
-    cumulative_balance = Decimal('0')
-    
-    for month_offset in range(-6, months_ahead + 1):  # 6 months history + forecast
-        target_date = today + timedelta(days=30 * month_offset)
-        month_key = target_date.strftime('%Y-%m')  # Use month key
-        
-        cashflow = monthly_cashflow.get(month_key, {
-            'inflow_forecast': Decimal('0'),
-            'outflow_forecast': Decimal('0'),
-            'inflow_actual': Decimal('0'),
-            'outflow_actual': Decimal('0'),
-        })
-        
-        inflow = float(cashflow.get('inflow_actual', 0) or cashflow.get('inflow_forecast', 0))
-        outflow = float(cashflow.get('outflow_actual', 0) or cashflow.get('outflow_forecast', 0))
-        net = inflow - outflow
-        cumulative_balance += Decimal(str(net))
-        
-        forecast_data.append({
-            'date': month_key,  # Use month key for consistent monthly display
-            'inflow_forecast': float(cashflow.get('inflow_forecast', 0)),
-            'outflow_forecast': float(cashflow.get('outflow_forecast', 0)),
-            'inflow_actual': float(cashflow.get('inflow_actual', 0)),
-            'outflow_actual': float(cashflow.get('outflow_actual', 0)),
-            'net_cashflow': round(net, 2),
-            'cumulative_balance': round(float(cumulative_balance), 2),
-            'is_forecast': target_date > today,
-        })
-    
-    # Identify periods with negative balance
-    gap_intervals = [
-        {
-            'date': item['date'],
-            'deficit': abs(item['cumulative_balance']),
-        }
-        for item in forecast_data
-        if item['cumulative_balance'] < 0
-    ]
     
     return {
         'project_id': project_id,
-        'forecast_data': forecast_data,
-        'gap_intervals': gap_intervals,
-        'summary': {
-            'total_inflow_forecast': sum(f['inflow_forecast'] for f in forecast_data),
-            'total_outflow_forecast': sum(f['outflow_forecast'] for f in forecast_data),
-            'total_inflow_actual': sum(f['inflow_actual'] for f in forecast_data),
-            'total_outflow_actual': sum(f['outflow_actual'] for f in forecast_data),
-            'final_balance': forecast_data[-1]['cumulative_balance'] if forecast_data else 0,
-            'max_deficit': min((f['cumulative_balance'] for f in forecast_data), default=0),
-            'financing_needed': abs(min((f['cumulative_balance'] for f in forecast_data), default=0)) if min((f['cumulative_balance'] for f in forecast_data), default=0) < 0 else 0,
-        }
+        **build_cashflow_forecast(rows),
     }
 
 
 @router.get("/risk/{project_id}")
+@cached_view(tables=_PROJECT_VIEW_TABLES + ('procurement_options',), project_param='project_id')
 async def get_risk_analytics(
     project_id: int,
+    runs: Optional[int] = Query(default=None, ge=1000, le=1000000, description="Monte Carlo runs (default: risk_simulation_samples)"),
+    seed: Optional[int] = Query(default=None, ge=0, description="Random seed of the simulation (default: risk_simulation_seed)"),
     current_user: User = Depends(require_analytics_access),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Calculate risk metrics and predictions
-    Returns: delay variance, cost overrun variance, forecasts
+    Returns: delay variance, cost overrun variance, Monte Carlo completion and EAC forecasts
+    Served from the project's analytics snapshot when it is fresh (default runs and seed)
     """
+    if runs is None and seed is None:
+        return await serve_snapshot(db, project_id, SNAPSHOT_RISK)
+    return await compute_project_risk(db, project_id, runs=runs, seed=seed)
+
+
+async def compute_project_risk(
+    db: AsyncSession,
+    project_id: int,
+    runs: Optional[int] = None,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Live risk analytics of a project (response of GET /analytics/risk/{project_id})"""
     
     # Get finalized decisions
     decisions_result = await db.execute(
@@ -396,20 +344,11 @@ async def get_risk_analytics(
     sigma_cost_overrun = statistics.stdev(cost_ratios) if len(cost_ratios) > 1 else 0
     mean_cost_overrun = statistics.mean(cost_ratios) if cost_ratios else 0
     
-    # Simple forecast (linear trend)
-    # If delays are increasing, project completion date shifts
-    avg_delay = mean_time_delay
-    remaining_items = len([d for d in decisions if d.status == 'PROPOSED'])
-    forecasted_delay_days = int(avg_delay * remaining_items / max(len(decisions), 1))
-    
-    # Monte Carlo simulation (simplified)
-    # P50 (median), P90 (90th percentile) completion dates
-    if time_delays:
-        delay_p50 = int(statistics.median(time_delays))
-        delay_p90 = int(statistics.quantiles(time_delays, n=10)[8]) if len(time_delays) >= 10 else int(mean_time_delay * 1.5)
-    else:
-        delay_p50 = 0
-        delay_p90 = 0
+    # Monte Carlo simulation of the remaining (unpaid) decisions
+    # Completion shift P50/P80/P90 in days against the planned completion, and EAC distribution
+    model = build_simulation_model(await load_risk_rows(db, project_id))
+    simulation = await run_simulation(model, runs=runs, seed=seed)
+    shift = simulation['completion_shift_days']
     
     return {
         'project_id': project_id,
@@ -422,11 +361,13 @@ async def get_risk_analytics(
             'sample_size_cost': len(cost_ratios),
         },
         'forecast': {
-            'forecasted_delay_days': forecasted_delay_days,
-            'delay_probability_p50': delay_p50,
-            'delay_probability_p90': delay_p90,
-            'expected_completion_shift': f"{forecasted_delay_days} days",
+            'forecasted_delay_days': shift['p50'],
+            'delay_probability_p50': shift['p50'],
+            'delay_probability_p80': shift['p80'],
+            'delay_probability_p90': shift['p90'],
+            'expected_completion_shift': f"{shift['p50']} days",
         },
+        'simulation': simulation,
         'risk_level': {
             'time_risk': 'high' if sigma_time_delay > 30 else 'medium' if sigma_time_delay > 15 else 'low',
             'cost_risk': 'high' if sigma_cost_overrun > 20 else 'medium' if sigma_cost_overrun > 10 else 'low',
@@ -440,6 +381,7 @@ async def get_risk_analytics(
 
 
 @router.get("/portfolio/eva")
+@cached_view(tables=_PORTFOLIO_TABLES)
 async def get_portfolio_eva(
     currency_view: Optional[str] = Query('unified', description="Currency view: 'unified' (IRR) or 'original' (multi-currency)"),
     current_user: User = Depends(require_analytics_access),
@@ -448,58 +390,41 @@ async def get_portfolio_eva(
     """
     Get aggregated EVA metrics for all projects (Portfolio View)
     """
-    # Get all active projects
-    projects_result = await db.execute(
-        select(Project).where(Project.is_active == True)
-    )
-    projects = projects_result.scalars().all()
-    
-    # Aggregate all decisions across all projects
-    all_decisions_result = await db.execute(
-        select(FinalizedDecision)
-        .join(Project, FinalizedDecision.project_id == Project.id)
-        .where(Project.is_active == True)
-        .where(FinalizedDecision.status.in_(['LOCKED', 'PROPOSED']))
-    )
-    all_decisions = all_decisions_result.scalars().all()
+    # Aggregate all decisions across all active projects, from the decision cube
+    frame = await get_decision_frame(db)
+    all_decisions = frame.where(frame['project_is_active'] & frame.is_in('status', ['LOCKED', 'PROPOSED']))
+    
+    # Planned costs and payments as exact minor-unit arrays (amounts are in the base currency)
+    costs = all_decisions.money('final_cost')
+    payments = all_decisions.money('actual_payment_amount')
+    is_locked = all_decisions['status'] == 'LOCKED'
+    delivery_dates = all_decisions['delivery_date']
+    accepted_dates = all_decisions.days('pm_accepted_at')
+    payment_dates = all_decisions['actual_payment_date']
     
     # Calculate portfolio-level BAC, PV, EV, AC
     # BAC = Total PLANNED COST across all projects
-    BAC = sum(float(d.final_cost) for d in all_decisions) if all_decisions else 0
+    BAC = float(costs.total(BASE_CURRENCY))
     
     today = date.today()
     
     # PV - budgeted cost of work scheduled across all projects
-    PV = 0
-    for d in all_decisions:
-        # Work is "scheduled" if delivery date has passed
-        if d.delivery_date and d.delivery_date <= today:
-            PV += float(d.final_cost)
+    # Work is "scheduled" if delivery date has passed
+    is_planned = delivery_dates <= np.datetime64(today, 'D')
+    PV = float(costs[is_planned].total(BASE_CURRENCY))
     
     # EV - budgeted cost of work actually completed across all projects
     # Items are considered completed ONLY when PM accepts delivery
     # Priority: Actual Payment > PM Acceptance (required for completion)
-    EV = 0
-    items_actually_done = 0
-    
-    for d in all_decisions:
-        # Priority 1: Actual payment indicates truly completed work (payment made after PM acceptance)
-        if d.status == 'LOCKED' and d.actual_payment_amount and d.actual_payment_amount > 0:
-            items_actually_done += 1
-            EV += float(d.final_cost)
-        # Priority 2: PM acceptance - required indicator that delivery was accepted
-        elif d.status == 'LOCKED' and d.pm_accepted_at:
-            items_actually_done += 1
-            EV += float(d.final_cost)
-        # Note: LOCKED status alone is NOT sufficient - PM must accept delivery first
+    # Note: LOCKED status alone is NOT sufficient - PM must accept delivery first
+    is_done = is_locked & ((payments.minor > 0) | ~np.isnat(accepted_dates))
+    items_actually_done = int(is_done.sum())
+    EV = float(costs[is_done].total(BASE_CURRENCY))
     
     # AC - actual cost across all projects
     # Only count decisions where payment has actually been made
-    AC = sum(
-        float(d.actual_payment_amount)
-        for d in all_decisions
-        if d.status == 'LOCKED' and d.actual_payment_date and d.actual_payment_amount
-    ) if all_decisions else 0
+    is_paid = is_locked & ~np.isnat(payment_dates) & (payments.minor != 0)
+    AC = float(payments[is_paid].total(BASE_CURRENCY))
     
     # Performance indices
     CPI = EV / AC if AC > 0 else 1.0
@@ -513,56 +438,29 @@ async def get_portfolio_eva(
     ETC = EAC - AC
     VAC = BAC - EAC
     
-    # Time-series data
-    monthly_data = []
-    start_date = today - timedelta(days=180)
-    
-    # Find latest invoice date to determine end date
-    latest_invoice_date = today
-    for d in all_decisions:
-        if d.forecast_invoice_timing_type == 'ABSOLUTE' and d.forecast_invoice_issue_date:
-            if d.forecast_invoice_issue_date > latest_invoice_date:
-                latest_invoice_date = d.forecast_invoice_issue_date
-        elif d.forecast_invoice_timing_type == 'RELATIVE' and d.delivery_date:
-            days_after = d.forecast_invoice_days_after_delivery or 30
-            invoice_date = d.delivery_date + timedelta(days=days_after)
-            if invoice_date > latest_invoice_date:
-                latest_invoice_date = invoice_date
-    
-    # Calculate number of months to cover
-    days_span = (latest_invoice_date - start_date).days
-    months_to_show = max(12, (days_span // 30) + 2)
-    
-    for month_offset in range(months_to_show):
-        target_date = start_date + timedelta(days=30 * month_offset)
-        
-        pv_at_date = 0
-        for d in all_decisions:
-            # Work is "scheduled" if delivery date <= target_date
-            if d.delivery_date and d.delivery_date <= target_date:
-                pv_at_date += float(d.final_cost)
-        
-        ev_at_date = 0
-        for d in all_decisions:
-            if d.status == 'LOCKED' and d.pm_accepted_at and d.pm_accepted_at.date() <= target_date:
-                # Add PLANNED COST (not actual or invoice)
-                # Work is "earned" when PM accepts it
-                ev_at_date += float(d.final_cost)
-        
-        ac_at_date = sum(
-            float(d.actual_payment_amount)
-            for d in all_decisions
-            if d.status == 'LOCKED' and d.actual_payment_date and d.actual_payment_date <= target_date and d.actual_payment_amount
-        )
-        
-        monthly_data.append({
-            'date': target_date.isoformat(),
-            'pv': round(pv_at_date, 2),
-            'ev': round(ev_at_date, 2),
-            'ac': round(ac_at_date, 2),
-            'cpi': round(ev_at_date / ac_at_date, 3) if ac_at_date > 0 else 1.0,
-            'spi': round(ev_at_date / pv_at_date, 3) if pv_at_date > 0 else 1.0,
-        })
+    # Time-series data, sampled until the latest forecast invoice date
+    # (ABSOLUTE: issue date, RELATIVE: delivery date + days after delivery, default 30)
+    timing_types = all_decisions['forecast_invoice_timing_type']
+    issue_dates = all_decisions['forecast_invoice_issue_date']
+    days_after = all_decisions['forecast_invoice_days_after_delivery']
+    days_after = np.where(days_after > 0, days_after, 30).astype('timedelta64[D]')
+    is_absolute = (timing_types == 'ABSOLUTE') & ~np.isnat(issue_dates)
+    is_relative = (timing_types == 'RELATIVE') & ~np.isnat(delivery_dates)
+    invoice_dates = np.concatenate([issue_dates[is_absolute], (delivery_dates + days_after)[is_relative]])
+    latest_invoice_date = max(today, invoice_dates.max().astype(object)) if len(invoice_dates) else today
+    sample_dates = sample_dates_until(today - timedelta(days=180), latest_invoice_date)
+    places = all_decisions.decimal_places
+    
+    # PV - work is "scheduled" at its delivery date
+    has_delivery_date = ~np.isnat(delivery_dates)
+    planned = EvmEvents(delivery_dates[has_delivery_date], costs.minor[has_delivery_date])
+    # EV - work is "earned" at PLANNED COST when the PM accepts it
+    is_accepted = is_locked & ~np.isnat(accepted_dates)
+    earned = EvmEvents(accepted_dates[is_accepted], costs.minor[is_accepted])
+    # AC - payments made
+    is_payment = is_locked & (payments.minor != 0) & ~np.isnat(payment_dates)
+    actual = EvmEvents(payment_dates[is_payment], payments.minor[is_payment])
+    monthly_data = evm_time_series(planned, earned, actual, sample_dates, places).to_rows()
     
     return {
         'project_id': 'all',
@@ -583,9 +481,9 @@ async def get_portfolio_eva(
         },
         'progress': {
             'total_items': len(all_decisions),
-            'items_planned': sum(1 for d in all_decisions if d.delivery_date and d.delivery_date <= today),
+            'items_planned': int(is_planned.sum()),
             'items_completed': items_actually_done,
-            'percent_planned': round((sum(1 for d in all_decisions if d.delivery_date and d.delivery_date <= today) / len(all_decisions) * 100), 1) if all_decisions else 0,
+            'percent_planned': round((int(is_planned.sum()) / len(all_decisions) * 100), 1) if all_decisions else 0,
             'percent_complete': round((items_actually_done / len(all_decisions) * 100), 1) if all_decisions else 0,
         },
         'time_series': monthly_data,
@@ -598,6 +496,7 @@ async def get_portfolio_eva(
 
 
 @router.get("/portfolio/cashflow-forecast")
+@cached_view(tables=_PORTFOLIO_TABLES)
 async def get_portfolio_cashflow_forecast(
     months_ahead: int = Query(default=12, ge=1, le=24),
     currency_view: Optional[str] = Query('unified', description="Currency view: 'unified' (IRR) or 'original' (multi-currency)"),
@@ -607,146 +506,55 @@ async def get_portfolio_cashflow_forecast(
     """
     Generate cash flow forecast for entire portfolio
     """
-    # Get all cashflow events across all projects
-    events_result = await db.execute(
-        select(CashflowEvent)
-        .join(FinalizedDecision, CashflowEvent.related_decision_id == FinalizedDecision.id)
-        .join(Project, FinalizedDecision.project_id == Project.id)
-        .where(Project.is_active == True)
-        .where(CashflowEvent.is_cancelled == False)
-    )
-    events = events_result.scalars().all()
-    
-    # Group by MONTH (not exact date) for proper aggregation
-    monthly_cashflow: Dict[str, Dict[str, Decimal]] = {}
-    
-    for event in events:
-        month_key = event.event_date.strftime('%Y-%m')  # Group by month
-        if month_key not in monthly_cashflow:
-            monthly_cashflow[month_key] = {
-                'inflow_forecast': Decimal('0'),
-                'outflow_forecast': Decimal('0'),
-                'inflow_actual': Decimal('0'),
-                'outflow_actual': Decimal('0'),
-            }
-        
-        amount = event.amount
-        if event.event_type.upper() == 'INFLOW':
-            if event.forecast_type == 'FORECAST':
-                monthly_cashflow[month_key]['inflow_forecast'] += amount
-            else:
-                monthly_cashflow[month_key]['inflow_actual'] += amount
-        else:
-            if event.forecast_type == 'FORECAST':
-                monthly_cashflow[month_key]['outflow_forecast'] += amount
-            else:
-                monthly_cashflow[month_key]['outflow_actual'] += amount
-    
-    # Generate forecast
-    forecast_data = []
-    cumulative_balance = Decimal('0')
-    today = date.today()
-    
-    for i in range(months_ahead):
-        target_date = today + timedelta(days=30 * i)
-        month_key = target_date.strftime('%Y-%m')  # Use month key
-        cashflow = monthly_cashflow.get(month_key, {})
-        
-        inflow = float(cashflow.get('inflow_actual', 0) or cashflow.get('inflow_forecast', 0))
-        outflow = float(cashflow.get('outflow_actual', 0) or cashflow.get('outflow_forecast', 0))
-        net = inflow - outflow
-        cumulative_balance += Decimal(str(net))
-        
-        forecast_data.append({
-            'date': month_key,  # Use month key for consistent monthly display
-            'inflow_forecast': float(cashflow.get('inflow_forecast', 0)),
-            'outflow_forecast': float(cashflow.get('outflow_forecast', 0)),
-            'inflow_actual': float(cashflow.get('inflow_actual', 0)),
-            'outflow_actual': float(cashflow.get('outflow_actual', 0)),
-            'net_cashflow': round(net, 2),
-            'cumulative_balance': round(float(cumulative_balance), 2),
-            'is_forecast': target_date > today,
-        })
-    
-    gap_intervals = [
-        {'date': item['date'], 'deficit': abs(item['cumulative_balance'])}
-        for item in forecast_data
-        if item['cumulative_balance'] < 0
-    ]
+    # Monthly totals of all active projects for the next months_ahead months (current month first)
+    current_month = month_start(date.today())
+    rows = await monthly_cashflow_totals(db, current_month, add_months(current_month, months_ahead - 1))
     
     return {
         'project_id': 'all',
-        'forecast_data': forecast_data,
-        'gap_intervals': gap_intervals,
-        'summary': {
-            'total_inflow_forecast': sum(f['inflow_forecast'] for f in forecast_data),
-            'total_outflow_forecast': sum(f['outflow_forecast'] for f in forecast_data),
-            'total_inflow_actual': sum(f['inflow_actual'] for f in forecast_data),
-            'total_outflow_actual': sum(f['outflow_actual'] for f in forecast_data),
-            'final_balance': forecast_data[-1]['cumulative_balance'] if forecast_data else 0,
-            'max_deficit': min((f['cumulative_balance'] for f in forecast_data), default=0),
-            'financing_needed': abs(min((f['cumulative_balance'] for f in forecast_data), default=0)) if min((f['cumulative_balance'] for f in forecast_data), default=0) < 0 else 0,
-        }
+        **build_cashflow_forecast(rows),
     }
 
 
 @router.get("/portfolio/risk")
+@cached_view(tables=_PORTFOLIO_TABLES)
 async def get_portfolio_risk(
+    runs: Optional[int] = Query(default=None, ge=1000, le=1000000, description="Monte Carlo runs (default: risk_simulation_samples)"),
+    seed: Optional[int] = Query(default=None, ge=0, description="Random seed of the simulation (default: risk_simulation_seed)"),
     current_user: User = Depends(require_analytics_access),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Calculate portfolio-level risk metrics
+    Includes a Monte Carlo simulation of completion and EAC across all active projects
+    Projects are processed in parallel after one bulk load; projects not finished by
+    portfolio_risk_deadline_seconds are left out and the response is flagged partial
     """
-    # Get all locked decisions across all projects
-    decisions_result = await db.execute(
-        select(FinalizedDecision)
-        .join(Project, FinalizedDecision.project_id == Project.id)
-        .where(Project.is_active == True)
-        .where(FinalizedDecision.status == 'LOCKED')
-    )
-    decisions = decisions_result.scalars().all()
+    # Locked and proposed decisions of all active projects, in one query
+    rows = await load_risk_rows(db)
     
-    if len(decisions) < 2:
+    if sum(1 for row in rows if row.status == 'LOCKED') < 2:
         return {
             'project_id': 'all',
             'message': 'Insufficient data for portfolio risk analysis',
             'metrics': {},
         }
     
-    # Calculate time delays and cost overruns across all projects
-    # Compare: planned purchase_date vs actual_payment_date
-    time_delays = []
-    cost_ratios = []
-    
-    for decision in decisions:
-        if decision.purchase_date and decision.actual_payment_date:
-            # Planned payment date from optimization/decision
-            planned_payment = decision.purchase_date
-            # Actual payment date (when finance actually paid)
-            actual_payment = decision.actual_payment_date
-            delay_days = (actual_payment - planned_payment).days
-            time_delays.append(delay_days)
-        
-        if decision.actual_payment_amount and decision.actual_payment_amount > 0:
-            planned_cost = float(decision.final_cost)
-            actual_cost = float(decision.actual_payment_amount)
-            ratio = (actual_cost / planned_cost) - 1.0
-            cost_ratios.append(ratio * 100)
+    # Delays, cost overruns (planned purchase_date vs actual_payment_date, final_cost vs
+    # actual_payment_amount) and Monte Carlo runs per project, spread over the simulation pool
+    portfolio = await portfolio_risk(rows, runs=runs, seed=seed, executor=get_simulation_pool())
+    time_delays = portfolio['time_delays']
+    cost_ratios = portfolio['cost_overruns']
     
     sigma_time_delay = statistics.stdev(time_delays) if len(time_delays) > 1 else 0
     mean_time_delay = statistics.mean(time_delays) if time_delays else 0
     sigma_cost_overrun = statistics.stdev(cost_ratios) if len(cost_ratios) > 1 else 0
     mean_cost_overrun = statistics.mean(cost_ratios) if cost_ratios else 0
     
-    if time_delays:
-        delay_p50 = int(statistics.median(time_delays))
-        delay_p90 = int(statistics.quantiles(time_delays, n=10)[8]) if len(time_delays) >= 10 else int(mean_time_delay * 1.5)
-    else:
-        delay_p50 = 0
-        delay_p90 = 0
+    simulation = portfolio['simulation']
+    shift = simulation['completion_shift_days']
     
-    return {
+    response = {
         'project_id': 'all',
         'metrics': {
             'sigma_time_delay': round(sigma_time_delay, 2),
@@ -757,11 +565,13 @@ async def get_portfolio_risk(
             'sample_size_cost': len(cost_ratios),
         },
         'forecast': {
-            'forecasted_delay_days': 0,
-            'delay_probability_p50': delay_p50,
-            'delay_probability_p90': delay_p90,
-            'expected_completion_shift': f"Portfolio-wide analysis",
+            'forecasted_delay_days': shift['p50'],
+            'delay_probability_p50': shift['p50'],
+            'delay_probability_p80': shift['p80'],
+            'delay_probability_p90': shift['p90'],
+            'expected_completion_shift': f"{shift['p50']} days (portfolio-wide)",
         },
+        'simulation': simulation,
         'risk_level': {
             'time_risk': 'high' if sigma_time_delay > 30 else 'medium' if sigma_time_delay > 15 else 'low',
             'cost_risk': 'high' if sigma_cost_overrun > 20 else 'medium' if sigma_cost_overrun > 10 else 'low',
@@ -770,11 +580,22 @@ async def get_portfolio_risk(
         'distributions': {
             'time_delays': time_delays[:50],
             'cost_overruns': [round(r, 2) for r in cost_ratios[:50]],
-        }
+        },
+        'partial': portfolio['partial'],
+        'projects': {
+            'total': portfolio['projects_total'],
+            'completed': portfolio['projects_completed'],
+            'missing_project_ids': portfolio['missing_project_ids'],
+        },
     }
+    if portfolio['partial']:
+        # A Response bypasses the response cache, so the next request tries again
+        return JSONResponse(jsonable_encoder(response))
+    return response
 
 
 @router.get("/all-projects-summary")
+@cached_view(tables=_PORTFOLIO_TABLES)
 async def get_all_projects_analytics_summary(
     current_user: User = Depends(require_analytics_access),
     db: AsyncSession = Depends(get_db)
@@ -784,28 +605,48 @@ async def get_all_projects_analytics_summary(
     Returns: CPI, SPI, health status for each project
     """
     
-    # Get all active projects
-    projects_result = await db.execute(
-        select(Project).where(Project.is_active == True)
+    today = date.today()
+    decision = FinalizedDecision
+    delay_days = decision.actual_payment_date - decision.purchase_date
+    has_delay = and_(decision.purchase_date.isnot(None), decision.actual_payment_date.isnot(None))
+    cost_ratio = (decision.actual_payment_amount / decision.final_cost - 1) * 100
+    has_cost_ratio = and_(decision.actual_payment_amount > 0, decision.final_cost != 0)
+    
+    # Per-project aggregates of LOCKED decisions for all active projects in one grouped query
+    result = await db.execute(
+        select(
+            Project.id,
+            Project.project_code,
+            Project.name,
+            func.count(decision.id).label('locked'),
+            func.sum(decision.final_cost).label('total_planned'),
+            func.sum(func.coalesce(func.nullif(decision.actual_payment_amount, 0), decision.final_cost)).label('total_actual'),
+            func.count(decision.id).filter(decision.delivery_date <= today).label('should_be_done'),
+            func.count(decision.id).filter(
+                and_(decision.delivery_date <= today, decision.actual_payment_date.isnot(None))
+            ).label('actually_done'),
+            func.count(decision.id).filter(has_delay).label('delay_n'),
+            func.sum(delay_days).filter(has_delay).label('delay_sum'),
+            func.sum(delay_days * delay_days).filter(has_delay).label('delay_sum_sq'),
+            func.count(decision.id).filter(has_cost_ratio).label('cost_n'),
+            func.sum(cost_ratio).filter(has_cost_ratio).label('cost_sum'),
+            func.sum(cost_ratio * cost_ratio).filter(has_cost_ratio).label('cost_sum_sq'),
+        )
+        .outerjoin(decision, and_(decision.project_id == Project.id, decision.status == 'LOCKED'))
+        .where(Project.is_active == True)
+        .group_by(Project.id, Project.project_code, Project.name)
+        .order_by(Project.id)
     )
-    projects = projects_result.scalars().all()
+    rows = result.all()
     
     summaries = []
     
-    for project in projects:
-        # Quick health check based on finalized decisions
-        decisions_result = await db.execute(
-            select(FinalizedDecision)
-            .where(FinalizedDecision.project_id == project.id)
-            .where(FinalizedDecision.status == 'LOCKED')
-        )
-        decisions = decisions_result.scalars().all()
-        
-        if len(decisions) == 0:
+    for row in rows:
+        if row.locked == 0:
             summaries.append({
-                'project_id': project.id,
-                'project_code': project.project_code,
-                'project_name': project.name,
+                'project_id': row.id,
+                'project_code': row.project_code,
+                'project_name': row.name,
                 'status': 'not_started',
                 'cpi': None,
                 'spi': None,
@@ -813,61 +654,45 @@ async def get_all_projects_analytics_summary(
             })
             continue
         
-        # Calculate quick CPI
-        total_planned = sum(float(d.final_cost) for d in decisions)
-        total_actual = sum(float(d.actual_payment_amount or d.final_cost) for d in decisions)
+        # Quick CPI
+        total_planned = float(row.total_planned or 0)
+        total_actual = float(row.total_actual or 0)
         cpi = total_planned / total_actual if total_actual > 0 else 1.0
         
-        # Calculate quick SPI (based on delivery dates)
-        today = date.today()
-        should_be_done = sum(1 for d in decisions if d.delivery_date <= today)
-        actually_done = sum(1 for d in decisions if d.delivery_date <= today and d.actual_payment_date)
-        spi = actually_done / should_be_done if should_be_done > 0 else 1.0
+        # Quick SPI (based on delivery dates)
+        spi = row.actually_done / row.should_be_done if row.should_be_done > 0 else 1.0
         
         health = 'healthy' if cpi >= 0.9 and spi >= 0.9 else 'at_risk' if cpi >= 0.8 and spi >= 0.8 else 'critical'
         
-        # Calculate risk level (time and cost variance)
-        time_delays = []
-        cost_ratios = []
-        
-        for d in decisions:
-            if d.purchase_date and d.actual_payment_date:
-                delay_days = (d.actual_payment_date - d.purchase_date).days
-                time_delays.append(delay_days)
-            
-            if d.actual_payment_amount and d.actual_payment_amount > 0:
-                planned = float(d.final_cost)
-                actual = float(d.actual_payment_amount)
-                ratio = (actual / planned - 1.0) * 100
-                cost_ratios.append(ratio)
-        
-        sigma_time = statistics.stdev(time_delays) if len(time_delays) > 1 else 0
-        sigma_cost = statistics.stdev(cost_ratios) if len(cost_ratios) > 1 else 0
+        # Risk level (time and cost variance)
+        sigma_time = _sample_stdev(row.delay_n, row.delay_sum, row.delay_sum_sq)
+        sigma_cost = _sample_stdev(row.cost_n, row.cost_sum, row.cost_sum_sq)
         
         time_risk = 'high' if sigma_time > 30 else 'medium' if sigma_time > 15 else 'low'
         cost_risk = 'high' if sigma_cost > 20 else 'medium' if sigma_cost > 10 else 'low'
-        overall_risk = 'high' if (sigma_time > 30 or sigma_cost > 20) else 'medium' if (sigma_time > 15 or sigma_cost > 10) else 'low' if (time_delays or cost_ratios) else None
+        overall_risk = 'high' if (sigma_time > 30 or sigma_cost > 20) else 'medium' if (sigma_time > 15 or sigma_cost > 10) else 'low' if (row.delay_n or row.cost_n) else None
         
         summaries.append({
-            'project_id': project.id,
-            'project_code': project.project_code,
-            'project_name': project.name,
-            'locked_decisions': len(decisions),
+            'project_id': row.id,
+            'project_code': row.project_code,
+            'project_name': row.name,
+            'locked_decisions': row.locked,
             'cpi': round(cpi, 3),
             'spi': round(spi, 3),
             'health': health,
             'risk_level': overall_risk,
-            'time_risk': time_risk if time_delays else None,
-            'cost_risk': cost_risk if cost_ratios else None,
+            'time_risk': time_risk if row.delay_n else None,
+            'cost_risk': cost_risk if row.cost_n else None,
         })
     
     return {
-        'total_projects': len(projects),
+        'total_projects': len(rows),
         'projects': summaries,
     }
 
 
 @router.get("/item-follow-up/{project_id}")
+@cached_view(tables=_ITEM_FOLLOW_UP_TABLES)
 async def get_item_follow_up(
     project_id: int,
     current_user: User = Depends(require_analytics_access),
@@ -890,269 +715,46 @@ async def get_item_follow_up(
             detail="Project not found"
         )
     
-    # Get all project items with their status
-    items_result = await db.execute(
-        select(ProjectItem)
-        .options(selectinload(ProjectItem.delivery_options_rel))
-        .where(ProjectItem.project_id == project_id)
-        .order_by(ProjectItem.id)
-    )
-    project_items = items_result.scalars().all()
-    
-    follow_up_data = []
-    
-    for item in project_items:
-        # Determine item status based on platform process
-        status = "CREATED"
-        notes = ""
-        
-        # Check if item has delivery options
-        has_delivery_options = item.delivery_options_rel and len(item.delivery_options_rel) > 0
-        
-        if has_delivery_options:
-            status = "DELIVERY_ADDED"
-        
-        # Check finalized decisions FIRST (highest priority)
-        decision_result = await db.execute(
-            select(FinalizedDecision)
-            .where(FinalizedDecision.project_item_id == item.id)
-            .order_by(FinalizedDecision.created_at.desc())
-        )
-        decision = decision_result.scalars().first()  # Get the most recent decision
-        
-        if decision:
-            if decision.status == "PROPOSED":
-                status = "PROPOSED"
-            elif decision.status == "LOCKED":
-                # Check delivery_status for procurement and project delivery tracking
-                if decision.delivery_status == "DELIVERY_COMPLETE":
-                    status = "DELIVERY_COMPLETE"
-                elif decision.delivery_status == "CONFIRMED_BY_PROCUREMENT":
-                    status = "CONFIRMED_BY_PROCUREMENT"
-                else:
-                    status = "LOCKED"
-            elif decision.status == "PROCUREMENT_PLAN":
-                # Check delivery_status for procurement and project delivery tracking
-                if decision.delivery_status == "DELIVERY_COMPLETE":
-                    status = "DELIVERY_COMPLETE"
-                elif decision.delivery_status == "CONFIRMED_BY_PROCUREMENT":
-                    status = "CONFIRMED_BY_PROCUREMENT"
-                else:
-                    status = "PROCUREMENT_PLAN"
-            elif decision.status == "ORDERED":
-                status = "ORDERED"
-            elif decision.status == "DELIVERED":
-                status = "DELIVERED"
-        
-        # Check procurement options - get full objects to extract dates and counts
-        procurement_options_result = await db.execute(
-            select(ProcurementOption)
-            .where(
-                and_(
-                    ProcurementOption.project_item_id == item.id,
-                    ProcurementOption.is_active == True
-                )
-            )
-        )
-        procurement_options_list = procurement_options_result.scalars().all()
-        procurement_options_count = len(procurement_options_list)
-        finalized_options_count = sum(1 for opt in procurement_options_list if opt.is_finalized)
-        
-        # Only set PROCUREMENT_OPTIONS status if there's no finalized decision
-        if procurement_options_count > 0 and not decision:
-            if item.is_finalized:
-                # Item is finalized and has options but no decision - ready for optimization
-                status = "READY_FOR_OPTIMIZATION"
-            else:
-                status = "PROCUREMENT_OPTIONS"
-            notes = f"{procurement_options_count} options ({finalized_options_count} finalized)"
-        elif procurement_options_count > 0:
-            # Has procurement options and decision - update notes only
-            notes = f"{procurement_options_count} options ({finalized_options_count} finalized)"
-        
-        # Check if item is finalized (only if no decision and no procurement options status set)
-        if not decision and procurement_options_count == 0 and item.is_finalized:
-            status = "FINALIZED"
-        
-        # Get delivery dates from delivery options and procurement options
-        lead_time_date = None  # Delivery date to project (from procurement option - when supplier delivers)
-        delivery_time_date = None  # Delivery date to customer (from delivery option - when we deliver)
-        
-        # Get earliest expected delivery date from procurement options (when supplier delivers to us)
-        if procurement_options_list:
-            procurement_dates = [
-                opt.expected_delivery_date for opt in procurement_options_list
-                if opt.expected_delivery_date
-            ]
-            if procurement_dates:
-                lead_time_date = min(procurement_dates)  # Earliest delivery from supplier
-        
-        # Get delivery date from delivery options (when we deliver to customer)
-        if item.delivery_options_rel:
-            delivery_dates = [
-                do.delivery_date for do in item.delivery_options_rel 
-                if do.delivery_date
-            ]
-            if delivery_dates:
-                delivery_time_date = min(delivery_dates)  # Earliest delivery to customer
-        
-        follow_up_data.append({
-            'project_item_id': item.id,
-            'item_code': item.item_code,
-            'item_name': item.item_name or item.item_code,
-            'quantity': item.quantity,
-            'status': status,
-            'lead_time_date': lead_time_date.isoformat() if lead_time_date else None,  # Delivery date to project
-            'delivery_time_date': delivery_time_date.isoformat() if delivery_time_date else None,  # Delivery date to customer
-            'procurement_options_count': procurement_options_count,
-            'procurement_options_finalized': finalized_options_count == procurement_options_count and procurement_options_count > 0,
-            'notes': notes,
-            'is_finalized': item.is_finalized,
-            'created_at': item.created_at,
-        })
-    
-    return follow_up_data
+    return await project_follow_up(db, project_id)
 
 
 @router.get("/portfolio/item-follow-up")
 async def get_portfolio_item_follow_up(
+    response: Response,
+    limit: Optional[int] = Query(default=None, ge=1, le=5000, description="Page size (default: all items, streamed)"),
+    after_item_id: Optional[int] = Query(default=None, description="Return items after this project_item_id"),
     current_user: User = Depends(require_analytics_access),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get item follow-up status for all projects (portfolio view)
-    """
     
-    # Get all projects
-    projects_result = await db.execute(
-        select(Project).where(Project.is_active == True)
-    )
-    projects = projects_result.scalars().all()
-    
-    portfolio_data = []
-    
-    for project in projects:
-        # Get project items
-        items_result = await db.execute(
-            select(ProjectItem)
-            .options(selectinload(ProjectItem.delivery_options_rel))
-            .where(ProjectItem.project_id == project.id)
-            .order_by(ProjectItem.id)
-        )
-        project_items = items_result.scalars().all()
-        
-        for item in project_items:
-            # Same logic as single project endpoint
-            status = "CREATED"
-            notes = ""
-            
-            # Check delivery options
-            has_delivery_options = item.delivery_options_rel and len(item.delivery_options_rel) > 0
-            
-            if has_delivery_options:
-                status = "DELIVERY_ADDED"
-            
-            # Check finalized decisions FIRST (highest priority)
-            decision_result = await db.execute(
-                select(FinalizedDecision)
-                .where(FinalizedDecision.project_item_id == item.id)
-                .order_by(FinalizedDecision.created_at.desc())
-            )
-            decision = decision_result.scalars().first()  # Get the most recent decision
-            
-            if decision:
-                if decision.status == "PROPOSED":
-                    status = "PROPOSED"
-                elif decision.status == "LOCKED":
-                    # Check delivery_status for procurement and project delivery tracking
-                    if decision.delivery_status == "DELIVERY_COMPLETE":
-                        status = "DELIVERY_COMPLETE"
-                    elif decision.delivery_status == "CONFIRMED_BY_PROCUREMENT":
-                        status = "CONFIRMED_BY_PROCUREMENT"
-                    else:
-                        status = "LOCKED"
-                elif decision.status == "PROCUREMENT_PLAN":
-                    # Check delivery_status for procurement and project delivery tracking
-                    if decision.delivery_status == "DELIVERY_COMPLETE":
-                        status = "DELIVERY_COMPLETE"
-                    elif decision.delivery_status == "CONFIRMED_BY_PROCUREMENT":
-                        status = "CONFIRMED_BY_PROCUREMENT"
-                    else:
-                        status = "PROCUREMENT_PLAN"
-                elif decision.status == "ORDERED":
-                    status = "ORDERED"
-                elif decision.status == "DELIVERED":
-                    status = "DELIVERED"
-            
-            # Check procurement options - get full objects to extract dates and counts
-            procurement_options_result = await db.execute(
-                select(ProcurementOption)
-                .where(
-                    and_(
-                        ProcurementOption.project_item_id == item.id,
-                        ProcurementOption.is_active == True
-                    )
-                )
-            )
-            procurement_options_list = procurement_options_result.scalars().all()
-            procurement_options_count = len(procurement_options_list)
-            finalized_options_count = sum(1 for opt in procurement_options_list if opt.is_finalized)
-            
-            # Only set PROCUREMENT_OPTIONS status if there's no finalized decision
-            if procurement_options_count > 0 and not decision:
-                if item.is_finalized:
-                    # Item is finalized and has options but no decision - ready for optimization
-                    status = "READY_FOR_OPTIMIZATION"
-                else:
-                    status = "PROCUREMENT_OPTIONS"
-                notes = f"{procurement_options_count} options ({finalized_options_count} finalized)"
-            elif procurement_options_count > 0:
-                # Has procurement options and decision - update notes only
-                notes = f"{procurement_options_count} options ({finalized_options_count} finalized)"
-            
-            # Check if item is finalized (only if no decision and no procurement options status set)
-            if not decision and procurement_options_count == 0 and item.is_finalized:
-                status = "FINALIZED"
-            
-            # Get delivery dates from delivery options and procurement options
-            lead_time_date = None  # Delivery date to project (from procurement option - when supplier delivers)
-            delivery_time_date = None  # Delivery date to customer (from delivery option - when we deliver)
-            
-            # Get earliest expected delivery date from procurement options (when supplier delivers to us)
-            if procurement_options_list:
-                procurement_dates = [
-                    opt.expected_delivery_date for opt in procurement_options_list
-                    if opt.expected_delivery_date
-                ]
-                if procurement_dates:
-                    lead_time_date = min(procurement_dates)  # Earliest delivery from supplier
-            
-            # Get delivery date from delivery options (when we deliver to customer)
-            if item.delivery_options_rel:
-                delivery_dates = [
-                    do.delivery_date for do in item.delivery_options_rel 
-                    if do.delivery_date
-                ]
-                if delivery_dates:
-                    delivery_time_date = min(delivery_dates)  # Earliest delivery to customer
-            
-            portfolio_data.append({
-                'project_id': project.id,
-                'project_code': project.project_code,
-                'project_name': project.name,
-                'project_item_id': item.id,
-                'item_code': item.item_code,
-                'item_name': item.item_name or item.item_code,
-                'quantity': item.quantity,
-                'status': status,
-                'lead_time_date': lead_time_date.isoformat() if lead_time_date else None,  # Delivery date to project
-                'delivery_time_date': delivery_time_date.isoformat() if delivery_time_date else None,  # Delivery date to customer
-                'procurement_options_count': procurement_options_count,
-                'procurement_options_finalized': finalized_options_count == procurement_options_count and procurement_options_count > 0,
-                'notes': notes,
-                'is_finalized': item.is_finalized,
-                'created_at': item.created_at,
-            })
-    
-    return portfolio_data
+    Items are ordered by project_item_id. With limit, one page is returned and the
+    X-Next-After-Item-Id header holds the cursor of the next page (absent on the last
+    page). Without limit the whole list is streamed, built batch by batch.
+    """
+    if limit is not None:
+        page = []
+        async for rows in iter_follow_up_batches(db, after_item_id=after_item_id, limit=limit):
+            page.extend(rows)
+        if len(page) == limit:
+            response.headers["X-Next-After-Item-Id"] = str(page[-1]['project_item_id'])
+        return page
+    
+    async def stream_rows():
+        # Own session: the response body is produced after the endpoint returns
+        async with AsyncSessionLocal() as session:
+            yield "["
+            first = True
+            async for rows in iter_follow_up_batches(session, after_item_id=after_item_id):
+                for row in rows:
+                    yield ("" if first else ",") + json.dumps(jsonable_encoder(row))
+                    first = False
+            yield "]"
+    
+    return StreamingResponse(stream_rows(), media_type="application/json")
+
 
+register_snapshot_builder(SNAPSHOT_EVA, compute_project_eva)
+register_snapshot_builder(SNAPSHOT_RISK, compute_project_risk)
+register_snapshot_builder(SNAPSHOT_CASHFLOW_FORECAST, compute_cashflow_forecast)
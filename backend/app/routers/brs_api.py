@@ -91,7 +91,8 @@ async def brs_api_health_check():
         return {
             "status": "healthy",
             "currencies_count": len(rates),
-            "last_update": brs_api_client._cache_timestamp.isoformat() if brs_api_client._cache_timestamp else None,
+            "last_update": brs_api_client.last_updated.isoformat() if brs_api_client.last_updated else None,
+            "stale": brs_api_client.is_stale(),
             "source": "BrsApi"
         }
     except Exception as e:
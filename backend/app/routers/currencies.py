@@ -3,7 +3,7 @@ Currency and Exchange Rate management endpoints
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload
@@ -11,9 +11,16 @@ from datetime import date, datetime
 from decimal import Decimal
 import logging
 
+from app.config import settings
 from app.database import get_db
 from app.auth import get_current_user, require_finance
 from app.models import Currency, ExchangeRate, User
+from app.exchange_rate_daily import exchange_rates_changed
+from app.cross_rate_matrix import cross_rate_engine
+from app.exchange_rate_import import import_exchange_rates
+from app.currency_conversion_service import CurrencyConversionService, BASE_CURRENCY
+from app.rate_history import ohlc_rate_history, downsample_rate_history
+from app.data_versions import bump_version, make_etag, etag_matches
 
 logger = logging.getLogger(__name__)
 from app.schemas import (
@@ -25,13 +32,41 @@ from app.schemas import (
 router = APIRouter(prefix="/currencies", tags=["currencies"])
 
 
+# Last built currency listing per include_inactive flag: {include_inactive: (etag, currencies)}
+_currency_list_cache = {}
+
+
+def _currency_list_etag(include_inactive: bool) -> str:
+    # The date is part of the key: a future-dated rate becomes the latest one at midnight
+    return make_etag(
+        ['currencies', 'exchange_rates'], include_inactive, date.today(),
+        max_age_seconds=settings.exchange_rate_cache_ttl_seconds
+    )
+
+
 @router.get("/", response_model=List[CurrencyWithRates])
 async def list_currencies(
+    response: Response,
     include_inactive: bool = Query(False, description="Include inactive currencies"),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get list of all currencies with latest exchange rates"""
+    """
+    Get list of all currencies with latest exchange rates.
+    
+    The response carries an ETag derived from the currency and exchange rate versions;
+    repeat requests with If-None-Match get 304 (or the cached listing) without querying.
+    """
+    etag = _currency_list_etag(include_inactive)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    cached = _currency_list_cache.get(include_inactive)
+    if cached and cached[0] == etag:
+        return cached[1]
+    
     query = select(Currency)
     
     if not include_inactive:
@@ -42,73 +77,54 @@ async def list_currencies(
     result = await db.execute(query)
     currencies = result.scalars().all()
     
-    # Get latest exchange rates for each currency
+    # Latest rate into the base currency for every currency in one DISTINCT ON query
+    latest_rates = {}
+    try:
+        rate_query = (
+            select(ExchangeRate)
+            .where(
+                and_(
+                    ExchangeRate.to_currency == 'IRR',  # Convert to base currency
+                    ExchangeRate.is_active == True,
+                    ExchangeRate.date <= date.today()
+                )
+            )
+            .distinct(ExchangeRate.from_currency)
+            .order_by(ExchangeRate.from_currency, ExchangeRate.date.desc(), ExchangeRate.id.desc())
+        )
+        rate_result = await db.execute(rate_query)
+        latest_rates = {rate.from_currency: rate for rate in rate_result.scalars().all()}
+    except Exception as e:
+        # If exchange rates table doesn't exist, return currencies without rates
+        logger.warning(f"Could not fetch latest exchange rates: {e}")
+    
     currency_list = []
     for currency in currencies:
         # Base currency always has rate 1.0
+        latest_rate = None if currency.is_base_currency else latest_rates.get(currency.code)
         if currency.is_base_currency:
-            currency_data = CurrencyWithRates(
-                id=currency.id,
-                code=currency.code,
-                name=currency.name,
-                symbol=currency.symbol,
-                is_base_currency=currency.is_base_currency,
-                is_active=currency.is_active,
-                decimal_places=currency.decimal_places,
-                created_at=currency.created_at,
-                updated_at=currency.updated_at,
-                created_by_id=currency.created_by_id,
-                latest_rate=None,
-                rate_to_base=1.0
-            )
+            rate_to_base = 1.0
         else:
-            # Get latest exchange rate for non-base currencies (convert to IRR)
-            # Note: Exchange rates table may not exist yet
-            try:
-                rate_query = select(ExchangeRate).where(
-                    and_(
-                        ExchangeRate.from_currency == currency.code,
-                        ExchangeRate.to_currency == 'IRR',  # Convert to base currency
-                        ExchangeRate.is_active == True,
-                        ExchangeRate.date <= date.today()
-                    )
-                ).order_by(ExchangeRate.date.desc()).limit(1)
-                
-                rate_result = await db.execute(rate_query)
-                latest_rate = rate_result.scalar_one_or_none()
-                
-                currency_data = CurrencyWithRates(
-                    id=currency.id,
-                    code=currency.code,
-                    name=currency.name,
-                    symbol=currency.symbol,
-                    is_base_currency=currency.is_base_currency,
-                    is_active=currency.is_active,
-                    decimal_places=currency.decimal_places,
-                    created_at=currency.created_at,
-                    updated_at=currency.updated_at,
-                    created_by_id=currency.created_by_id,
-                    latest_rate=latest_rate,
-                    rate_to_base=latest_rate.rate if latest_rate else None
-                )
-            except Exception as e:
-                # If exchange rates table doesn't exist, return currency without rate
-                logger.warning(f"Could not fetch exchange rate for {currency.code}: {e}")
-                currency_data = CurrencyWithRates(
-                    id=currency.id,
-                    code=currency.code,
-                    name=currency.name,
-                    symbol=currency.symbol,
-                    is_base_currency=currency.is_base_currency,
-                    is_active=currency.is_active,
-                    decimal_places=currency.decimal_places,
-                    created_at=currency.created_at,
-                    updated_at=currency.updated_at,
-                    created_by_id=currency.created_by_id,
-                    latest_rate=None,
-                    rate_to_base=None
-                )
-        currency_list.append(currency_data)
+            rate_to_base = latest_rate.rate if latest_rate else None
+        
+        currency_list.append(CurrencyWithRates(
+            id=currency.id,
+            code=currency.code,
+            name=currency.name,
+            symbol=currency.symbol,
+            is_base_currency=currency.is_base_currency,
+            is_active=currency.is_active,
+            decimal_places=currency.decimal_places,
+            created_at=currency.created_at,
+            updated_at=currency.updated_at,
+            created_by_id=currency.created_by_id,
+            latest_rate=latest_rate,
+            rate_to_base=rate_to_base
+        ))
+    
+    # Only keep the listing if nothing was written while it was being built
+    if _currency_list_etag(include_inactive) == etag:
+        _currency_list_cache[include_inactive] = (etag, currency_list)
     
     return currency_list
 
@@ -158,6 +174,7 @@ async def create_currency(
     
     db.add(db_currency)
     await db.commit()
+    bump_version('currencies')
     await db.refresh(db_currency)
     
     return db_currency
@@ -250,6 +267,7 @@ async def update_currency(
         setattr(currency, field, value)
     
     await db.commit()
+    bump_version('currencies')
     await db.refresh(currency)
     
     return currency
@@ -284,6 +302,7 @@ async def delete_currency(
     
     await db.delete(currency)
     await db.commit()
+    bump_version('currencies')
     
     return {"message": "Currency deleted successfully"}
 
@@ -326,6 +345,7 @@ async def add_exchange_rate(
         existing_rate.is_active = True
         existing_rate.updated_at = datetime.now()
         await db.commit()
+        await exchange_rates_changed(db, [(from_currency, to_currency, rate_date)])
         return {"message": "Exchange rate updated successfully", "id": existing_rate.id}
     else:
         # Create new rate
@@ -339,10 +359,49 @@ async def add_exchange_rate(
         )
         db.add(new_rate)
         await db.commit()
+        await exchange_rates_changed(db, [(from_currency, to_currency, rate_date)])
         await db.refresh(new_rate)
         return {"message": "Exchange rate added successfully", "id": new_rate.id}
 
 
+@router.post("/rates/import")
+async def import_exchange_rates_file(
+    file: UploadFile = File(..., description="CSV or Excel file with exchange rates"),
+    skip_invalid: bool = Query(False, description="Import the valid rows even if some rows are invalid"),
+    dry_run: bool = Query(False, description="Only validate the file"),
+    current_user: User = Depends(require_finance()),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk add or update exchange rates from a file (Finance/Admin only).
+    
+    Columns are either date, from_currency, to_currency, rate, or date plus one
+    column per currency holding its rate into the base currency.
+    """
+    content = await file.read()
+    try:
+        result = await import_exchange_rates(
+            db, content, file.filename,
+            created_by_id=current_user.id,
+            skip_invalid=skip_invalid,
+            dry_run=dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if result.errors and not (skip_invalid or dry_run):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": f"{len(result.errors)} invalid row(s); nothing was imported", **result.to_dict()}
+        )
+    
+    if dry_run:
+        message = f"Validated {result.rows_read} row(s); {result.skipped} invalid, {result.duplicates} duplicate(s)"
+    else:
+        message = f"Imported {result.inserted + result.updated} exchange rate(s)"
+    return {"message": message, **result.to_dict()}
+
+
 @router.get("/rates/list")
 async def list_exchange_rates(
     from_currency: Optional[str] = Query(None, description="Filter by source currency"),
@@ -393,6 +452,63 @@ async def list_exchange_rates(
     ]
 
 
+@router.get("/rates/history")
+async def get_exchange_rate_history(
+    from_currency: str = Query(..., min_length=3, max_length=3, description="Source currency code"),
+    to_currency: str = Query(BASE_CURRENCY, min_length=3, max_length=3, description="Target currency code"),
+    start_date: Optional[date] = Query(None, description="Start date (inclusive)"),
+    end_date: Optional[date] = Query(None, description="End date (inclusive)"),
+    points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample to at most this many points"),
+    interval: Optional[str] = Query(None, pattern="^(WEEK|MONTH)$", description="Return OHLC per WEEK or MONTH instead of points"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Rate history of one currency pair for charts.
+    
+    With points, long ranges are reduced with a shape-preserving downsample (LTTB);
+    with interval, open/high/low/close per week or month are returned.
+    """
+    from_currency = from_currency.upper()
+    to_currency = to_currency.upper()
+    
+    if interval:
+        candles = await ohlc_rate_history(db, from_currency, to_currency, interval, start_date, end_date)
+        return {
+            "from_currency": from_currency,
+            "to_currency": to_currency,
+            "interval": interval,
+            "ohlc": [
+                {
+                    "period_start": candle["period_start"].isoformat(),
+                    "open": float(candle["open"]),
+                    "high": float(candle["high"]),
+                    "low": float(candle["low"]),
+                    "close": float(candle["close"]),
+                    "samples": candle["samples"]
+                }
+                for candle in candles
+            ]
+        }
+    
+    service = CurrencyConversionService(db)
+    history = await service.get_rate_history(from_currency, to_currency, start_date, end_date)
+    total_points = len(history)
+    if points:
+        history = downsample_rate_history(history, points)
+    
+    return {
+        "from_currency": from_currency,
+        "to_currency": to_currency,
+        "total_points": total_points,
+        "returned_points": len(history),
+        "points": [
+            {"date": row["date"].isoformat(), "rate": float(row["rate"])}
+            for row in history
+        ]
+    }
+
+
 @router.put("/rates/{rate_id}")
 async def update_exchange_rate(
     rate_id: int,
@@ -415,6 +531,7 @@ async def update_exchange_rate(
     exchange_rate.rate = rate
     exchange_rate.updated_at = datetime.now()
     await db.commit()
+    await exchange_rates_changed(db, [(exchange_rate.from_currency, exchange_rate.to_currency, exchange_rate.date)])
     
     return {"message": "Exchange rate updated successfully"}
 
@@ -437,8 +554,10 @@ async def delete_exchange_rate(
             detail="Exchange rate not found"
         )
     
+    change = (exchange_rate.from_currency, exchange_rate.to_currency, exchange_rate.date)
     await db.delete(exchange_rate)
     await db.commit()
+    await exchange_rates_changed(db, [change])
     
     return {"message": "Exchange rate deleted successfully"}
 
@@ -506,6 +625,7 @@ async def create_exchange_rate(
         existing_rate.is_active = rate.is_active
         existing_rate.created_by_id = current_user.id  # Track who updated it
         await db.commit()
+        await exchange_rates_changed(db, [(currency.code, BASE_CURRENCY, rate.rate_date)])
         await db.refresh(existing_rate)
         return existing_rate
     
@@ -520,6 +640,7 @@ async def create_exchange_rate(
     
     db.add(db_rate)
     await db.commit()
+    await exchange_rates_changed(db, [(currency.code, BASE_CURRENCY, rate.rate_date)])
     await db.refresh(db_rate)
     
     return db_rate
@@ -544,12 +665,15 @@ async def update_exchange_rate(
             detail="Exchange rate not found"
         )
     
-    # Update rate
+    # Update rate; the daily rows of the old and the new (pair, date) are rebuilt
+    old_change = (rate.from_currency, rate.to_currency, rate.date)
     update_data = rate_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(rate, field, value)
+    new_change = (rate.from_currency, rate.to_currency, rate.date)
     
     await db.commit()
+    await exchange_rates_changed(db, [old_change, new_change])
     await db.refresh(rate)
     
     return rate
@@ -573,8 +697,10 @@ async def delete_exchange_rate_legacy(
             detail="Exchange rate not found"
         )
     
+    change = (rate.from_currency, rate.to_currency, rate.date)
     await db.delete(rate)
     await db.commit()
+    await exchange_rates_changed(db, [change])
     
     return {"message": "Exchange rate deleted successfully"}
 
@@ -628,49 +754,21 @@ async def convert_currency(
             detail="One or both currencies not found"
         )
     
-    # Get exchange rates (base currency always has rate 1.0)
-    from_rate_to_base = Decimal("1.0")
-    to_rate_to_base = Decimal("1.0")
-    
-    if not from_currency.is_base_currency:
-        from_rate_query = select(ExchangeRate).where(
-            and_(
-                ExchangeRate.from_currency == from_currency.code,
-                ExchangeRate.to_currency == 'IRR',  # Assuming IRR is base currency
-                ExchangeRate.is_active == True,
-                ExchangeRate.date <= conversion_date
-            )
-        ).order_by(ExchangeRate.date.desc()).limit(1)
-        
-        from_rate_result = await db.execute(from_rate_query)
-        from_rate = from_rate_result.scalar_one_or_none()
-        
-        if not from_rate:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"No exchange rate found for {from_currency.code} on or before {conversion_date}"
-            )
-        from_rate_to_base = from_rate.rate
-    
-    if not to_currency.is_base_currency:
-        to_rate_query = select(ExchangeRate).where(
-            and_(
-                ExchangeRate.from_currency == to_currency.code,
-                ExchangeRate.to_currency == 'IRR',  # Assuming IRR is base currency
-                ExchangeRate.is_active == True,
-                ExchangeRate.date <= conversion_date
-            )
-        ).order_by(ExchangeRate.date.desc()).limit(1)
-        
-        to_rate_result = await db.execute(to_rate_query)
-        to_rate = to_rate_result.scalar_one_or_none()
-        
-        if not to_rate:
+    # Both rates into the base currency from the cached cross-rate matrix of the date
+    # (base currency always has rate 1.0)
+    matrix = await cross_rate_engine.matrix_for(db, conversion_date)
+    rates_to_base = []
+    for currency in (from_currency, to_currency):
+        if currency.is_base_currency:
+            rates_to_base.append(Decimal("1.0"))
+            continue
+        if not matrix.has_rate(currency.code):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"No exchange rate found for {to_currency.code} on or before {conversion_date}"
+                detail=f"No exchange rate found for {currency.code} on or before {conversion_date}"
             )
-        to_rate_to_base = to_rate.rate
+        rates_to_base.append(matrix.rate(currency.code, BASE_CURRENCY))
+    from_rate_to_base, to_rate_to_base = rates_to_base
     
     # Convert to base currency first, then to target currency
     base_amount = amount * from_rate_to_base
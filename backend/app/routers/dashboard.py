@@ -12,17 +12,30 @@ from decimal import Decimal
 from collections import defaultdict
 from sqlalchemy import and_
 from io import BytesIO
+import math
+import logging
 import pandas as pd
 from app.database import get_db
 from app.auth import get_current_user
 from app.models import User, CashflowEvent, BudgetData, FinalizedDecision
-from app.currency_conversion_service import CurrencyConversionService
+from app.currency_conversion_service import BASE_CURRENCY
+from app.cross_rate_matrix import cross_rate_engine
+from app.exchange_rate_daily import base_rate_join
 from app.cashflow_sync_service import CashflowSyncService
+from app.response_cache import cached_view
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+logger = logging.getLogger(__name__)
+
+# Data the cached dashboard responses are built from (app/response_cache.py)
+_DASHBOARD_TABLES = (
+    'cashflow_events', 'finalized_decisions', 'budget_data', 'projects',
+    'currencies', 'exchange_rates', 'exchange_rates_daily',
+)
 
 
 @router.get("/cashflow")
+@cached_view(tables=_DASHBOARD_TABLES)
 async def get_cashflow_analysis(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
@@ -96,40 +109,37 @@ async def get_cashflow_analysis(
         if end_date:
             query = query.where(CashflowEvent.event_date <= date.fromisoformat(end_date))
         
-        # Execute query
-        result = await db.execute(query.order_by(CashflowEvent.event_date))
-        events = result.scalars().all()
-        
         # Aggregate by month
-        # Initialize currency conversion service
-        currency_service = CurrencyConversionService(db)
-        
         if currency_view == 'unified':
             # Unified view: Convert all amounts to base currency (IRR)
             monthly_data = defaultdict(lambda: {"inflow": Decimal(0), "outflow": Decimal(0)})
             
-            for event in events:
-                month_key = event.event_date.strftime("%Y-%m")
-                
-                # Get amount in original currency
-                amount = event.amount_value if event.amount_value is not None else event.amount
-                currency = event.amount_currency if event.amount_currency else 'IRR'
-                
-                # Convert to base currency (IRR)
-                try:
-                    if currency != 'IRR':
-                        amount_in_irr = await currency_service.convert_to_base(amount, currency, event.event_date)
-                    else:
-                        amount_in_irr = amount
-                except Exception as e:
-                    # If conversion fails, use original amount (assume it's in IRR)
-                    amount_in_irr = amount
-                
-                if event.event_type.upper() == "INFLOW":
-                    monthly_data[month_key]["inflow"] += amount_in_irr
+            # Convert and sum inside Postgres by joining the forward-filled daily rates;
+            # amounts without a rate keep their original value (assumed to be IRR)
+            events_subquery = query.subquery()
+            event_currency = func.coalesce(events_subquery.c.amount_currency, 'IRR')
+            event_amount = func.coalesce(events_subquery.c.amount_value, events_subquery.c.amount)
+            month_expr = func.to_char(events_subquery.c.event_date, 'YYYY-MM')
+            direction_expr = func.upper(events_subquery.c.event_type)
+            daily_rates, rate_join, rate_expr = base_rate_join(event_currency, events_subquery.c.event_date)
+            
+            totals_result = await db.execute(
+                select(month_expr, direction_expr, func.sum(event_amount * rate_expr))
+                .select_from(events_subquery)
+                .outerjoin(daily_rates, rate_join)
+                .group_by(month_expr, direction_expr)
+            )
+            
+            for month_key, direction, total in totals_result.all():
+                if direction == "INFLOW":
+                    monthly_data[month_key]["inflow"] += Decimal(total or 0)
                 else:
-                    monthly_data[month_key]["outflow"] += amount_in_irr
+                    monthly_data[month_key]["outflow"] += Decimal(total or 0)
         else:
+            # Execute query
+            result = await db.execute(query.order_by(CashflowEvent.event_date))
+            events = result.scalars().all()
+            
             # Original currency view: Return data grouped by currency
             monthly_data_by_currency = defaultdict(lambda: defaultdict(lambda: {"inflow": Decimal(0), "outflow": Decimal(0)}))
 
@@ -171,26 +181,23 @@ async def get_cashflow_analysis(
                     total_budget_irr = Decimal(budget.available_budget or 0)  # Base budget in IRR
                     print(f"DEBUG: Budget for {month_key} ({budget.budget_date}) - Base IRR: {total_budget_irr}")
                     
-                    # Add multi-currency budgets converted to IRR
+                    # Add multi-currency budgets converted to IRR, all currencies of the
+                    # budget at once with the cross-rate matrix of its date
                     if budget.multi_currency_budget:
                         print(f"DEBUG: Multi-currency budget: {budget.multi_currency_budget}")
-                        for curr_code, curr_amount in budget.multi_currency_budget.items():
-                            try:
-                                if curr_code != 'IRR':
-                                    print(f"DEBUG: Converting {curr_amount} {curr_code} on {budget.budget_date}")
-                                    converted_amount = await currency_service.convert_to_base(
-                                        Decimal(str(curr_amount)), 
-                                        curr_code, 
-                                        budget.budget_date
-                                    )
-                                    print(f"DEBUG: Converted to {converted_amount} IRR")
-                                    total_budget_irr += converted_amount
-                                else:
-                                    total_budget_irr += Decimal(str(curr_amount))
-                            except Exception as e:
+                        codes = list(budget.multi_currency_budget)
+                        amounts = [Decimal(str(budget.multi_currency_budget[code])) for code in codes]
+                        converted = await cross_rate_engine.convert_column(
+                            db, amounts, codes, BASE_CURRENCY, budget.budget_date
+                        )
+                        for curr_code, curr_amount, converted_amount in zip(codes, amounts, converted.tolist()):
+                            if curr_code == BASE_CURRENCY:
+                                total_budget_irr += curr_amount
+                            elif math.isnan(converted_amount):
                                 # If conversion fails, skip this currency
-                                print(f"DEBUG: Conversion failed for {curr_code}: {str(e)}")
-                                pass
+                                logger.warning(f"Budget conversion failed for {curr_code}: no rate on or before {budget.budget_date}")
+                            elif curr_amount > 0:
+                                total_budget_irr += Decimal(str(converted_amount))
                     
                     print(f"DEBUG: Total budget for {month_key}: {total_budget_irr}")
                     # Sum budgets for the same month instead of overwriting
@@ -317,6 +324,7 @@ async def get_cashflow_analysis(
 
 
 @router.get("/summary")
+@cached_view(tables=_DASHBOARD_TABLES)
 async def get_dashboard_summary(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
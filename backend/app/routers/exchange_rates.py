@@ -13,6 +13,7 @@ from sqlalchemy import select, and_, desc
 from app.database import get_db
 from app.auth import get_current_user, require_admin
 from app.models import ExchangeRate, User
+from app.exchange_rate_daily import exchange_rates_changed
 from app.schemas import (
     ExchangeRate as ExchangeRateSchema,
     ExchangeRateCreate,
@@ -148,6 +149,7 @@ async def create_exchange_rate(
         existing_rate.rate = rate_data.rate
         existing_rate.is_active = rate_data.is_active
         await db.commit()
+        await exchange_rates_changed(db, [(rate_data.from_currency, rate_data.to_currency, rate_data.date)])
         await db.refresh(existing_rate)
         
         return ExchangeRateResponse(
@@ -173,6 +175,7 @@ async def create_exchange_rate(
     
     db.add(new_rate)
     await db.commit()
+    await exchange_rates_changed(db, [(rate_data.from_currency, rate_data.to_currency, rate_data.date)])
     await db.refresh(new_rate)
     
     return ExchangeRateResponse(
@@ -244,6 +247,7 @@ async def update_exchange_rate(
         rate.is_active = rate_data.is_active
     
     await db.commit()
+    await exchange_rates_changed(db, [(rate.from_currency, rate.to_currency, rate.date)])
     await db.refresh(rate)
     
     return ExchangeRateResponse(
@@ -276,8 +280,10 @@ async def delete_exchange_rate(
             detail="Exchange rate not found"
         )
     
+    change = (rate.from_currency, rate.to_currency, rate.date)
     await db.delete(rate)
     await db.commit()
+    await exchange_rates_changed(db, [change])
     
     return {"message": "Exchange rate deleted successfully"}
 
@@ -19,12 +19,13 @@ from app.optimization_engine import ProcurementOptimizer
 from app.optimization_engine_enhanced import (
     EnhancedProcurementOptimizer, SolverType, OptimizationStrategy
 )
+from app.workers.optimizer import enqueue_job, ENGINE_ENHANCED
 from app.excel_handler import ExcelHandler
-from app.models import User
+from app.models import User, OptimizationJob as OptimizationJobModel
 from app.schemas import (
     BudgetData, BudgetDataCreate, BudgetDataUpdate,
     OptimizationResult, OptimizationRunRequest, OptimizationRunResponse,
-    DashboardStats, ExcelImportResponse
+    OptimizationJob, DashboardStats, ExcelImportResponse
 )
 
 router = APIRouter(prefix="/finance", tags=["finance"])
@@ -159,6 +160,66 @@ async def run_enhanced_optimization(
     )
 
 
+@router.post("/optimize-jobs", response_model=OptimizationJob, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_optimization_job(
+    request: OptimizationRunRequest,
+    engine: str = Query(ENGINE_ENHANCED, pattern="^(LEGACY|ENHANCED)$", description="Optimization engine to run"),
+    solver_type: SolverType = Query(SolverType.CP_SAT, description="Solver type to use (enhanced engine)"),
+    generate_multiple_proposals: bool = Query(False, description="Generate multiple proposals with different strategies"),
+    strategies: Optional[List[OptimizationStrategy]] = Query(None, description="Strategies to use (default: all)"),
+    current_user: User = Depends(require_finance()),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue an optimization run for the optimization workers (python -m app.workers.optimizer).
+    
+    Returns immediately; poll GET /finance/optimize-jobs/{job_id} for the status and result.
+    """
+    return await enqueue_job(
+        db,
+        request,
+        engine=engine,
+        solver_type=solver_type.value if engine == ENGINE_ENHANCED else None,
+        generate_multiple_proposals=generate_multiple_proposals,
+        strategies=[s.value for s in strategies] if strategies else None,
+        created_by_id=current_user.id
+    )
+
+
+@router.get("/optimize-jobs", response_model=List[OptimizationJob])
+async def list_optimization_jobs(
+    job_status: Optional[str] = Query(None, alias="status", pattern="^(QUEUED|RUNNING|SUCCEEDED|FAILED)$"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(require_finance()),
+    db: AsyncSession = Depends(get_db)
+):
+    """List recent optimization jobs, newest first"""
+    query = select(OptimizationJobModel).order_by(OptimizationJobModel.created_at.desc()).limit(limit)
+    if job_status:
+        query = query.where(OptimizationJobModel.status == job_status)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+@router.get("/optimize-jobs/{job_id}", response_model=OptimizationJob)
+async def get_optimization_job(
+    job_id: str,
+    current_user: User = Depends(require_finance()),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the status (and result, once finished) of an optimization job"""
+    import uuid
+    try:
+        job_uuid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid job ID format")
+    
+    job = await db.get(OptimizationJobModel, job_uuid)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Optimization job not found")
+    return job
+
+
 @router.get("/solver-info")
 async def get_solver_information(current_user: User = Depends(get_current_user)):
     """
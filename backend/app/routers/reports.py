@@ -4,35 +4,92 @@ Provides comprehensive data aggregation and analytics for the Reports & Analytic
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, case, and_, or_, extract
+from sqlalchemy import select, func, case, and_, extract
 from sqlalchemy.orm import selectinload
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 import io
 import json
+import numpy as np
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 
 from app.database import get_db
 from app.auth import get_current_user, get_user_projects, require_analytics_access
-from app.models import User, FinalizedDecision, CashflowEvent, Project
+from app.models import User, CashflowEvent, Project
+from app.money import DEFAULT_DECIMAL_PLACES, MoneyArray, load_currency_scales
+from app.evm_engine import EvmEvents, evm_time_series, event_dates
+from app.currency_conversion_service import CurrencyConversionService, BASE_CURRENCY, MISSING_RATE_KEEP
+from app.response_cache import cached_view
+from app.decision_cube import DecisionFrame, get_decision_frame
+from app.decision_sketches import decision_sketches, PAYMENT_DELAY, CYCLE_TIME
 
 router = APIRouter(prefix="/reports", tags=["Reports & Analytics"])
 
+# Data the cached report responses are built from (app/response_cache.py)
+_REPORT_TABLES = (
+    'projects', 'finalized_decisions', 'cashflow_events', 'procurement_options',
+    'currencies', 'exchange_rates', 'exchange_rates_daily',
+)
 
-def calculate_percentile(values: List[float], percentile: int) -> float:
-    """Calculate percentile from a list of values."""
-    if not values:
-        return 0.0
-    sorted_values = sorted(values)
-    index = (percentile / 100) * (len(sorted_values) - 1)
-    lower = int(index)
-    upper = lower + 1
-    if upper >= len(sorted_values):
-        return sorted_values[-1]
-    weight = index - lower
-    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+async def _event_amounts_in_base(db: AsyncSession, events: List[CashflowEvent], scales: Dict[str, int]) -> MoneyArray:
+    """Cashflow event amounts converted to the base currency at their event dates (unconverted if no rate)"""
+    amounts = MoneyArray.from_amounts(
+        [e.amount_value for e in events], [e.amount_currency for e in events], scales
+    )
+    factors = await CurrencyConversionService(db).convert_many(
+        [1] * len(events),
+        list(amounts.currencies),
+        [e.event_date for e in events],
+        on_missing=MISSING_RATE_KEEP
+    )
+    return amounts.convert(factors, BASE_CURRENCY)
+
+
+def _locked_decisions(
+    frame: DecisionFrame,
+    project_ids: Optional[List[int]],
+    supplier_names: Optional[List[str]],
+    date_mask: Optional[np.ndarray] = None
+) -> DecisionFrame:
+    """LOCKED decisions matching the report filters"""
+    mask = frame['status'] == 'LOCKED'
+    if date_mask is not None:
+        mask &= date_mask
+    if project_ids:
+        mask &= frame.is_in('project_id', project_ids)
+    if supplier_names:
+        mask &= frame.is_in('supplier_name', supplier_names)
+    return frame.where(mask)
+
+
+def _purchased_or_finalized_between(frame: DecisionFrame, start_date: Optional[date], end_date: Optional[date]) -> np.ndarray:
+    """Decisions purchased or finalized within the date range (each bound on either date)"""
+    mask = np.ones(len(frame), dtype=bool)
+    if start_date:
+        mask &= frame.on_or_after('finalized_at', start_date) | frame.on_or_after('purchase_date', start_date)
+    if end_date:
+        mask &= frame.on_or_before('finalized_at', end_date) | frame.on_or_before('purchase_date', end_date)
+    return mask
+
+
+def _between(frame: DecisionFrame, column: str, start_date: Optional[date], end_date: Optional[date]) -> np.ndarray:
+    mask = np.ones(len(frame), dtype=bool)
+    if start_date:
+        mask &= frame.on_or_after(column, start_date)
+    if end_date:
+        mask &= frame.on_or_before(column, end_date)
+    return mask
+
+
+def _project_names(decisions: DecisionFrame) -> Dict[int, str]:
+    """{project_id: project name} in order of first appearance"""
+    names: Dict[int, str] = {}
+    for project_id, name in zip(decisions['project_id'].tolist(), decisions['project_name']):
+        names.setdefault(project_id, name or 'Unknown')
+    return names
 
 
 async def aggregate_financial_summary(
@@ -44,41 +101,12 @@ async def aggregate_financial_summary(
 ) -> Dict[str, Any]:
     """Aggregate financial summary data: cash flow and budget vs actuals."""
     
-    # Base query for finalized decisions
-    decisions_query = select(FinalizedDecision).options(
-        selectinload(FinalizedDecision.project),
-        selectinload(FinalizedDecision.procurement_option)
-    ).where(
-        FinalizedDecision.status == 'LOCKED'
+    # Locked decisions from the decision cube
+    frame = await get_decision_frame(db)
+    decisions = _locked_decisions(
+        frame, project_ids, supplier_names, _purchased_or_finalized_between(frame, start_date, end_date)
     )
     
-    # Apply filters
-    if start_date:
-        decisions_query = decisions_query.where(
-            or_(
-                FinalizedDecision.finalized_at >= datetime.combine(start_date, datetime.min.time()),
-                FinalizedDecision.purchase_date >= start_date
-            )
-        )
-    if end_date:
-        decisions_query = decisions_query.where(
-            or_(
-                FinalizedDecision.finalized_at <= datetime.combine(end_date, datetime.max.time()),
-                FinalizedDecision.purchase_date <= end_date
-            )
-        )
-    if project_ids:
-        decisions_query = decisions_query.where(FinalizedDecision.project_id.in_(project_ids))
-    
-    result = await db.execute(decisions_query)
-    all_decisions = result.scalars().all()
-    
-    # Apply supplier filter (after loading procurement_option relationship)
-    if supplier_names:
-        decisions = [d for d in all_decisions if d.procurement_option and d.procurement_option.supplier_name in supplier_names]
-    else:
-        decisions = all_decisions
-    
     # Cash Flow Analysis
     cash_flow_data = {}
     
@@ -104,15 +132,20 @@ async def aggregate_financial_summary(
     else:
         cashflow_events = all_cashflow_events
     
-    for event in cashflow_events:
-        event_date = event.event_date
-        if event_date not in cash_flow_data:
-            cash_flow_data[event_date] = {'inflow': 0, 'outflow': 0}
-        
-        if event.event_type == 'INFLOW':
-            cash_flow_data[event_date]['inflow'] += float(event.amount_value or 0)
-        elif event.event_type == 'OUTFLOW':
-            cash_flow_data[event_date]['outflow'] += float(event.amount_value or 0)
+    # Event amounts in the base currency as exact minor units
+    scales = await load_currency_scales(db)
+    event_amounts = await _event_amounts_in_base(db, cashflow_events, scales)
+    is_inflow = np.array([e.event_type == 'INFLOW' for e in cashflow_events], dtype=bool)
+    is_outflow = np.array([e.event_type == 'OUTFLOW' for e in cashflow_events], dtype=bool)
+    
+    for (event_date, _currency), total in event_amounts[is_inflow].group_sum(
+        [e.event_date for e, flag in zip(cashflow_events, is_inflow) if flag]
+    ).items():
+        cash_flow_data.setdefault(event_date, {'inflow': 0, 'outflow': 0})['inflow'] = float(total)
+    for (event_date, _currency), total in event_amounts[is_outflow].group_sum(
+        [e.event_date for e, flag in zip(cashflow_events, is_outflow) if flag]
+    ).items():
+        cash_flow_data.setdefault(event_date, {'inflow': 0, 'outflow': 0})['outflow'] = float(total)
     
     # Sort by date and calculate cumulative
     sorted_dates = sorted(cash_flow_data.keys())
@@ -131,27 +164,24 @@ async def aggregate_financial_summary(
     budget_vs_actual = []
     
     # Group by project
-    project_data = {}
-    for decision in decisions:
-        project_id = decision.project_id
-        if project_id not in project_data:
-            project_data[project_id] = {
-                'project_name': decision.project.name if decision.project else 'Unknown',
-                'planned_cost': 0,
-                'actual_cost': 0
-            }
-        project_data[project_id]['planned_cost'] += float(decision.final_cost or 0)
-        # Note: actual_cost will be calculated from cashflow events below
+    project_data = {
+        project_id: {'project_name': name, 'planned_cost': 0, 'actual_cost': 0}
+        for project_id, name in _project_names(decisions).items()
+    }
     
-    # Calculate actual costs from cashflow events
-    for event in cashflow_events:
-        if event.event_type == 'OUTFLOW' and event.related_decision:
-            project_id = event.related_decision.project_id
-            if project_id in project_data:
-                project_data[project_id]['actual_cost'] += float(event.amount_value or 0)
+    planned_costs = decisions.money('final_cost')
+    for (project_id, _currency), total in planned_costs.group_sum(decisions['project_id'].tolist()).items():
+        project_data[project_id]['planned_cost'] = float(total)
     
-    total_planned = 0
-    total_actual = 0
+    # Calculate actual costs from cashflow events
+    is_project_outflow = is_outflow & np.array([
+        bool(e.related_decision and e.related_decision.project_id in project_data) for e in cashflow_events
+    ], dtype=bool)
+    outflow_projects = [
+        e.related_decision.project_id for e, flag in zip(cashflow_events, is_project_outflow) if flag
+    ]
+    for (project_id, _currency), total in event_amounts[is_project_outflow].group_sum(outflow_projects).items():
+        project_data[project_id]['actual_cost'] = float(total)
     
     for project_id, data in project_data.items():
         planned = data['planned_cost']
@@ -166,11 +196,10 @@ async def aggregate_financial_summary(
             'variance_amount': round(variance_amount, 2),
             'variance_percent': round(variance_percent, 2)
         })
-        
-        total_planned += planned
-        total_actual += actual
     
     # Add grand total
+    total_planned = float(planned_costs.total(BASE_CURRENCY))
+    total_actual = float(event_amounts[is_project_outflow].total(BASE_CURRENCY))
     total_variance = total_actual - total_planned
     total_variance_percent = (total_variance / total_planned * 100) if total_planned > 0 else 0
     
@@ -203,41 +232,12 @@ async def aggregate_evm_analytics(
 ) -> Dict[str, Any]:
     """Aggregate EVM (Earned Value Management) analytics data."""
     
-    # Base query
-    decisions_query = select(FinalizedDecision).options(
-        selectinload(FinalizedDecision.project),
-        selectinload(FinalizedDecision.procurement_option)
-    ).where(
-        FinalizedDecision.status == 'LOCKED'
+    # Locked decisions from the decision cube
+    frame = await get_decision_frame(db)
+    decisions = _locked_decisions(
+        frame, project_ids, supplier_names, _purchased_or_finalized_between(frame, start_date, end_date)
     )
     
-    # Apply filters
-    if start_date:
-        decisions_query = decisions_query.where(
-            or_(
-                FinalizedDecision.purchase_date >= start_date,
-                FinalizedDecision.finalized_at >= datetime.combine(start_date, datetime.min.time())
-            )
-        )
-    if end_date:
-        decisions_query = decisions_query.where(
-            or_(
-                FinalizedDecision.purchase_date <= end_date,
-                FinalizedDecision.finalized_at <= datetime.combine(end_date, datetime.max.time())
-            )
-        )
-    if project_ids:
-        decisions_query = decisions_query.where(FinalizedDecision.project_id.in_(project_ids))
-    
-    result = await db.execute(decisions_query)
-    all_decisions = result.scalars().all()
-    
-    # Apply supplier filter
-    if supplier_names:
-        decisions = [d for d in all_decisions if d.procurement_option and d.procurement_option.supplier_name in supplier_names]
-    else:
-        decisions = all_decisions
-    
     # Get cashflow events for AC calculation
     cashflow_query = select(CashflowEvent).options(
         selectinload(CashflowEvent.related_decision)
@@ -260,153 +260,98 @@ async def aggregate_evm_analytics(
     else:
         cashflow_events = all_cashflow_events
     
-    # EVM Performance over time
-    evm_data = {}
-    
-    # Check if PM acceptance workflow is actually in use
-    pm_acceptance_in_use = any(d.pm_accepted_at for d in decisions)
-    
     # Check if delivery dates are realistic (not all in the future)
     current_date = date.today()
-    future_delivery_threshold = current_date + timedelta(days=365)  # 1 year from now
-    unrealistic_delivery_dates = all(
-        d.delivery_date and d.delivery_date > future_delivery_threshold 
-        for d in decisions if d.delivery_date
+    today = np.datetime64(current_date, 'D')
+    future_delivery_threshold = np.datetime64(current_date + timedelta(days=365), 'D')  # 1 year from now
+    delivery_dates = decisions['delivery_date']
+    unrealistic_delivery_dates = bool(np.all(delivery_dates[~np.isnat(delivery_dates)] > future_delivery_threshold))
+    
+    purchase_dates = decisions['purchase_date']
+    finalized_dates = decisions.days('finalized_at')
+    accepted_dates = decisions.days('pm_accepted_at')
+    is_paid = decisions['actual_payment_amount'] > 0
+    is_delivery_complete = decisions['delivery_status'] == 'DELIVERY_COMPLETE'
+    # LOCKED status only counts as earned when no decision has any other completion indicator
+    has_any_completion_indicator = bool(np.any(
+        (decisions['actual_payment_amount'] != 0) | ~np.isnat(accepted_dates) | is_delivery_complete
+    ))
+    
+    def or_today(days: np.ndarray) -> np.ndarray:
+        return np.where(np.isnat(days), today, days)
+    
+    # Planned Value (PV) date - Enhanced logic with fallbacks: purchase date, else
+    # finalized date if delivery dates are unrealistic, else delivery date
+    fallback_dates = finalized_dates if unrealistic_delivery_dates else np.full_like(finalized_dates, np.datetime64('NaT'))
+    pv_dates = np.where(
+        ~np.isnat(purchase_dates),
+        purchase_dates,
+        np.where(~np.isnat(fallback_dates), fallback_dates, delivery_dates)
     )
     
-    for decision in decisions:
-        # Planned Value (PV) - Enhanced logic with fallbacks
-        if decision.purchase_date:
-            pv_date = decision.purchase_date
-        elif unrealistic_delivery_dates and decision.finalized_at:
-            # Fallback: Use finalized_at date if delivery dates are unrealistic
-            pv_date = decision.finalized_at.date()
-        elif decision.delivery_date:
-            pv_date = decision.delivery_date
-        else:
-            continue  # Skip if no valid date available
-            
-        if pv_date not in evm_data:
-            evm_data[pv_date] = {'pv': 0, 'ev': 0, 'ac': 0}
-        evm_data[pv_date]['pv'] += float(decision.final_cost or 0)
-        
-        # Earned Value (EV) - Priority-based calculation for time-series
-        # Priority: Actual Payment > PM Acceptance > Delivery Complete > LOCKED Status
-        ev_date = None
-        
-        if decision.actual_payment_amount and decision.actual_payment_amount > 0:
-            # Priority 1: Actual payment indicates truly completed work
-            ev_date = decision.actual_payment_date if decision.actual_payment_date else current_date
-        elif decision.pm_accepted_at:
-            # Priority 2: PM acceptance if workflow exists
-            ev_date = decision.pm_accepted_at.date()
-        elif decision.delivery_status == 'DELIVERY_COMPLETE':
-            # Priority 3: Delivery complete status
-            ev_date = decision.actual_delivery_date if decision.actual_delivery_date else current_date
-        elif decision.status == 'LOCKED':
-            # Priority 4: LOCKED status (only if no other indicators available)
-            has_any_completion_indicator = any(
-                d.actual_payment_amount or 
-                d.pm_accepted_at or 
-                d.delivery_status == 'DELIVERY_COMPLETE'
-                for d in decisions
-            )
-            if not has_any_completion_indicator:
-                ev_date = decision.finalized_at.date() if decision.finalized_at else current_date
-        
-        if ev_date:
-            if ev_date not in evm_data:
-                evm_data[ev_date] = {'pv': 0, 'ev': 0, 'ac': 0}
-            evm_data[ev_date]['ev'] += float(decision.final_cost or 0)
-        
-        # Actual Cost (AC) - will be calculated from cashflow events below
-    
-    # Calculate AC from cashflow events
-    for event in cashflow_events:
-        if event.event_type == 'OUTFLOW':
-            ac_date = event.event_date
-            if ac_date not in evm_data:
-                evm_data[ac_date] = {'pv': 0, 'ev': 0, 'ac': 0}
-            evm_data[ac_date]['ac'] += float(event.amount_value or 0)
-    
-    # Sort and create cumulative values
-    sorted_dates = sorted(evm_data.keys())
-    dates_str = [d.isoformat() for d in sorted_dates]
-    
-    cumulative_pv = []
-    cumulative_ev = []
-    cumulative_ac = []
-    pv_sum = ev_sum = ac_sum = 0
+    # Earned Value (EV) date - Priority-based calculation
+    # Priority: Actual Payment > PM Acceptance > Delivery Complete > LOCKED Status
+    # (LOCKED only if no other indicators available); applied lowest priority first
+    ev_dates = np.full(len(decisions), np.datetime64('NaT'), dtype='datetime64[D]')
+    if not has_any_completion_indicator:
+        ev_dates = or_today(finalized_dates)
+    ev_dates = np.where(is_delivery_complete, or_today(decisions['actual_delivery_date']), ev_dates)
+    ev_dates = np.where(~np.isnat(accepted_dates), accepted_dates, ev_dates)
+    ev_dates = np.where(is_paid, or_today(decisions['actual_payment_date']), ev_dates)
+    is_earned = ~np.isnat(ev_dates)
+    
+    # Actual Cost (AC) from outflow cashflow events, in the base currency
+    scales = await load_currency_scales(db)
+    places = scales.get(BASE_CURRENCY, DEFAULT_DECIMAL_PLACES)
+    event_amounts = await _event_amounts_in_base(db, cashflow_events, scales)
+    is_outflow = np.array([e.event_type == 'OUTFLOW' for e in cashflow_events], dtype=bool)
+    outflow_events = [e for e, flag in zip(cashflow_events, is_outflow) if flag]
+    outflow_amounts = event_amounts[is_outflow]
+    
+    # EVM Performance over time: cumulative values on every date where any of them changes
+    # Decisions without a PV date are left out of the time series
+    costs = decisions.money('final_cost')
+    has_pv_date = ~np.isnat(pv_dates)
+    planned = EvmEvents(pv_dates[has_pv_date], costs.minor[has_pv_date])
+    earned = EvmEvents(ev_dates[has_pv_date & is_earned], costs.minor[has_pv_date & is_earned])
+    actual = EvmEvents(
+        np.array([e.event_date for e in outflow_events], dtype='datetime64[D]'),
+        outflow_amounts.minor
+    )
+    series = evm_time_series(planned, earned, actual, event_dates(planned, earned, actual), places)
     
-    for d in sorted_dates:
-        pv_sum += evm_data[d]['pv']
-        ev_sum += evm_data[d]['ev']
-        ac_sum += evm_data[d]['ac']
-        cumulative_pv.append(round(pv_sum, 2))
-        cumulative_ev.append(round(ev_sum, 2))
-        cumulative_ac.append(round(ac_sum, 2))
+    dates_str = [d.isoformat() for d in series.dates.astype(object)]
+    cumulative_pv = [round(float(x), 2) for x in series.pv]
+    cumulative_ev = [round(float(x), 2) for x in series.ev]
+    cumulative_ac = [round(float(x), 2) for x in series.ac]
     
     # KPI Trends (CPI and SPI over time)
-    cpi_values = []
-    spi_values = []
-    
-    for i in range(len(cumulative_ev)):
-        ev = cumulative_ev[i]
-        ac = cumulative_ac[i]
-        pv = cumulative_pv[i]
-        
-        cpi = (ev / ac) if ac > 0 else 1.0
-        spi = (ev / pv) if pv > 0 else 1.0
-        
-        cpi_values.append(round(cpi, 3))
-        spi_values.append(round(spi, 3))
+    cpi_values = [round(float(x), 3) for x in series.cpi()]
+    spi_values = [round(float(x), 3) for x in series.spi()]
     
     # Project KPI Breakdown
     project_kpis = []
-    project_data = {}
-    
-    for decision in decisions:
-        project_id = decision.project_id
-        if project_id not in project_data:
-            project_data[project_id] = {
-                'project_name': decision.project.name if decision.project else 'Unknown',
-                'pv': 0,
-                'ev': 0,
-                'ac': 0
-            }
-        
-        project_data[project_id]['pv'] += float(decision.final_cost or 0)
-        
-        # Enhanced EV calculation with priority-based fallbacks
-        # Priority: Actual Payment > PM Acceptance > Delivery Complete > LOCKED Status
-        if decision.actual_payment_amount and decision.actual_payment_amount > 0:
-            # Priority 1: Actual payment indicates truly completed work
-            project_data[project_id]['ev'] += float(decision.final_cost or 0)
-        elif decision.pm_accepted_at:
-            # Priority 2: PM acceptance if workflow exists
-            project_data[project_id]['ev'] += float(decision.final_cost or 0)
-        elif decision.delivery_status == 'DELIVERY_COMPLETE':
-            # Priority 3: Delivery complete status
-            project_data[project_id]['ev'] += float(decision.final_cost or 0)
-        elif decision.status == 'LOCKED':
-            # Priority 4: LOCKED status (only if no other indicators available)
-            has_any_completion_indicator = any(
-                d.actual_payment_amount or 
-                d.pm_accepted_at or 
-                d.delivery_status == 'DELIVERY_COMPLETE'
-                for d in decisions
-            )
-            if not has_any_completion_indicator:
-                project_data[project_id]['ev'] += float(decision.final_cost or 0)
-        
-        # AC will be calculated from cashflow events below
+    project_data = {
+        project_id: {'project_name': name, 'pv': 0, 'ev': 0, 'ac': 0}
+        for project_id, name in _project_names(decisions).items()
+    }
+    
+    project_keys = decisions['project_id'].tolist()
+    for (project_id, _currency), total in costs.group_sum(project_keys).items():
+        project_data[project_id]['pv'] = float(total)
+    
+    # EV uses the same priority-based rules as the time series, regardless of dates
+    earned_keys = [key for key, flag in zip(project_keys, is_earned) if flag]
+    for (project_id, _currency), total in costs[is_earned].group_sum(earned_keys).items():
+        project_data[project_id]['ev'] = float(total)
     
     # Calculate AC from cashflow events for project KPIs
-    for event in cashflow_events:
-        if event.event_type == 'OUTFLOW' and event.related_decision:
-            project_id = event.related_decision.project_id
-            if project_id in project_data:
-                project_data[project_id]['ac'] += float(event.amount_value or 0)
+    has_project = np.array([
+        bool(e.related_decision and e.related_decision.project_id in project_data) for e in outflow_events
+    ], dtype=bool)
+    ac_keys = [e.related_decision.project_id for e, flag in zip(outflow_events, has_project) if flag]
+    for (project_id, _currency), total in outflow_amounts[has_project].group_sum(ac_keys).items():
+        project_data[project_id]['ac'] = float(total)
     
     for project_id, data in project_data.items():
         pv = data['pv']
@@ -463,92 +408,55 @@ async def aggregate_risk_forecasts(
 ) -> Dict[str, Any]:
     """Aggregate risk and forecast data."""
     
-    # Base query
-    decisions_query = select(FinalizedDecision).options(
-        selectinload(FinalizedDecision.project),
-        selectinload(FinalizedDecision.procurement_option)
-    ).where(
-        FinalizedDecision.status == 'LOCKED'
+    # Locked decisions purchased within the date range, from the decision cube
+    frame = await get_decision_frame(db)
+    decisions = _locked_decisions(
+        frame, project_ids, supplier_names, _between(frame, 'purchase_date', start_date, end_date)
     )
     
-    # Apply filters
-    if start_date:
-        decisions_query = decisions_query.where(
-            FinalizedDecision.purchase_date >= start_date
-        )
-    if end_date:
-        decisions_query = decisions_query.where(
-            FinalizedDecision.purchase_date <= end_date
-        )
-    if project_ids:
-        decisions_query = decisions_query.where(FinalizedDecision.project_id.in_(project_ids))
-    
-    result = await db.execute(decisions_query)
-    all_decisions = result.scalars().all()
+    # Schedule delay of each decision (actual payment vs planned purchase), for the risk scores
+    actual_dates = decisions['actual_payment_date']
+    planned_dates = decisions['purchase_date']
+    has_delay = ~np.isnat(actual_dates) & ~np.isnat(planned_dates)
+    schedule_delays = np.zeros(len(decisions), dtype=np.int64)
+    schedule_delays[has_delay] = (actual_dates[has_delay] - planned_dates[has_delay]).astype(np.int64)
     
-    # Apply supplier filter
-    if supplier_names:
-        decisions = [d for d in all_decisions if d.procurement_option and d.procurement_option.supplier_name in supplier_names]
-    else:
-        decisions = all_decisions
-    
-    # Calculate payment delays
-    payment_delays = []
-    for decision in decisions:
-        if decision.actual_payment_date and decision.purchase_date:
-            actual_date = decision.actual_payment_date
-            planned_date = decision.purchase_date
-            delay_days = (actual_date - planned_date).days
-            # Only include reasonable delays (not extreme negative values)
-            if delay_days > -365 and delay_days < 365:  # Within 1 year range
-                payment_delays.append(delay_days)
+    # Delays within 1 year range, merged from the per project/supplier/month sketches
+    payment_delays = decision_sketches.query(
+        frame, PAYMENT_DELAY, project_ids, supplier_names, start_date, end_date
+    )
     
     # Calculate P50 and P90 - use fallback if no valid delays
-    if payment_delays:
-        p50_delay = calculate_percentile(payment_delays, 50)
-        p90_delay = calculate_percentile(payment_delays, 90)
+    if payment_delays.count:
+        p50_delay = payment_delays.percentile(50)
+        p90_delay = payment_delays.percentile(90)
     else:
         # Fallback: Use a reasonable default based on typical procurement cycles
         p50_delay = 30  # 30 days median delay
         p90_delay = 90  # 90 days 90th percentile delay
     
-    # Payment delay distribution (histogram data)
-    delay_histogram = {}
-    for delay in payment_delays:
-        # Bucket delays into 10-day intervals
-        bucket = (delay // 10) * 10
-        delay_histogram[bucket] = delay_histogram.get(bucket, 0) + 1
-    
+    # Payment delay distribution (histogram data), delays bucketed into 10-day intervals
     histogram_data = [
-        {'delay_bucket': k, 'count': v}
-        for k, v in sorted(delay_histogram.items())
+        {'delay_bucket': bucket, 'count': count}
+        for bucket, count in payment_delays.buckets(10)
     ]
     
     # Top 5 Highest Risk Items
-    risk_items = []
-    for decision in decisions:
-        planned_cost = float(decision.final_cost or 0)
-        actual_cost = float(decision.actual_payment_amount or 0)
-        cost_variance = actual_cost - planned_cost
-        
-        schedule_delay = 0
-        if decision.actual_payment_date and decision.purchase_date:
-            schedule_delay = (decision.actual_payment_date - decision.purchase_date).days
-        
-        # Calculate risk score (combination of cost overrun and schedule delay)
-        risk_score = abs(cost_variance) + (abs(schedule_delay) * 10)  # Weight schedule delay more
-        
-        risk_items.append({
-            'item_name': decision.item_code,
-            'project_name': decision.project.name if decision.project else 'Unknown',
-            'cost_variance': round(cost_variance, 2),
-            'schedule_delay': schedule_delay,
-            'risk_score': risk_score
-        })
+    cost_variances = decisions.amounts('actual_payment_amount') - decisions.amounts('final_cost')
+    # Calculate risk score (combination of cost overrun and schedule delay)
+    risk_scores = np.abs(cost_variances) + (np.abs(schedule_delays) * 10)  # Weight schedule delay more
     
     # Sort by risk score and take top 5
-    risk_items.sort(key=lambda x: x['risk_score'], reverse=True)
-    top_risk_items = risk_items[:5]
+    top_risk_items = [
+        {
+            'item_name': decisions['item_code'][k],
+            'project_name': decisions['project_name'][k] or 'Unknown',
+            'cost_variance': round(float(cost_variances[k]), 2),
+            'schedule_delay': int(schedule_delays[k]),
+            'risk_score': float(risk_scores[k])
+        }
+        for k in np.argsort(-risk_scores, kind='stable')[:5]
+    ]
     
     return {
         'delay_forecast': {
@@ -569,65 +477,46 @@ async def aggregate_operational_performance(
 ) -> Dict[str, Any]:
     """Aggregate operational performance data."""
     
-    # Base query
-    decisions_query = select(FinalizedDecision).options(
-        selectinload(FinalizedDecision.procurement_option)
-    ).where(
-        FinalizedDecision.status == 'LOCKED'
+    # Locked decisions finalized within the date range, from the decision cube
+    frame = await get_decision_frame(db)
+    decisions = _locked_decisions(
+        frame, project_ids, supplier_names, _between(frame, 'finalized_at', start_date, end_date)
     )
     
-    # Apply filters
-    if start_date:
-        decisions_query = decisions_query.where(
-            FinalizedDecision.finalized_at >= datetime.combine(start_date, datetime.min.time())
-        )
-    if end_date:
-        decisions_query = decisions_query.where(
-            FinalizedDecision.finalized_at <= datetime.combine(end_date, datetime.max.time())
-        )
-    if project_ids:
-        decisions_query = decisions_query.where(FinalizedDecision.project_id.in_(project_ids))
-    
-    result = await db.execute(decisions_query)
-    all_decisions = result.scalars().all()
-    
-    # Apply supplier filter
-    if supplier_names:
-        decisions = [d for d in all_decisions if d.procurement_option and d.procurement_option.supplier_name in supplier_names]
-    else:
-        decisions = all_decisions
-    
     # Supplier Scorecard
-    supplier_data = {}
-    
-    for decision in decisions:
-        if not decision.procurement_option:
-            continue
-            
-        supplier_name = decision.procurement_option.supplier_name
-        if not supplier_name:
-            continue
-        
-        if supplier_name not in supplier_data:
-            supplier_data[supplier_name] = {
-                'supplier_name': supplier_name,
-                'total_orders': 0,
-                'on_time_deliveries': 0,
-                'total_planned_cost': 0,
-                'total_actual_cost': 0
-            }
-        
-        supplier_data[supplier_name]['total_orders'] += 1
-        supplier_data[supplier_name]['total_planned_cost'] += float(decision.final_cost or 0)
-        supplier_data[supplier_name]['total_actual_cost'] += float(decision.actual_payment_amount or 0)
-        
-        # Check on-time delivery - Enhanced logic with fallbacks
-        if decision.actual_delivery_date and decision.delivery_date:
-            if decision.actual_delivery_date <= decision.delivery_date:
-                supplier_data[supplier_name]['on_time_deliveries'] += 1
-        elif decision.delivery_status == 'DELIVERY_COMPLETE':
-            # Fallback: If delivery is marked complete, assume it was on time
-            supplier_data[supplier_name]['on_time_deliveries'] += 1
+    has_supplier = np.fromiter((bool(name) for name in decisions['supplier_name']), dtype=bool, count=len(decisions))
+    supplied = decisions.where(has_supplier)
+    suppliers = supplied['supplier_name'].tolist()
+    supplier_index = {name: k for k, name in enumerate(dict.fromkeys(suppliers))}
+    group = np.fromiter((supplier_index[name] for name in suppliers), dtype=np.int64, count=len(suppliers))
+    
+    # Check on-time delivery - Enhanced logic with fallbacks:
+    # delivered by the planned date, or (without both dates) delivery marked complete
+    actual_delivery = supplied['actual_delivery_date']
+    planned_delivery = supplied['delivery_date']
+    has_dates = ~np.isnat(actual_delivery) & ~np.isnat(planned_delivery)
+    on_time = (has_dates & (actual_delivery <= planned_delivery)) | (
+        ~has_dates & (supplied['delivery_status'] == 'DELIVERY_COMPLETE')
+    )
+    total_orders = np.bincount(group, minlength=len(supplier_index))
+    on_time_deliveries = np.bincount(group, weights=on_time, minlength=len(supplier_index))
+    
+    supplier_data = {
+        name: {
+            'supplier_name': name,
+            'total_orders': int(total_orders[k]),
+            'on_time_deliveries': int(on_time_deliveries[k]),
+            'total_planned_cost': 0,
+            'total_actual_cost': 0
+        }
+        for name, k in supplier_index.items()
+    }
+    
+    # Planned and paid totals per supplier, summed exactly in minor units
+    for (supplier_name, _currency), total in supplied.money('final_cost').group_sum(suppliers).items():
+        supplier_data[supplier_name]['total_planned_cost'] = float(total)
+    for (supplier_name, _currency), total in supplied.money('actual_payment_amount').group_sum(suppliers).items():
+        supplier_data[supplier_name]['total_actual_cost'] = float(total)
     
     supplier_scorecard = []
     for supplier_name, data in supplier_data.items():
@@ -645,36 +534,31 @@ async def aggregate_operational_performance(
             'avg_cost_variance_percent': round(avg_cost_variance, 2)
         })
     
-    # Procurement Cycle Time - Enhanced logic with fallbacks
-    cycle_times = []
-    for decision in decisions:
-        if decision.finalized_at and decision.pm_accepted_at:
-            cycle_time = (decision.pm_accepted_at - decision.finalized_at).days
-            cycle_times.append(cycle_time)
-        elif decision.finalized_at and decision.status == 'LOCKED':
-            # Fallback: Use a reasonable cycle time if PM acceptance is not available
-            cycle_time = 7  # Assume 7 days average cycle time
-            cycle_times.append(cycle_time)
-    
-    # Create histogram for cycle times
-    cycle_time_histogram = {}
-    for cycle_time in cycle_times:
-        # Bucket into 5-day intervals
-        bucket = (cycle_time // 5) * 5
-        cycle_time_histogram[bucket] = cycle_time_histogram.get(bucket, 0) + 1
+    # Procurement Cycle Time (PM acceptance - finalization, 7 days when not accepted yet),
+    # merged from the per project/supplier/month sketches
+    cycle_times = decision_sketches.query(
+        frame, CYCLE_TIME, project_ids, supplier_names, start_date, end_date
+    )
     
+    # Create histogram for cycle times, bucketed into 5-day intervals
     cycle_time_data = [
-        {'cycle_time_bucket': k, 'count': v}
-        for k, v in sorted(cycle_time_histogram.items())
+        {'cycle_time_bucket': bucket, 'count': count}
+        for bucket, count in cycle_times.buckets(5)
     ]
     
     return {
         'supplier_scorecard': supplier_scorecard,
-        'procurement_cycle_time': cycle_time_data
+        'procurement_cycle_time': cycle_time_data,
+        'procurement_cycle_time_percentiles': {
+            'p50': round(cycle_times.percentile(50), 1),
+            'p90': round(cycle_times.percentile(90), 1),
+            'count': cycle_times.count
+        }
     }
 
 
 @router.get("/")
+@cached_view(tables=_REPORT_TABLES)
 async def get_reports_data(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
@@ -865,6 +749,7 @@ async def export_reports_excel(
 
 
 @router.get("/filters/projects")
+@cached_view(tables=('projects',))
 async def get_projects_for_filter(
     current_user: User = Depends(require_analytics_access()),
     db: AsyncSession = Depends(get_db)
@@ -879,6 +764,7 @@ async def get_projects_for_filter(
 
 
 @router.get("/filters/suppliers")
+@cached_view(tables=('procurement_options',))
 async def get_suppliers_for_filter(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_analytics_access())
@@ -902,6 +788,7 @@ async def get_suppliers_for_filter(
 
 
 @router.get("/data-summary")
+@cached_view(tables=_REPORT_TABLES)
 async def get_data_summary(
     current_user: User = Depends(require_analytics_access()),
     db: AsyncSession = Depends(get_db)
@@ -913,17 +800,15 @@ async def get_data_summary(
     from app.models import ProcurementOption
     
     # Get all locked decisions
-    locked_result = await db.execute(
-        select(FinalizedDecision).where(FinalizedDecision.status == 'LOCKED')
-    )
-    all_locked = locked_result.scalars().all()
+    frame = await get_decision_frame(db)
+    all_locked = frame.where(frame['status'] == 'LOCKED')
     total_locked = len(all_locked)
     
     # Count items with various data
-    with_invoice = sum(1 for d in all_locked if d.actual_invoice_issue_date)
-    with_payment = sum(1 for d in all_locked if d.actual_payment_date)
-    with_pm_acceptance = sum(1 for d in all_locked if d.pm_accepted_at)
-    with_delivery_complete = sum(1 for d in all_locked if d.delivery_status == 'DELIVERY_COMPLETE')
+    with_invoice = int((~np.isnat(all_locked['actual_invoice_issue_date'])).sum())
+    with_payment = int((~np.isnat(all_locked['actual_payment_date'])).sum())
+    with_pm_acceptance = int((~np.isnat(all_locked['pm_accepted_at'])).sum())
+    with_delivery_complete = int((all_locked['delivery_status'] == 'DELIVERY_COMPLETE').sum())
     
     # Count projects
     projects_result = await db.execute(
@@ -504,6 +504,38 @@ class OptimizationRunRequest(BaseModel):
     time_limit_seconds: int = Field(300, ge=10, le=3600)
     split_into_bunches: bool = Field(False, description="Split results into first bunch and rest")
     first_bunch_size: Optional[int] = Field(None, ge=1, description="Number of items in first bunch (by priority)")
+    aggregate_identical_items: bool = Field(
+        False,
+        description="Group interchangeable items across projects into integer-quantity variables (CP-SAT)"
+    )
+    solution_pool_size: Optional[int] = Field(
+        None, ge=1, le=20,
+        description="Return the K best distinct CP-SAT solutions of one strategy as proposals (enumerated with no-good cuts)"
+    )
+    solution_pool_min_distance: int = Field(
+        1, ge=1,
+        description="Minimum number of items whose choice differs between pooled solutions"
+    )
+    rolling_horizon_weeks: Optional[int] = Field(
+        None, ge=1, le=104,
+        description="Rolling-horizon mode: weeks of full-resolution (daily) slots per window"
+    )
+    rolling_horizon_step_weeks: Optional[int] = Field(
+        None, ge=1, le=104,
+        description="Weeks the window rolls forward per solve (default: the window length)"
+    )
+    rolling_horizon_coarse_days: int = Field(
+        30, ge=1, le=365,
+        description="Size of the aggregated buckets beyond the window, in days"
+    )
+    time_bucket: str = Field(
+        default='MONTH', pattern="^(DAY|WEEK|MONTH)$",
+        description="Calendar bucket (DAY, WEEK or MONTH) used to group purchases for budget constraints"
+    )
+    dump_model: bool = Field(
+        default=False,
+        description="Write the compiled solver model to the dump directory for offline replay"
+    )
 
 
 # Individual decision in an optimization proposal
@@ -578,6 +610,28 @@ class OptimizationRun(OptimizationRunBase):
     model_config = {"from_attributes": True}
 
 
+# Optimization Job Schemas
+class OptimizationJob(BaseModel):
+    id: uuid.UUID
+    engine: str
+    request_parameters: Dict[str, Any]
+    solver_type: Optional[str] = None
+    generate_multiple_proposals: bool = False
+    strategies: Optional[List[str]] = None
+    status: str
+    attempts: int
+    worker_id: Optional[str] = None
+    run_id: Optional[uuid.UUID] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    claimed_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    model_config = {"from_attributes": True}
+
+
 # Finalized Decision Schemas
 class FinalizedDecisionBase(BaseModel):
     run_id: Optional[uuid.UUID] = None
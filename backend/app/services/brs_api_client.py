@@ -1,17 +1,73 @@
 """
 BrsApi Integration Service for Real-time Currency Conversion
+
+- One long-lived aiohttp session (pooled keep-alive connections) per process instead
+  of a new session per request.
+- Stale-while-revalidate: callers get the cached rates immediately; when they are older
+  than BRS_API_REFRESH_SECONDS a refresh runs in the background. A background refresher
+  task (start()/close(), wired into the app lifespan) keeps them warm, so request
+  handlers only wait on the upstream for the very first load or force_refresh.
+- The upstream is reached through a transport. BRS_API_TRANSPORT=fake uses
+  FakeBrsTransport (sample rates, no network) for tests and offline deployments.
 """
 
 import asyncio
 import aiohttp
 import logging
+import time
 from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
 from dataclasses import dataclass
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+TRANSPORT_HTTP = 'http'
+TRANSPORT_FAKE = 'fake'
+
+SAMPLE_RESPONSE: Dict[str, Any] = {
+    "currencies": [
+        {
+            "symbol": "USD",
+            "name_en": "US Dollar",
+            "price": 1150000.0,
+            "change_percent": 0.82
+        },
+        {
+            "symbol": "EUR",
+            "name_en": "Euro",
+            "price": 46000.0,
+            "change_percent": -0.15
+        },
+        {
+            "symbol": "AED",
+            "name_en": "UAE Dirham",
+            "price": 11400.0,
+            "change_percent": 0.25
+        },
+        {
+            "symbol": "GBP",
+            "name_en": "British Pound",
+            "price": 52000.0,
+            "change_percent": 0.45
+        },
+        {
+            "symbol": "JPY",
+            "name_en": "Japanese Yen",
+            "price": 850.0,
+            "change_percent": -0.30
+        },
+        {
+            "symbol": "IRR",
+            "name_en": "Iranian Rial",
+            "price": 1.0,
+            "change_percent": 0.0
+        }
+    ]
+}
+
+
 @dataclass
 class CurrencyRate:
     symbol: str
@@ -20,153 +76,237 @@ class CurrencyRate:
     change_percent: float
     timestamp: datetime
 
+
+class BrsTransport:
+    """Fetches one raw BrsApi response"""
+
+    async def fetch(self, params: Dict[str, str]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class AiohttpTransport(BrsTransport):
+    """BrsApi over HTTP with one shared, pooled ClientSession"""
+
+    # Headers to avoid 6G Firewall blocking
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1'
+    }
+
+    def __init__(self, base_url: str, api_key: str, timeout: float = 10.0, max_connections: int = 10):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily: a ClientSession must be created inside the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.HEADERS
+            )
+        return self._session
+
+    async def fetch(self, params: Dict[str, str]) -> Dict[str, Any]:
+        session = self._get_session()
+        async with session.get(self.base_url, params={**params, "key": self.api_key}) as response:
+            if response.status != 200:
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history,
+                    status=response.status, message=f"BrsApi returned status {response.status}"
+                )
+            return await response.json(content_type=None)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class FakeBrsTransport(BrsTransport):
+    """In-process stand-in for BrsApi; serves SAMPLE_RESPONSE or the given response"""
+
+    def __init__(self, response: Optional[Dict[str, Any]] = None):
+        self.response = response if response is not None else SAMPLE_RESPONSE
+        self.calls = 0
+
+    async def fetch(self, params: Dict[str, str]) -> Dict[str, Any]:
+        self.calls += 1
+        return self.response
+
+
+def create_transport(name: Optional[str] = None) -> BrsTransport:
+    """Transport selected by BRS_API_TRANSPORT"""
+    name = (name or settings.brs_api_transport).lower()
+    if name == TRANSPORT_FAKE:
+        return FakeBrsTransport()
+    if name == TRANSPORT_HTTP:
+        return AiohttpTransport(
+            settings.brs_api_base_url,
+            settings.brs_api_key,
+            timeout=settings.brs_api_timeout_seconds,
+            max_connections=settings.brs_api_max_connections
+        )
+    raise ValueError(f"Unknown BrsApi transport '{name}' (expected '{TRANSPORT_HTTP}' or '{TRANSPORT_FAKE}')")
+
+
 class BrsApiClient:
     """Client for BrsApi currency conversion service"""
     
-    def __init__(self):
-        self.api_key = "BY2La54gKuQsmIZEZCN9TFDUPpxhAicx"
-        self.base_url = "https://BrsApi.ir/Api/Market/Gold_Currency.php"
-        self.timeout = 10
+    def __init__(self, transport: Optional[BrsTransport] = None, refresh_seconds: Optional[float] = None):
+        self.transport = transport or create_transport()
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else settings.brs_api_refresh_seconds
         self.max_retries = 3
-        self.cache_duration = timedelta(minutes=5)
-        self._cache: Dict[str, Any] = {}
+        self._rates: List[CurrencyRate] = []
         self._cache_timestamp: Optional[datetime] = None
-        
+        self._fetched_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        self._revalidate_task: Optional[asyncio.Task] = None
+        self._refresher_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Load the rates and keep them fresh from a background task"""
+        if self._refresher_task is None or self._refresher_task.done():
+            self._refresher_task = asyncio.create_task(self._refresher_loop())
+    
+    async def close(self):
+        """Stop background refreshes and release pooled connections"""
+        for task in (self._refresher_task, self._revalidate_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._refresher_task = None
+        self._revalidate_task = None
+        await self.transport.close()
+    
+    async def _refresher_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Background BrsApi refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+    
     async def _make_request(self, params: Dict[str, str]) -> Dict[str, Any]:
-        """Make HTTP request to BrsApi with retry logic"""
-        params.update({"key": self.api_key})
-        
-        # Headers to avoid 6G Firewall blocking
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
-        
+        """Fetch through the transport with retry logic; raises after the last attempt"""
+        last_error: Optional[Exception] = None
         for attempt in range(self.max_retries):
             try:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                    async with session.get(self.base_url, params=params, headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            logger.info(f"BrsApi request successful on attempt {attempt + 1}")
-                            return data
-                        else:
-                            logger.warning(f"BrsApi returned status {response.status} on attempt {attempt + 1}")
-                            
-            except asyncio.TimeoutError:
+                data = await self.transport.fetch(dict(params))
+                logger.debug(f"BrsApi request successful on attempt {attempt + 1}")
+                return data
+            except asyncio.TimeoutError as e:
+                last_error = e
                 logger.warning(f"BrsApi request timeout on attempt {attempt + 1}")
             except aiohttp.ClientError as e:
+                last_error = e
                 logger.warning(f"BrsApi client error on attempt {attempt + 1}: {e}")
             except Exception as e:
+                last_error = e
                 logger.error(f"BrsApi unexpected error on attempt {attempt + 1}: {e}")
             
             if attempt < self.max_retries - 1:
                 # Exponential backoff
-                wait_time = 2 ** attempt
-                logger.info(f"Retrying BrsApi request in {wait_time} seconds...")
-                await asyncio.sleep(wait_time)
+                await asyncio.sleep(2 ** attempt)
         
-        # If all retries failed, return mock data for development
-        logger.warning("BrsApi request failed after all retry attempts, using mock data")
-        return self._get_mock_response()
+        raise RuntimeError(f"BrsApi request failed after {self.max_retries} attempts: {last_error}")
     
-    def _get_mock_response(self) -> Dict[str, Any]:
-        """Get mock response for development/testing"""
-        return {
-            "currencies": [
-                {
-                    "symbol": "USD",
-                    "name_en": "US Dollar",
-                    "price": 1150000.0,
-                    "change_percent": 0.82
-                },
-                {
-                    "symbol": "EUR",
-                    "name_en": "Euro",
-                    "price": 46000.0,
-                    "change_percent": -0.15
-                },
-                {
-                    "symbol": "AED",
-                    "name_en": "UAE Dirham",
-                    "price": 11400.0,
-                    "change_percent": 0.25
-                },
-                {
-                    "symbol": "GBP",
-                    "name_en": "British Pound",
-                    "price": 52000.0,
-                    "change_percent": 0.45
-                },
-                {
-                    "symbol": "JPY",
-                    "name_en": "Japanese Yen",
-                    "price": 850.0,
-                    "change_percent": -0.30
-                },
-                {
-                    "symbol": "IRR",
-                    "name_en": "Iranian Rial",
-                    "price": 1.0,
-                    "change_percent": 0.0
-                }
-            ]
-        }
+    @staticmethod
+    def _parse_rates(response: Dict[str, Any]) -> List[CurrencyRate]:
+        now = datetime.now()
+        rates = []
+        for currency_data in response.get('currencies', []):
+            try:
+                rates.append(CurrencyRate(
+                    symbol=currency_data.get('symbol', ''),
+                    name_en=currency_data.get('name_en', ''),
+                    price=float(currency_data.get('price', 0)),
+                    change_percent=float(currency_data.get('change_percent', 0)),
+                    timestamp=now
+                ))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Error parsing currency data: {e}")
+        return rates
     
-    def _is_cache_valid(self) -> bool:
-        """Check if cached data is still valid"""
-        if not self._cache_timestamp or not self._cache:
-            return False
-        return datetime.now() - self._cache_timestamp < self.cache_duration
+    async def refresh(self) -> List[CurrencyRate]:
+        """Fetch the rates from the upstream now (concurrent callers share one fetch)"""
+        started = time.monotonic()
+        async with self._refresh_lock:
+            # Another caller refreshed while this one waited for the lock
+            if self._fetched_at is not None and self._fetched_at >= started:
+                return self._rates
+            
+            try:
+                response = await self._make_request({"section": "currency"})
+            except Exception:
+                if self._rates:
+                    raise
+                # Nothing to serve yet: fall back to sample data for development
+                logger.warning("BrsApi unavailable and no cached rates, using sample data")
+                response = SAMPLE_RESPONSE
+            
+            self._rates = self._parse_rates(response)
+            self._cache_timestamp = datetime.now()
+            self._fetched_at = time.monotonic()
+            logger.info(f"Fetched {len(self._rates)} currency rates from BrsApi")
+            return self._rates
+    
+    def is_stale(self) -> bool:
+        if self._fetched_at is None:
+            return True
+        return time.monotonic() - self._fetched_at >= self.refresh_seconds
+    
+    @property
+    def last_updated(self) -> Optional[datetime]:
+        return self._cache_timestamp
+    
+    def _revalidate_in_background(self):
+        if self._revalidate_task is not None and not self._revalidate_task.done():
+            return
+        
+        async def _revalidate():
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"BrsApi revalidation failed, serving stale rates: {e}")
+        
+        self._revalidate_task = asyncio.create_task(_revalidate())
     
     async def get_currency_rates(self, force_refresh: bool = False) -> List[CurrencyRate]:
-        """Get current currency rates from BrsApi"""
+        """
+        Get current currency rates from BrsApi.
         
-        # Check cache first
-        if not force_refresh and self._is_cache_valid():
-            logger.info("Returning cached currency rates")
-            return self._cache.get('rates', [])
+        Returns cached rates without waiting on the upstream; stale rates trigger a
+        background refresh. Only the first load and force_refresh wait for a fetch.
+        """
+        if force_refresh or not self._rates:
+            try:
+                return await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to fetch currency rates from BrsApi: {e}")
+                if self._rates:
+                    logger.info("Returning cached rates due to API failure")
+                    return self._rates
+                raise
         
-        try:
-            params = {"section": "currency"}
-            response = await self._make_request(params)
-            
-            # Parse response
-            currencies_data = response.get('currencies', [])
-            rates = []
-            
-            for currency_data in currencies_data:
-                try:
-                    rate = CurrencyRate(
-                        symbol=currency_data.get('symbol', ''),
-                        name_en=currency_data.get('name_en', ''),
-                        price=float(currency_data.get('price', 0)),
-                        change_percent=float(currency_data.get('change_percent', 0)),
-                        timestamp=datetime.now()
-                    )
-                    rates.append(rate)
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Error parsing currency data: {e}")
-                    continue
-            
-            # Update cache
-            self._cache['rates'] = rates
-            self._cache_timestamp = datetime.now()
-            
-            logger.info(f"Successfully fetched {len(rates)} currency rates from BrsApi")
-            return rates
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch currency rates from BrsApi: {e}")
-            # Return cached data if available, even if expired
-            if self._cache.get('rates'):
-                logger.info("Returning expired cached data due to API failure")
-                return self._cache.get('rates', [])
-            raise
+        if self.is_stale():
+            self._revalidate_in_background()
+        return self._rates
     
     async def get_currency_rate(self, symbol: str) -> Optional[CurrencyRate]:
         """Get rate for a specific currency"""
@@ -0,0 +1,284 @@
+"""
+Optimization Worker
+
+Claims queued optimization jobs from the optimization_jobs table and executes them,
+so solver capacity scales by adding worker processes or machines while API nodes
+only enqueue (POST /finance/optimize-jobs).
+
+    python -m app.workers.optimizer [--worker-id NAME] [--once]
+
+- Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers
+  can poll the same table without handing out a job twice.
+- While a job runs, a heartbeat thread updates heartbeat_at. The solver blocks the
+  worker's event loop, so the heartbeat uses its own thread, loop and connection.
+- RUNNING jobs whose heartbeat is older than optimization_worker_stale_seconds (a
+  crashed or killed worker) are requeued, or failed after optimization_job_max_attempts.
+"""
+
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import OptimizationJob
+from app.schemas import OptimizationRunRequest
+from app.optimization_engine import ProcurementOptimizer
+from app.optimization_engine_enhanced import (
+    EnhancedProcurementOptimizer, SolverType, OptimizationStrategy
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'QUEUED'
+JOB_RUNNING = 'RUNNING'
+JOB_SUCCEEDED = 'SUCCEEDED'
+JOB_FAILED = 'FAILED'
+
+ENGINE_LEGACY = 'LEGACY'
+ENGINE_ENHANCED = 'ENHANCED'
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def enqueue_job(
+    db: AsyncSession,
+    request: OptimizationRunRequest,
+    engine: str = ENGINE_ENHANCED,
+    solver_type: Optional[str] = None,
+    generate_multiple_proposals: bool = False,
+    strategies: Optional[list] = None,
+    created_by_id: Optional[int] = None
+) -> OptimizationJob:
+    """Insert a QUEUED job; a worker picks it up on its next poll"""
+    job = OptimizationJob(
+        engine=engine,
+        request_parameters=request.model_dump(mode='json'),
+        solver_type=solver_type,
+        generate_multiple_proposals=generate_multiple_proposals,
+        strategies=strategies,
+        status=JOB_QUEUED,
+        attempts=0,
+        created_by_id=created_by_id
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def claim_next_job(db: AsyncSession, worker_id: str) -> Optional[OptimizationJob]:
+    """
+    Claim the oldest QUEUED job for this worker.
+
+    Rows locked by another worker's claim are skipped instead of waited on, so
+    concurrent workers never block each other or claim the same job.
+    """
+    result = await db.execute(
+        select(OptimizationJob)
+        .where(OptimizationJob.status == JOB_QUEUED)
+        .order_by(OptimizationJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalar_one_or_none()
+    if job is None:
+        await db.rollback()
+        return None
+
+    now = _now()
+    job.status = JOB_RUNNING
+    job.worker_id = worker_id
+    job.attempts = (job.attempts or 0) + 1
+    job.claimed_at = now
+    job.heartbeat_at = now
+    job.error = None
+    await db.commit()
+    return job
+
+
+async def recover_stale_jobs(db: AsyncSession) -> int:
+    """Requeue (or fail) RUNNING jobs whose worker stopped sending heartbeats"""
+    cutoff = _now() - timedelta(seconds=settings.optimization_worker_stale_seconds)
+    result = await db.execute(
+        select(OptimizationJob)
+        .where(OptimizationJob.status == JOB_RUNNING, OptimizationJob.heartbeat_at < cutoff)
+        .with_for_update(skip_locked=True)
+    )
+    stale_jobs = result.scalars().all()
+
+    for job in stale_jobs:
+        message = f"Worker {job.worker_id} stopped sending heartbeats"
+        if job.attempts >= settings.optimization_job_max_attempts:
+            job.status = JOB_FAILED
+            job.error = f"{message}; giving up after {job.attempts} attempt(s)"
+            job.finished_at = _now()
+        else:
+            job.status = JOB_QUEUED
+            job.error = message
+            job.worker_id = None
+        logger.warning(f"Optimization job {job.id}: {message} -> {job.status}")
+
+    await db.commit()
+    return len(stale_jobs)
+
+
+class HeartbeatThread(threading.Thread):
+    """Periodically touch heartbeat_at of a running job from a separate thread"""
+
+    def __init__(self, job_id, worker_id: str, interval_seconds: float):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=self.interval_seconds)
+
+    def run(self):
+        asyncio.run(self._beat())
+
+    async def _beat(self):
+        # asyncpg connections belong to one event loop, so this thread uses its own engine
+        engine = create_async_engine(
+            settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
+            pool_size=1,
+            max_overflow=0
+        )
+        try:
+            while not self._stop_event.wait(self.interval_seconds):
+                try:
+                    async with engine.begin() as conn:
+                        await conn.execute(
+                            update(OptimizationJob.__table__)
+                            .where(
+                                OptimizationJob.__table__.c.id == self.job_id,
+                                OptimizationJob.__table__.c.worker_id == self.worker_id
+                            )
+                            .values(heartbeat_at=_now())
+                        )
+                except Exception as e:
+                    logger.warning(f"Heartbeat for optimization job {self.job_id} failed: {str(e)}")
+        finally:
+            await engine.dispose()
+
+
+async def execute_job(db: AsyncSession, job: OptimizationJob):
+    """Run the optimization described by a job with the engine it asks for"""
+    request = OptimizationRunRequest(**job.request_parameters)
+
+    if job.engine == ENGINE_LEGACY:
+        optimizer = ProcurementOptimizer(db)
+        return await optimizer.run_optimization(request)
+
+    solver_type = SolverType(job.solver_type) if job.solver_type else SolverType.CP_SAT
+    strategies = [OptimizationStrategy(s) for s in job.strategies] if job.strategies else None
+    optimizer = EnhancedProcurementOptimizer(db, solver_type=solver_type)
+    return await optimizer.run_optimization(
+        request,
+        generate_multiple_proposals=job.generate_multiple_proposals,
+        strategies=strategies
+    )
+
+
+async def process_job(job: OptimizationJob, worker_id: str):
+    """Execute a claimed job and write its result (or error) back"""
+    logger.info(f"Worker {worker_id} running optimization job {job.id} (attempt {job.attempts})")
+    heartbeat = HeartbeatThread(job.id, worker_id, settings.optimization_worker_heartbeat_seconds)
+    heartbeat.start()
+
+    status = JOB_FAILED
+    values = {}
+    try:
+        async with AsyncSessionLocal() as db:
+            response = await execute_job(db, job)
+        # An infeasible model is a finished job; ERROR means the engine itself failed
+        status = JOB_FAILED if response.status == 'ERROR' else JOB_SUCCEEDED
+        values = {
+            'run_id': response.run_id,
+            'result': response.model_dump(mode='json'),
+            'error': None if status == JOB_SUCCEEDED else response.message,
+        }
+    except Exception as e:
+        logger.error(f"Optimization job {job.id} failed: {str(e)}", exc_info=True)
+        values = {'error': str(e)}
+    finally:
+        heartbeat.stop()
+
+    async with AsyncSessionLocal() as db:
+        # Only write back if the job was not requeued to another worker in the meantime
+        await db.execute(
+            update(OptimizationJob)
+            .where(OptimizationJob.id == job.id, OptimizationJob.worker_id == worker_id)
+            .values(status=status, finished_at=_now(), heartbeat_at=_now(), **values)
+        )
+        await db.commit()
+
+    logger.info(f"Optimization job {job.id} finished: {status}")
+
+
+async def run_worker(worker_id: str, once: bool = False, stop_event: Optional[asyncio.Event] = None):
+    """Poll for jobs until stopped (or until the queue is empty with once=True)"""
+    stop_event = stop_event or asyncio.Event()
+    poll_seconds = settings.optimization_worker_poll_seconds
+    logger.info(f"Optimization worker {worker_id} started (poll every {poll_seconds}s)")
+
+    while not stop_event.is_set():
+        async with AsyncSessionLocal() as db:
+            await recover_stale_jobs(db)
+            job = await claim_next_job(db, worker_id)
+
+        if job is not None:
+            await process_job(job, worker_id)
+            continue
+
+        if once:
+            break
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    logger.info(f"Optimization worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an optimization worker")
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="Name recorded on claimed jobs (default: hostname-pid)")
+    parser.add_argument('--once', action='store_true',
+                        help="Exit when the queue is empty instead of polling")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def _run():
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                # Finish the current job, then exit
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:
+                pass
+        await run_worker(args.worker_id, once=args.once, stop_event=stop_event)
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
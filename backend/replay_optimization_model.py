@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Replay a dumped optimization model offline
+
+Dumps are written by the optimization engines when a run sets dump_model or when a
+solve takes longer than OPTIMIZATION_MODEL_DUMP_SLOW_SECONDS (see app/config.py).
+No database access is needed.
+
+Examples:
+    # Re-solve with the recorded parameters
+    python replay_optimization_model.py optimization_dumps/20250101_120000_ab12cd34_PRIORITY_WEIGHTED_cpsat
+
+    # Compare CP-SAT parameter variants
+    python replay_optimization_model.py DUMP --variant num_workers=1 --variant num_workers=8,cp_model_presolve=false
+
+    # Compare backends (CP-SAT dumps are converted when the model is linear)
+    python replay_optimization_model.py DUMP --solver SCIP --solver CBC --time-limit 60
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.optimization_model_dump import (
+    ModelDump, FORMAT_CPSAT, replay_cpsat, replay_mp, format_comparison
+)
+
+
+def parse_variant(text: str) -> Dict[str, str]:
+    """Parse 'key=value,key=value' into CP-SAT parameter overrides"""
+    overrides = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        if '=' not in part:
+            raise argparse.ArgumentTypeError(f"Expected key=value, got '{part}'")
+        key, value = part.split('=', 1)
+        overrides[key.strip()] = value.strip()
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a dumped optimization model")
+    parser.add_argument('dump', help="Dump directory (contains manifest.json and model.pb)")
+    parser.add_argument('--variant', action='append', type=parse_variant, default=[],
+                        help="CP-SAT parameter overrides, e.g. num_workers=8,cp_model_presolve=false")
+    parser.add_argument('--solver', action='append', default=[],
+                        help="Linear solver backend to replay with (GLOP, SCIP, CBC, ...)")
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help="Time limit in seconds (default: the recorded limit)")
+    args = parser.parse_args()
+
+    dump = ModelDump(args.dump)
+    manifest = dump.manifest
+    metadata = manifest.get('metadata', {})
+
+    print(f"📦 Dump: {dump.path}")
+    print(f"   Format: {dump.format}, solver: {manifest.get('solver')}, "
+          f"engine: {metadata.get('engine', '-')}, strategy: {metadata.get('strategy', '-')}")
+    print(f"   Variables: {len(manifest.get('variables', {}))}, "
+          f"items: {metadata.get('items', '-')}, options: {metadata.get('options', '-')}")
+    print()
+
+    results = []
+
+    if dump.format == FORMAT_CPSAT:
+        variants = args.variant or ([{}] if not args.solver else [])
+        for overrides in variants:
+            label = 'CP_SAT ' + (','.join(f"{k}={v}" for k, v in overrides.items()) or '(recorded)')
+            print(f"🔄 Replaying {label}...")
+            results.append(replay_cpsat(dump, overrides, args.time_limit, label))
+    elif args.variant:
+        print("⚠️  --variant only applies to CP-SAT dumps; ignoring")
+
+    solvers = args.solver or ([] if dump.format == FORMAT_CPSAT else [manifest.get('solver')])
+    for solver_name in solvers:
+        print(f"🔄 Replaying with {solver_name}...")
+        try:
+            results.append(replay_mp(dump, solver_name, args.time_limit))
+        except ValueError as e:
+            print(f"❌ {solver_name}: {e}")
+
+    print()
+    print(format_comparison(dump.recorded_result, results))
+
+
+if __name__ == "__main__":
+    main()
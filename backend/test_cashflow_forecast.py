@@ -0,0 +1,133 @@
+import sys
+sys.path.append('/app')
+
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.cashflow_forecast import month_start, add_months, build_cashflow_forecast
+
+
+def baseline_forecast(events, today, months_ahead):
+    """Monthly grouping and running balance of get_cashflow_forecast before the SQL aggregation"""
+    monthly_cashflow = {}
+    for event in events:
+        month_key = event.event_date.strftime('%Y-%m')
+        if month_key not in monthly_cashflow:
+            monthly_cashflow[month_key] = {
+                'inflow_forecast': Decimal('0'),
+                'outflow_forecast': Decimal('0'),
+                'inflow_actual': Decimal('0'),
+                'outflow_actual': Decimal('0'),
+            }
+        kind = 'inflow' if event.event_type == 'INFLOW' else 'outflow'
+        source = 'actual' if event.forecast_type == 'ACTUAL' else 'forecast'
+        monthly_cashflow[month_key][f'{kind}_{source}'] += event.amount
+
+    forecast_data = []
+    cumulative_balance = Decimal('0')
+    empty = {key: Decimal('0') for key in ('inflow_forecast', 'outflow_forecast', 'inflow_actual', 'outflow_actual')}
+    for month_offset in range(-6, months_ahead + 1):
+        target_date = today + timedelta(days=30 * month_offset)
+        month_key = target_date.strftime('%Y-%m')
+        cashflow = monthly_cashflow.get(month_key, empty)
+
+        inflow = float(cashflow.get('inflow_actual', 0) or cashflow.get('inflow_forecast', 0))
+        outflow = float(cashflow.get('outflow_actual', 0) or cashflow.get('outflow_forecast', 0))
+        net = inflow - outflow
+        cumulative_balance += Decimal(str(net))
+
+        forecast_data.append({
+            'date': month_key,
+            'inflow_forecast': float(cashflow.get('inflow_forecast', 0)),
+            'outflow_forecast': float(cashflow.get('outflow_forecast', 0)),
+            'inflow_actual': float(cashflow.get('inflow_actual', 0)),
+            'outflow_actual': float(cashflow.get('outflow_actual', 0)),
+            'net_cashflow': round(net, 2),
+            'cumulative_balance': round(float(cumulative_balance), 2),
+            'is_forecast': target_date > today,
+        })
+    return forecast_data
+
+
+def monthly_rows(events, first_month, last_month):
+    """What _MONTHLY_CASHFLOW_SQL returns: totals of every month in the range, zero when empty"""
+    rows = []
+    month = first_month
+    while month <= last_month:
+        totals = {key: Decimal('0') for key in ('inflow_actual', 'inflow_forecast', 'outflow_actual', 'outflow_forecast')}
+        for event in events:
+            if month_start(event.event_date) == month:
+                kind = 'inflow' if event.event_type.upper() == 'INFLOW' else 'outflow'
+                source = 'actual' if event.forecast_type == 'ACTUAL' else 'forecast'
+                totals[f'{kind}_{source}'] += event.amount
+        rows.append(SimpleNamespace(month=month, **totals))
+        month = add_months(month, 1)
+    return rows
+
+
+def test_cashflow_forecast():
+    print('🔍 TESTING CASH FLOW FORECAST')
+    print('=' * 60)
+    rng = np.random.default_rng(9)
+    failures = 0
+
+    # add_months against stepping one calendar month at a time
+    for start in (date(2023, 1, 1), date(2024, 11, 1), date(1999, 12, 1)):
+        forward = backward = start
+        for months in range(1, 40):
+            forward = (forward.replace(day=28) + timedelta(days=4)).replace(day=1)
+            backward = (backward - timedelta(days=1)).replace(day=1)
+            if add_months(start, months) != forward or add_months(start, -months) != backward:
+                failures += 1
+                print(f'❌ add_months({start}, ±{months}) = {add_months(start, months)}, {add_months(start, -months)}')
+                break
+
+    # Forecast against the baseline loop on days where its 30-day steps hit each month once
+    cases = 0
+    for today in (date(2025, 3, 15), date(2024, 7, 20), date(2025, 1, 18)):
+        for months_ahead in (1, 6, 12):
+            cases += 1
+            current_month = month_start(today)
+            events = [
+                SimpleNamespace(
+                    event_date=today + timedelta(days=int(rng.integers(-200, 30 * months_ahead + 30))),
+                    event_type=rng.choice(['INFLOW', 'OUTFLOW']),
+                    forecast_type=rng.choice(['ACTUAL', 'FORECAST']),
+                    amount=Decimal(int(rng.integers(1, 10**10))).scaleb(-2),
+                )
+                for _ in range(int(rng.integers(0, 300)))
+            ]
+            rows = monthly_rows(events, add_months(current_month, -6), add_months(current_month, months_ahead))
+            expected = baseline_forecast(events, today, months_ahead)
+            actual = build_cashflow_forecast(rows, today)['forecast_data']
+            if [row['date'] for row in actual] != [row['date'] for row in expected]:
+                failures += 1
+                print(f'❌ {today}, {months_ahead} months ahead: months differ from baseline')
+                continue
+            for row, base in zip(actual, expected):
+                if row['is_forecast'] != base['is_forecast'] or any(
+                    abs(row[key] - base[key]) > 0.011 for key in base if key not in ('date', 'is_forecast')
+                ):
+                    failures += 1
+                    print(f'❌ {today}, {row["date"]}: {row} != baseline {base}')
+                    break
+
+    # Calendar months: no month is skipped where the baseline's 30-day steps skipped one
+    today = date(2025, 1, 31)
+    rows = monthly_rows([], add_months(month_start(today), -6), add_months(month_start(today), 12))
+    keys = [row['date'] for row in build_cashflow_forecast(rows, today)['forecast_data']]
+    if len(keys) != 19 or len(set(keys)) != 19 or '2025-02' not in keys:
+        failures += 1
+        print(f'❌ forecast months of {today}: {keys}')
+
+    if failures:
+        print(f'\n❌ {failures} check(s) failed')
+        sys.exit(1)
+    print(f'✅ add_months and {cases} forecasts match the baseline')
+
+
+if __name__ == "__main__":
+    test_cashflow_forecast()
@@ -0,0 +1,78 @@
+import sys
+sys.path.append('/app')
+
+import numpy as np
+
+from app.decision_sketches import DayHistogram
+
+
+def baseline_percentile(values, percentile):
+    """calculate_percentile of app/routers/reports.py before the sketches"""
+    if not values:
+        return 0.0
+    sorted_values = sorted(values)
+    index = (percentile / 100) * (len(sorted_values) - 1)
+    lower = int(index)
+    upper = lower + 1
+    if upper >= len(sorted_values):
+        return sorted_values[-1]
+    weight = index - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def baseline_buckets(values, width):
+    """Delay (10-day) and cycle-time (5-day) histograms of the reports before the sketches"""
+    histogram = {}
+    for value in values:
+        bucket = (value // width) * width
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    return sorted(histogram.items())
+
+
+def test_decision_sketches():
+    print('🔍 TESTING DAY HISTOGRAM SKETCHES')
+    print('=' * 60)
+    rng = np.random.default_rng(42)
+    failures = 0
+
+    samples = [[], [5], [3, 3, 3], list(rng.integers(-30, 120, size=1000))]
+    for _ in range(50):
+        samples.append(list(rng.integers(-364, 365, size=int(rng.integers(1, 300)))))
+
+    for values in samples:
+        histogram = DayHistogram.of(np.array(values, dtype=np.int64))
+        for percentile in (0, 10, 25, 50, 75, 90, 95, 99, 100):
+            expected = baseline_percentile(values, percentile)
+            actual = histogram.percentile(percentile)
+            if abs(actual - expected) > 1e-9:
+                failures += 1
+                print(f'❌ p{percentile} of {len(values)} values: {actual} != baseline {expected}')
+            if values and abs(actual - float(np.percentile(values, percentile))) > 1e-9:
+                failures += 1
+                print(f'❌ p{percentile} of {len(values)} values: {actual} != numpy {np.percentile(values, percentile)}')
+        for width in (5, 10):
+            if histogram.buckets(width) != baseline_buckets(values, width):
+                failures += 1
+                print(f'❌ {width}-day buckets of {len(values)} values differ from baseline')
+
+    # Merging and removing give the same histogram as building from the combined values
+    first = list(rng.integers(0, 60, size=200))
+    second = list(rng.integers(0, 60, size=150))
+    merged = DayHistogram.of(np.array(first))
+    merged.merge(DayHistogram.of(np.array(second)))
+    if merged.counts != DayHistogram.of(np.array(first + second)).counts:
+        failures += 1
+        print('❌ merge differs from the histogram of the combined values')
+    merged.remove(np.array(second))
+    if merged.counts != DayHistogram.of(np.array(first)).counts:
+        failures += 1
+        print('❌ remove does not undo add')
+
+    if failures:
+        print(f'\n❌ {failures} check(s) failed')
+        sys.exit(1)
+    print(f'✅ {len(samples)} samples match the baseline percentiles, numpy.percentile and histograms')
+
+
+if __name__ == "__main__":
+    test_decision_sketches()
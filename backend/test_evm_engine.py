@@ -0,0 +1,148 @@
+import sys
+sys.path.append('/app')
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.evm_engine import EvmEvents, evm_time_series, monthly_sample_dates
+from app.money import to_minor
+
+
+def baseline_monthly_data(decisions, start_date, months_to_show, all_delivery_dates_future):
+    """Monthly PV/EV/AC loop of get_earned_value_analytics before the EVM engine"""
+    monthly_data = []
+    for month_offset in range(months_to_show):
+        target_date = start_date + timedelta(days=30 * month_offset)
+
+        pv_at_date = 0
+        for d in decisions:
+            if all_delivery_dates_future and d.finalized_at:
+                if d.finalized_at.date() <= target_date:
+                    pv_at_date += float(d.final_cost)
+            elif d.delivery_date and d.delivery_date <= target_date:
+                pv_at_date += float(d.final_cost)
+
+        ev_at_date = 0
+        for d in decisions:
+            if d.status == 'LOCKED' and d.actual_payment_amount and d.actual_payment_amount > 0 and d.actual_payment_date and d.actual_payment_date <= target_date:
+                ev_at_date += float(d.final_cost)
+            elif d.status == 'LOCKED' and d.pm_accepted_at and d.pm_accepted_at.date() <= target_date:
+                ev_at_date += float(d.final_cost)
+
+        ac_at_date = sum(
+            float(d.actual_payment_amount if d.actual_payment_amount else d.final_cost)
+            for d in decisions
+            if d.status == 'LOCKED' and d.actual_payment_date and d.actual_payment_date <= target_date
+        )
+
+        monthly_data.append({
+            'date': target_date.isoformat(),
+            'pv': round(pv_at_date, 2),
+            'ev': round(ev_at_date, 2),
+            'ac': round(ac_at_date, 2),
+            'cpi': round(ev_at_date / ac_at_date, 3) if ac_at_date > 0 else 1.0,
+            'spi': round(ev_at_date / pv_at_date, 3) if pv_at_date > 0 else 1.0,
+        })
+    return monthly_data
+
+
+def engine_monthly_data(decisions, sample_dates, all_delivery_dates_future):
+    """Same series through EvmEvents, as get_earned_value_analytics builds it"""
+    planned = EvmEvents.from_pairs(
+        (
+            d.finalized_at.date() if all_delivery_dates_future and d.finalized_at else d.delivery_date,
+            d.final_cost
+        )
+        for d in decisions
+    )
+    earned = EvmEvents.from_pairs(
+        (
+            min(filter(None, [
+                d.actual_payment_date if d.actual_payment_amount and d.actual_payment_amount > 0 else None,
+                d.pm_accepted_at.date() if d.pm_accepted_at else None,
+            ]), default=None),
+            d.final_cost
+        )
+        for d in decisions if d.status == 'LOCKED'
+    )
+    actual = EvmEvents.from_pairs(
+        (d.actual_payment_date, d.actual_payment_amount if d.actual_payment_amount else d.final_cost)
+        for d in decisions if d.status == 'LOCKED'
+    )
+    return evm_time_series(planned, earned, actual, sample_dates).to_rows()
+
+
+def random_decisions(rng, count, today):
+    decisions = []
+    for _ in range(count):
+        delivery = today + timedelta(days=int(rng.integers(-300, 300))) if rng.random() < 0.9 else None
+        locked = rng.random() < 0.6
+        paid = locked and rng.random() < 0.5
+        decisions.append(SimpleNamespace(
+            final_cost=Decimal(int(rng.integers(1, 10**9))).scaleb(-2),
+            delivery_date=delivery,
+            finalized_at=datetime.combine(today - timedelta(days=int(rng.integers(0, 400))), datetime.min.time()),
+            status='LOCKED' if locked else 'PENDING',
+            actual_payment_amount=Decimal(int(rng.integers(0, 10**9))).scaleb(-2) if paid and rng.random() < 0.8 else None,
+            actual_payment_date=today + timedelta(days=int(rng.integers(-300, 60))) if paid else None,
+            pm_accepted_at=datetime.combine(today + timedelta(days=int(rng.integers(-300, 60))), datetime.min.time()) if locked and rng.random() < 0.7 else None,
+            forecast_invoice_timing_type=rng.choice(['ABSOLUTE', 'RELATIVE', None]),
+            forecast_invoice_issue_date=today + timedelta(days=int(rng.integers(-100, 700))),
+            forecast_invoice_days_after_delivery=int(rng.integers(0, 90)) if rng.random() < 0.5 else None,
+        ))
+    return decisions
+
+
+def test_evm_engine():
+    print('🔍 TESTING EVM ENGINE')
+    print('=' * 60)
+    rng = np.random.default_rng(3)
+    today = date(2025, 6, 15)
+    failures = 0
+
+    # cumulative_at against summing the events on or before each date
+    for size in (0, 1, 50, 2000):
+        days = [date(2024, 1, 1) + timedelta(days=int(k)) for k in rng.integers(0, 600, size=size)]
+        amounts = [Decimal(int(a)).scaleb(-2) for a in rng.integers(-10**8, 10**10, size=size)]
+        events = EvmEvents.from_pairs(zip(days, amounts))
+        samples = [date(2023, 12, 1) + timedelta(days=int(k)) for k in range(0, 700, 7)]
+        actual = events.cumulative_at(np.array(samples, dtype='datetime64[D]'))
+        expected = [sum((to_minor(a) for d, a in zip(days, amounts) if d <= s), 0) for s in samples]
+        if actual.tolist() != expected:
+            failures += 1
+            print(f'❌ cumulative_at of {size} events differs from the running sum')
+
+    # Monthly EVA series against the baseline loop
+    cases = 0
+    for count in (0, 1, 5, 40, 300):
+        for all_delivery_dates_future in (False, True):
+            cases += 1
+            decisions = random_decisions(rng, count, today)
+            start_date = today - timedelta(days=180)
+            sample_dates = monthly_sample_dates(decisions, start_date, today)
+            expected = baseline_monthly_data(decisions, start_date, len(sample_dates), all_delivery_dates_future)
+            actual = engine_monthly_data(decisions, sample_dates, all_delivery_dates_future)
+            if len(actual) != len(expected):
+                failures += 1
+                print(f'❌ {count} decisions: {len(actual)} samples != baseline {len(expected)}')
+                continue
+            for row, base in zip(actual, expected):
+                if row['date'] != base['date'] or any(
+                    abs(row[key] - base[key]) > tolerance
+                    for key, tolerance in (('pv', 0.011), ('ev', 0.011), ('ac', 0.011), ('cpi', 0.0011), ('spi', 0.0011))
+                ):
+                    failures += 1
+                    print(f'❌ {count} decisions on {base["date"]}: {row} != baseline {base}')
+                    break
+
+    if failures:
+        print(f'\n❌ {failures} check(s) failed')
+        sys.exit(1)
+    print(f'✅ cumulative_at and {cases} EVA series match the baseline loops')
+
+
+if __name__ == "__main__":
+    test_evm_engine()
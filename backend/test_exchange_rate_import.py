@@ -0,0 +1,112 @@
+import sys
+sys.path.append('/app')
+
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+from app.exchange_rate_import import normalize_rate_frame, validate_rate_frame
+
+
+def baseline_import(rows):
+    """
+    Posting the rows one by one to POST /exchange-rates: the ExchangeRateCreateRequest
+    checks (date, 3-letter codes, rate > 0), different currencies, then the last rate
+    per date and pair wins
+    """
+    rates = {}
+    invalid_rows = set()
+    for source_row, row in enumerate(rows, start=2):
+        try:
+            day = date.fromisoformat(row['date'])
+            rate = Decimal(row['rate'])
+        except (ValueError, InvalidOperation):
+            invalid_rows.add(source_row)
+            continue
+        if len(row['from_currency']) != 3 or len(row['to_currency']) != 3 or not rate > 0:
+            invalid_rows.add(source_row)
+            continue
+        if row['from_currency'] == row['to_currency']:
+            invalid_rows.add(source_row)
+            continue
+        rates[(day, row['from_currency'], row['to_currency'])] = rate
+    return rates, invalid_rows
+
+
+def imported(df):
+    valid, errors, duplicates = validate_rate_frame(normalize_rate_frame(df))
+    rates = {
+        (row.date, row.from_currency, row.to_currency): Decimal(str(round(float(row.rate), 6)))
+        for row in valid.itertuples()
+    }
+    invalid_rows = {int(message.split(':')[0].split()[1]) for message in errors}
+    return valid, rates, invalid_rows, duplicates
+
+
+def test_exchange_rate_import():
+    print('🔍 TESTING EXCHANGE RATE IMPORT VALIDATION')
+    print('=' * 60)
+    rng = np.random.default_rng(5)
+    failures = 0
+
+    dates = ['2024-01-01', '2024-01-02', '2024-02-29', '2024-12-31', '2024-02-30', 'yesterday', '']
+    codes = ['USD', 'EUR', 'IRR', 'AED', 'US', 'EURO', '']
+    rates = ['1', '0.5', '42000', '123.456789', '0', '-3', 'abc', '']
+
+    cases = 0
+    for size in (1, 10, 200, 2000):
+        cases += 1
+        rows = [
+            {
+                'date': rng.choice(dates),
+                'from_currency': rng.choice(codes),
+                'to_currency': rng.choice(codes),
+                'rate': rng.choice(rates),
+            }
+            for _ in range(size)
+        ]
+        expected_rates, expected_invalid = baseline_import(rows)
+        valid, actual_rates, actual_invalid, duplicates = imported(pd.DataFrame(rows, dtype=str))
+        if actual_rates != expected_rates:
+            failures += 1
+            print(f'❌ {size} rows: imported rates differ from the row-by-row baseline')
+        if actual_invalid != expected_invalid:
+            failures += 1
+            print(f'❌ {size} rows: invalid rows {sorted(actual_invalid ^ expected_invalid)[:10]} differ from baseline')
+        if duplicates != size - len(expected_invalid) - len(expected_rates):
+            failures += 1
+            print(f'❌ {size} rows: {duplicates} duplicates reported')
+
+    # Wide layout gives the same rates as the long layout into the base currency
+    wide = pd.DataFrame({'date': ['2024-03-01', '2024-03-02'], 'USD': ['50000', ''], 'EUR': ['55000.5', '55100']})
+    _, wide_rates, wide_invalid, _ = imported(wide)
+    expected = {
+        (date(2024, 3, 1), 'USD', 'IRR'): Decimal('50000'),
+        (date(2024, 3, 1), 'EUR', 'IRR'): Decimal('55000.5'),
+        (date(2024, 3, 2), 'EUR', 'IRR'): Decimal('55100'),
+    }
+    if wide_rates != expected or wide_invalid:
+        failures += 1
+        print(f'❌ wide layout: {wide_rates} != {expected}')
+
+    # Checks the import adds on top of the single-rate endpoint
+    stricter = pd.DataFrame([
+        {'date': '2024-01-01', 'from_currency': ' usd ', 'to_currency': 'irr', 'rate': '1,234.5'},
+        {'date': '2024-01-01', 'from_currency': 'U1D', 'to_currency': 'IRR', 'rate': '1'},
+        {'date': '2024-01-01', 'from_currency': 'EUR', 'to_currency': 'IRR', 'rate': '1000000000'},
+    ], dtype=str)
+    _, strict_rates, strict_invalid, _ = imported(stricter)
+    if strict_rates != {(date(2024, 1, 1), 'USD', 'IRR'): Decimal('1234.5')} or strict_invalid != {3, 4}:
+        failures += 1
+        print(f'❌ normalization or stricter checks: {strict_rates}, invalid rows {strict_invalid}')
+
+    if failures:
+        print(f'\n❌ {failures} check(s) failed')
+        sys.exit(1)
+    print(f'✅ {cases} random files match the row-by-row baseline')
+
+
+if __name__ == "__main__":
+    test_exchange_rate_import()
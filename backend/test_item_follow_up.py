@@ -0,0 +1,88 @@
+import sys
+sys.path.append('/app')
+
+from itertools import product
+from types import SimpleNamespace
+
+from app.item_follow_up import classify_item
+
+
+def baseline_status(is_finalized, has_delivery_options, decision, procurement_options_count, finalized_options_count):
+    """Per-item status logic of get_item_follow_up before the batched follow-up queries"""
+    status = "CREATED"
+    notes = ""
+
+    if has_delivery_options:
+        status = "DELIVERY_ADDED"
+
+    if decision:
+        if decision.status == "PROPOSED":
+            status = "PROPOSED"
+        elif decision.status == "LOCKED":
+            if decision.delivery_status == "DELIVERY_COMPLETE":
+                status = "DELIVERY_COMPLETE"
+            elif decision.delivery_status == "CONFIRMED_BY_PROCUREMENT":
+                status = "CONFIRMED_BY_PROCUREMENT"
+            else:
+                status = "LOCKED"
+        elif decision.status == "PROCUREMENT_PLAN":
+            if decision.delivery_status == "DELIVERY_COMPLETE":
+                status = "DELIVERY_COMPLETE"
+            elif decision.delivery_status == "CONFIRMED_BY_PROCUREMENT":
+                status = "CONFIRMED_BY_PROCUREMENT"
+            else:
+                status = "PROCUREMENT_PLAN"
+        elif decision.status == "ORDERED":
+            status = "ORDERED"
+        elif decision.status == "DELIVERED":
+            status = "DELIVERED"
+
+    if procurement_options_count > 0 and not decision:
+        if is_finalized:
+            status = "READY_FOR_OPTIMIZATION"
+        else:
+            status = "PROCUREMENT_OPTIONS"
+        notes = f"{procurement_options_count} options ({finalized_options_count} finalized)"
+    elif procurement_options_count > 0:
+        notes = f"{procurement_options_count} options ({finalized_options_count} finalized)"
+
+    if not decision and procurement_options_count == 0 and is_finalized:
+        status = "FINALIZED"
+
+    return status, notes
+
+
+def test_item_follow_up():
+    print('🔍 TESTING ITEM FOLLOW-UP STATUS')
+    print('=' * 60)
+    failures = 0
+    cases = 0
+
+    decision_statuses = ["PROPOSED", "LOCKED", "PROCUREMENT_PLAN", "ORDERED", "DELIVERED", "REVERTED", None]
+    delivery_statuses = [None, "AWAITING_DELIVERY", "CONFIRMED_BY_PROCUREMENT", "DELIVERY_COMPLETE"]
+    decisions = [None] + [
+        SimpleNamespace(status=status, delivery_status=delivery_status)
+        for status, delivery_status in product(decision_statuses, delivery_statuses)
+    ]
+    option_counts = [(0, 0), (1, 0), (1, 1), (3, 2), (5, 5)]
+
+    for is_finalized, has_delivery_options, decision, (options, finalized) in product(
+        (False, True), (False, True), decisions, option_counts
+    ):
+        cases += 1
+        expected = baseline_status(is_finalized, has_delivery_options, decision, options, finalized)
+        actual = classify_item(is_finalized, has_delivery_options, decision, options, finalized)
+        if actual != expected:
+            failures += 1
+            described = f'{decision.status}/{decision.delivery_status}' if decision else 'no decision'
+            print(f'❌ finalized={is_finalized}, delivery options={has_delivery_options}, {described}, '
+                  f'{options} options: {actual} != baseline {expected}')
+
+    if failures:
+        print(f'\n❌ {failures} check(s) failed')
+        sys.exit(1)
+    print(f'✅ {cases} combinations match the baseline follow-up status')
+
+
+if __name__ == "__main__":
+    test_item_follow_up()
@@ -0,0 +1,91 @@
+import sys
+sys.path.append('/app')
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from app.money import Money, MoneyArray, to_minor, from_minor
+
+
+def baseline_group_sum(amounts, currencies, keys):
+    """Decimal loop of the analytics and report aggregations before the minor-unit refactor"""
+    totals = {}
+    for amount, currency, key in zip(amounts, currencies, keys):
+        code = (currency or 'IRR').strip().upper()
+        totals[(key, code)] = totals.get((key, code), Decimal('0')) + (amount or Decimal('0'))
+    return totals
+
+
+def test_money():
+    print('🔍 TESTING MINOR-UNIT MONEY')
+    print('=' * 60)
+    rng = np.random.default_rng(11)
+    failures = 0
+
+    # to_minor / from_minor round-trip stored Numeric(15, 2) amounts exactly
+    for text in ('0', '0.01', '-0.01', '12.34', '999999999999.99', '-4500000.50', '1e3'):
+        amount = Decimal(text)
+        expected = int((amount * 100).to_integral_value(rounding=ROUND_HALF_UP))
+        if to_minor(amount) != expected or from_minor(to_minor(amount)) != amount:
+            failures += 1
+            print(f'❌ to_minor/from_minor of {text}: {to_minor(amount)} != {expected}')
+    for value, expected in ((0.125, 13), (-0.125, -13), ('2.345', 235), (None, 0), (7, 700)):
+        if to_minor(value) != expected:
+            failures += 1
+            print(f'❌ to_minor({value!r}) = {to_minor(value)}, expected {expected}')
+    if to_minor(Decimal('1.2345'), 4) != 12345 or to_minor(Decimal('1.5'), 0) != 2:
+        failures += 1
+        print('❌ to_minor ignores the decimal places')
+
+    # group_sum and totals against the Decimal loops they replace
+    cases = 0
+    for size in (0, 1, 10, 500, 5000):
+        amounts = [
+            None if rng.random() < 0.05 else Decimal(int(rng.integers(-10**11, 10**11))).scaleb(-2)
+            for _ in range(size)
+        ]
+        currencies = [rng.choice(['IRR', 'USD', 'eur ', None]) for _ in range(size)]
+        keys = [int(k) for k in rng.integers(1, 20, size=size)]
+        cases += 1
+
+        money = MoneyArray.from_amounts(amounts, currencies)
+        expected = baseline_group_sum(amounts, currencies, keys)
+        actual = {pair: total.amount for pair, total in money.group_sum(keys).items()}
+        if actual != expected:
+            failures += 1
+            print(f'❌ group_sum of {size} amounts differs from the Decimal sums')
+
+        per_currency = {}
+        for (key, code), total in expected.items():
+            per_currency[code] = per_currency.get(code, Decimal('0')) + total
+        if {code: total.amount for code, total in money.totals().items()} != per_currency:
+            failures += 1
+            print(f'❌ totals of {size} amounts differ from the Decimal sums')
+
+        usd = money[money.currencies == 'USD']
+        if usd.total().amount != per_currency.get('USD', Decimal('0')):
+            failures += 1
+            print(f'❌ USD total of {size} amounts differs from the Decimal sum')
+
+    try:
+        MoneyArray.from_amounts([1, 2], ['IRR', 'USD']).total()
+        failures += 1
+        print('❌ total of mixed currencies did not raise')
+    except ValueError:
+        pass
+    try:
+        Money.of(1, 'IRR') + Money.of(1, 'USD')
+        failures += 1
+        print('❌ adding different currencies did not raise')
+    except ValueError:
+        pass
+
+    if failures:
+        print(f'\n❌ {failures} check(s) failed')
+        sys.exit(1)
+    print(f'✅ to_minor and {cases} group sums match the baseline Decimal arithmetic')
+
+
+if __name__ == "__main__":
+    test_money()
@@ -0,0 +1,92 @@
+import sys
+sys.path.append('/app')
+
+from datetime import date, timedelta
+import math
+
+import numpy as np
+
+from app.rate_history import downsample_lttb, downsample_rate_history
+
+
+def reference_lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets as in Steinarsson's reference implementation (indices)"""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    kept = [0]
+    for i in range(threshold - 2):
+        avg_start = math.floor((i + 1) * every) + 1
+        avg_end = min(math.floor((i + 2) * every) + 1, n)
+        avg_x = sum(points[j][0] for j in range(avg_start, avg_end)) / (avg_end - avg_start)
+        avg_y = sum(points[j][1] for j in range(avg_start, avg_end)) / (avg_end - avg_start)
+
+        range_start = math.floor(i * every) + 1
+        range_end = math.floor((i + 1) * every) + 1
+        max_area = -1.0
+        next_a = range_start
+        for j in range(range_start, range_end):
+            area = abs(
+                (points[a][0] - avg_x) * (points[j][1] - points[a][1])
+                - (points[a][0] - points[j][0]) * (avg_y - points[a][1])
+            )
+            if area > max_area:
+                max_area = area
+                next_a = j
+        kept.append(next_a)
+        a = next_a
+    kept.append(n - 1)
+    return kept
+
+
+def test_rate_history():
+    print('🔍 TESTING RATE HISTORY DOWNSAMPLING')
+    print('=' * 60)
+    rng = np.random.default_rng(7)
+    failures = 0
+    cases = 0
+
+    for n in (3, 10, 101, 365, 1000, 3650):
+        x = np.arange(n, dtype=np.int64) + 19000
+        y = np.cumsum(rng.normal(0, 1, size=n)) + 50000
+        points = list(zip(x.tolist(), y.tolist()))
+        for threshold in (2, 3, 4, 50, 200, 500, n - 1, n, n + 10):
+            if threshold < 2:
+                continue
+            cases += 1
+            actual = downsample_lttb(x, y, threshold).tolist()
+            expected = reference_lttb(points, threshold)
+            if actual != expected:
+                failures += 1
+                print(f'❌ n={n}, threshold={threshold}: indices differ from the reference LTTB')
+            if len(actual) != min(n, threshold if threshold >= 3 else n) or actual[0] != 0 or actual[-1] != n - 1:
+                failures += 1
+                print(f'❌ n={n}, threshold={threshold}: wrong length or endpoints')
+            if any(b <= a for a, b in zip(actual, actual[1:])):
+                failures += 1
+                print(f'❌ n={n}, threshold={threshold}: indices not increasing')
+
+    # Without max_points (or at or below it) the history is returned unchanged, as before
+    history = [
+        {'date': date(2024, 1, 1) + timedelta(days=i), 'rate': 42000 + i % 17}
+        for i in range(400)
+    ]
+    if downsample_rate_history(history, None) is not history or downsample_rate_history(history, 400) is not history:
+        failures += 1
+        print('❌ history without downsampling is not returned unchanged')
+    reduced = downsample_rate_history(history, 100)
+    if len(reduced) != 100 or reduced[0] is not history[0] or reduced[-1] is not history[-1]:
+        failures += 1
+        print('❌ downsampled history does not keep 100 rows including first and last')
+
+    if failures:
+        print(f'\n❌ {failures} check(s) failed')
+        sys.exit(1)
+    print(f'✅ {cases} series match the reference LTTB')
+
+
+if __name__ == "__main__":
+    test_rate_history()